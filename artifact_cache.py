@@ -0,0 +1,167 @@
+# artifact_cache.py
+"""
+Content-addressed cache for circuit build artifacts (circom source, r1cs/wasm, zkeys).
+
+Each build stage stores its outputs under artifacts/build_cache/<stage>/<key>/, where key is a SHA-256 over
+everything the stage depends on. A stage directory is only published once all of its outputs exist, so an
+existing directory means the stage is up to date. manifest.json records which keys are current for each
+circuit; config_loader resolves the wasm/zkey/vkey paths through it and falls back to the hand-built
+locations when a circuit has never been built by zkp_scripts/09_build_zkp_artifacts.py.
+
+This module must not import config_loader (config_loader imports it).
+"""
+import glob
+import hashlib
+import json
+import os
+import re
+import shutil
+import struct
+
+import metrics
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_ROOT = os.path.join(BASE_DIR, "artifacts", "build_cache")
+MANIFEST_PATH = os.path.join(CACHE_ROOT, "manifest.json")
+
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def sha256_file(path):
+    """SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def stage_key(stage_name, **inputs):
+    """Cache key for a stage: hash of the stage name and its (JSON-serialisable) inputs."""
+    payload = json.dumps({"stage": stage_name, "inputs": inputs}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def stage_dir(stage_name, key):
+    return os.path.join(CACHE_ROOT, stage_name, key)
+
+
+def is_built(stage_name, key):
+    built = os.path.isdir(stage_dir(stage_name, key))
+    metrics.record_cache(f"build_{stage_name}", built)
+    return built
+
+
+def begin_stage(stage_name, key):
+    """Returns an empty scratch directory for building a stage; pass it to publish_stage when done."""
+    scratch_dir = stage_dir(stage_name, key) + ".tmp"
+    shutil.rmtree(scratch_dir, ignore_errors=True)
+    os.makedirs(scratch_dir)
+    return scratch_dir
+
+
+def publish_stage(stage_name, key, scratch_dir):
+    """Atomically moves a finished scratch directory into the cache."""
+    final_dir = stage_dir(stage_name, key)
+    if os.path.isdir(final_dir): # Someone else built the same content in the meantime
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+    else:
+        os.replace(scratch_dir, final_dir)
+    return final_dir
+
+
+def load_manifest():
+    if not os.path.exists(MANIFEST_PATH):
+        return {"circuits": {}, "file_digests": {}}
+    with open(MANIFEST_PATH, 'r') as f:
+        manifest = json.load(f)
+    manifest.setdefault("circuits", {})
+    manifest.setdefault("file_digests", {})
+    return manifest
+
+
+def save_manifest(manifest):
+    os.makedirs(CACHE_ROOT, exist_ok=True)
+    tmp_path = MANIFEST_PATH + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, MANIFEST_PATH)
+
+
+def cached_file_digest(manifest, path):
+    """sha256_file, memoised in the manifest by (size, mtime) so large ptau files are hashed only once."""
+    stat = os.stat(path)
+    entry = manifest["file_digests"].get(os.path.abspath(path))
+    if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+        return entry["sha256"]
+    digest = sha256_file(path)
+    manifest["file_digests"][os.path.abspath(path)] = {"size": stat.st_size, "mtime": stat.st_mtime, "sha256": digest}
+    return digest
+
+
+def resolve(circuit_name, artifact, default_path):
+    """
+    Path of a built artifact ("wasm", "witness_gen", "zkey", "vkey", ...) for circuit_name, taken from the
+    manifest if the build driver produced it and the file still exists, otherwise default_path.
+    """
+    try:
+        entry = load_manifest()["circuits"].get(circuit_name, {})
+    except (OSError, ValueError):
+        return default_path
+    relative_path = entry.get("artifacts", {}).get(artifact)
+    if relative_path:
+        cached_path = os.path.join(CACHE_ROOT, relative_path)
+        if os.path.exists(cached_path):
+            return cached_path
+    return default_path
+
+
+def read_r1cs_header(r1cs_path):
+    """
+    Reads the header section of a circom .r1cs file (iden3 binary format) and returns its counts:
+    n_wires, n_pub_out, n_pub_in, n_prv_in, n_labels and n_constraints.
+    """
+    with open(r1cs_path, 'rb') as f:
+        magic, version, n_sections = struct.unpack('<4sII', f.read(12))
+        if magic != b'r1cs':
+            raise ValueError(f"{r1cs_path} is not an r1cs file")
+        for _ in range(n_sections):
+            section_type, section_size = struct.unpack('<IQ', f.read(12))
+            if section_type != 1:
+                f.seek(section_size, os.SEEK_CUR)
+                continue
+            field_size, = struct.unpack('<I', f.read(4))
+            f.seek(field_size, os.SEEK_CUR) # Prime
+            n_wires, n_pub_out, n_pub_in, n_prv_in, n_labels, n_constraints = struct.unpack('<IIIIQI', f.read(28))
+            return {"n_wires": n_wires, "n_pub_out": n_pub_out, "n_pub_in": n_pub_in, "n_prv_in": n_prv_in,
+                    "n_labels": n_labels, "n_constraints": n_constraints}
+    raise ValueError(f"{r1cs_path} has no header section")
+
+
+def required_ptau_power(r1cs_header):
+    """Smallest powers-of-tau exponent snarkjs groth16 setup accepts for this circuit."""
+    domain_rows = r1cs_header["n_constraints"] + r1cs_header["n_pub_in"] + r1cs_header["n_pub_out"]
+    return max(1, domain_rows.bit_length())
+
+
+def ptau_power_from_name(ptau_path):
+    """Exponent encoded in a ptau file name (pot12_final.ptau -> 12, powersOfTau28_hez_final_14.ptau -> 14)."""
+    numbers = re.findall(r'\d+', os.path.basename(ptau_path))
+    return int(numbers[-1]) if numbers else None
+
+
+def ptau_candidates(required_power, search_dirs):
+    """(path, power) of every .ptau file in search_dirs that fits required_power, smallest first."""
+    candidates = []
+    for search_dir in search_dirs:
+        for ptau_path in glob.glob(os.path.join(search_dir, "*.ptau")):
+            power = ptau_power_from_name(ptau_path)
+            if power is not None and power >= required_power:
+                candidates.append((power, os.path.getsize(ptau_path), ptau_path))
+    return [(ptau_path, power) for power, _, ptau_path in sorted(candidates)]
+
+
+def find_smallest_ptau(required_power, search_dirs):
+    """Returns (path, power) of the smallest .ptau file in search_dirs that fits required_power, or (None, None)."""
+    candidates = ptau_candidates(required_power, search_dirs)
+    return candidates[0] if candidates else (None, None)
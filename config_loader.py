@@ -3,6 +3,9 @@ import os
 from dotenv import load_dotenv
 import json
 from web3 import Web3 # Import Web3 here for to_checksum_address
+import artifact_cache # Resolves circuit/zkey paths built by zkp_scripts/09_build_zkp_artifacts.py
+import prover_backends
+import proof_scheduler
 
 load_dotenv() # Load variables from .env file
 
@@ -29,6 +32,187 @@ else:
 # Option 1: Paste as a multi-line string
 CONTRACT_ABI_STRING = """
 [
+	{
+		"inputs": [
+			{
+				"internalType": "uint256",
+				"name": "_udi",
+				"type": "uint256"
+			},
+			{
+				"internalType": "uint256",
+				"name": "_predictedClass",
+				"type": "uint256"
+			},
+			{
+				"internalType": "uint256",
+				"name": "_featureCommitment",
+				"type": "uint256"
+			},
+			{
+				"internalType": "uint256[2]",
+				"name": "_pi_a",
+				"type": "uint256[2]"
+			},
+			{
+				"internalType": "uint256[2][2]",
+				"name": "_pi_b",
+				"type": "uint256[2][2]"
+			},
+			{
+				"internalType": "uint256[2]",
+				"name": "_pi_c",
+				"type": "uint256[2]"
+			},
+			{
+				"internalType": "string",
+				"name": "_notes",
+				"type": "string"
+			}
+		],
+		"name": "logCommittedPrediction",
+		"outputs": [
+			{
+				"internalType": "uint256",
+				"name": "recordId",
+				"type": "uint256"
+			}
+		],
+		"stateMutability": "nonpayable",
+		"type": "function"
+	},
+	{
+		"inputs": [
+			{
+				"internalType": "bytes32",
+				"name": "_root",
+				"type": "bytes32"
+			},
+			{
+				"internalType": "uint64",
+				"name": "_windowStart",
+				"type": "uint64"
+			},
+			{
+				"internalType": "uint64",
+				"name": "_windowEnd",
+				"type": "uint64"
+			},
+			{
+				"internalType": "uint32",
+				"name": "_leafCount",
+				"type": "uint32"
+			}
+		],
+		"name": "logMerkleRoot",
+		"outputs": [
+			{
+				"internalType": "uint256",
+				"name": "windowId",
+				"type": "uint256"
+			}
+		],
+		"stateMutability": "nonpayable",
+		"type": "function"
+	},
+	{
+		"inputs": [
+			{
+				"internalType": "uint256",
+				"name": "_udi",
+				"type": "uint256"
+			},
+			{
+				"internalType": "uint256",
+				"name": "_predictedClass",
+				"type": "uint256"
+			},
+			{
+				"internalType": "uint256",
+				"name": "_packedInputs",
+				"type": "uint256"
+			},
+			{
+				"internalType": "uint256[2]",
+				"name": "_pi_a",
+				"type": "uint256[2]"
+			},
+			{
+				"internalType": "uint256[2][2]",
+				"name": "_pi_b",
+				"type": "uint256[2][2]"
+			},
+			{
+				"internalType": "uint256[2]",
+				"name": "_pi_c",
+				"type": "uint256[2]"
+			},
+			{
+				"internalType": "string",
+				"name": "_notes",
+				"type": "string"
+			}
+		],
+		"name": "logPackedPrediction",
+		"outputs": [
+			{
+				"internalType": "uint256",
+				"name": "recordId",
+				"type": "uint256"
+			}
+		],
+		"stateMutability": "nonpayable",
+		"type": "function"
+	},
+	{
+		"inputs": [
+			{
+				"internalType": "uint256[]",
+				"name": "_udis",
+				"type": "uint256[]"
+			},
+			{
+				"internalType": "uint256[]",
+				"name": "_predictedClasses",
+				"type": "uint256[]"
+			},
+			{
+				"internalType": "uint256[]",
+				"name": "_packedInputs",
+				"type": "uint256[]"
+			},
+			{
+				"internalType": "uint256[2]",
+				"name": "_pi_a",
+				"type": "uint256[2]"
+			},
+			{
+				"internalType": "uint256[2][2]",
+				"name": "_pi_b",
+				"type": "uint256[2][2]"
+			},
+			{
+				"internalType": "uint256[2]",
+				"name": "_pi_c",
+				"type": "uint256[2]"
+			},
+			{
+				"internalType": "string",
+				"name": "_notes",
+				"type": "string"
+			}
+		],
+		"name": "logPackedPredictionBatch",
+		"outputs": [
+			{
+				"internalType": "uint256",
+				"name": "batchId",
+				"type": "uint256"
+			}
+		],
+		"stateMutability": "nonpayable",
+		"type": "function"
+	},
 	{
 		"inputs": [
 			{
@@ -67,82 +251,742 @@ CONTRACT_ABI_STRING = """
 				"type": "string"
 			}
 		],
-		"name": "logPrediction",
-		"outputs": [
+		"name": "logPrediction",
+		"outputs": [
+			{
+				"internalType": "uint256",
+				"name": "recordId",
+				"type": "uint256"
+			}
+		],
+		"stateMutability": "nonpayable",
+		"type": "function"
+	},
+	{
+		"inputs": [
+			{
+				"internalType": "uint256[]",
+				"name": "_udis",
+				"type": "uint256[]"
+			},
+			{
+				"internalType": "uint256[]",
+				"name": "_predictedClasses",
+				"type": "uint256[]"
+			},
+			{
+				"internalType": "uint256[8][]",
+				"name": "_publicInputs",
+				"type": "uint256[8][]"
+			},
+			{
+				"internalType": "uint256[2]",
+				"name": "_pi_a",
+				"type": "uint256[2]"
+			},
+			{
+				"internalType": "uint256[2][2]",
+				"name": "_pi_b",
+				"type": "uint256[2][2]"
+			},
+			{
+				"internalType": "uint256[2]",
+				"name": "_pi_c",
+				"type": "uint256[2]"
+			},
+			{
+				"internalType": "string",
+				"name": "_notes",
+				"type": "string"
+			}
+		],
+		"name": "logPredictionBatch",
+		"outputs": [
+			{
+				"internalType": "uint256",
+				"name": "batchId",
+				"type": "uint256"
+			}
+		],
+		"stateMutability": "nonpayable",
+		"type": "function"
+	},
+	{
+		"inputs": [
+			{
+				"internalType": "uint256",
+				"name": "_udi",
+				"type": "uint256"
+			},
+			{
+				"internalType": "uint256",
+				"name": "_predictedClass",
+				"type": "uint256"
+			},
+			{
+				"internalType": "uint256[8]",
+				"name": "_publicInputs",
+				"type": "uint256[8]"
+			},
+			{
+				"internalType": "uint256",
+				"name": "_featureCommitment",
+				"type": "uint256"
+			},
+			{
+				"internalType": "bytes32",
+				"name": "_verificationKeyHash",
+				"type": "bytes32"
+			},
+			{
+				"internalType": "uint256[24]",
+				"name": "_proof",
+				"type": "uint256[24]"
+			},
+			{
+				"internalType": "string",
+				"name": "_notes",
+				"type": "string"
+			}
+		],
+		"name": "logUniversalPrediction",
+		"outputs": [
+			{
+				"internalType": "uint256",
+				"name": "recordId",
+				"type": "uint256"
+			}
+		],
+		"stateMutability": "nonpayable",
+		"type": "function"
+	},
+	{
+		"inputs": [
+			{
+				"internalType": "bytes32",
+				"name": "_verificationKeyHash",
+				"type": "bytes32"
+			},
+			{
+				"internalType": "uint8",
+				"name": "_proofSystem",
+				"type": "uint8"
+			}
+		],
+		"name": "registerVerificationKey",
+		"outputs": [],
+		"stateMutability": "nonpayable",
+		"type": "function"
+	},
+	{
+		"inputs": [
+			{
+				"internalType": "address",
+				"name": "newOwner",
+				"type": "address"
+			}
+		],
+		"name": "transferOwnership",
+		"outputs": [],
+		"stateMutability": "nonpayable",
+		"type": "function"
+	},
+	{
+		"inputs": [],
+		"stateMutability": "nonpayable",
+		"type": "constructor"
+	},
+	{
+		"anonymous": false,
+		"inputs": [
+			{
+				"indexed": true,
+				"internalType": "uint256",
+				"name": "windowId",
+				"type": "uint256"
+			},
+			{
+				"indexed": true,
+				"internalType": "bytes32",
+				"name": "root",
+				"type": "bytes32"
+			},
+			{
+				"indexed": false,
+				"internalType": "uint64",
+				"name": "windowStart",
+				"type": "uint64"
+			},
+			{
+				"indexed": false,
+				"internalType": "uint64",
+				"name": "windowEnd",
+				"type": "uint64"
+			},
+			{
+				"indexed": false,
+				"internalType": "uint32",
+				"name": "leafCount",
+				"type": "uint32"
+			},
+			{
+				"indexed": true,
+				"internalType": "address",
+				"name": "submittedBy",
+				"type": "address"
+			}
+		],
+		"name": "MerkleRootLogged",
+		"type": "event"
+	},
+	{
+		"anonymous": false,
+		"inputs": [
+			{
+				"indexed": true,
+				"internalType": "uint256",
+				"name": "batchId",
+				"type": "uint256"
+			},
+			{
+				"indexed": false,
+				"internalType": "uint256",
+				"name": "firstRecordId",
+				"type": "uint256"
+			},
+			{
+				"indexed": false,
+				"internalType": "uint256",
+				"name": "count",
+				"type": "uint256"
+			},
+			{
+				"indexed": true,
+				"internalType": "address",
+				"name": "submittedBy",
+				"type": "address"
+			}
+		],
+		"name": "PredictionBatchLogged",
+		"type": "event"
+	},
+	{
+		"anonymous": false,
+		"inputs": [
+			{
+				"indexed": true,
+				"internalType": "uint256",
+				"name": "recordId",
+				"type": "uint256"
+			},
+			{
+				"indexed": true,
+				"internalType": "uint256",
+				"name": "udi",
+				"type": "uint256"
+			},
+			{
+				"indexed": false,
+				"internalType": "uint256",
+				"name": "timestamp",
+				"type": "uint256"
+			},
+			{
+				"indexed": false,
+				"internalType": "uint256",
+				"name": "predictedClass",
+				"type": "uint256"
+			},
+			{
+				"indexed": true,
+				"internalType": "address",
+				"name": "submittedBy",
+				"type": "address"
+			}
+		],
+		"name": "PredictionLogged",
+		"type": "event"
+	},
+	{
+		"anonymous": false,
+		"inputs": [
+			{
+				"indexed": true,
+				"internalType": "bytes32",
+				"name": "verificationKeyHash",
+				"type": "bytes32"
+			},
+			{
+				"indexed": false,
+				"internalType": "uint8",
+				"name": "proofSystem",
+				"type": "uint8"
+			}
+		],
+		"name": "VerificationKeyRegistered",
+		"type": "event"
+	},
+	{
+		"inputs": [],
+		"name": "PROOF_SYSTEM_FFLONK",
+		"outputs": [
+			{
+				"internalType": "uint8",
+				"name": "",
+				"type": "uint8"
+			}
+		],
+		"stateMutability": "view",
+		"type": "function"
+	},
+	{
+		"inputs": [],
+		"name": "PROOF_SYSTEM_PLONK",
+		"outputs": [
+			{
+				"internalType": "uint8",
+				"name": "",
+				"type": "uint8"
+			}
+		],
+		"stateMutability": "view",
+		"type": "function"
+	},
+	{
+		"inputs": [],
+		"name": "batchCount",
+		"outputs": [
+			{
+				"internalType": "uint256",
+				"name": "",
+				"type": "uint256"
+			}
+		],
+		"stateMutability": "view",
+		"type": "function"
+	},
+	{
+		"inputs": [
+			{
+				"internalType": "uint256",
+				"name": "",
+				"type": "uint256"
+			}
+		],
+		"name": "batches",
+		"outputs": [
+			{
+				"internalType": "uint256",
+				"name": "firstRecordId",
+				"type": "uint256"
+			},
+			{
+				"internalType": "uint256",
+				"name": "count",
+				"type": "uint256"
+			},
+			{
+				"components": [
+					{
+						"internalType": "uint256[2]",
+						"name": "pi_a",
+						"type": "uint256[2]"
+					},
+					{
+						"internalType": "uint256[2][2]",
+						"name": "pi_b",
+						"type": "uint256[2][2]"
+					},
+					{
+						"internalType": "uint256[2]",
+						"name": "pi_c",
+						"type": "uint256[2]"
+					}
+				],
+				"internalType": "struct PredictionLogger.PredictionProof",
+				"name": "proof",
+				"type": "tuple"
+			},
+			{
+				"internalType": "string",
+				"name": "notes",
+				"type": "string"
+			}
+		],
+		"stateMutability": "view",
+		"type": "function"
+	},
+	{
+		"inputs": [
+			{
+				"internalType": "uint256",
+				"name": "",
+				"type": "uint256"
+			}
+		],
+		"name": "featureCommitments",
+		"outputs": [
+			{
+				"internalType": "uint256",
+				"name": "",
+				"type": "uint256"
+			}
+		],
+		"stateMutability": "view",
+		"type": "function"
+	},
+	{
+		"inputs": [
+			{
+				"internalType": "uint256",
+				"name": "_batchId",
+				"type": "uint256"
+			}
+		],
+		"name": "getBatch",
+		"outputs": [
+			{
+				"components": [
+					{
+						"internalType": "uint256",
+						"name": "firstRecordId",
+						"type": "uint256"
+					},
+					{
+						"internalType": "uint256",
+						"name": "count",
+						"type": "uint256"
+					},
+					{
+						"components": [
+							{
+								"internalType": "uint256[2]",
+								"name": "pi_a",
+								"type": "uint256[2]"
+							},
+							{
+								"internalType": "uint256[2][2]",
+								"name": "pi_b",
+								"type": "uint256[2][2]"
+							},
+							{
+								"internalType": "uint256[2]",
+								"name": "pi_c",
+								"type": "uint256[2]"
+							}
+						],
+						"internalType": "struct PredictionLogger.PredictionProof",
+						"name": "proof",
+						"type": "tuple"
+					},
+					{
+						"internalType": "string",
+						"name": "notes",
+						"type": "string"
+					}
+				],
+				"internalType": "struct PredictionLogger.PredictionBatch",
+				"name": "",
+				"type": "tuple"
+			}
+		],
+		"stateMutability": "view",
+		"type": "function"
+	},
+	{
+		"inputs": [
+			{
+				"internalType": "uint256",
+				"name": "_udi",
+				"type": "uint256"
+			}
+		],
+		"name": "getLatestRecordForUdi",
+		"outputs": [
+			{
+				"internalType": "uint256",
+				"name": "recordId",
+				"type": "uint256"
+			},
+			{
+				"components": [
+					{
+						"internalType": "uint256",
+						"name": "udi",
+						"type": "uint256"
+					},
+					{
+						"internalType": "uint256",
+						"name": "timestamp",
+						"type": "uint256"
+					},
+					{
+						"internalType": "uint256",
+						"name": "predictedClass",
+						"type": "uint256"
+					},
+					{
+						"internalType": "uint256[8]",
+						"name": "publicInputs",
+						"type": "uint256[8]"
+					},
+					{
+						"components": [
+							{
+								"internalType": "uint256[2]",
+								"name": "pi_a",
+								"type": "uint256[2]"
+							},
+							{
+								"internalType": "uint256[2][2]",
+								"name": "pi_b",
+								"type": "uint256[2][2]"
+							},
+							{
+								"internalType": "uint256[2]",
+								"name": "pi_c",
+								"type": "uint256[2]"
+							}
+						],
+						"internalType": "struct PredictionLogger.PredictionProof",
+						"name": "proof",
+						"type": "tuple"
+					},
+					{
+						"internalType": "string",
+						"name": "notes",
+						"type": "string"
+					}
+				],
+				"internalType": "struct PredictionLogger.PredictionRecord",
+				"name": "record",
+				"type": "tuple"
+			}
+		],
+		"stateMutability": "view",
+		"type": "function"
+	},
+	{
+		"inputs": [
+			{
+				"internalType": "uint256",
+				"name": "_windowId",
+				"type": "uint256"
+			}
+		],
+		"name": "getMerkleWindow",
+		"outputs": [
+			{
+				"components": [
+					{
+						"internalType": "bytes32",
+						"name": "root",
+						"type": "bytes32"
+					},
+					{
+						"internalType": "uint64",
+						"name": "windowStart",
+						"type": "uint64"
+					},
+					{
+						"internalType": "uint64",
+						"name": "windowEnd",
+						"type": "uint64"
+					},
+					{
+						"internalType": "uint32",
+						"name": "leafCount",
+						"type": "uint32"
+					},
+					{
+						"internalType": "uint64",
+						"name": "timestamp",
+						"type": "uint64"
+					},
+					{
+						"internalType": "address",
+						"name": "submittedBy",
+						"type": "address"
+					}
+				],
+				"internalType": "struct PredictionLogger.MerkleWindow",
+				"name": "",
+				"type": "tuple"
+			}
+		],
+		"stateMutability": "view",
+		"type": "function"
+	},
+	{
+		"inputs": [
+			{
+				"internalType": "uint256",
+				"name": "_recordId",
+				"type": "uint256"
+			}
+		],
+		"name": "getPublicInputs",
+		"outputs": [
+			{
+				"internalType": "uint256[8]",
+				"name": "",
+				"type": "uint256[8]"
+			}
+		],
+		"stateMutability": "view",
+		"type": "function"
+	},
+	{
+		"inputs": [
+			{
+				"internalType": "uint256",
+				"name": "_recordId",
+				"type": "uint256"
+			}
+		],
+		"name": "getRecord",
+		"outputs": [
+			{
+				"components": [
+					{
+						"internalType": "uint256",
+						"name": "udi",
+						"type": "uint256"
+					},
+					{
+						"internalType": "uint256",
+						"name": "timestamp",
+						"type": "uint256"
+					},
+					{
+						"internalType": "uint256",
+						"name": "predictedClass",
+						"type": "uint256"
+					},
+					{
+						"internalType": "uint256[8]",
+						"name": "publicInputs",
+						"type": "uint256[8]"
+					},
+					{
+						"components": [
+							{
+								"internalType": "uint256[2]",
+								"name": "pi_a",
+								"type": "uint256[2]"
+							},
+							{
+								"internalType": "uint256[2][2]",
+								"name": "pi_b",
+								"type": "uint256[2][2]"
+							},
+							{
+								"internalType": "uint256[2]",
+								"name": "pi_c",
+								"type": "uint256[2]"
+							}
+						],
+						"internalType": "struct PredictionLogger.PredictionProof",
+						"name": "proof",
+						"type": "tuple"
+					},
+					{
+						"internalType": "string",
+						"name": "notes",
+						"type": "string"
+					}
+				],
+				"internalType": "struct PredictionLogger.PredictionRecord",
+				"name": "",
+				"type": "tuple"
+			}
+		],
+		"stateMutability": "view",
+		"type": "function"
+	},
+	{
+		"inputs": [
 			{
 				"internalType": "uint256",
-				"name": "recordId",
+				"name": "_udi",
 				"type": "uint256"
 			}
 		],
-		"stateMutability": "nonpayable",
-		"type": "function"
-	},
-	{
-		"inputs": [
+		"name": "getUdiRecordCount",
+		"outputs": [
 			{
-				"internalType": "address",
-				"name": "newOwner",
-				"type": "address"
+				"internalType": "uint256",
+				"name": "",
+				"type": "uint256"
 			}
 		],
-		"name": "transferOwnership",
-		"outputs": [],
-		"stateMutability": "nonpayable",
+		"stateMutability": "view",
 		"type": "function"
 	},
 	{
-		"inputs": [],
-		"stateMutability": "nonpayable",
-		"type": "constructor"
-	},
-	{
-		"anonymous": false,
 		"inputs": [
 			{
-				"indexed": true,
 				"internalType": "uint256",
-				"name": "recordId",
+				"name": "_udi",
 				"type": "uint256"
 			},
 			{
-				"indexed": true,
 				"internalType": "uint256",
-				"name": "udi",
+				"name": "_offset",
 				"type": "uint256"
 			},
 			{
-				"indexed": false,
 				"internalType": "uint256",
-				"name": "timestamp",
+				"name": "_limit",
 				"type": "uint256"
 			},
 			{
-				"indexed": false,
-				"internalType": "uint256",
-				"name": "predictedClass",
-				"type": "uint256"
-			},
+				"internalType": "bool",
+				"name": "_newestFirst",
+				"type": "bool"
+			}
+		],
+		"name": "getUdiRecordIds",
+		"outputs": [
 			{
-				"indexed": true,
-				"internalType": "address",
-				"name": "submittedBy",
-				"type": "address"
+				"internalType": "uint256[]",
+				"name": "recordIds",
+				"type": "uint256[]"
 			}
 		],
-		"name": "PredictionLogged",
-		"type": "event"
+		"stateMutability": "view",
+		"type": "function"
 	},
 	{
 		"inputs": [
 			{
 				"internalType": "uint256",
-				"name": "_recordId",
+				"name": "_udi",
 				"type": "uint256"
+			},
+			{
+				"internalType": "uint256",
+				"name": "_offset",
+				"type": "uint256"
+			},
+			{
+				"internalType": "uint256",
+				"name": "_limit",
+				"type": "uint256"
+			},
+			{
+				"internalType": "bool",
+				"name": "_newestFirst",
+				"type": "bool"
 			}
 		],
-		"name": "getRecord",
+		"name": "getUdiRecords",
 		"outputs": [
+			{
+				"internalType": "uint256[]",
+				"name": "recordIds",
+				"type": "uint256[]"
+			},
 			{
 				"components": [
 					{
@@ -193,7 +1037,43 @@ CONTRACT_ABI_STRING = """
 						"type": "string"
 					}
 				],
-				"internalType": "struct PredictionLogger.PredictionRecord",
+				"internalType": "struct PredictionLogger.PredictionRecord[]",
+				"name": "page",
+				"type": "tuple[]"
+			}
+		],
+		"stateMutability": "view",
+		"type": "function"
+	},
+	{
+		"inputs": [
+			{
+				"internalType": "uint256",
+				"name": "_recordId",
+				"type": "uint256"
+			}
+		],
+		"name": "getUniversalProof",
+		"outputs": [
+			{
+				"components": [
+					{
+						"internalType": "uint8",
+						"name": "proofSystem",
+						"type": "uint8"
+					},
+					{
+						"internalType": "bytes32",
+						"name": "verificationKeyHash",
+						"type": "bytes32"
+					},
+					{
+						"internalType": "uint256[24]",
+						"name": "proof",
+						"type": "uint256[24]"
+					}
+				],
+				"internalType": "struct PredictionLogger.UniversalProof",
 				"name": "",
 				"type": "tuple"
 			}
@@ -201,6 +1081,63 @@ CONTRACT_ABI_STRING = """
 		"stateMutability": "view",
 		"type": "function"
 	},
+	{
+		"inputs": [],
+		"name": "merkleWindowCount",
+		"outputs": [
+			{
+				"internalType": "uint256",
+				"name": "",
+				"type": "uint256"
+			}
+		],
+		"stateMutability": "view",
+		"type": "function"
+	},
+	{
+		"inputs": [
+			{
+				"internalType": "uint256",
+				"name": "",
+				"type": "uint256"
+			}
+		],
+		"name": "merkleWindows",
+		"outputs": [
+			{
+				"internalType": "bytes32",
+				"name": "root",
+				"type": "bytes32"
+			},
+			{
+				"internalType": "uint64",
+				"name": "windowStart",
+				"type": "uint64"
+			},
+			{
+				"internalType": "uint64",
+				"name": "windowEnd",
+				"type": "uint64"
+			},
+			{
+				"internalType": "uint32",
+				"name": "leafCount",
+				"type": "uint32"
+			},
+			{
+				"internalType": "uint64",
+				"name": "timestamp",
+				"type": "uint64"
+			},
+			{
+				"internalType": "address",
+				"name": "submittedBy",
+				"type": "address"
+			}
+		],
+		"stateMutability": "view",
+		"type": "function"
+	},
 	{
 		"inputs": [],
 		"name": "owner",
@@ -214,6 +1151,44 @@ CONTRACT_ABI_STRING = """
 		"stateMutability": "view",
 		"type": "function"
 	},
+	{
+		"inputs": [
+			{
+				"internalType": "uint256",
+				"name": "",
+				"type": "uint256"
+			}
+		],
+		"name": "packedPublicInputs",
+		"outputs": [
+			{
+				"internalType": "uint256",
+				"name": "",
+				"type": "uint256"
+			}
+		],
+		"stateMutability": "view",
+		"type": "function"
+	},
+	{
+		"inputs": [
+			{
+				"internalType": "uint256",
+				"name": "",
+				"type": "uint256"
+			}
+		],
+		"name": "recordBatchId",
+		"outputs": [
+			{
+				"internalType": "uint256",
+				"name": "",
+				"type": "uint256"
+			}
+		],
+		"stateMutability": "view",
+		"type": "function"
+	},
 	{
 		"inputs": [],
 		"name": "recordCount",
@@ -282,6 +1257,88 @@ CONTRACT_ABI_STRING = """
 		],
 		"stateMutability": "view",
 		"type": "function"
+	},
+	{
+		"inputs": [
+			{
+				"internalType": "uint256",
+				"name": "_packed",
+				"type": "uint256"
+			}
+		],
+		"name": "unpackPublicInputs",
+		"outputs": [
+			{
+				"internalType": "uint256[8]",
+				"name": "inputs",
+				"type": "uint256[8]"
+			}
+		],
+		"stateMutability": "pure",
+		"type": "function"
+	},
+	{
+		"inputs": [
+			{
+				"internalType": "bytes32",
+				"name": "",
+				"type": "bytes32"
+			}
+		],
+		"name": "verificationKeys",
+		"outputs": [
+			{
+				"internalType": "uint8",
+				"name": "",
+				"type": "uint8"
+			}
+		],
+		"stateMutability": "view",
+		"type": "function"
+	},
+	{
+		"inputs": [
+			{
+				"internalType": "uint256",
+				"name": "_windowId",
+				"type": "uint256"
+			},
+			{
+				"internalType": "uint256",
+				"name": "_udi",
+				"type": "uint256"
+			},
+			{
+				"internalType": "uint256",
+				"name": "_predictedClass",
+				"type": "uint256"
+			},
+			{
+				"internalType": "uint256",
+				"name": "_inputCommitment",
+				"type": "uint256"
+			},
+			{
+				"internalType": "bytes32",
+				"name": "_proofHash",
+				"type": "bytes32"
+			},
+			{
+				"internalType": "bytes32[]",
+				"name": "_proof",
+				"type": "bytes32[]"
+			}
+		],
+		"name": "verifyMerkleRecord",
+		"outputs": [
+			{
+				"internalType": "bool",
+				"name": "",
+				"type": "bool"
+			}
+		],
+		"stateMutability": "view",
+		"type": "function"
 	}
 ]
 """
@@ -306,28 +1363,155 @@ if not all([SEPOLIA_RPC_URL, DEPLOYER_PRIVATE_KEY, CONTRACT_ADDRESS, CONTRACT_AB
 # Paths (copied and adapted from 07_automate_proof_generation.py)
 BASE_DIR = os.path.dirname(os.path.abspath(os.path.join(os.getcwd(), __file__)))  # Assuming config_loader.py is in project root
 
-DATASET_PATH = os.path.join(BASE_DIR, "data", "ai4i2020.csv")
+DATASET_PATH = os.getenv("DATASET_PATH", os.path.join(BASE_DIR, "data", "ai4i2020.csv")) # e.g. a synthetic workload from 10_generate_synthetic_workload.py
 SCALER_PATH = os.path.join(BASE_DIR, "artifacts", "model", "standard_scaler.joblib")
 MODEL_PATH = os.path.join(BASE_DIR, "artifacts", "model", "decision_tree_model.joblib")
+FEATURE_NAMES_PATH = os.path.join(BASE_DIR, "artifacts", "model", "feature_names.joblib")
+# Flat-array tree with the scaler folded in (tree_scorer.py), exported by 03_train_evaluate_model.py
+TREE_SCORER_PATH = os.path.join(BASE_DIR, "artifacts", "model", "tree_scorer.npz")
+# Structured per-leaf rules written by 04_extract_tree_rules.py (.json always, .arrow if pyarrow is installed)
+TREE_RULES_JSON_PATH = os.path.join(BASE_DIR, "artifacts", "model", "tree_rules.json")
+TREE_RULES_ARROW_PATH = os.path.join(BASE_DIR, "artifacts", "model", "tree_rules.arrow")
+TREE_RULES_EXPORT_PATHS = [TREE_RULES_JSON_PATH, TREE_RULES_ARROW_PATH]
+
+# Circuit build tooling (used by zkp_scripts/09_build_zkp_artifacts.py)
+CIRCOM_CMD_PATH = os.getenv("CIRCOM_CMD_PATH", "circom")
+# Directories searched for powers-of-tau files; the smallest one that fits the circuit is used
+PTAU_SEARCH_DIRS = [d for d in os.getenv("PTAU_DIR", "").split(os.pathsep) if d] + \
+    [os.path.join(BASE_DIR, "artifacts", "ptau"), BASE_DIR]
 
+# Circuit, key and witness paths below resolve to the content-addressed build cache when the build driver
+# has produced them, and otherwise to the hand-built locations described in the README.
 CIRCUIT_BUILD_DIR = os.path.join(BASE_DIR, "artifacts", "circuit", "circuit_build")
-WASM_FILE_PATH = os.path.join(CIRCUIT_BUILD_DIR, "decision_tree_js", "decision_tree.wasm")
-WITNESS_GEN_SCRIPT_PATH = os.path.join(CIRCUIT_BUILD_DIR, "decision_tree_js", "generate_witness.js")
+WASM_FILE_PATH = artifact_cache.resolve("decision_tree", "wasm",
+    os.path.join(CIRCUIT_BUILD_DIR, "decision_tree_js", "decision_tree.wasm"))
+WITNESS_GEN_SCRIPT_PATH = artifact_cache.resolve("decision_tree", "witness_gen",
+    os.path.join(CIRCUIT_BUILD_DIR, "decision_tree_js", "generate_witness.js"))
+
+# Proof system: "groth16" (circuit-specific setup + contribution per retrained tree) or the universal-setup
+# "plonk" / "fflonk", whose keys come straight from the shared ptau file. 09 builds the keys for it.
+PROOF_SYSTEMS = ("groth16", "plonk", "fflonk")
+PROOF_SYSTEM = os.getenv("PROOF_SYSTEM", "groth16").lower()
+if PROOF_SYSTEM not in PROOF_SYSTEMS:
+    raise ValueError(f"PROOF_SYSTEM must be one of {PROOF_SYSTEMS}, got '{PROOF_SYSTEM}'")
+
+def _key_path(circuit_name, artifact, groth16_path):
+    """zkey/vkey of circuit_name for PROOF_SYSTEM; universal-setup keys are stored as "<system>_zkey"/"<system>_vkey"."""
+    if PROOF_SYSTEM == "groth16":
+        return artifact_cache.resolve(circuit_name, artifact, groth16_path)
+    directory, file_name = os.path.split(groth16_path)
+    return artifact_cache.resolve(circuit_name, f"{PROOF_SYSTEM}_{artifact}",
+                                  os.path.join(directory, f"{PROOF_SYSTEM}_{file_name.replace('_0001', '')}"))
 
-PROVING_KEY_PATH = os.path.join(BASE_DIR, "artifacts", "zkp_keys", "decision_tree_0001.zkey")
-VERIFICATION_KEY_PATH = os.path.join(BASE_DIR, "artifacts", "zkp_keys", "verification_key.json")
+PROVING_KEY_PATH = _key_path("decision_tree", "zkey",
+    os.path.join(BASE_DIR, "artifacts", "zkp_keys", "decision_tree_0001.zkey"))
+VERIFICATION_KEY_PATH = _key_path("decision_tree", "vkey",
+    os.path.join(BASE_DIR, "artifacts", "zkp_keys", "verification_key.json"))
+
+def _witness_path(wasm_file_path, file_name="witness.wtns"):
+    """Witnesses go next to a hand-built wasm, but never into the (immutable) build cache."""
+    if wasm_file_path.startswith(artifact_cache.CACHE_ROOT):
+        return os.path.join(BASE_DIR, "runtime_outputs", file_name)
+    return os.path.join(os.path.dirname(wasm_file_path), file_name)
 
 INPUT_JSON_PATH = os.path.join(BASE_DIR, "runtime_outputs", "input.json")
-WITNESS_FILE_PATH = os.path.join(CIRCUIT_BUILD_DIR, "decision_tree_js", "witness.wtns")
+WITNESS_FILE_PATH = _witness_path(WASM_FILE_PATH)
 PROOF_JSON_PATH = os.path.join(BASE_DIR, "runtime_outputs", "proof.json")
 PUBLIC_JSON_PATH = os.path.join(BASE_DIR, "runtime_outputs", "public.json")
 RESULTS_CSV_PATH = os.path.join(BASE_DIR, "runtime_outputs", "end_to_end_results.csv")
 
+# Batch circuit (DecisionTreeBatch(K, 8)): K samples proven with one witness and one Groth16 proof.
+# PROOF_BATCH_SIZE = 1 keeps the original one-proof-per-sample flow.
+PROOF_BATCH_SIZE = int(os.getenv("PROOF_BATCH_SIZE", "1"))
+BATCH_CIRCUIT_BUILD_DIR = os.path.join(BASE_DIR, "artifacts", "circuit", "batch_circuit_build")
+BATCH_WASM_FILE_PATH = artifact_cache.resolve("decision_tree_batch", "wasm",
+    os.path.join(BATCH_CIRCUIT_BUILD_DIR, "decision_tree_batch_js", "decision_tree_batch.wasm"))
+BATCH_WITNESS_GEN_SCRIPT_PATH = artifact_cache.resolve("decision_tree_batch", "witness_gen",
+    os.path.join(BATCH_CIRCUIT_BUILD_DIR, "decision_tree_batch_js", "generate_witness.js"))
+BATCH_PROVING_KEY_PATH = _key_path("decision_tree_batch", "zkey",
+    os.path.join(BASE_DIR, "artifacts", "zkp_keys", "decision_tree_batch_0001.zkey"))
+BATCH_VERIFICATION_KEY_PATH = _key_path("decision_tree_batch", "vkey",
+    os.path.join(BASE_DIR, "artifacts", "zkp_keys", "batch_verification_key.json"))
+BATCH_INPUT_JSON_PATH = os.path.join(BASE_DIR, "runtime_outputs", "batch_input.json")
+BATCH_WITNESS_FILE_PATH = _witness_path(BATCH_WASM_FILE_PATH, "batch_witness.wtns")
+BATCH_PROOF_JSON_PATH = os.path.join(BASE_DIR, "runtime_outputs", "batch_proof.json")
+BATCH_PUBLIC_JSON_PATH = os.path.join(BASE_DIR, "runtime_outputs", "batch_public.json")
+
+# Public-input mode: "features" publishes all 8 features (original flow); "commitment" keeps the features
+# private and publishes only Poseidon(features..., salt) and the prediction (DecisionTreeCommitted circuit);
+# "packed" proves like "features" but logs the 8 features packed into one word (logPackedPrediction).
+PUBLIC_INPUT_MODES = ("features", "commitment", "packed")
+PUBLIC_INPUT_MODE = os.getenv("PUBLIC_INPUT_MODE", "features").lower()
+if PUBLIC_INPUT_MODE not in PUBLIC_INPUT_MODES:
+    raise ValueError(f"PUBLIC_INPUT_MODE must be one of {PUBLIC_INPUT_MODES}, got '{PUBLIC_INPUT_MODE}'")
+COMMITMENT_SALTED = os.getenv("COMMITMENT_SALTED", "true").lower() in ("1", "true", "yes")
+COMMITTED_CIRCUIT_BUILD_DIR = os.path.join(BASE_DIR, "artifacts", "circuit", "committed_circuit_build")
+COMMITTED_WASM_FILE_PATH = artifact_cache.resolve("decision_tree_committed", "wasm",
+    os.path.join(COMMITTED_CIRCUIT_BUILD_DIR, "decision_tree_committed_js", "decision_tree_committed.wasm"))
+COMMITTED_WITNESS_GEN_SCRIPT_PATH = artifact_cache.resolve("decision_tree_committed", "witness_gen",
+    os.path.join(COMMITTED_CIRCUIT_BUILD_DIR, "decision_tree_committed_js", "generate_witness.js"))
+COMMITTED_PROVING_KEY_PATH = _key_path("decision_tree_committed", "zkey",
+    os.path.join(BASE_DIR, "artifacts", "zkp_keys", "decision_tree_committed_0001.zkey"))
+COMMITTED_VERIFICATION_KEY_PATH = _key_path("decision_tree_committed", "vkey",
+    os.path.join(BASE_DIR, "artifacts", "zkp_keys", "committed_verification_key.json"))
+COMMITTED_WITNESS_FILE_PATH = _witness_path(COMMITTED_WASM_FILE_PATH, "committed_witness.wtns")
+
+def resolve_circuit_paths(committed=False):
+    """
+    wasm / witness_gen / zkey / vkey of the single-sample (or committed) circuit, re-read from the build
+    manifest now. The *_PATH constants above are resolved once at import; long-running services call
+    this to pick up artifacts rebuilt by 09 without a restart.
+    """
+    name, build_dir = (("decision_tree_committed", COMMITTED_CIRCUIT_BUILD_DIR) if committed
+                       else ("decision_tree", CIRCUIT_BUILD_DIR))
+    zkey_file, vkey_file = (("decision_tree_committed_0001.zkey", "committed_verification_key.json") if committed
+                            else ("decision_tree_0001.zkey", "verification_key.json"))
+    return {
+        "wasm": artifact_cache.resolve(name, "wasm", os.path.join(build_dir, f"{name}_js", f"{name}.wasm")),
+        "witness_gen": artifact_cache.resolve(name, "witness_gen", os.path.join(build_dir, f"{name}_js", "generate_witness.js")),
+        "zkey": _key_path(name, "zkey", os.path.join(BASE_DIR, "artifacts", "zkp_keys", zkey_file)),
+        "vkey": _key_path(name, "vkey", os.path.join(BASE_DIR, "artifacts", "zkp_keys", vkey_file)),
+    }
+# Salts and features needed to open each on-chain commitment later (keep private)
+COMMITMENT_OPENINGS_CSV_PATH = os.path.join(BASE_DIR, "runtime_outputs", "commitment_openings.csv")
+
+# Per-sample progress journal (SQLite): reruns skip proven/confirmed samples and reconcile sent transactions
+RUN_JOURNAL_ENABLED = os.getenv("RUN_JOURNAL", "true").lower() in ("1", "true", "yes")
+RUN_JOURNAL_PATH = os.getenv("RUN_JOURNAL_PATH", os.path.join(BASE_DIR, "runtime_outputs", "run_journal.sqlite"))
+
+# Dashboard /api/stats rollups (stats_rollups.py), folded incrementally from RESULTS_CSV_PATH
+STATS_DB_PATH = os.getenv("STATS_DB_PATH", os.path.join(BASE_DIR, "runtime_outputs", "stats_rollups.sqlite"))
+STATS_BUCKET_SECONDS = int(os.getenv("STATS_BUCKET_SECONDS", "3600")) # Width of the failure-rate time buckets
+
+# Dashboard /api/export (prediction_history.py): indexed copy of RESULTS_CSV_PATH, streamed in pages of this many rows
+HISTORY_DB_PATH = os.getenv("HISTORY_DB_PATH", os.path.join(BASE_DIR, "runtime_outputs", "prediction_history.sqlite"))
+EXPORT_PAGE_ROWS = int(os.getenv("EXPORT_PAGE_ROWS", "10000"))
+HISTORY_INGEST_SECONDS = float(os.getenv("HISTORY_INGEST_SECONDS", "5")) # How often the dashboard copies new CSV rows into it
+
+# Prometheus-format metrics (metrics.py): the dashboard serves /metrics; 08 serves them on this port if set
+PIPELINE_METRICS_PORT = int(os.getenv("PIPELINE_METRICS_PORT", "0") or 0)
+
+# Distributed proving (proof_queue.py): 14_proof_coordinator.py enqueues, 15_proof_worker.py leases and proves
+PROOF_QUEUE_PATH = os.getenv("PROOF_QUEUE_PATH", os.path.join(BASE_DIR, "runtime_outputs", "proof_queue.sqlite"))
+PROOF_QUEUE_LEASE_SECONDS = int(os.getenv("PROOF_QUEUE_LEASE_SECONDS", "300")) # Renewed by the worker while it proves
+PROOF_QUEUE_MAX_ATTEMPTS = int(os.getenv("PROOF_QUEUE_MAX_ATTEMPTS", "3"))
+
+# On-chain logging: "records" logs every prediction (original flow); "merkle" adds verified predictions to a
+# local Merkle store (merkle_store.py) and logs one root per window via logMerkleRoot
+CHAIN_LOGGING_MODES = ("records", "merkle")
+CHAIN_LOGGING_MODE = os.getenv("CHAIN_LOGGING_MODE", "records").lower()
+if CHAIN_LOGGING_MODE not in CHAIN_LOGGING_MODES:
+    raise ValueError(f"CHAIN_LOGGING_MODE must be one of {CHAIN_LOGGING_MODES}, got '{CHAIN_LOGGING_MODE}'")
+MERKLE_STORE_PATH = os.getenv("MERKLE_STORE_PATH", os.path.join(BASE_DIR, "runtime_outputs", "merkle_store.sqlite"))
+MERKLE_WINDOW_SECONDS = int(os.getenv("MERKLE_WINDOW_SECONDS", "3600"))
+
 DATA_SPLITS_DIR = os.path.join(BASE_DIR, "artifacts", "data_splits")
 X_TRAIN_CSV_PATH = os.path.join(DATA_SPLITS_DIR, "X_train.csv")
 X_TEST_CSV_PATH = os.path.join(DATA_SPLITS_DIR, "X_test.csv")
 Y_TRAIN_CSV_PATH = os.path.join(DATA_SPLITS_DIR, "y_train.csv")
 Y_TEST_CSV_PATH = os.path.join(DATA_SPLITS_DIR, "y_test.csv")
+# Splits are stored as memory-mapped .npy columns (dataset_cache.save_split); CSV copies are opt-in
+EXPORT_SPLIT_CSVS = os.getenv("EXPORT_SPLIT_CSVS", "false").lower() in ("1", "true", "yes")
 
 
 
@@ -335,6 +1519,22 @@ Y_TEST_CSV_PATH = os.path.join(DATA_SPLITS_DIR, "y_test.csv")
 FEATURE_NAMES_ORDER = ['Air temperature [K]', 'Process temperature [K]', 'Rotational speed [rpm]', 'Torque [Nm]', 'Tool wear [min]', 'Type_H', 'Type_L', 'Type_M']
 NUMERICAL_FEATURES_FOR_SCALING = ['Air temperature [K]', 'Process temperature [K]', 'Rotational speed [rpm]', 'Torque [Nm]', 'Tool wear [min]']
 FIXED_POINT_MULTIPLIER = 10000
+# Circuit input units: "scaled" feeds scaler.transform(x) * FIXED_POINT_MULTIPLIER (signed); "raw" folds the
+# scaler into the circuit's thresholds and feeds raw readings as integers, round(x * RAW_UNIT_MULTIPLIERS[x]).
+# The circuit must be regenerated (05/09) after changing this.
+CIRCUIT_INPUT_UNIT_MODES = ("scaled", "raw")
+CIRCUIT_INPUT_UNITS = os.getenv("CIRCUIT_INPUT_UNITS", "scaled").lower()
+if CIRCUIT_INPUT_UNITS not in CIRCUIT_INPUT_UNIT_MODES:
+    raise ValueError(f"CIRCUIT_INPUT_UNITS must be one of {CIRCUIT_INPUT_UNIT_MODES}, got '{CIRCUIT_INPUT_UNITS}'")
+RAW_UNIT_MULTIPLIERS = {'Air temperature [K]': 10, 'Process temperature [K]': 10, 'Rotational speed [rpm]': 1,
+                        'Torque [Nm]': 10, 'Tool wear [min]': 1} # Tenth-kelvin, rpm, Nm x 10, minutes
+# Circuit tree evaluation: "full" compares at every split node; "path" proves only the sample's root-to-leaf
+# path, hinted by the witness generator and checked against a Poseidon Merkle commitment of the node table
+# (cheaper for large, deep trees; 05 prints both estimates). Regenerate the circuit (05/09) after changing it.
+CIRCUIT_TREE_EVALUATIONS = ("full", "path")
+CIRCUIT_TREE_EVALUATION = os.getenv("CIRCUIT_TREE_EVALUATION", "full").lower()
+if CIRCUIT_TREE_EVALUATION not in CIRCUIT_TREE_EVALUATIONS:
+    raise ValueError(f"CIRCUIT_TREE_EVALUATION must be one of {CIRCUIT_TREE_EVALUATIONS}, got '{CIRCUIT_TREE_EVALUATION}'")
 SAMPLE_INDEX = 49 # UDI 50
 
 # Path to snarkjs.cmd
@@ -351,3 +1551,16 @@ elif os.name == 'nt' and os.path.exists(DEFAULT_WINDOWS_SNARKJS_PATH): # Check i
 else:
     SNARKJS_CMD_PATH = "snarkjs" # Fallback, assumes snarkjs is in system PATH
     print(f"SNARKJS_CMD_PATH not found in .env or default Windows path. Assuming 'snarkjs' is in system PATH.")
+
+# Prover used by 07/08: "snarkjs" (default) or "native" (rapidsnark-style binary, same .zkey/.wtns; Groth16 only)
+PROVER_BACKEND = os.getenv("PROVER_BACKEND", "snarkjs").lower()
+NATIVE_PROVER_PATH = os.getenv("NATIVE_PROVER_PATH", "prover")
+PROVER = prover_backends.get_prover(PROVER_BACKEND, SNARKJS_CMD_PATH, NATIVE_PROVER_PATH, PROOF_SYSTEM)
+
+# Order in which samples are proven (proof_scheduler.py): earliest deadline first, deadline = queued + class target.
+# Classes: failure (ml_prediction == 1), high_wear, priority_type, routine
+SCHEDULER_LATENCY_TARGETS = proof_scheduler.parse_latency_targets(os.getenv("SCHEDULER_LATENCY_TARGETS", ""))
+SCHEDULER_HIGH_TOOL_WEAR_MIN = float(os.getenv("SCHEDULER_HIGH_TOOL_WEAR_MIN", "200"))
+SCHEDULER_PRIORITY_TYPES = tuple(t.strip() for t in os.getenv("SCHEDULER_PRIORITY_TYPES", "H").split(",") if t.strip())
+SCHEDULING_POLICY = proof_scheduler.SchedulingPolicy(SCHEDULER_LATENCY_TARGETS, SCHEDULER_HIGH_TOOL_WEAR_MIN,
+                                                     SCHEDULER_PRIORITY_TYPES)
@@ -23,9 +23,70 @@ contract PredictionLogger {
         string notes;           // e.g., "Local ZKP verification successful"
     }
 
+    struct PredictionBatch {
+        uint256 firstRecordId;  // recordId of the first prediction covered by this proof
+        uint256 count;          // Number of real (non-padding) predictions in the batch
+        PredictionProof proof;  // One Groth16 proof for the whole DecisionTreeBatch(K, 8) circuit
+        string notes;
+    }
+
     uint256 public recordCount;
     mapping(uint256 => PredictionRecord) public records; // Maps a recordId to a PredictionRecord
 
+    uint256 public batchCount;
+    mapping(uint256 => PredictionBatch) public batches;  // Maps a batchId to a PredictionBatch
+    mapping(uint256 => uint256) public recordBatchId;    // recordId => batchId + 1 (0 means logged individually)
+
+    // recordId => Poseidon(features..., salt) for records proven with the DecisionTreeCommitted circuit.
+    // Such records keep publicInputs zeroed: the features stay private and only the commitment is public.
+    mapping(uint256 => uint256) public featureCommitments;
+
+    // Universal-setup proofs (snarkjs PLONK / FFLONK, 24 words each). Retraining the tree only needs a new
+    // verification key, derived from the shared powers of tau; the owner registers its keccak256 hash here.
+    uint8 public constant PROOF_SYSTEM_PLONK = 1;
+    uint8 public constant PROOF_SYSTEM_FFLONK = 2;
+
+    struct UniversalProof {
+        uint8 proofSystem;           // PROOF_SYSTEM_PLONK or PROOF_SYSTEM_FFLONK
+        bytes32 verificationKeyHash; // keccak256 of the verification key the proof was checked against
+        uint256[24] proof;           // snarkjs Solidity calldata order
+    }
+
+    mapping(bytes32 => uint8) public verificationKeys;            // Key hash => proof system (0 = not registered)
+    mapping(uint256 => UniversalProof) internal universalProofs;  // recordId => proof, for universal-setup records
+
+    // Merkle-window logging: only the root of each window's verified predictions goes on chain.
+    // Leaf = keccak256(0x00 ++ abi.encode(udi, predictedClass, inputCommitment, proofHash)); nodes hash
+    // 0x01 ++ the sorted pair. The prefixes keep an internal node from being passed off as a leaf.
+    bytes1 internal constant MERKLE_LEAF_PREFIX = 0x00;
+    bytes1 internal constant MERKLE_NODE_PREFIX = 0x01;
+    struct MerkleWindow {
+        bytes32 root;
+        uint64 windowStart;     // Unix time range the window's predictions were recorded in
+        uint64 windowEnd;
+        uint32 leafCount;
+        uint64 timestamp;       // Blockchain timestamp of logging
+        address submittedBy;
+    }
+
+    uint256 public merkleWindowCount;
+    mapping(uint256 => MerkleWindow) public merkleWindows; // Maps a windowId to a MerkleWindow
+
+    // Per-machine index: udi => its recordIds in logging order, so one machine's history (and its latest
+    // record) is read directly instead of scanning every event. uint64 ids pack four to a storage slot,
+    // which keeps the extra gas per logged record to roughly one slot write in four plus the length update.
+    mapping(uint256 => uint64[]) internal udiRecordIds;
+
+    // Packed public inputs (logPackedPrediction / logPackedPredictionBatch): the 8 features in one word,
+    // input i in bits 32*i .. 32*i+31 as value + 2^31. Such records keep publicInputs zeroed, so one storage
+    // slot and 32 calldata bytes replace eight of each. recordId => packed word (0 means not packed).
+    uint256 internal constant SNARK_SCALAR_FIELD =
+        21888242871839275222246405745257275088548364400416034343698204186575808495617;
+    uint256 internal constant PACKED_LANE_BITS = 32;
+    uint256 internal constant PACKED_LANE_MASK = 0xffffffff;
+    uint256 internal constant PACKED_LANE_OFFSET = 1 << 31;
+    mapping(uint256 => uint256) public packedPublicInputs;
+
     address public owner;
 
     event PredictionLogged(
@@ -36,6 +97,24 @@ contract PredictionLogger {
         address indexed submittedBy // The address that called logPrediction
     );
 
+    event PredictionBatchLogged(
+        uint256 indexed batchId,
+        uint256 firstRecordId,
+        uint256 count,
+        address indexed submittedBy
+    );
+
+    event VerificationKeyRegistered(bytes32 indexed verificationKeyHash, uint8 proofSystem);
+
+    event MerkleRootLogged(
+        uint256 indexed windowId,
+        bytes32 indexed root,
+        uint64 windowStart,
+        uint64 windowEnd,
+        uint32 leafCount,
+        address indexed submittedBy
+    );
+
     modifier onlyOwner() {
         require(msg.sender == owner, "Only owner can call this function.");
         _;
@@ -76,11 +155,339 @@ contract PredictionLogger {
             notes: _notes
         });
 
+        udiRecordIds[_udi].push(uint64(recordId));
+        recordCount++;
+        emit PredictionLogged(recordId, _udi, block.timestamp, _predictedClass, msg.sender);
+        return recordId;
+    }
+
+    /**
+     * @dev Logs a prediction like logPrediction, with its 8 public inputs packed into one word. Publicly callable.
+     * @param _udi Unique Device Identifier or sample ID.
+     * @param _predictedClass The prediction output from the ZK circuit (0 or 1).
+     * @param _packedInputs The 8 public input features packed by public_input_packing.py (see unpackPublicInputs).
+     * @param _pi_a Proof component A.
+     * @param _pi_b Proof component B.
+     * @param _pi_c Proof component C.
+     * @param _notes Additional notes for the record.
+     * @return recordId The ID of the newly created record.
+     */
+    function logPackedPrediction(
+        uint256 _udi,
+        uint256 _predictedClass,
+        uint256 _packedInputs,
+        uint256[2] calldata _pi_a,
+        uint256[2][2] calldata _pi_b,
+        uint256[2] calldata _pi_c,
+        string calldata _notes
+    ) public returns (uint256 recordId) {
+        require(_packedInputs != 0, "Packed inputs must be non-zero.");
+        recordId = recordCount;
+        PredictionRecord storage record = records[recordId];
+        record.udi = _udi;
+        record.timestamp = block.timestamp;
+        record.predictedClass = _predictedClass;
+        record.proof = PredictionProof(_pi_a, _pi_b, _pi_c);
+        record.notes = _notes;
+        packedPublicInputs[recordId] = _packedInputs;
+
+        udiRecordIds[_udi].push(uint64(recordId));
+        recordCount++;
+        emit PredictionLogged(recordId, _udi, block.timestamp, _predictedClass, msg.sender);
+        return recordId;
+    }
+
+    /**
+     * @dev Logs a prediction proven with the DecisionTreeCommitted circuit. Publicly callable.
+     * The proof's only public signals are the prediction and a Poseidon commitment to the features,
+     * so calldata and storage are constant-size and the raw sensor values are never published.
+     * @param _udi Unique Device Identifier or sample ID.
+     * @param _predictedClass The prediction output from the ZK circuit (0 or 1).
+     * @param _featureCommitment Poseidon(features..., salt), the circuit's public input.
+     * @param _pi_a Proof component A.
+     * @param _pi_b Proof component B.
+     * @param _pi_c Proof component C.
+     * @param _notes Additional notes for the record.
+     * @return recordId The ID of the newly created record.
+     */
+    function logCommittedPrediction(
+        uint256 _udi,
+        uint256 _predictedClass,
+        uint256 _featureCommitment,
+        uint256[2] calldata _pi_a,
+        uint256[2][2] calldata _pi_b,
+        uint256[2] calldata _pi_c,
+        string calldata _notes
+    ) public returns (uint256 recordId) {
+        recordId = recordCount;
+        PredictionRecord storage record = records[recordId];
+        record.udi = _udi;
+        record.timestamp = block.timestamp;
+        record.predictedClass = _predictedClass;
+        record.proof = PredictionProof(_pi_a, _pi_b, _pi_c);
+        record.notes = _notes;
+        featureCommitments[recordId] = _featureCommitment;
+
+        udiRecordIds[_udi].push(uint64(recordId));
+        recordCount++;
+        emit PredictionLogged(recordId, _udi, block.timestamp, _predictedClass, msg.sender);
+        return recordId;
+    }
+
+    /**
+     * @dev Logs up to K predictions covered by a single batch proof. Publicly callable.
+     * Each prediction still gets its own recordId and PredictionLogged event, but the proof
+     * and notes are stored once on the batch, so per-prediction gas drops roughly by K.
+     * If fewer than K samples were available, the circuit's remaining slots were padded by
+     * repeating the last sample; only the real predictions are passed here.
+     * @param _udis Unique Device Identifiers or sample IDs, one per prediction.
+     * @param _predictedClasses The prediction outputs from the ZK circuit (0 or 1), one per prediction.
+     * @param _publicInputs The 8 public input features of each prediction.
+     * @param _pi_a Proof component A.
+     * @param _pi_b Proof component B.
+     * @param _pi_c Proof component C.
+     * @param _notes Additional notes for the batch.
+     * @return batchId The ID of the newly created batch.
+     */
+    function logPredictionBatch(
+        uint256[] calldata _udis,
+        uint256[] calldata _predictedClasses,
+        uint256[8][] calldata _publicInputs,
+        uint256[2] calldata _pi_a,
+        uint256[2][2] calldata _pi_b,
+        uint256[2] calldata _pi_c,
+        string calldata _notes
+    ) public returns (uint256 batchId) {
+        uint256 count = _udis.length;
+        require(count > 0, "Empty batch.");
+        require(_predictedClasses.length == count && _publicInputs.length == count, "Batch length mismatch.");
+
+        batchId = batchCount;
+        uint256 firstRecordId = recordCount;
+        batches[batchId] = PredictionBatch({
+            firstRecordId: firstRecordId,
+            count: count,
+            proof: PredictionProof(_pi_a, _pi_b, _pi_c),
+            notes: _notes
+        });
+
+        for (uint256 i = 0; i < count; i++) {
+            uint256 recordId = firstRecordId + i;
+            PredictionRecord storage record = records[recordId];
+            record.udi = _udis[i];
+            record.timestamp = block.timestamp;
+            record.predictedClass = _predictedClasses[i];
+            record.publicInputs = _publicInputs[i];
+            recordBatchId[recordId] = batchId + 1;
+            udiRecordIds[_udis[i]].push(uint64(recordId));
+            emit PredictionLogged(recordId, _udis[i], block.timestamp, _predictedClasses[i], msg.sender);
+        }
+
+        recordCount = firstRecordId + count;
+        batchCount++;
+        emit PredictionBatchLogged(batchId, firstRecordId, count, msg.sender);
+        return batchId;
+    }
+
+    /**
+     * @dev Logs a batch like logPredictionBatch, with each prediction's 8 public inputs packed into one word.
+     * @param _udis Unique Device Identifiers or sample IDs, one per prediction.
+     * @param _predictedClasses The prediction outputs from the ZK circuit (0 or 1), one per prediction.
+     * @param _packedInputs The packed public inputs of each prediction (see unpackPublicInputs).
+     * @param _pi_a Proof component A.
+     * @param _pi_b Proof component B.
+     * @param _pi_c Proof component C.
+     * @param _notes Additional notes for the batch.
+     * @return batchId The ID of the newly created batch.
+     */
+    function logPackedPredictionBatch(
+        uint256[] calldata _udis,
+        uint256[] calldata _predictedClasses,
+        uint256[] calldata _packedInputs,
+        uint256[2] calldata _pi_a,
+        uint256[2][2] calldata _pi_b,
+        uint256[2] calldata _pi_c,
+        string calldata _notes
+    ) public returns (uint256 batchId) {
+        uint256 count = _udis.length;
+        require(count > 0, "Empty batch.");
+        require(_predictedClasses.length == count && _packedInputs.length == count, "Batch length mismatch.");
+
+        batchId = batchCount;
+        uint256 firstRecordId = recordCount;
+        batches[batchId] = PredictionBatch({
+            firstRecordId: firstRecordId,
+            count: count,
+            proof: PredictionProof(_pi_a, _pi_b, _pi_c),
+            notes: _notes
+        });
+
+        for (uint256 i = 0; i < count; i++) {
+            require(_packedInputs[i] != 0, "Packed inputs must be non-zero.");
+            uint256 recordId = firstRecordId + i;
+            PredictionRecord storage record = records[recordId];
+            record.udi = _udis[i];
+            record.timestamp = block.timestamp;
+            record.predictedClass = _predictedClasses[i];
+            packedPublicInputs[recordId] = _packedInputs[i];
+            recordBatchId[recordId] = batchId + 1;
+            udiRecordIds[_udis[i]].push(uint64(recordId));
+            emit PredictionLogged(recordId, _udis[i], block.timestamp, _predictedClasses[i], msg.sender);
+        }
+
+        recordCount = firstRecordId + count;
+        batchCount++;
+        emit PredictionBatchLogged(batchId, firstRecordId, count, msg.sender);
+        return batchId;
+    }
+
+    /**
+     * @dev Registers the verification key of a PLONK or FFLONK circuit. Only the owner can vouch for a key.
+     * @param _verificationKeyHash keccak256 of the verification key JSON (see 08_end_to_end_pipeline.py).
+     * @param _proofSystem PROOF_SYSTEM_PLONK or PROOF_SYSTEM_FFLONK.
+     */
+    function registerVerificationKey(bytes32 _verificationKeyHash, uint8 _proofSystem) public onlyOwner {
+        require(_proofSystem == PROOF_SYSTEM_PLONK || _proofSystem == PROOF_SYSTEM_FFLONK, "Unknown proof system.");
+        verificationKeys[_verificationKeyHash] = _proofSystem;
+        emit VerificationKeyRegistered(_verificationKeyHash, _proofSystem);
+    }
+
+    /**
+     * @dev Logs a prediction proven with a universal-setup proof system. Publicly callable.
+     * The record's Groth16 proof stays zeroed; the proof is stored in universalProofs instead.
+     * @param _udi Unique Device Identifier or sample ID.
+     * @param _predictedClass The prediction output from the ZK circuit (0 or 1).
+     * @param _publicInputs The 8 public input features (all zero for DecisionTreeCommitted proofs).
+     * @param _featureCommitment Poseidon commitment of DecisionTreeCommitted proofs (0 otherwise).
+     * @param _verificationKeyHash Hash of a registered verification key.
+     * @param _proof The PLONK or FFLONK proof in snarkjs Solidity calldata order.
+     * @param _notes Additional notes for the record.
+     * @return recordId The ID of the newly created record.
+     */
+    function logUniversalPrediction(
+        uint256 _udi,
+        uint256 _predictedClass,
+        uint256[8] calldata _publicInputs,
+        uint256 _featureCommitment,
+        bytes32 _verificationKeyHash,
+        uint256[24] calldata _proof,
+        string calldata _notes
+    ) public returns (uint256 recordId) {
+        uint8 proofSystem = verificationKeys[_verificationKeyHash];
+        require(proofSystem != 0, "Verification key not registered.");
+
+        recordId = recordCount;
+        PredictionRecord storage record = records[recordId];
+        record.udi = _udi;
+        record.timestamp = block.timestamp;
+        record.predictedClass = _predictedClass;
+        record.publicInputs = _publicInputs;
+        record.notes = _notes;
+        universalProofs[recordId] = UniversalProof(proofSystem, _verificationKeyHash, _proof);
+        if (_featureCommitment != 0) {
+            featureCommitments[recordId] = _featureCommitment;
+        }
+
+        udiRecordIds[_udi].push(uint64(recordId));
         recordCount++;
         emit PredictionLogged(recordId, _udi, block.timestamp, _predictedClass, msg.sender);
         return recordId;
     }
 
+    /**
+     * @dev Logs the Merkle root of a window of verified predictions. Publicly callable.
+     * The records themselves stay off chain; any one of them can be checked with verifyMerkleRecord.
+     * @param _root Root of the window's Merkle tree.
+     * @param _windowStart Start of the window (Unix time).
+     * @param _windowEnd End of the window (Unix time).
+     * @param _leafCount Number of predictions in the tree.
+     * @return windowId The ID of the newly logged window.
+     */
+    function logMerkleRoot(
+        bytes32 _root,
+        uint64 _windowStart,
+        uint64 _windowEnd,
+        uint32 _leafCount
+    ) public returns (uint256 windowId) {
+        require(_root != bytes32(0), "Empty Merkle root.");
+        require(_leafCount > 0, "Empty Merkle window.");
+        require(_windowStart <= _windowEnd, "Invalid window range.");
+
+        windowId = merkleWindowCount;
+        merkleWindows[windowId] = MerkleWindow({
+            root: _root,
+            windowStart: _windowStart,
+            windowEnd: _windowEnd,
+            leafCount: _leafCount,
+            timestamp: uint64(block.timestamp),
+            submittedBy: msg.sender
+        });
+        merkleWindowCount++;
+        emit MerkleRootLogged(windowId, _root, _windowStart, _windowEnd, _leafCount, msg.sender);
+        return windowId;
+    }
+
+    /**
+     * @dev Checks that a prediction is included in a logged window. The leaf is hashed here from the
+     * record's fields, so only a real leaf (never an internal node) can be proven.
+     * @param _windowId The ID of the window.
+     * @param _udi The record's UDI.
+     * @param _predictedClass The record's predicted class.
+     * @param _inputCommitment Poseidon commitment to the record's circuit features.
+     * @param _proofHash keccak256 of the record's proof JSON (sorted keys, no whitespace).
+     * @param _proof Sibling hashes from the leaf up to the root.
+     * @return True if the leaf and proof hash up to the window's root.
+     */
+    function verifyMerkleRecord(
+        uint256 _windowId,
+        uint256 _udi,
+        uint256 _predictedClass,
+        uint256 _inputCommitment,
+        bytes32 _proofHash,
+        bytes32[] calldata _proof
+    ) public view returns (bool) {
+        require(_windowId < merkleWindowCount, "Window ID out of bounds.");
+        bytes32 node = keccak256(abi.encodePacked(MERKLE_LEAF_PREFIX,
+            abi.encode(_udi, _predictedClass, _inputCommitment, _proofHash)));
+        for (uint256 i = 0; i < _proof.length; i++) {
+            bytes32 sibling = _proof[i];
+            node = node <= sibling
+                ? keccak256(abi.encodePacked(MERKLE_NODE_PREFIX, node, sibling))
+                : keccak256(abi.encodePacked(MERKLE_NODE_PREFIX, sibling, node));
+        }
+        return node == merkleWindows[_windowId].root;
+    }
+
+    /**
+     * @dev Retrieves a logged Merkle window by its ID.
+     * @param _windowId The ID of the window to retrieve.
+     * @return The MerkleWindow struct.
+     */
+    function getMerkleWindow(uint256 _windowId) public view returns (MerkleWindow memory) {
+        require(_windowId < merkleWindowCount, "Window ID out of bounds.");
+        return merkleWindows[_windowId];
+    }
+
+    /**
+     * @dev Retrieves the universal-setup proof of a record (proofSystem is 0 for Groth16 records).
+     * @param _recordId The ID of the record.
+     * @return The UniversalProof struct.
+     */
+    function getUniversalProof(uint256 _recordId) public view returns (UniversalProof memory) {
+        require(_recordId < recordCount, "Record ID out of bounds.");
+        return universalProofs[_recordId];
+    }
+
+    /**
+     * @dev Retrieves a stored prediction batch by its ID.
+     * @param _batchId The ID of the batch to retrieve.
+     * @return The PredictionBatch struct.
+     */
+    function getBatch(uint256 _batchId) public view returns (PredictionBatch memory) {
+        require(_batchId < batchCount, "Batch ID out of bounds.");
+        return batches[_batchId];
+    }
+
     /**
      * @dev Retrieves a stored prediction record by its ID.
      * @param _recordId The ID of the record to retrieve.
@@ -91,6 +498,101 @@ contract PredictionLogger {
         return records[_recordId];
     }
 
+    /**
+     * @dev Unpacks a packed public-input word into the 8 inputs as field elements, as in the proof's public.json.
+     * @param _packed A word from packedPublicInputs (or built by public_input_packing.py).
+     * @return inputs The 8 public inputs; negative values come back as SNARK_SCALAR_FIELD - |value|.
+     */
+    function unpackPublicInputs(uint256 _packed) public pure returns (uint256[8] memory inputs) {
+        for (uint256 i = 0; i < 8; i++) {
+            uint256 lane = (_packed >> (i * PACKED_LANE_BITS)) & PACKED_LANE_MASK;
+            inputs[i] = lane >= PACKED_LANE_OFFSET
+                ? lane - PACKED_LANE_OFFSET
+                : SNARK_SCALAR_FIELD - (PACKED_LANE_OFFSET - lane);
+        }
+        return inputs;
+    }
+
+    /**
+     * @dev A record's 8 public inputs, whether it was logged packed or not (all zero for committed records).
+     * @param _recordId The ID of the record.
+     * @return The 8 public inputs as field elements.
+     */
+    function getPublicInputs(uint256 _recordId) public view returns (uint256[8] memory) {
+        require(_recordId < recordCount, "Record ID out of bounds.");
+        uint256 packed = packedPublicInputs[_recordId];
+        if (packed != 0) {
+            return unpackPublicInputs(packed);
+        }
+        return records[_recordId].publicInputs;
+    }
+
+    /**
+     * @dev Number of records logged for a machine.
+     * @param _udi Unique Device Identifier or sample ID.
+     * @return The length of the machine's record index.
+     */
+    function getUdiRecordCount(uint256 _udi) public view returns (uint256) {
+        return udiRecordIds[_udi].length;
+    }
+
+    /**
+     * @dev One page of a machine's recordIds.
+     * @param _udi Unique Device Identifier or sample ID.
+     * @param _offset Number of records to skip, counted from the newest record if _newestFirst, else the oldest.
+     * @param _limit Maximum number of recordIds to return.
+     * @param _newestFirst Page from the most recent record backwards.
+     * @return recordIds Up to _limit recordIds (empty past the end of the index).
+     */
+    function getUdiRecordIds(uint256 _udi, uint256 _offset, uint256 _limit, bool _newestFirst)
+        public view returns (uint256[] memory recordIds)
+    {
+        uint64[] storage ids = udiRecordIds[_udi];
+        uint256 total = ids.length;
+        uint256 count = _offset >= total ? 0 : total - _offset;
+        if (count > _limit) {
+            count = _limit;
+        }
+        recordIds = new uint256[](count);
+        for (uint256 i = 0; i < count; i++) {
+            recordIds[i] = ids[_newestFirst ? total - 1 - _offset - i : _offset + i];
+        }
+        return recordIds;
+    }
+
+    /**
+     * @dev One page of a machine's records, in the order of getUdiRecordIds.
+     * @param _udi Unique Device Identifier or sample ID.
+     * @param _offset Number of records to skip.
+     * @param _limit Maximum number of records to return.
+     * @param _newestFirst Page from the most recent record backwards.
+     * @return recordIds The recordIds of the page.
+     * @return page The PredictionRecord structs of the page.
+     */
+    function getUdiRecords(uint256 _udi, uint256 _offset, uint256 _limit, bool _newestFirst)
+        public view returns (uint256[] memory recordIds, PredictionRecord[] memory page)
+    {
+        recordIds = getUdiRecordIds(_udi, _offset, _limit, _newestFirst);
+        page = new PredictionRecord[](recordIds.length);
+        for (uint256 i = 0; i < recordIds.length; i++) {
+            page[i] = records[recordIds[i]];
+        }
+        return (recordIds, page);
+    }
+
+    /**
+     * @dev Retrieves the most recently logged record of a machine.
+     * @param _udi Unique Device Identifier or sample ID.
+     * @return recordId The ID of the latest record.
+     * @return record The PredictionRecord struct.
+     */
+    function getLatestRecordForUdi(uint256 _udi) public view returns (uint256 recordId, PredictionRecord memory record) {
+        uint64[] storage ids = udiRecordIds[_udi];
+        require(ids.length > 0, "No records for this UDI.");
+        recordId = ids[ids.length - 1];
+        return (recordId, records[recordId]);
+    }
+
     /**
      * @dev Allows the current owner to transfer control of the contract to a newOwner.
      * @param newOwner The address to transfer ownership to.
@@ -0,0 +1,176 @@
+# csv_tailer.py
+"""
+Byte-offset tailing of the pipeline's results CSV into a SQLite store (stats_rollups.py and
+prediction_history.py build on CsvTailStore).
+
+The store keeps the CSV's path, header and the byte offset read so far in a meta table. ingest_csv
+reads the rows appended since that offset in chunks of whole rows (a row still being written is read
+next time) and hands each chunk to the subclass's _apply_rows in the same transaction that moves the
+offset, so rows and offset never disagree. The offset is re-read inside each chunk's transaction, so
+two processes tailing the same store (e.g. Flask's reloader) do not apply a chunk twice. A replaced or
+truncated CSV empties the store and starts again from its first row.
+"""
+import csv
+import io
+import json
+import os
+import sqlite3
+import threading
+
+READ_CHUNK_BYTES = 8 << 20
+
+_META_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def complete_rows_length(data):
+    """Length of the prefix of data that holds only complete CSV rows (newlines inside quotes do not end a row)."""
+    end = position = quotes = 0
+    while True:
+        newline = data.find(b'\n', position)
+        if newline < 0:
+            return end
+        quotes += data.count(b'"', position, newline)
+        if quotes % 2 == 0:
+            end = newline + 1
+        position = newline + 1
+
+
+def int_or_none(value):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def float_or_none(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class CsvTailStore:
+    """
+    Thread-safe SQLite store at path, created with schema, that tails a CSV. Subclasses name their
+    tables in TABLES (emptied when the CSV is replaced) and fold each chunk's rows in _apply_rows.
+    """
+
+    NAME = "CSV tail store" # Prefix of log messages
+    TABLES = ()
+
+    def __init__(self, path, schema):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._conn = sqlite3.connect(path, timeout=60, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_META_SCHEMA + schema)
+
+    def _meta(self, key):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row['value'] if row else None
+
+    def _set_meta(self, key, value):
+        self._conn.execute("INSERT INTO meta (key, value) VALUES (?, ?) "
+                           "ON CONFLICT(key) DO UPDATE SET value = excluded.value", (key, value))
+
+    def _transaction(self, work):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = work()
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return result
+
+    def _reset(self):
+        """Empties meta and TABLES; runs inside a transaction."""
+        for table in ('meta',) + tuple(self.TABLES):
+            self._conn.execute(f"DELETE FROM {table}")
+
+    def _apply_rows(self, records):
+        """Folds one chunk's rows (dicts keyed by the CSV header) into the store; runs inside a transaction."""
+        raise NotImplementedError
+
+    def ingest_csv(self, csv_path):
+        """Applies the rows appended to csv_path since the last call; returns how many."""
+        if not os.path.exists(csv_path):
+            return 0
+        csv_path = os.path.abspath(csv_path)
+        ingested = 0
+        with open(csv_path, 'rb') as f:
+            while True:
+                rows = self._transaction(lambda: self._ingest_chunk(f, csv_path))
+                if rows is None:
+                    return ingested
+                ingested += rows
+
+    def _ingest_chunk(self, f, csv_path):
+        offset = int(self._meta('csv_offset') or 0)
+        if self._meta('csv_path') != csv_path or os.fstat(f.fileno()).st_size < offset:
+            if offset:
+                print(f"{self.NAME}: {csv_path} was replaced; rebuilding from its first row.")
+            self._reset()
+            self._set_meta('csv_path', csv_path)
+            offset = 0
+        f.seek(offset)
+        chunk = f.read(READ_CHUNK_BYTES)
+        end = complete_rows_length(chunk) # A row still being written is read next time
+        if end == 0:
+            return None
+        rows = list(csv.reader(io.StringIO(chunk[:end].decode('utf-8'), newline='')))
+        header = json.loads(self._meta('csv_header') or 'null')
+        if header is None:
+            header, rows = rows[0], rows[1:]
+        records = [dict(zip(header, row)) for row in rows if row]
+        self._apply_rows(records)
+        self._set_meta('csv_offset', str(offset + end))
+        self._set_meta('csv_header', json.dumps(header))
+        return len(records)
+
+    def pending_bytes(self, csv_path):
+        """Bytes of csv_path not yet ingested (the tailer's lag), or None if it does not exist."""
+        if not os.path.exists(csv_path):
+            return None
+        with self._lock:
+            offset = int(self._meta('csv_offset') or 0) if self._meta('csv_path') == os.path.abspath(csv_path) else 0
+        return max(os.path.getsize(csv_path) - offset, 0)
+
+    def _tail(self, csv_path, poll_seconds):
+        while True:
+            try:
+                rows = self.ingest_csv(csv_path)
+                if rows:
+                    print(f"{self.NAME}: ingested {rows} new CSV rows.")
+            except Exception as e:
+                print(f"{self.NAME}: ingesting {csv_path} failed, retrying: {e}")
+            if self._stopped.wait(poll_seconds):
+                return
+
+    def start_tailing(self, csv_path, poll_seconds=5.0):
+        """Ingests csv_path on a daemon thread every poll_seconds, so readers never ingest themselves."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._tail, args=(csv_path, poll_seconds),
+                                            name=f"{self.NAME.lower().replace(' ', '-')}-tail", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def close(self):
+        self.stop()
+        with self._lock:
+            self._conn.close()
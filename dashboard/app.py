@@ -1,7 +1,8 @@
 # dashboard/app.py
-from flask import Flask, render_template, jsonify
+from flask import Flask, Response, render_template, jsonify, request, stream_with_context
 import pandas as pd
 import os
+import time
 import traceback
 from web3 import Web3, HTTPProvider
 from web3.middleware import ExtraDataToPOAMiddleware
@@ -14,6 +15,14 @@ import sys
 PROJECT_ROOT_FOR_CONFIG = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(PROJECT_ROOT_FOR_CONFIG)
 import config_loader as cfg
+import tree_rules
+import stats_rollups
+import prediction_history
+import merkle_store
+import machine_history
+import public_input_packing
+import metrics
+import joblib
 
 app = Flask(__name__)
 
@@ -25,7 +34,7 @@ blockchain_enabled = False
 
 if cfg.SEPOLIA_RPC_URL and cfg.CONTRACT_ADDRESS and cfg.CONTRACT_ABI:
     try:
-        w3 = Web3(HTTPProvider(cfg.SEPOLIA_RPC_URL))
+        w3 = metrics.instrument_web3(Web3(HTTPProvider(cfg.SEPOLIA_RPC_URL)))
         w3.middleware_onion.inject(ExtraDataToPOAMiddleware, layer=0)
         if w3.is_connected():
             print("Successfully connected to Sepolia for dashboard.")
@@ -44,6 +53,76 @@ else:
 # --- Path to CSV ---
 CSV_FILE_PATH = cfg.RESULTS_CSV_PATH # From config_loader
 
+# --- Leaf rule index for "why" explanations of predicted failures ---
+rule_index = None
+circuit_scaler = None # Standardises raw-unit circuit inputs (CIRCUIT_INPUT_UNITS=raw)
+try:
+    circuit_scaler = joblib.load(cfg.SCALER_PATH)
+    rule_index = tree_rules.LeafRuleIndex(joblib.load(cfg.MODEL_PATH), cfg.FEATURE_NAMES_ORDER, circuit_scaler)
+except Exception as e:
+    print(f"WARNING: Could not build the rule index; failure explanations will be unavailable: {e}")
+
+# --- Fleet statistics, maintained incrementally from the results CSV ---
+rollups = stats_rollups.StatsRollups(cfg.STATS_DB_PATH, cfg.STATS_BUCKET_SECONDS)
+
+# --- Indexed prediction history for /api/export, copied from the results CSV on a background thread ---
+history = prediction_history.PredictionHistory(cfg.HISTORY_DB_PATH)
+history.start_tailing(CSV_FILE_PATH, cfg.HISTORY_INGEST_SECONDS)
+
+# --- Merkle-window records (CHAIN_LOGGING_MODE=merkle), verified against their on-chain roots ---
+merkle_records = merkle_store.MerkleStore(cfg.MERKLE_STORE_PATH, cfg.MERKLE_WINDOW_SECONDS)
+
+# --- Runtime metrics for /metrics ---
+REQUEST_SECONDS = metrics.histogram("dashboard_request_seconds", "Dashboard request latency by endpoint.", ["endpoint"])
+EXPORTED_ROWS = metrics.counter("dashboard_exported_rows", "Prediction history rows streamed by /api/export.", ["format"])
+HEAD_BLOCK_CACHE_SECONDS = 15 # Scrapes re-read the chain head at most this often
+last_indexed_block = None # Chain head when /api/predictions last read the PredictionLogged events
+chain_head = {"block": None, "read_at": 0.0} # Last chain head seen, shared by /api/predictions and scrapes
+
+def event_indexer_lag_blocks():
+    if last_indexed_block is None or w3 is None:
+        return None
+    if time.monotonic() - chain_head["read_at"] >= HEAD_BLOCK_CACHE_SECONDS:
+        chain_head.update(block=w3.eth.block_number, read_at=time.monotonic())
+    return max(chain_head["block"] - last_indexed_block, 0)
+
+metrics.gauge("dashboard_event_indexer_lag_blocks",
+              "Blocks mined since the dashboard last read PredictionLogged events.").set_function(event_indexer_lag_blocks)
+metrics.gauge("dashboard_stats_indexer_lag_bytes",
+              "Bytes of the results CSV not yet folded into the /api/stats rollups.").set_function(
+                  lambda: rollups.pending_bytes(CSV_FILE_PATH))
+metrics.gauge("dashboard_history_indexer_lag_bytes",
+              "Bytes of the results CSV not yet copied into the /api/export history index.").set_function(
+                  lambda: history.pending_bytes(CSV_FILE_PATH))
+
+@app.before_request
+def start_request_timer():
+    request.metrics_start_time = time.perf_counter()
+
+@app.after_request
+def observe_request_latency(response):
+    start_time = getattr(request, 'metrics_start_time', None)
+    if start_time is not None and request.endpoint:
+        REQUEST_SECONDS.labels(request.endpoint).observe(time.perf_counter() - start_time)
+    return response
+
+def add_failure_explanations(records):
+    """Fills 'why' for every predicted failure with one batched leaf lookup over all records."""
+    rows, targets = [], []
+    for record in records:
+        circuit_inputs = record.pop('_circuit_inputs', None)
+        record['why'] = None
+        if rule_index is None or record.get('circuit_prediction') != 1 or not circuit_inputs:
+            continue
+        rows.append(tree_rules.features_from_circuit_inputs(circuit_inputs, cfg.FEATURE_NAMES_ORDER,
+            cfg.NUMERICAL_FEATURES_FOR_SCALING, cfg.FIXED_POINT_MULTIPLIER, circuit_scaler,
+            cfg.RAW_UNIT_MULTIPLIERS if cfg.CIRCUIT_INPUT_UNITS == "raw" else None))
+        targets.append(record)
+    if rows:
+        for record, rule in zip(targets, rule_index.explain(rows)):
+            record['why'] = tree_rules.format_rule(rule)
+    return records
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -60,6 +139,20 @@ def convert_to_native_python_type(value):
         return None # Or an empty string "" if preferred for display
     return value
 
+def unpack_record_inputs(record_id, public_inputs):
+    """
+    A record's 8 public inputs. Records logged with logPackedPrediction keep publicInputs zeroed; their
+    packedPublicInputs word is read (one extra call, only for records without inputs) and unpacked here.
+    """
+    if any(public_inputs):
+        return list(public_inputs)
+    try:
+        packed = contract.functions.packedPublicInputs(record_id).call()
+    except Exception as e: # Older deployments have no packed-input support
+        print(f"Note: Could not look up packed inputs for record {record_id}: {e}")
+        return list(public_inputs)
+    return public_input_packing.unpack_public_inputs(packed) if packed else list(public_inputs)
+
 def format_record_for_dashboard(event_log, record_struct_data, csv_lookup_data):
     tx_hash_hex = event_log.transactionHash.hex()
     record_udi = event_log.args.udi
@@ -76,6 +169,7 @@ def format_record_for_dashboard(event_log, record_struct_data, csv_lookup_data):
             csv_row_dict['local_zkp_verified'] = convert_to_native_python_type(csv_row.get('local_zkp_verified'))
             csv_row_dict['gas_used'] = convert_to_native_python_type(csv_row.get('gas_used'))
             csv_row_dict['tx_status'] = convert_to_native_python_type(csv_row.get('tx_status'))
+            csv_row_dict['inputs_for_circuit'] = convert_to_native_python_type(csv_row.get('inputs_for_circuit'))
         else: # Fallback if no tx_hash match
             matching_udi_rows = csv_lookup_data[csv_lookup_data['sample_udi'] == record_udi]
             if not matching_udi_rows.empty:
@@ -85,7 +179,27 @@ def format_record_for_dashboard(event_log, record_struct_data, csv_lookup_data):
                 print(f"Note: Found CSV data for UDI {record_udi} by UDI match, not TxHash.")
 
 
-    public_inputs_formatted = [str(val) for val in record_struct_data[3]]
+    public_inputs = unpack_record_inputs(event_log.args.recordId, record_struct_data[3])
+    public_inputs_formatted = [str(val) for val in public_inputs]
+    circuit_inputs = list(public_inputs) if any(public_inputs) else None
+    if circuit_inputs is None and csv_row_dict.get('inputs_for_circuit'): # Committed records: inputs only in the CSV
+        circuit_inputs = json.loads(csv_row_dict['inputs_for_circuit'])
+    if not any(public_inputs): # Committed records publish only a Poseidon commitment to the features
+        try:
+            feature_commitment = contract.functions.featureCommitments(event_log.args.recordId).call()
+            if feature_commitment:
+                public_inputs_formatted = [f"commitment:{feature_commitment}"]
+        except Exception as e: # Older deployments have no commitment support
+            print(f"Note: Could not look up feature commitment for record {event_log.args.recordId}: {e}")
+
+    notes = str(record_struct_data[5]) # notes from getRecord
+    if not notes: # Records logged through logPredictionBatch keep their notes on the batch
+        try:
+            batch_ref = contract.functions.recordBatchId(event_log.args.recordId).call()
+            if batch_ref:
+                notes = f"Batch #{batch_ref - 1}: {contract.functions.getBatch(batch_ref - 1).call()[3]}"
+        except Exception as e: # Older deployments have no batch support
+            print(f"Note: Could not look up batch notes for record {event_log.args.recordId}: {e}")
 
     # Ensure all values being returned are JSON serializable native Python types
     return {
@@ -101,7 +215,8 @@ def format_record_for_dashboard(event_log, record_struct_data, csv_lookup_data):
         'blockchain_tx_hash': tx_hash_hex,
         'gas_used': csv_row_dict.get('gas_used'),
         'tx_status': csv_row_dict.get('tx_status', 'Success (On-chain)'),
-        'notes': str(record_struct_data[5]) # notes from getRecord
+        'notes': notes,
+        '_circuit_inputs': circuit_inputs # Consumed by add_failure_explanations
     }
 
 @app.route('/api/predictions')
@@ -126,8 +241,12 @@ def get_predictions_combined():
     predictions = []
     try:
         print("Accessing /api/predictions (blockchain events + CSV enrichment mode)")
+        head_block = w3.eth.block_number
         event_filter = contract.events.PredictionLogged.create_filter(from_block='earliest', to_block='latest')
         logs = event_filter.get_all_entries()
+        global last_indexed_block
+        last_indexed_block = head_block
+        chain_head.update(block=head_block, read_at=time.monotonic())
         print(f"Found {len(logs)} PredictionLogged events.")
 
         recent_logs_to_process = sorted(logs, key=lambda x: x.blockNumber, reverse=True)[:20]
@@ -141,6 +260,7 @@ def get_predictions_combined():
             formatted_record = format_record_for_dashboard(event_log, record_struct_data, csv_data_df)
             predictions.append(formatted_record)
         
+        add_failure_explanations(predictions)
         print(f"Formatted {len(predictions)} records for dashboard.")
         return jsonify(predictions)
 
@@ -151,6 +271,150 @@ def get_predictions_combined():
         traceback.print_exc()
         return jsonify({"error": "An internal server error occurred. Check Flask console."}), 500
 
+@app.route('/metrics')
+def get_metrics():
+    """Runtime metrics in Prometheus text format."""
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+@app.route('/api/stats')
+def get_stats():
+    """Fleet statistics from the rollups; only rows appended to the CSV since the last request are read."""
+    try:
+        new_rows = rollups.ingest_csv(CSV_FILE_PATH)
+        if new_rows:
+            print(f"Stats rollups: folded in {new_rows} new CSV rows.")
+        recent_buckets = min(max(request.args.get('buckets', 24, type=int), 1), 24 * 31)
+        return jsonify(rollups.stats(recent_buckets))
+    except Exception as e:
+        print(f"!!! Error in get_stats: {e}")
+        traceback.print_exc()
+        return jsonify({"error": "An internal server error occurred. Check Flask console."}), 500
+
+def count_exported_rows(pages, format_name):
+    for page in pages:
+        EXPORTED_ROWS.labels(format_name).inc(len(page))
+        yield page
+
+@app.route('/api/machines/<int:udi>/history')
+def get_machine_history(udi):
+    """
+    One page of a machine's on-chain records from the contract's per-UDI index (?offset=, ?limit=,
+    ?order=newest|oldest), without reading the fleet's PredictionLogged events.
+    """
+    if not blockchain_enabled or not contract:
+        return jsonify({"error": "Blockchain connection not available. Check server logs."}), 503
+    try:
+        history = machine_history.machine_history(
+            contract, udi, request.args.get('offset', 0, type=int), request.args.get('limit', 20, type=int),
+            newest_first=request.args.get('order', 'newest') != 'oldest')
+        for record in history['records']: # Same fields add_failure_explanations reads from /api/predictions rows
+            record['circuit_prediction'] = record['predicted_class']
+            public_inputs = [int(value) for value in record['public_inputs']]
+            record['_circuit_inputs'] = public_inputs if any(public_inputs) else None
+        add_failure_explanations(history['records'])
+        return jsonify(history)
+    except Exception as e:
+        print(f"!!! Error in get_machine_history: {e}")
+        traceback.print_exc()
+        return jsonify({"error": "An internal server error occurred. Check Flask console."}), 500
+
+@app.route('/api/machines/<int:udi>/latest')
+def get_machine_latest(udi):
+    """The machine's most recent on-chain record (getLatestRecordForUdi)."""
+    if not blockchain_enabled or not contract:
+        return jsonify({"error": "Blockchain connection not available. Check server logs."}), 503
+    try:
+        record = machine_history.latest_record(contract, udi)
+        if record is None:
+            return jsonify({"error": f"No on-chain record found for UDI {udi}."}), 404
+        return jsonify(record)
+    except Exception as e:
+        print(f"!!! Error in get_machine_latest: {e}")
+        traceback.print_exc()
+        return jsonify({"error": "An internal server error occurred. Check Flask console."}), 500
+
+@app.route('/api/export')
+def export_history():
+    """
+    Streams the indexed prediction history as NDJSON, Arrow IPC or Parquet (?format=), optionally filtered
+    by time (?start=, ?end=, ISO-8601 or epoch seconds) and UDI (?udi=1,2,3), resuming after ?after_id=.
+    Rows come from the local index in pages of EXPORT_PAGE_ROWS; no chain calls are made. The index is
+    filled by a background thread, so rows written in the last HISTORY_INGEST_SECONDS may be missing.
+    """
+    format_name = request.args.get('format', 'ndjson').lower()
+    if format_name not in prediction_history.EXPORT_FORMATS:
+        return jsonify({"error": f"Unknown format {format_name!r}; expected one of {list(prediction_history.EXPORT_FORMATS)}."}), 400
+    try:
+        start = prediction_history.parse_time(request.args.get('start'))
+        end = prediction_history.parse_time(request.args.get('end'))
+        udis = [int(udi) for udi in request.args.get('udi', '').split(',') if udi.strip()]
+        after_id = request.args.get('after_id', 0, type=int)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid filter: {e}"}), 400
+    try:
+        pages = history.pages(start, end, udis, after_id, cfg.EXPORT_PAGE_ROWS)
+        chunks = prediction_history.encode_pages(count_exported_rows(pages, format_name), format_name)
+    except ImportError as e:
+        return jsonify({"error": str(e)}), 501
+    except Exception as e:
+        print(f"!!! Error in export_history: {e}")
+        traceback.print_exc()
+        return jsonify({"error": "An internal server error occurred. Check Flask console."}), 500
+    file_name = f"prediction_history.{prediction_history.FILE_EXTENSIONS[format_name]}"
+    return Response(stream_with_context(chunks), content_type=prediction_history.MEDIA_TYPES[format_name],
+                    headers={"Content-Disposition": f"attachment; filename={file_name}"})
+
+@app.route('/api/merkle/windows')
+def get_merkle_windows():
+    """The most recent Merkle windows of the local store with their roots and publication status."""
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 500)
+    return jsonify(merkle_records.windows(limit=limit))
+
+def verify_merkle_record(record):
+    """
+    Checks one stored record: its leaf is recomputed from the stored fields and proof, the inclusion
+    proof must lead to the window root, and that root must be the one logged on chain for the window.
+    """
+    result = {
+        'udi': record['udi'], 'window_id': record['window_id'], 'leaf_index': record['leaf_index'],
+        'predicted_class': record['predicted_class'], 'input_commitment': record['input_commitment'],
+        'proof_hash': record['proof_hash'], 'leaf': record['leaf'], 'window_status': record['status'],
+        'window_start': record['window_start'], 'window_end': record['window_end'], 'root': record['root'],
+        'chain_window_id': record['chain_window_id'], 'root_tx_hash': record['tx_hash'],
+        'inclusion_proof': record['proof'], 'leaf_matches': False, 'proof_matches_root': None,
+        'onchain_root': None, 'onchain_root_matches': None, 'onchain_verified': None, 'verified': False,
+    }
+    stored_proof = (record['record'] or {}).get('proof')
+    proof_hash = merkle_store.to_hex(merkle_store.proof_hash(stored_proof)) if stored_proof else record['proof_hash']
+    leaf = merkle_store.leaf_hash(record['udi'], record['predicted_class'], int(record['input_commitment']), proof_hash)
+    result['leaf_matches'] = merkle_store.to_hex(leaf) == record['leaf'] and proof_hash == record['proof_hash']
+    if record['proof'] is None: # Window still open: no root yet
+        return result
+    result['proof_matches_root'] = merkle_store.verify_inclusion(leaf, record['proof'], record['root'])
+    if record['chain_window_id'] is not None and blockchain_enabled and contract:
+        window = contract.functions.getMerkleWindow(record['chain_window_id']).call()
+        result['onchain_root'] = merkle_store.to_hex(window[0])
+        result['onchain_root_matches'] = result['onchain_root'] == record['root']
+        result['onchain_verified'] = contract.functions.verifyMerkleRecord(
+            record['chain_window_id'], record['udi'], record['predicted_class'], int(record['input_commitment']),
+            bytes.fromhex(proof_hash[2:]), [bytes.fromhex(node[2:]) for node in record['proof']]).call()
+    result['verified'] = bool(result['leaf_matches'] and result['proof_matches_root']
+                              and result['onchain_root_matches'] and result['onchain_verified'])
+    return result
+
+@app.route('/api/merkle/verify/<int:udi>')
+def verify_merkle_records(udi):
+    """Every Merkle-window record of a UDI, each verified against its window's on-chain root."""
+    try:
+        records = merkle_records.records_for_udi(udi)
+        if not records:
+            return jsonify({"error": f"No Merkle-window record found for UDI {udi}."}), 404
+        return jsonify([verify_merkle_record(record) for record in records])
+    except Exception as e:
+        print(f"!!! Error in verify_merkle_records: {e}")
+        traceback.print_exc()
+        return jsonify({"error": "An internal server error occurred. Check Flask console."}), 500
+
 if __name__ == '__main__':
     if not cfg.SEPOLIA_RPC_URL or not cfg.CONTRACT_ADDRESS or not cfg.CONTRACT_ABI:
         print("CRITICAL: Essential configuration from config_loader.py is missing!")
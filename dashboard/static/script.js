@@ -27,7 +27,7 @@ document.addEventListener('DOMContentLoaded', function() {
         if (!data || data.length === 0) {
             const row = predictionsTableBody.insertRow();
             const cell = row.insertCell();
-            cell.colSpan = 10; 
+            cell.colSpan = 11; 
             cell.textContent = 'No prediction data found on the blockchain yet, or an issue occurred fetching it.';
             cell.style.textAlign = 'center';
             return;
@@ -110,6 +110,11 @@ document.addEventListener('DOMContentLoaded', function() {
             const notesCell = row.insertCell();
             notesCell.textContent = record.notes || '';
             notesCell.title = record.notes || ''; // Show full notes on hover
+
+            // Why: the decision rule (leaf interval per feature) behind a predicted failure
+            const whyCell = row.insertCell();
+            whyCell.textContent = record.why || '';
+            whyCell.title = record.why || '';
         });
     }
 
@@ -154,6 +159,125 @@ document.addEventListener('DOMContentLoaded', function() {
 
     refreshButton.addEventListener('click', fetchData);
     fetchData(); // Initial data load
+
+    // --- Merkle-window records: verify one UDI against its on-chain root ---
+    const merkleTableBody = document.getElementById('merkleTable').getElementsByTagName('tbody')[0];
+    const merkleUDIInput = document.getElementById('merkleUDI');
+    const merkleMessageElement = document.getElementById('merkle-message');
+
+    function checkText(value) {
+        if (value === null || value === undefined) {
+            return 'Pending';
+        }
+        return value ? '✅ Yes' : '❌ No';
+    }
+
+    function populateMerkleTable(records) {
+        merkleTableBody.innerHTML = '';
+        records.forEach(record => {
+            const row = merkleTableBody.insertRow();
+            row.insertCell().textContent = record.chain_window_id !== null ?
+                `${record.window_id} (on-chain ${record.chain_window_id})` : record.window_id;
+            row.insertCell().textContent = record.leaf_index;
+            row.insertCell().textContent = record.predicted_class == 1 ? 'Failure (1)' : 'No Failure (0)';
+            row.insertCell().textContent = record.window_status;
+            const rootCell = row.insertCell();
+            rootCell.textContent = record.root ? record.root.substring(0, 12) + '...' : 'N/A';
+            rootCell.title = record.root || '';
+            row.insertCell().textContent = checkText(record.leaf_matches);
+            row.insertCell().textContent = checkText(record.proof_matches_root);
+            row.insertCell().textContent = checkText(record.onchain_root_matches);
+            row.insertCell().textContent = checkText(record.onchain_verified);
+            const resultCell = row.insertCell();
+            resultCell.textContent = record.verified ? '✅ Verified' : (record.window_status === 'published' ? '❌ Not Verified' : 'Root not on chain yet');
+            resultCell.style.color = record.verified ? 'green' : (record.window_status === 'published' ? 'red' : 'inherit');
+        });
+    }
+
+    function verifyMerkleRecord() {
+        const udi = merkleUDIInput.value.trim();
+        merkleTableBody.innerHTML = '';
+        merkleMessageElement.textContent = '';
+        if (!/^[0-9]+$/.test(udi)) {
+            merkleMessageElement.textContent = 'Enter a numeric UDI.';
+            return;
+        }
+        fetch(`/api/merkle/verify/${udi}`)
+            .then(response => response.json().then(data => {
+                if (!response.ok) {
+                    throw new Error(data.error || response.statusText);
+                }
+                return data;
+            }))
+            .then(populateMerkleTable)
+            .catch(error => {
+                console.error('Error verifying Merkle record:', error);
+                merkleMessageElement.textContent = `Verification failed: ${error.message}`;
+            });
+    }
+
+    document.getElementById('verifyMerkle').addEventListener('click', verifyMerkleRecord);
+
+    // --- Machine history: pages of one UDI's records from the contract's per-UDI index ---
+    const historyTableBody = document.getElementById('historyTable').getElementsByTagName('tbody')[0];
+    const historyUDIInput = document.getElementById('historyUDI');
+    const historySummaryElement = document.getElementById('history-summary');
+    const historyMessageElement = document.getElementById('history-message');
+    const olderHistoryButton = document.getElementById('olderHistory');
+    const HISTORY_PAGE_SIZE = 20;
+    let historyUDI = null;
+    let historyOffset = 0;
+
+    function appendHistoryRows(history) {
+        history.records.forEach(record => {
+            const row = historyTableBody.insertRow();
+            row.insertCell().textContent = record.record_id;
+            row.insertCell().textContent = new Date(record.timestamp_utc).toLocaleString();
+            const predictionCell = row.insertCell();
+            predictionCell.textContent = record.predicted_class == 1 ? 'Failure (1)' : 'No Failure (0)';
+            predictionCell.style.color = record.predicted_class == 1 ? 'red' : 'inherit';
+            row.insertCell().textContent = record.feature_commitment ?
+                `commitment:${record.feature_commitment}` : record.public_inputs.join(', ');
+            row.insertCell().textContent = record.batch_id !== null ? `Batch #${record.batch_id}: ${record.notes}` : record.notes;
+            row.insertCell().textContent = record.why || '';
+        });
+        historyOffset = history.offset + history.records.length;
+        historySummaryElement.textContent = `UDI ${history.udi}: showing ${historyOffset} of ${history.total} on-chain records (newest first).`;
+        olderHistoryButton.disabled = historyOffset >= history.total;
+    }
+
+    function fetchHistoryPage() {
+        historyMessageElement.textContent = '';
+        fetch(`/api/machines/${historyUDI}/history?offset=${historyOffset}&limit=${HISTORY_PAGE_SIZE}`)
+            .then(response => response.json().then(data => {
+                if (!response.ok) {
+                    throw new Error(data.error || response.statusText);
+                }
+                return data;
+            }))
+            .then(appendHistoryRows)
+            .catch(error => {
+                console.error('Error fetching machine history:', error);
+                historyMessageElement.textContent = `Could not load the history: ${error.message}`;
+            });
+    }
+
+    function loadHistory() {
+        const udi = historyUDIInput.value.trim();
+        historyTableBody.innerHTML = '';
+        historySummaryElement.textContent = '';
+        olderHistoryButton.disabled = true;
+        if (!/^[0-9]+$/.test(udi)) {
+            historyMessageElement.textContent = 'Enter a numeric UDI.';
+            return;
+        }
+        historyUDI = udi;
+        historyOffset = 0;
+        fetchHistoryPage();
+    }
+
+    document.getElementById('loadHistory').addEventListener('click', loadHistory);
+    olderHistoryButton.addEventListener('click', fetchHistoryPage);
 });
 
 // Function to sort the table
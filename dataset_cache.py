@@ -0,0 +1,290 @@
+# dataset_cache.py
+"""
+Columnar, memory-mapped cache for the sensor dataset and the train/test splits.
+
+The CSV is converted once into one .npy file per column (explicit dtypes, fixed-width strings) plus a
+UDI -> row index, under artifacts/dataset_cache/<csv name>/. load_dataset() memory-maps the columns and
+only re-parses the CSV when its size, mtime or content hash changed. The conversion streams the CSV in
+chunks, so files far larger than memory can be cached.
+"""
+import hashlib
+import json
+import os
+import struct
+
+import numpy as np
+import pandas as pd
+
+import metrics
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_ROOT = os.path.join(BASE_DIR, "artifacts", "dataset_cache")
+CACHE_FORMAT_VERSION = 1
+CSV_CHUNK_ROWS = 200_000
+NPY_HEADER_BYTES = 128 # Fixed header size for appended splits, so the final row count can be patched in place
+
+# Explicit dtypes for the AI4I 2020 columns; other columns are inferred from the data
+DATASET_SCHEMA = {
+    'UDI': 'int64',
+    'Product ID': 'str',
+    'Type': 'str',
+    'Air temperature [K]': 'float64',
+    'Process temperature [K]': 'float64',
+    'Rotational speed [rpm]': 'int64',
+    'Torque [Nm]': 'float64',
+    'Tool wear [min]': 'int64',
+    'Machine failure': 'int8',
+    'TWF': 'int8',
+    'HDF': 'int8',
+    'PWF': 'int8',
+    'OSF': 'int8',
+    'RNF': 'int8',
+}
+
+
+def _sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _column_file_name(index):
+    return f"col_{index:03d}.npy" # Column names contain spaces and brackets; the manifest maps them
+
+
+def _write_manifest(cache_dir, manifest):
+    tmp_path = os.path.join(cache_dir, "manifest.json.tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(cache_dir, "manifest.json"))
+
+
+def _read_manifest(cache_dir):
+    manifest_path = os.path.join(cache_dir, "manifest.json")
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, 'r') as f:
+        manifest = json.load(f)
+    return manifest if manifest.get("format_version") == CACHE_FORMAT_VERSION else None
+
+
+def dataset_cache_dir(csv_path):
+    return os.path.join(CACHE_ROOT, os.path.splitext(os.path.basename(csv_path))[0])
+
+
+def _csv_is_current(manifest, csv_path):
+    """Size and mtime decide quickly; a touched-but-identical file is recognised by its hash."""
+    stat = os.stat(csv_path)
+    source = manifest["source"]
+    if source["size"] == stat.st_size and source["mtime"] == stat.st_mtime:
+        return True
+    if source["size"] != stat.st_size:
+        return False
+    return source["sha256"] == _sha256_file(csv_path)
+
+
+def build_dataset_cache(csv_path, cache_dir=None, schema=DATASET_SCHEMA):
+    """Converts csv_path into per-column .npy files in two streaming passes (sizes, then data)."""
+    cache_dir = cache_dir or dataset_cache_dir(csv_path)
+    os.makedirs(cache_dir, exist_ok=True)
+    read_dtypes = {name: (str if dtype == 'str' else dtype) for name, dtype in schema.items()}
+
+    # Pass 1: row count, column dtypes, widths of string columns
+    n_rows = 0
+    column_dtypes = {}
+    string_widths = {}
+    for chunk in pd.read_csv(csv_path, chunksize=CSV_CHUNK_ROWS, dtype=read_dtypes):
+        n_rows += len(chunk)
+        for name in chunk.columns:
+            dtype = schema.get(name)
+            if dtype is None: # Inferred column: widen to float64 if any chunk is fractional
+                dtype = 'str' if chunk[name].dtype == object else str(chunk[name].dtype)
+                if column_dtypes.get(name) == 'float64' and dtype == 'int64':
+                    dtype = 'float64'
+            column_dtypes[name] = dtype
+            if dtype == 'str':
+                width = int(chunk[name].astype(str).str.len().max()) if len(chunk) else 1
+                string_widths[name] = max(string_widths.get(name, 1), width)
+    column_names = list(column_dtypes)
+
+    # Pass 2: fill one memory-mapped .npy per column
+    columns_meta = []
+    outputs = {}
+    for index, name in enumerate(column_names):
+        dtype = f"<U{string_widths[name]}" if column_dtypes[name] == 'str' else column_dtypes[name]
+        file_name = _column_file_name(index)
+        outputs[name] = np.lib.format.open_memmap(os.path.join(cache_dir, file_name), mode='w+',
+                                                  dtype=np.dtype(dtype), shape=(n_rows,))
+        columns_meta.append({"name": name, "file": file_name, "dtype": np.dtype(dtype).str})
+    row_offset = 0
+    for chunk in pd.read_csv(csv_path, chunksize=CSV_CHUNK_ROWS, dtype=read_dtypes):
+        for name in column_names:
+            outputs[name][row_offset:row_offset + len(chunk)] = chunk[name].to_numpy().astype(outputs[name].dtype)
+        row_offset += len(chunk)
+    for output in outputs.values():
+        output.flush()
+
+    # UDI -> row index: sorted UDIs and their row positions, looked up with searchsorted
+    if 'UDI' in outputs:
+        order = np.argsort(outputs['UDI'], kind='stable')
+        np.save(os.path.join(cache_dir, "udi_sorted.npy"), np.asarray(outputs['UDI'])[order])
+        np.save(os.path.join(cache_dir, "udi_rows.npy"), order.astype(np.int64))
+    del outputs
+
+    stat = os.stat(csv_path)
+    manifest = {
+        "format_version": CACHE_FORMAT_VERSION,
+        "source": {"path": os.path.abspath(csv_path), "size": stat.st_size, "mtime": stat.st_mtime,
+                   "sha256": _sha256_file(csv_path)},
+        "n_rows": n_rows,
+        "columns": columns_meta,
+    }
+    _write_manifest(cache_dir, manifest) # Written last: a cache without a manifest is rebuilt
+    print(f"Dataset cache built for {csv_path}: {n_rows} rows, {len(column_names)} columns -> {cache_dir}")
+    return manifest
+
+
+def _ensure_cache(csv_path):
+    cache_dir = dataset_cache_dir(csv_path)
+    manifest = _read_manifest(cache_dir)
+    hit = manifest is not None and _csv_is_current(manifest, csv_path)
+    metrics.record_cache("dataset", hit)
+    if not hit:
+        manifest = build_dataset_cache(csv_path, cache_dir)
+    elif manifest["source"]["mtime"] != os.stat(csv_path).st_mtime: # Same content, new mtime
+        manifest["source"]["mtime"] = os.stat(csv_path).st_mtime
+        _write_manifest(cache_dir, manifest)
+    return cache_dir, manifest
+
+
+def load_columns(csv_path, columns=None, mmap=True):
+    """Returns {column name: array} for the requested columns (all by default), memory-mapped if mmap."""
+    cache_dir, manifest = _ensure_cache(csv_path)
+    wanted = set(columns) if columns is not None else None
+    arrays = {}
+    for meta in manifest["columns"]:
+        if wanted is None or meta["name"] in wanted:
+            arrays[meta["name"]] = np.load(os.path.join(cache_dir, meta["file"]), mmap_mode='r' if mmap else None)
+    missing = (wanted or set()) - set(arrays)
+    if missing:
+        raise KeyError(f"Columns not in {csv_path}: {sorted(missing)}")
+    return arrays
+
+
+def load_dataset(csv_path, columns=None, mmap=True):
+    """Drop-in replacement for pd.read_csv(csv_path) backed by the columnar cache."""
+    arrays = load_columns(csv_path, columns, mmap)
+    ordered_names = columns if columns is not None else list(arrays)
+    return pd.DataFrame({name: arrays[name] for name in ordered_names}, copy=False)
+
+
+def rows_for_udis(csv_path, udis):
+    """Row positions for the given UDIs (raises KeyError for unknown UDIs)."""
+    cache_dir, _ = _ensure_cache(csv_path)
+    udi_sorted = np.load(os.path.join(cache_dir, "udi_sorted.npy"), mmap_mode='r')
+    udi_rows = np.load(os.path.join(cache_dir, "udi_rows.npy"), mmap_mode='r')
+    udis = np.asarray(udis, dtype=np.int64)
+    positions = np.searchsorted(udi_sorted, udis)
+    found = (positions < len(udi_sorted)) & (udi_sorted[np.minimum(positions, len(udi_sorted) - 1)] == udis)
+    if not found.all():
+        raise KeyError(f"Unknown UDIs: {udis[~found].tolist()[:10]}")
+    return np.asarray(udi_rows[positions])
+
+
+# --- Train/test split cache ---
+
+def save_split(split_dir, name, frame):
+    """Saves a DataFrame/Series as per-column .npy files under split_dir/name/."""
+    frame = frame.to_frame() if isinstance(frame, pd.Series) else frame
+    target_dir = os.path.join(split_dir, name)
+    os.makedirs(target_dir, exist_ok=True)
+    columns_meta = []
+    for index, column_name in enumerate(frame.columns):
+        values = frame[column_name].to_numpy()
+        if values.dtype == object:
+            values = values.astype(str)
+        file_name = _column_file_name(index)
+        np.save(os.path.join(target_dir, file_name), values)
+        columns_meta.append({"name": column_name, "file": file_name, "dtype": values.dtype.str})
+    _write_manifest(target_dir, {"format_version": CACHE_FORMAT_VERSION, "n_rows": len(frame), "columns": columns_meta})
+
+
+def has_split(split_dir, name):
+    return _read_manifest(os.path.join(split_dir, name)) is not None
+
+
+def load_split(split_dir, name, mmap=True):
+    """Loads a split saved with save_split as a DataFrame."""
+    target_dir = os.path.join(split_dir, name)
+    manifest = _read_manifest(target_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"No cached split '{name}' in {split_dir}")
+    return pd.DataFrame({meta["name"]: np.load(os.path.join(target_dir, meta["file"]), mmap_mode='r' if mmap else None)
+                         for meta in manifest["columns"]}, copy=False)
+
+
+def _npy_header(dtype, n_rows):
+    """A .npy v1.0 header padded to NPY_HEADER_BYTES (np.load accepts any padding before the newline)."""
+    header = "{'descr': %r, 'fortran_order': False, 'shape': (%d,), }" % (np.lib.format.dtype_to_descr(dtype), n_rows)
+    prefix = np.lib.format.magic(1, 0)
+    body_length = NPY_HEADER_BYTES - len(prefix) - 2
+    return prefix + struct.pack('<H', body_length) + header.ljust(body_length - 1).encode('latin1') + b'\n'
+
+
+class SplitWriter:
+    """
+    Appends DataFrame/Series chunks to a split under split_dir/name/ (same layout as save_split), so a
+    split can be written without holding it in memory. The manifest is written by close(); a writer that
+    fails midway leaves no loadable split behind.
+    """
+
+    def __init__(self, split_dir, name):
+        self.target_dir = os.path.join(split_dir, name)
+        os.makedirs(self.target_dir, exist_ok=True)
+        manifest_path = os.path.join(self.target_dir, "manifest.json")
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+        self.columns = None
+        self.dtypes = None
+        self.n_rows = 0
+        self._files = []
+
+    def append(self, frame):
+        frame = frame.to_frame() if isinstance(frame, pd.Series) else frame
+        if self.columns is None:
+            self.columns = list(frame.columns)
+            self.dtypes = [frame[name].to_numpy().dtype for name in self.columns]
+            if any(dtype == object for dtype in self.dtypes):
+                raise TypeError("SplitWriter stores fixed-width columns only; convert object columns first")
+            for index, dtype in enumerate(self.dtypes):
+                f = open(os.path.join(self.target_dir, _column_file_name(index)), 'wb')
+                f.write(_npy_header(dtype, 0))
+                self._files.append(f)
+        elif list(frame.columns) != self.columns:
+            raise ValueError(f"Chunk columns {list(frame.columns)} do not match {self.columns}")
+        for f, name, dtype in zip(self._files, self.columns, self.dtypes):
+            f.write(np.ascontiguousarray(frame[name].to_numpy(), dtype=dtype).tobytes())
+        self.n_rows += len(frame)
+
+    def close(self):
+        columns_meta = []
+        for index, (f, name, dtype) in enumerate(zip(self._files, self.columns or [], self.dtypes or [])):
+            f.seek(0)
+            f.write(_npy_header(dtype, self.n_rows))
+            f.close()
+            columns_meta.append({"name": name, "file": _column_file_name(index), "dtype": dtype.str})
+        self._files = []
+        _write_manifest(self.target_dir, {"format_version": CACHE_FORMAT_VERSION, "n_rows": self.n_rows,
+                                          "columns": columns_meta})
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            for f in self._files:
+                f.close()
@@ -0,0 +1,79 @@
+# machine_history.py
+"""
+Reads one machine's prediction history from PredictionLogger's per-UDI index (getUdiRecordCount,
+getUdiRecords, getLatestRecordForUdi) instead of scanning every PredictionLogged event, so the cost of
+a page depends on the page size, not on the fleet's total history.
+
+Used by the dashboard's /api/machines/<udi>/... routes and pipeline_scripts/18_machine_history.py.
+"""
+from datetime import datetime, timezone
+
+import public_input_packing
+
+MAX_PAGE_SIZE = 100 # Records per getUdiRecords call; bounds the view call's memory and gas
+
+
+def record_to_dict(contract, record_id, record):
+    """
+    A PredictionRecord struct as a JSON-ready dict. Records logged with packed inputs, a feature commitment
+    or in a batch get their inputs, commitment and batch notes looked up (one extra call each, only for
+    those records).
+    """
+    udi, timestamp, predicted_class, public_inputs, proof, notes = record
+    result = {
+        'record_id': int(record_id),
+        'udi': int(udi),
+        'timestamp': int(timestamp),
+        'timestamp_utc': datetime.fromtimestamp(int(timestamp), tz=timezone.utc).isoformat(),
+        'predicted_class': int(predicted_class),
+        'public_inputs': [str(value) for value in public_inputs],
+        'feature_commitment': None,
+        'batch_id': None,
+        'notes': str(notes),
+    }
+    if not any(public_inputs):
+        try:
+            packed = contract.functions.packedPublicInputs(record_id).call()
+            if packed:
+                result['public_inputs'] = [str(value) for value in public_input_packing.unpack_public_inputs(packed)]
+        except Exception as e: # Older deployments have no packed-input support
+            print(f"Note: Could not look up packed inputs for record {record_id}: {e}")
+    if not any(int(value) for value in result['public_inputs']):
+        try:
+            feature_commitment = contract.functions.featureCommitments(record_id).call()
+            result['feature_commitment'] = str(feature_commitment) if feature_commitment else None
+        except Exception as e: # Older deployments have no commitment support
+            print(f"Note: Could not look up feature commitment for record {record_id}: {e}")
+    if not result['notes']: # Records logged through logPredictionBatch keep their notes on the batch
+        try:
+            batch_ref = contract.functions.recordBatchId(record_id).call()
+            if batch_ref:
+                result['batch_id'] = batch_ref - 1
+                result['notes'] = contract.functions.getBatch(batch_ref - 1).call()[3]
+        except Exception as e: # Older deployments have no batch support
+            print(f"Note: Could not look up batch notes for record {record_id}: {e}")
+    return result
+
+
+def machine_history(contract, udi, offset=0, limit=20, newest_first=True):
+    """
+    One page of a machine's records: {udi, total, offset, limit, newest_first, records}. offset counts
+    from the newest record when newest_first, else from the oldest.
+    """
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    offset = max(0, int(offset))
+    total = contract.functions.getUdiRecordCount(udi).call()
+    records = []
+    if offset < total:
+        record_ids, page = contract.functions.getUdiRecords(udi, offset, limit, newest_first).call()
+        records = [record_to_dict(contract, record_id, record) for record_id, record in zip(record_ids, page)]
+    return {'udi': int(udi), 'total': int(total), 'offset': offset, 'limit': limit,
+            'newest_first': bool(newest_first), 'records': records}
+
+
+def latest_record(contract, udi):
+    """The machine's most recently logged record as a dict, or None if it has none."""
+    if not contract.functions.getUdiRecordCount(udi).call():
+        return None
+    record_id, record = contract.functions.getLatestRecordForUdi(udi).call()
+    return record_to_dict(contract, record_id, record)
@@ -0,0 +1,280 @@
+# merkle_store.py
+"""
+Merkle-batched logging: verified predictions are collected per time window, and only each window's
+Merkle root goes on chain (PredictionLogger.logMerkleRoot), so chain cost per window is flat however
+many predictions it holds. The full records and the trees stay in a local SQLite store, from which any
+record's inclusion proof can be produced and checked against the on-chain root.
+
+Leaf:  keccak256(0x00 ++ abi.encode(uint256 udi, uint256 predictedClass, uint256 inputCommitment, bytes32 proofHash))
+Node:  keccak256(0x01 ++ min(a, b) ++ max(a, b))  (sorted pairs, as in OpenZeppelin's MerkleProof, so proofs
+       need no left/right flags; an odd node at the end of a level is carried up unchanged)
+The one-byte prefixes separate leaves from internal nodes, so a node cannot be proven as a leaf.
+inputCommitment is the Poseidon commitment to the circuit features (the published one in commitment
+mode) and proofHash is the keccak256 of the proof JSON with sorted keys and no whitespace.
+
+A window is open while records arrive, sealed once its time range has passed (its tree is then built
+and stored, level by level), and published when its root is logged on chain.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from eth_utils import keccak
+
+HASH_SIZE = 32
+LEAF_PREFIX = b'\x00'
+NODE_PREFIX = b'\x01'
+WINDOW_STATUSES = ('open', 'sealed', 'submitted', 'published')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS windows (
+    window_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    window_start INTEGER NOT NULL,
+    window_end INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'open',
+    leaf_count INTEGER NOT NULL DEFAULT 0,
+    root TEXT,
+    tree BLOB,
+    tx_hash TEXT,
+    chain_window_id INTEGER,
+    sealed_at REAL,
+    published_at REAL
+);
+CREATE INDEX IF NOT EXISTS windows_status ON windows (status, window_start);
+CREATE TABLE IF NOT EXISTS records (
+    window_id INTEGER NOT NULL,
+    leaf_index INTEGER NOT NULL,
+    udi INTEGER NOT NULL,
+    predicted_class INTEGER NOT NULL,
+    input_commitment TEXT NOT NULL,
+    proof_hash TEXT NOT NULL,
+    leaf TEXT NOT NULL,
+    record TEXT,
+    added_at REAL NOT NULL,
+    PRIMARY KEY (window_id, leaf_index)
+);
+CREATE INDEX IF NOT EXISTS records_udi ON records (udi);
+CREATE INDEX IF NOT EXISTS records_leaf ON records (leaf);
+"""
+
+
+# --- Hashing ---
+def _word(value):
+    return int(value).to_bytes(HASH_SIZE, 'big')
+
+
+def _bytes32(value):
+    """bytes from a 32-byte value given as bytes or a (0x-prefixed or bare) hex string."""
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value)
+    return bytes.fromhex(value[2:] if value.startswith('0x') else value)
+
+
+def to_hex(value):
+    return '0x' + bytes(value).hex()
+
+
+def proof_hash(proof):
+    """keccak256 of a proof (dict or proof.json text) serialised with sorted keys and no whitespace."""
+    if isinstance(proof, str):
+        proof = json.loads(proof)
+    return keccak(text=json.dumps(proof, sort_keys=True, separators=(',', ':')))
+
+
+def leaf_hash(udi, predicted_class, input_commitment, proof_hash_value):
+    """The leaf of one record; equals keccak256(0x00 ++ abi.encode(udi, predictedClass, inputCommitment, proofHash))."""
+    return keccak(LEAF_PREFIX + _word(udi) + _word(predicted_class) + _word(input_commitment) + _bytes32(proof_hash_value))
+
+
+def hash_pair(a, b):
+    return keccak(NODE_PREFIX + (a + b if a <= b else b + a))
+
+
+def build_levels(leaves):
+    """All tree levels, leaves first and the root level ([root]) last."""
+    if not leaves:
+        raise ValueError("A Merkle tree needs at least one leaf")
+    levels = [list(leaves)]
+    while len(levels[-1]) > 1:
+        level = levels[-1]
+        parents = [hash_pair(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            parents.append(level[-1])
+        levels.append(parents)
+    return levels
+
+
+def level_sizes(leaf_count):
+    sizes = [leaf_count]
+    while sizes[-1] > 1:
+        sizes.append((sizes[-1] + 1) // 2)
+    return sizes
+
+
+def inclusion_proof_from_tree(tree, leaf_count, leaf_index):
+    """Sibling hashes from leaf to root, read from a stored tree blob (levels concatenated)."""
+    proof = []
+    offset = 0
+    index = leaf_index
+    for size in level_sizes(leaf_count)[:-1]:
+        sibling = index ^ 1
+        if sibling < size: # The last node of an odd level has no sibling and is carried up
+            start = (offset + sibling) * HASH_SIZE
+            proof.append(bytes(tree[start:start + HASH_SIZE]))
+        offset += size
+        index //= 2
+    return proof
+
+
+def root_from_proof(leaf, proof):
+    node = _bytes32(leaf)
+    for sibling in proof:
+        node = hash_pair(node, _bytes32(sibling))
+    return node
+
+
+def verify_inclusion(leaf, proof, root):
+    """True if leaf with this inclusion proof hashes up to root (same check as PredictionLogger.verifyMerkleRecord)."""
+    return root_from_proof(leaf, proof) == _bytes32(root)
+
+
+# --- Store ---
+class MerkleStore:
+    """Windows, records and trees at path (SQLite, created on first use); thread-safe."""
+
+    def __init__(self, path, window_seconds=3600):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.window_seconds = int(window_seconds)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=60, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def _transaction(self, work):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = work(self._conn)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return result
+
+    def add_record(self, udi, predicted_class, input_commitment, proof_hash_value, record=None, timestamp=None):
+        """
+        Appends a verified prediction to the open window of its time range (opening one if needed;
+        a window sealed early for this range is followed by a new one). Returns (window_id, leaf_index).
+        A record whose leaf is already stored (the same proof added again after a crash) is not added
+        twice; its existing (window_id, leaf_index) is returned.
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        window_start = int(timestamp // self.window_seconds) * self.window_seconds
+        leaf = leaf_hash(udi, predicted_class, input_commitment, proof_hash_value)
+
+        def work(conn):
+            existing = conn.execute("SELECT window_id, leaf_index FROM records WHERE leaf = ? ORDER BY window_id LIMIT 1",
+                                    (to_hex(leaf),)).fetchone()
+            if existing is not None:
+                return existing['window_id'], existing['leaf_index']
+            row = conn.execute("SELECT window_id, leaf_count FROM windows WHERE status = 'open' AND window_start = ? "
+                               "ORDER BY window_id DESC LIMIT 1", (window_start,)).fetchone()
+            if row is None:
+                window_id = conn.execute("INSERT INTO windows (window_start, window_end) VALUES (?, ?)",
+                                         (window_start, window_start + self.window_seconds)).lastrowid
+                leaf_index = 0
+            else:
+                window_id, leaf_index = row['window_id'], row['leaf_count']
+            conn.execute("INSERT INTO records (window_id, leaf_index, udi, predicted_class, input_commitment, proof_hash, "
+                         "leaf, record, added_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                         (window_id, leaf_index, int(udi), int(predicted_class), str(int(input_commitment)),
+                          to_hex(_bytes32(proof_hash_value)), to_hex(leaf),
+                          json.dumps(record, default=str) if record is not None else None, time.time()))
+            conn.execute("UPDATE windows SET leaf_count = ? WHERE window_id = ?", (leaf_index + 1, window_id))
+            return window_id, leaf_index
+        return self._transaction(work)
+
+    def seal_windows(self, now=None, include_open=False):
+        """Builds and stores the tree of every open window whose time range has passed (or of all open
+        windows with include_open). Returns the sealed windows."""
+        now = time.time() if now is None else now
+        query = "SELECT window_id FROM windows WHERE status = 'open' AND leaf_count > 0"
+        params = []
+        if not include_open:
+            query += " AND window_end <= ?"
+            params.append(now)
+        with self._lock:
+            window_ids = [row['window_id'] for row in self._conn.execute(query, params).fetchall()]
+        sealed = []
+        for window_id in window_ids:
+            def work(conn):
+                rows = conn.execute("SELECT leaf FROM records WHERE window_id = ? ORDER BY leaf_index", (window_id,)).fetchall()
+                levels = build_levels([_bytes32(row['leaf']) for row in rows])
+                conn.execute("UPDATE windows SET status = 'sealed', leaf_count = ?, root = ?, tree = ?, sealed_at = ? "
+                             "WHERE window_id = ? AND status = 'open'",
+                             (len(rows), to_hex(levels[-1][0]), b''.join(node for level in levels for node in level),
+                              time.time(), window_id))
+            self._transaction(work)
+            sealed.append(self.window(window_id))
+        return sealed
+
+    def window(self, window_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM windows WHERE window_id = ?", (window_id,)).fetchone()
+        if row is None:
+            return None
+        window = dict(row)
+        window.pop('tree')
+        return window
+
+    def windows(self, statuses=WINDOW_STATUSES, limit=None, oldest_first=False):
+        """Windows in statuses (without their tree blobs), most recent first unless oldest_first."""
+        query = (f"SELECT window_id FROM windows WHERE status IN ({', '.join('?' * len(statuses))}) "
+                 f"ORDER BY window_id {'ASC' if oldest_first else 'DESC'} LIMIT ?")
+        with self._lock:
+            window_ids = [row['window_id'] for row in self._conn.execute(query, list(statuses) + [limit or -1])]
+        return [self.window(window_id) for window_id in window_ids]
+
+    def mark_submitted(self, window_id, tx_hash):
+        self._set_window(window_id, status='submitted', tx_hash=tx_hash)
+
+    def mark_published(self, window_id, chain_window_id, tx_hash=None):
+        fields = {'status': 'published', 'chain_window_id': int(chain_window_id), 'published_at': time.time()}
+        if tx_hash is not None:
+            fields['tx_hash'] = tx_hash
+        self._set_window(window_id, **fields)
+
+    def return_to_sealed(self, window_id):
+        """The root transaction reverted or was dropped: publish the window again."""
+        self._set_window(window_id, status='sealed', tx_hash=None)
+
+    def _set_window(self, window_id, **fields):
+        assignments = ', '.join(f"{name} = ?" for name in fields)
+        self._transaction(lambda conn: conn.execute(f"UPDATE windows SET {assignments} WHERE window_id = ?",
+                                                    list(fields.values()) + [window_id]))
+
+    def records_for_udi(self, udi):
+        """Every stored record of a UDI with its window, leaf and (once sealed) inclusion proof."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT r.*, w.status, w.root, w.tree, w.leaf_count, w.window_start, w.window_end, w.chain_window_id, "
+                "w.tx_hash FROM records r JOIN windows w ON w.window_id = r.window_id WHERE r.udi = ? "
+                "ORDER BY r.window_id, r.leaf_index", (int(udi),)).fetchall()
+        results = []
+        for row in rows:
+            result = dict(row)
+            tree = result.pop('tree')
+            result['record'] = json.loads(result['record']) if result['record'] else None
+            result['proof'] = ([to_hex(node) for node in inclusion_proof_from_tree(tree, row['leaf_count'], row['leaf_index'])]
+                               if tree is not None else None)
+            results.append(result)
+        return results
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,112 @@
+# metrics.py
+"""
+Runtime metrics in Prometheus text format, on prometheus_client, for the dashboard's /metrics route
+and the pipeline's exporter (start_http_server).
+
+counter()/gauge()/histogram() return the metric already registered under a name, since numbered
+scripts are loaded more than once through importlib and prometheus_client rejects a second
+registration. Gauges can take a callback that is evaluated only when the metrics are scraped; a
+callback that returns None or raises reports NaN instead of failing the whole scrape.
+"""
+import math
+import os
+import threading
+import time
+
+import prometheus_client
+from prometheus_client import CONTENT_TYPE_LATEST as CONTENT_TYPE
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+REGISTRY = prometheus_client.REGISTRY
+
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+
+class Gauge(prometheus_client.Gauge):
+    """prometheus_client Gauge whose set_function tolerates callbacks that return None or raise."""
+
+    def set_function(self, function):
+        def value():
+            try:
+                result = function()
+            except Exception:
+                return math.nan
+            return math.nan if result is None else float(result)
+        super().set_function(value)
+
+
+def _register(metric_class, name, documentation, labelnames, **kwargs):
+    with _metrics_lock:
+        metric = _metrics.get(name)
+        if metric is None:
+            metric = _metrics[name] = metric_class(name, documentation, labelnames, **kwargs)
+        elif type(metric) is not metric_class or tuple(metric._labelnames) != tuple(labelnames):
+            raise ValueError(f"Metric {name} is already registered with a different type or labels")
+        return metric
+
+
+def counter(name, documentation, labelnames=()):
+    """Monotonic count; exposed as <name>_total."""
+    return _register(prometheus_client.Counter, name, documentation, labelnames)
+
+
+def gauge(name, documentation, labelnames=()):
+    return _register(Gauge, name, documentation, labelnames)
+
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return _register(prometheus_client.Histogram, name, documentation, labelnames, buckets=buckets)
+
+
+def render():
+    """All metrics in Prometheus text format."""
+    return prometheus_client.generate_latest(REGISTRY).decode("utf-8")
+
+
+# --- Metrics shared by the pipeline, the dashboard and the helper modules ---
+RPC_REQUEST_SECONDS = histogram("web3_rpc_request_seconds", "Latency of JSON-RPC requests by method.", ["method"])
+RPC_ERRORS = counter("web3_rpc_errors", "JSON-RPC requests that raised or returned an error, by method.", ["method"])
+CACHE_REQUESTS = counter("cache_requests", "Cache lookups by cache and result (hit or miss).", ["cache", "result"])
+SUBPROCESS_SPAWNS = counter("subprocess_spawns", "External processes started, by executable.", ["command"])
+
+
+def record_cache(cache_name, hit):
+    CACHE_REQUESTS.labels(cache_name, "hit" if hit else "miss").inc()
+
+
+def record_spawn(command_parts):
+    """Counts one subprocess start, labelled by the executable's base name (e.g. node, snarkjs)."""
+    executable = os.path.basename(str(command_parts[0])) if command_parts else "unknown"
+    SUBPROCESS_SPAWNS.labels(os.path.splitext(executable)[0] or "unknown").inc()
+
+
+def instrument_web3(w3):
+    """Times every JSON-RPC request of w3's provider by method (wraps provider.make_request in place)."""
+    provider = w3.provider
+    if getattr(provider, "_metrics_instrumented", False):
+        return w3
+    make_request = provider.make_request
+
+    def timed_make_request(method, params):
+        start_time = time.perf_counter()
+        try:
+            response = make_request(method, params)
+        except Exception:
+            RPC_ERRORS.labels(method).inc()
+            raise
+        finally:
+            RPC_REQUEST_SECONDS.labels(method).observe(time.perf_counter() - start_time)
+        if isinstance(response, dict) and response.get("error"):
+            RPC_ERRORS.labels(method).inc()
+        return response
+
+    provider.make_request = timed_make_request
+    provider._metrics_instrumented = True
+    return w3
+
+
+def start_http_server(port, address="0.0.0.0"):
+    """Serves /metrics on a daemon thread; returns the server (call .shutdown() to stop it)."""
+    server, _ = prometheus_client.start_http_server(port, address)
+    return server
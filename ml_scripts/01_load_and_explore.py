@@ -1,14 +1,20 @@
 import pandas as pd
 import os
+import sys
+
+# Add project root to sys.path to allow importing the shared dataset loader
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+import dataset_cache
 
 # --- Configuration ---
-BASE_DIR = os.path.abspath(os.path.dirname(__file__))
-DATASET_PATH = os.path.join(BASE_DIR, 'data', 'manufacturing_6G_dataset.csv') # Make sure this path is correct
+BASE_DIR = PROJECT_ROOT
+DATASET_PATH = os.path.join(BASE_DIR, 'data', 'ai4i2020.csv') # Make sure this path is correct
 
 def load_data(path):
     """Loads the dataset from a CSV file."""
     try:
-        df = pd.read_csv(path)
+        df = dataset_cache.load_dataset(path) # Columnar cache, rebuilt only when the CSV changes
         print("Dataset loaded successfully!")
         return df
     except FileNotFoundError:
@@ -1,3 +1,5 @@
+import argparse
+import numpy as np
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
@@ -9,6 +11,7 @@ import sys
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(PROJECT_ROOT)
 import config_loader as cfg # Import your configuration
+import dataset_cache
 
 # --- Configuration ---
 DATASET_PATH = cfg.DATASET_PATH # Make sure this path is correct
@@ -18,16 +21,21 @@ TARGET_COLUMN = 'Machine failure'
 # Columns to drop as they are identifiers or too specific for general failure prediction initially
 # We will also drop the specific failure types for now, focusing on the main 'Machine failure' target
 COLUMNS_TO_DROP = ['UDI', 'Product ID', 'TWF', 'HDF', 'PWF', 'OSF', 'RNF']
+# Metadata columns dropped when present (arrival times of synthetic workloads)
+OPTIONAL_COLUMNS_TO_DROP = ['Arrival time [s]']
 # Features to scale
 NUMERICAL_FEATURES = ['Air temperature [K]', 'Process temperature [K]', 'Rotational speed [rpm]', 'Torque [Nm]', 'Tool wear [min]']
 
 TEST_SIZE = 0.2 # 20% of data for testing
 RANDOM_STATE = 42 # For reproducibility
+CHUNK_ROWS = 200_000 # Rows per chunk in --chunked mode; bounds peak memory independently of the dataset size
+SPLIT_KEY_COLUMN = 'UDI' # Hashed to assign rows to train/test in --chunked mode
+SPLIT_HISTOGRAM_BITS = 16 # Hash-histogram bins per label (2^16) when locating each label's test cutoff
 
 def load_data(path):
     """Loads the dataset from a CSV file."""
     try:
-        df = pd.read_csv(path)
+        df = dataset_cache.load_dataset(path, mmap=False) # Preprocessing modifies the frame
         print("Dataset loaded successfully for preprocessing.")
         return df
     except FileNotFoundError:
@@ -43,7 +51,7 @@ def preprocess_data(df):
         return None, None, None, None
 
     # Drop unnecessary columns
-    df_processed = df.drop(columns=COLUMNS_TO_DROP)
+    df_processed = df.drop(columns=COLUMNS_TO_DROP + [name for name in OPTIONAL_COLUMNS_TO_DROP if name in df.columns])
     print(f"Dropped columns: {', '.join(COLUMNS_TO_DROP)}")
 
     # One-hot encode the 'Type' column
@@ -90,18 +98,161 @@ def preprocess_data(df):
 
     return X_train, X_test, y_train, y_test, X.columns.tolist() # also return feature names
 
+def split_hash(keys, seed=RANDOM_STATE):
+    """Each key mixed (splitmix64) into a deterministic pseudo-random integer in [0, 2^53)."""
+    x = np.asarray(keys).astype(np.uint64) + np.uint64((seed * 0x9E3779B97F4A7C15) % (1 << 64))
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    x = x ^ (x >> np.uint64(31))
+    return x >> np.uint64(11)
+
+def stratified_test_cutoffs(columns, chunk_rows, test_size=TEST_SIZE):
+    """
+    {label: cutoff}: within each label, the round(test_size * count) rows with the smallest split hashes
+    go to the test set, so every class is split in the test_size proportion exactly, as with
+    train_test_split(stratify=y). Reads only the key and label columns: one pass builds a hash histogram
+    per label, a second collects the hashes in each label's boundary bin, so memory stays bounded.
+    """
+    shift = np.uint64(53 - SPLIT_HISTOGRAM_BITS)
+    split_columns = {name: columns[name] for name in (SPLIT_KEY_COLUMN, TARGET_COLUMN)}
+    histograms = {}
+    for chunk in iter_chunks(split_columns, chunk_rows):
+        bins = (split_hash(chunk[SPLIT_KEY_COLUMN].to_numpy()) >> shift).astype(np.int64)
+        labels = chunk[TARGET_COLUMN].to_numpy()
+        for label in np.unique(labels).tolist():
+            histogram = histograms.setdefault(label, np.zeros(1 << SPLIT_HISTOGRAM_BITS, dtype=np.int64))
+            histogram += np.bincount(bins[labels == label], minlength=1 << SPLIT_HISTOGRAM_BITS)
+
+    boundaries = {} # label -> (boundary bin, test rows still needed from it)
+    for label, histogram in histograms.items():
+        target = int(round(test_size * histogram.sum()))
+        cumulative = np.cumsum(histogram)
+        boundary = int(np.searchsorted(cumulative, target))
+        boundaries[label] = (boundary, target - (int(cumulative[boundary - 1]) if boundary else 0))
+
+    boundary_hashes = {label: [] for label in boundaries}
+    for chunk in iter_chunks(split_columns, chunk_rows):
+        hashes = split_hash(chunk[SPLIT_KEY_COLUMN].to_numpy())
+        labels = chunk[TARGET_COLUMN].to_numpy()
+        for label, (boundary, _) in boundaries.items():
+            boundary_hashes[label].append(hashes[(labels == label) & ((hashes >> shift) == np.uint64(boundary))])
+    cutoffs = {}
+    for label, (boundary, needed) in boundaries.items():
+        if needed == 0:
+            cutoffs[label] = np.uint64(boundary) << shift
+        else:
+            cutoffs[label] = np.sort(np.concatenate(boundary_hashes[label]))[needed - 1] + np.uint64(1)
+    return cutoffs
+
+def hash_test_mask(keys, labels, cutoffs):
+    """True for rows assigned to the test set: split hash below the cutoff of the row's label."""
+    hashes = split_hash(keys)
+    labels = np.asarray(labels)
+    is_test = np.zeros(len(hashes), dtype=bool)
+    for label, cutoff in cutoffs.items():
+        in_label = labels == label
+        is_test[in_label] = hashes[in_label] < cutoff
+    return is_test
+
+def iter_chunks(columns, chunk_rows):
+    """Yields DataFrames of chunk_rows rows sliced from the memory-mapped dataset columns."""
+    n_rows = len(next(iter(columns.values())))
+    for start in range(0, n_rows, chunk_rows):
+        yield pd.DataFrame({name: np.asarray(values[start:start + chunk_rows]) for name, values in columns.items()})
+
+def preprocess_data_chunked(path, chunk_rows=CHUNK_ROWS):
+    """
+    Out-of-core variant of preprocess_data: streams the dataset in chunks, splits each label by UDI hash
+    (stratified_test_cutoffs), fits the scaler with partial_fit on the training rows (pass 1) and appends the scaled splits to disk chunk by chunk (pass 2). Peak memory is
+    a few chunks, whatever the dataset size. Returns (split sizes, feature names).
+    """
+    columns = dataset_cache.load_columns(path) # Memory-mapped; the CSV is converted in streaming chunks
+    for name in COLUMNS_TO_DROP + OPTIONAL_COLUMNS_TO_DROP:
+        if name != SPLIT_KEY_COLUMN:
+            columns.pop(name, None)
+    print(f"Dropped columns: {', '.join(COLUMNS_TO_DROP)}")
+
+    # Pass 0: each label's hash cutoff, from the key and label columns only
+    cutoffs = stratified_test_cutoffs(columns, chunk_rows)
+
+    # Pass 1: Type categories, class counts and scaler statistics of the training rows
+    scaler = StandardScaler()
+    type_values = set()
+    class_counts = {"train": {}, "test": {}}
+    for chunk in iter_chunks(columns, chunk_rows):
+        is_test = hash_test_mask(chunk[SPLIT_KEY_COLUMN].to_numpy(), chunk[TARGET_COLUMN].to_numpy(), cutoffs)
+        type_values.update(np.unique(chunk['Type'].to_numpy()).tolist())
+        scaler.partial_fit(chunk.loc[~is_test, NUMERICAL_FEATURES])
+        for split, mask in (("train", ~is_test), ("test", is_test)):
+            for label, count in chunk.loc[mask, TARGET_COLUMN].value_counts().items():
+                class_counts[split][label] = class_counts[split].get(label, 0) + int(count)
+    type_columns = [f"{TYPE_COLUMN_PREFIX}_{value}" for value in sorted(type_values)] # get_dummies order
+    feature_names = [name for name in columns if name not in (SPLIT_KEY_COLUMN, 'Type', TARGET_COLUMN)] + type_columns
+    print(f"Target variable: {TARGET_COLUMN}")
+    print(f"Features: {feature_names}")
+    for split, counts in class_counts.items():
+        total = sum(counts.values())
+        print(f"{split.capitalize()} target distribution: " +
+              ", ".join(f"{label}: {count / total:.4f}" for label, count in sorted(counts.items())))
+    print(f"Saving standard scaler to: {cfg.SCALER_PATH}")
+    joblib.dump(scaler, cfg.SCALER_PATH)
+
+    # Pass 2: encode, scale and append each chunk to its split
+    os.makedirs(cfg.DATA_SPLITS_DIR, exist_ok=True)
+    csv_paths = {"X_train": cfg.X_TRAIN_CSV_PATH, "X_test": cfg.X_TEST_CSV_PATH,
+                 "y_train": cfg.Y_TRAIN_CSV_PATH, "y_test": cfg.Y_TEST_CSV_PATH}
+    writers = {name: dataset_cache.SplitWriter(cfg.DATA_SPLITS_DIR, name) for name in csv_paths}
+    for chunk in iter_chunks(columns, chunk_rows):
+        is_test = hash_test_mask(chunk[SPLIT_KEY_COLUMN].to_numpy(), chunk[TARGET_COLUMN].to_numpy(), cutoffs)
+        X = chunk[[name for name in feature_names if name not in type_columns]].copy()
+        X[NUMERICAL_FEATURES] = scaler.transform(chunk[NUMERICAL_FEATURES])
+        for column in type_columns:
+            X[column] = (chunk['Type'].to_numpy() == column[len(TYPE_COLUMN_PREFIX) + 1:]).astype(int)
+        y = chunk[TARGET_COLUMN]
+        for name, part in (("X_train", X[~is_test]), ("X_test", X[is_test]),
+                           ("y_train", y[~is_test]), ("y_test", y[is_test])):
+            writers[name].append(part)
+            if cfg.EXPORT_SPLIT_CSVS:
+                part.to_csv(csv_paths[name], index=False, mode='w' if writers[name].n_rows == len(part) else 'a',
+                            header=writers[name].n_rows == len(part))
+    for writer in writers.values():
+        writer.close()
+    return {name: writer.n_rows for name, writer in writers.items()}, feature_names
+
 # --- Main execution ---
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Preprocess the dataset into scaled train/test splits.")
+    parser.add_argument("--chunked", action="store_true",
+                        help="Stream the dataset in chunks (bounded memory, hash-based split) instead of loading it whole.")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+
+    if args.chunked:
+        split_sizes, feature_names = preprocess_data_chunked(DATASET_PATH, args.chunk_rows)
+        print("\nPreprocessing complete.")
+        print(f"Saving feature names to: {cfg.FEATURE_NAMES_PATH}")
+        joblib.dump(feature_names, cfg.FEATURE_NAMES_PATH)
+        print(f"Split sizes: {split_sizes}")
+        print(f"Feature names: {feature_names}")
+        print("Processed data (X_train, X_test, y_train, y_test) and feature_names saved to files.")
+        sys.exit(0)
+
     dataset = load_data(DATASET_PATH)
     if dataset is not None:
         X_train, X_test, y_train, y_test, feature_names = preprocess_data(dataset)
         if X_train is not None:
             print("\nPreprocessing complete.")
            # --- Save the processed data and feature names ---
-            X_train.to_csv(cfg.X_TRAIN_CSV_PATH, index=False)
-            X_test.to_csv(cfg.X_TEST_CSV_PATH, index=False)
-            y_train.to_csv(cfg.Y_TRAIN_CSV_PATH, index=False, header=['Machine failure']) # Save with header
-            y_test.to_csv(cfg.Y_TEST_CSV_PATH, index=False, header=['Machine failure'])   # Save with header
+            os.makedirs(cfg.DATA_SPLITS_DIR, exist_ok=True)
+            dataset_cache.save_split(cfg.DATA_SPLITS_DIR, "X_train", X_train)
+            dataset_cache.save_split(cfg.DATA_SPLITS_DIR, "X_test", X_test)
+            dataset_cache.save_split(cfg.DATA_SPLITS_DIR, "y_train", y_train.rename('Machine failure'))
+            dataset_cache.save_split(cfg.DATA_SPLITS_DIR, "y_test", y_test.rename('Machine failure'))
+            if cfg.EXPORT_SPLIT_CSVS: # Human-readable copies; 03 reads the columnar splits
+                X_train.to_csv(cfg.X_TRAIN_CSV_PATH, index=False)
+                X_test.to_csv(cfg.X_TEST_CSV_PATH, index=False)
+                y_train.to_csv(cfg.Y_TRAIN_CSV_PATH, index=False, header=['Machine failure']) # Save with header
+                y_test.to_csv(cfg.Y_TEST_CSV_PATH, index=False, header=['Machine failure'])   # Save with header
             print(f"Saving feature names to: {cfg.FEATURE_NAMES_PATH}")
             joblib.dump(feature_names, cfg.FEATURE_NAMES_PATH)
 
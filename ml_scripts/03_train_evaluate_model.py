@@ -5,6 +5,19 @@ import joblib # For loading feature names and later the model
 import matplotlib.pyplot as plt # For plotting tree (optional, needs graphviz for visualization)
 from sklearn.tree import plot_tree # For plotting tree
 import os
+import sys
+import argparse
+import itertools
+from joblib import Parallel, delayed
+from sklearn.model_selection import train_test_split
+
+# Add project root to sys.path to allow importing config_loader
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+import config_loader as cfg # Import your configuration
+import script_loader
+import tree_scorer
+import dataset_cache
 
 # --- Configuration ---
 current_script_dir = os.path.dirname(__file__) # 1. Determine the path to the directory containing *this* script 
@@ -24,13 +37,30 @@ DT_MAX_DEPTH = 5 # Limiting depth to prevent overfitting and for easier visualiz
 DT_MIN_SAMPLES_LEAF = 10
 DT_RANDOM_STATE = 42
 
+# Hyperparameter search (--search): grid, validation split and recall target for the failure class
+SEARCH_GRID = {
+    "max_depth": [3, 4, 5, 6, 7, 8],
+    "min_samples_leaf": [1, 5, 10, 20, 50],
+    "class_weight": [None, "balanced"],
+    "ccp_alpha": [0.0, 1e-4, 5e-4, 1e-3, 5e-3],
+}
+SEARCH_VALIDATION_SIZE = 0.25 # Held out from the training split; the test split stays untouched
+SEARCH_RECALL_TARGET = 0.85
+SEARCH_RESULTS_PATH = os.path.join(BASE_DIR, "artifacts", "model", "hyperparameter_search.csv")
+
 def load_processed_data():
     """Loads the preprocessed training and testing data."""
     try:
-        X_train = pd.read_csv(X_TRAIN_PATH)
-        y_train = pd.read_csv(Y_TRAIN_PATH).squeeze() # .squeeze() to convert single column DataFrame to Series
-        X_test = pd.read_csv(X_TEST_PATH)
-        y_test = pd.read_csv(Y_TEST_PATH).squeeze()
+        if dataset_cache.has_split(DATA_SPLITS_DIR, "X_train"): # Columnar splits written by 02
+            X_train = dataset_cache.load_split(DATA_SPLITS_DIR, "X_train")
+            y_train = dataset_cache.load_split(DATA_SPLITS_DIR, "y_train").squeeze(axis=1)
+            X_test = dataset_cache.load_split(DATA_SPLITS_DIR, "X_test")
+            y_test = dataset_cache.load_split(DATA_SPLITS_DIR, "y_test").squeeze(axis=1)
+        else: # CSV splits from older runs
+            X_train = pd.read_csv(X_TRAIN_PATH)
+            y_train = pd.read_csv(Y_TRAIN_PATH).squeeze() # .squeeze() to convert single column DataFrame to Series
+            X_test = pd.read_csv(X_TEST_PATH)
+            y_test = pd.read_csv(Y_TEST_PATH).squeeze()
         feature_names = joblib.load(FEATURE_NAMES_PATH)
         print("Processed data loaded successfully.")
         return X_train, y_train, X_test, y_test, feature_names
@@ -101,12 +131,94 @@ def evaluate_model(model, X_test, y_test, feature_names):
         print("Ensure graphviz is installed and in PATH if you want to visualize the tree image.")
         print("You can also export tree rules to text if visualization fails.")
 
+def fit_and_score(params, X_fit, y_fit, X_val, y_val):
+    """Fits one configuration and returns (params, model, validation metrics for the failure class)."""
+    model = DecisionTreeClassifier(random_state=DT_RANDOM_STATE, **params)
+    model.fit(X_fit, y_fit)
+    y_pred = model.predict(X_val)
+    metrics = {
+        "recall": recall_score(y_val, y_pred, pos_label=1, zero_division=0),
+        "precision": precision_score(y_val, y_pred, pos_label=1, zero_division=0),
+        "f1": f1_score(y_val, y_pred, pos_label=1, zero_division=0),
+    }
+    return params, model, metrics
+
+def pareto_front_mask(results):
+    """True for configurations no other one beats on constraints, recall and F1 at once."""
+    costs = results["estimated_constraints"].to_numpy()
+    recalls = results["recall"].to_numpy()
+    f1s = results["f1"].to_numpy()
+    mask = []
+    for i in range(len(results)):
+        no_worse = (costs <= costs[i]) & (recalls >= recalls[i]) & (f1s >= f1s[i])
+        better = (costs < costs[i]) | (recalls > recalls[i]) | (f1s > f1s[i])
+        mask.append(not (no_worse & better).any())
+    return mask
+
+def search_hyperparameters(X_train, y_train, recall_target, n_jobs):
+    """
+    Fits every SEARCH_GRID configuration in parallel, scores it on a stratified validation split and on the
+    analytic circuit cost (05's estimate_circuit_constraints), and writes all results with the Pareto flag.
+    Returns the cheapest configuration that meets recall_target (best recall if none does).
+    """
+    generator = script_loader.load_generator()
+
+    X_fit, X_val, y_fit, y_val = train_test_split(X_train, y_train, test_size=SEARCH_VALIDATION_SIZE,
+                                                  random_state=DT_RANDOM_STATE, stratify=y_train)
+    grid = [dict(zip(SEARCH_GRID, values)) for values in itertools.product(*SEARCH_GRID.values())]
+    print(f"\nSearching {len(grid)} configurations (n_jobs={n_jobs}, recall target {recall_target})...")
+    fitted = Parallel(n_jobs=n_jobs)(delayed(fit_and_score)(params, X_fit, y_fit, X_val, y_val) for params in grid)
+
+    raw_units = generator.load_raw_units() # Costs the raw-unit circuit when CIRCUIT_INPUT_UNITS=raw
+    rows = []
+    for params, model, metrics in fitted:
+        # Cheap and analytic, so done here, not in workers
+        cost = generator.estimate_circuit_constraints(model, raw_units=raw_units, feature_names=list(X_train.columns))
+        rows.append({**params, "class_weight": params["class_weight"] or "none", **metrics, **cost})
+    results = pd.DataFrame(rows)
+    results["pareto"] = pareto_front_mask(results)
+    results = results.sort_values(["estimated_constraints", "recall"], ascending=[True, False])
+    results.to_csv(SEARCH_RESULTS_PATH, index=False)
+
+    front = results[results["pareto"]]
+    print(f"\n--- Pareto front ({len(front)} of {len(results)} configurations) ---")
+    print(front[list(SEARCH_GRID) + ["recall", "f1", "n_leaves", "estimated_constraints"]].to_string(index=False))
+    print(f"All results written to {SEARCH_RESULTS_PATH}")
+
+    meeting_target = results[results["recall"] >= recall_target]
+    if meeting_target.empty:
+        print(f"\nNo configuration reaches recall {recall_target}; picking the highest-recall one.")
+        best = results.sort_values(["recall", "estimated_constraints"], ascending=[False, True]).iloc[0]
+    else:
+        best = meeting_target.iloc[0] # Sorted by cost
+    best_params = {name: best[name] for name in SEARCH_GRID}
+    best_params["class_weight"] = None if best_params["class_weight"] == "none" else best_params["class_weight"]
+    best_params["max_depth"] = int(best_params["max_depth"])
+    best_params["min_samples_leaf"] = int(best_params["min_samples_leaf"])
+    best_params["ccp_alpha"] = float(best_params["ccp_alpha"])
+    print(f"\nSelected: {best_params} (validation recall {best['recall']:.3f}, F1 {best['f1']:.3f}, "
+          f"~{int(best['estimated_constraints'])} constraints)")
+    return best_params
+
 # --- Main execution ---
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train and evaluate the decision tree.")
+    parser.add_argument("--search", action="store_true",
+                        help="Search SEARCH_GRID in parallel and train the cheapest model meeting the recall target.")
+    parser.add_argument("--recall-target", type=float, default=SEARCH_RECALL_TARGET)
+    parser.add_argument("--n-jobs", type=int, default=-1, help="Parallel workers for --search (-1 = all cores).")
+    args = parser.parse_args()
+
     X_train, y_train, X_test, y_test, feature_names = load_processed_data()
 
     if X_train is not None:
-        model = train_decision_tree(X_train, y_train)
+        if args.search:
+            best_params = search_hyperparameters(X_train, y_train, args.recall_target, args.n_jobs)
+            DT_MAX_DEPTH = best_params["max_depth"]
+            print(f"\nRetraining the selected configuration on the full training split...")
+            model = DecisionTreeClassifier(random_state=DT_RANDOM_STATE, **best_params).fit(X_train, y_train)
+        else:
+            model = train_decision_tree(X_train, y_train)
 
         evaluate_model(model, X_test, y_test, feature_names)
 
@@ -114,4 +226,12 @@ if __name__ == "__main__":
         joblib.dump(model, MODEL_SAVE_PATH)
         print(f"\nTrained model saved to {MODEL_SAVE_PATH}")
 
+        # Export the flat-array scorer (scaler folded into the thresholds) for fast in-process triage
+        try:
+            scaler = joblib.load(cfg.SCALER_PATH)
+            tree_scorer.export_scorer(model, scaler, feature_names, cfg.TREE_SCORER_PATH, model_path=MODEL_SAVE_PATH)
+            print(f"Tree scorer exported to {cfg.TREE_SCORER_PATH}")
+        except FileNotFoundError as e:
+            print(f"Could not export the tree scorer (scaler missing?): {e}")
+
         print("\nScript finished.")
\ No newline at end of file
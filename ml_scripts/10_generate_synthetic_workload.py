@@ -0,0 +1,195 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr, ndtri
+
+# Add project root to sys.path to allow importing the shared dataset loader
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+import dataset_cache
+
+# --- Configuration ---
+BASE_DIR = PROJECT_ROOT
+DATASET_PATH = os.path.join(BASE_DIR, 'data', 'ai4i2020.csv') # Calibration source
+DEFAULT_OUTPUT_PATH = os.path.join(BASE_DIR, 'data', 'synthetic_ai4i.csv')
+NUMERICAL_FEATURES = ['Air temperature [K]', 'Process temperature [K]', 'Rotational speed [rpm]', 'Torque [Nm]', 'Tool wear [min]']
+FEATURE_DECIMALS = [1, 1, 0, 1, 0] # Precision of the source columns
+FAILURE_MODES = ['TWF', 'HDF', 'PWF', 'OSF', 'RNF']
+TARGET_COLUMN = 'Machine failure'
+ARRIVAL_COLUMN = 'Arrival time [s]' # Optional; 02 ignores it
+OUTPUT_COLUMNS = ['UDI', 'Product ID', 'Type'] + NUMERICAL_FEATURES + [TARGET_COLUMN] + FAILURE_MODES
+MIN_PROFILE_ROWS = 10 # Failure patterns rarer than this borrow the pooled failure profile
+BLOCK_ROWS = 65_536 # Generation unit; each block has its own RNG stream, so output does not depend on chunking
+
+
+class CopulaProfile:
+    """Gaussian copula over the numeric features: empirical marginals joined by the normal-score correlation."""
+
+    def __init__(self, frame):
+        values = frame[NUMERICAL_FEATURES].to_numpy(dtype=np.float64)
+        self.sorted_values = np.sort(values, axis=0)
+        n = len(values)
+        ranks = values.argsort(axis=0).argsort(axis=0)
+        scores = ndtri((ranks + 0.5) / n)
+        corr = np.corrcoef(scores, rowvar=False) if n > 1 else np.eye(len(NUMERICAL_FEATURES))
+        corr = np.nan_to_num(corr, nan=0.0) # Constant columns within a profile
+        np.fill_diagonal(corr, 1.0)
+        eigenvalues, eigenvectors = np.linalg.eigh(corr) # Clip to keep it positive semi-definite
+        self.cholesky_factor = eigenvectors * np.sqrt(np.clip(eigenvalues, 1e-9, None))
+        self.n_rows = n
+
+    def sample(self, rng, n):
+        u = ndtr(rng.standard_normal((n, len(NUMERICAL_FEATURES))) @ self.cholesky_factor.T)
+        positions = u * (self.n_rows - 1)
+        grid = np.arange(self.n_rows)
+        return np.column_stack([np.interp(positions[:, i], grid, self.sorted_values[:, i])
+                                for i in range(len(NUMERICAL_FEATURES))])
+
+
+def fit_workload_model(df):
+    """
+    Calibrates on the dataset: healthy rows get one copula per Type; failure rows get one copula per failure
+    pattern (TWF..RNF flags), pooled over Types, with the Type drawn from its empirical share for that pattern.
+    """
+    patterns = {}
+    for keys, group in df.groupby([TARGET_COLUMN] + FAILURE_MODES):
+        failed = bool(keys[0])
+        type_counts = group['Type'].value_counts()
+        patterns[tuple(int(k) for k in keys)] = {
+            "failed": failed,
+            "count": len(group),
+            "types": type_counts.index.tolist(),
+            "type_probs": (type_counts / type_counts.sum()).to_numpy(),
+        }
+    healthy_profiles = {machine_type: CopulaProfile(group)
+                        for machine_type, group in df[df[TARGET_COLUMN] == 0].groupby('Type')}
+    failures = df[df[TARGET_COLUMN] == 1]
+    pooled_failure_profile = CopulaProfile(failures)
+    failure_profiles = {}
+    for keys, group in failures.groupby([TARGET_COLUMN] + FAILURE_MODES):
+        key = tuple(int(k) for k in keys)
+        failure_profiles[key] = CopulaProfile(group) if len(group) >= MIN_PROFILE_ROWS else pooled_failure_profile
+    return {
+        "patterns": patterns,
+        "healthy_profiles": healthy_profiles,
+        "failure_profiles": failure_profiles,
+        "failure_rate": float(df[TARGET_COLUMN].mean()),
+    }
+
+
+def pattern_distribution(model, failure_rate, mode_weights):
+    """Pattern keys and probabilities: failure_rate split over failure patterns (reweighted per mode)."""
+    keys = list(model["patterns"])
+    weights = []
+    for key in keys:
+        info = model["patterns"][key]
+        weight = float(info["count"])
+        for mode, flag in zip(FAILURE_MODES, key[1:]):
+            if flag:
+                weight *= mode_weights.get(mode, 1.0)
+        weights.append(weight)
+    weights = np.array(weights)
+    failed = np.array([model["patterns"][key]["failed"] for key in keys])
+    probs = np.where(failed, weights / weights[failed].sum() * failure_rate,
+                     weights / weights[~failed].sum() * (1.0 - failure_rate))
+    return keys, probs
+
+
+def generate_block(model, keys, probs, block_index, n_rows, seed, udi_start, arrival_rate):
+    """Generates rows block_index * BLOCK_ROWS .. + n_rows from an RNG stream derived from (seed, block_index)."""
+    rng = np.random.default_rng([seed, block_index])
+    first_row = block_index * BLOCK_ROWS
+    pattern_index = rng.choice(len(keys), size=n_rows, p=probs)
+    types = np.empty(n_rows, dtype='<U1')
+    features = np.empty((n_rows, len(NUMERICAL_FEATURES)))
+    flags = np.zeros((n_rows, 1 + len(FAILURE_MODES)), dtype=np.int8)
+    for index in np.unique(pattern_index):
+        rows = np.flatnonzero(pattern_index == index)
+        key = keys[index]
+        info = model["patterns"][key]
+        flags[rows] = key
+        types[rows] = rng.choice(info["types"], size=len(rows), p=info["type_probs"])
+        if info["failed"]:
+            features[rows] = model["failure_profiles"][key].sample(rng, len(rows))
+        else:
+            for machine_type in np.unique(types[rows]):
+                typed_rows = rows[types[rows] == machine_type]
+                features[typed_rows] = model["healthy_profiles"][machine_type].sample(rng, len(typed_rows))
+
+    udis = np.arange(udi_start + first_row, udi_start + first_row + n_rows, dtype=np.int64)
+    block = pd.DataFrame({
+        'UDI': udis,
+        'Product ID': np.char.add(types, (10000 + udis % 90000).astype(str)),
+        'Type': types,
+    })
+    for i, (name, decimals) in enumerate(zip(NUMERICAL_FEATURES, FEATURE_DECIMALS)):
+        column = np.round(features[:, i], decimals)
+        block[name] = column.astype(np.int64) if decimals == 0 else column
+    for i, name in enumerate([TARGET_COLUMN] + FAILURE_MODES):
+        block[name] = flags[:, i]
+    if arrival_rate:
+        # Poisson arrivals; block offsets use the expected gap so blocks stay independent
+        gaps = rng.exponential(1.0 / arrival_rate, size=n_rows)
+        block[ARRIVAL_COLUMN] = np.round(first_row / arrival_rate + np.cumsum(gaps), 6)
+    return block
+
+
+def generate_workload(model, n_rows, seed, output_path, failure_rate=None, mode_weights=None,
+                      udi_start=1, arrival_rate=None):
+    """Streams n_rows synthetic rows to output_path (CSV, AI4I schema) block by block."""
+    keys, probs = pattern_distribution(model, model["failure_rate"] if failure_rate is None else failure_rate,
+                                       mode_weights or {})
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    n_blocks = (n_rows + BLOCK_ROWS - 1) // BLOCK_ROWS
+    n_failures = 0
+    with open(output_path, 'w', newline='') as f:
+        for block_index in range(n_blocks):
+            block_rows = min(BLOCK_ROWS, n_rows - block_index * BLOCK_ROWS)
+            block = generate_block(model, keys, probs, block_index, block_rows, seed, udi_start, arrival_rate)
+            block.to_csv(f, index=False, header=block_index == 0)
+            n_failures += int(block[TARGET_COLUMN].sum())
+            print(f"  {min((block_index + 1) * BLOCK_ROWS, n_rows)}/{n_rows} rows written", end='\r')
+    print()
+    return n_failures
+
+
+def parse_mode_weights(items):
+    weights = {}
+    for item in items or []:
+        mode, _, value = item.partition('=')
+        if mode not in FAILURE_MODES or not value:
+            raise ValueError(f"Expected MODE=WEIGHT with MODE in {FAILURE_MODES}, got '{item}'")
+        weights[mode] = float(value)
+    return weights
+
+
+# --- Main execution ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic sensor workload calibrated on ai4i2020.csv.")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=42, help="Same seed and options give byte-identical output.")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT_PATH)
+    parser.add_argument("--failure-rate", type=float, default=None,
+                        help="Share of rows with Machine failure = 1 (default: the dataset's rate).")
+    parser.add_argument("--mode-weight", action="append", metavar="MODE=WEIGHT",
+                        help="Relative weight of failures involving MODE (e.g. HDF=3); repeatable.")
+    parser.add_argument("--arrival-rate", type=float, default=None,
+                        help=f"Readings per second; adds a Poisson '{ARRIVAL_COLUMN}' column.")
+    parser.add_argument("--udi-start", type=int, default=1)
+    args = parser.parse_args()
+
+    source = dataset_cache.load_dataset(DATASET_PATH, columns=OUTPUT_COLUMNS[2:])
+    print(f"Calibrating on {len(source)} rows of {DATASET_PATH}...")
+    workload_model = fit_workload_model(source)
+    print(f"Fitted {len(workload_model['patterns'])} failure patterns; dataset failure rate {workload_model['failure_rate']:.4f}")
+
+    start_time = time.time()
+    n_failures = generate_workload(workload_model, args.rows, args.seed, args.output, args.failure_rate,
+                                   parse_mode_weights(args.mode_weight), args.udi_start, args.arrival_rate)
+    elapsed = time.time() - start_time
+    print(f"Wrote {args.rows} rows ({n_failures} failures, {n_failures / max(args.rows, 1):.4f}) to {args.output} "
+          f"in {elapsed:.1f}s ({args.rows / max(elapsed, 1e-9):,.0f} rows/s)")
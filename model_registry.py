@@ -0,0 +1,168 @@
+# model_registry.py
+"""
+Versioned, hot-swappable model state for long-running services (pipeline_scripts/17_prediction_service.py).
+
+A ModelBundle holds everything one prediction and its proof need: the model (or tree scorer), the
+scaler and the circuit artifact paths, plus a version id derived from their contents. The registry
+hands out the current bundle; a request keeps the bundle it started with until it finishes, so a
+reload never changes the model or keys under an in-flight proof. Reloading builds the new bundle
+completely before swapping a single reference, so requests see either the old or the new version.
+
+The registry watches the files behind the bundle (size and mtime) and reloads once they have changed
+and then stayed the same for one more poll, so a model whose files are still being written (e.g. by
+03_train_evaluate_model.py) is not picked up half-way.
+"""
+import hashlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import metrics
+
+VERSION_LENGTH = 12 # Hex characters of the bundle's content hash
+
+RELOADS = metrics.counter("model_registry_reloads", "Model bundle reloads, by outcome.", ["outcome"])
+IN_FLIGHT = metrics.gauge("model_registry_in_flight", "Requests holding a model bundle, by version.", ["version"])
+
+
+def file_signature(paths):
+    """(path, size, mtime) of each existing path; changes whenever one of the files is replaced or rewritten."""
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            signature.append((path, None, None))
+            continue
+        signature.append((path, stat.st_size, stat.st_mtime))
+    return tuple(signature)
+
+
+def content_version(digests):
+    """Short version id over the content digests of a bundle's files (model, scaler, proving key, ...)."""
+    return hashlib.sha256("|".join(digests).encode()).hexdigest()[:VERSION_LENGTH]
+
+
+class ModelBundle:
+    """One immutable version: model, scaler, artifact paths and whatever else the loader attaches."""
+
+    def __init__(self, version, model, scaler, paths, **extra):
+        self.version = version
+        self.model = model
+        self.scaler = scaler
+        self.paths = dict(paths)
+        self.extra = extra
+        self.loaded_at = time.time()
+
+    def describe(self):
+        return {"version": self.version, "loaded_at": self.loaded_at, "paths": self.paths,
+                **{key: value for key, value in self.extra.items() if isinstance(value, (str, int, float))}}
+
+
+class ModelRegistry:
+    """
+    Current ModelBundle, built by load_bundle(); watched_paths() lists the files whose change should
+    trigger a reload (it is re-evaluated on every poll, so it may follow a build manifest).
+    """
+
+    def __init__(self, load_bundle, watched_paths, poll_seconds=10.0, on_reload=None):
+        self._load_bundle = load_bundle
+        self._watched_paths = watched_paths
+        self._poll_seconds = poll_seconds
+        self._on_reload = on_reload
+        self._lock = threading.Lock()        # Guards the current bundle and the in-flight counts
+        self._reload_lock = threading.Lock() # One reload at a time
+        self._in_flight = {}
+        self._stopped = threading.Event()
+        self._thread = None
+        self._signature = file_signature(watched_paths())
+        self._bundle = load_bundle()
+        RELOADS.labels("loaded").inc()
+
+    def current(self):
+        with self._lock:
+            return self._bundle
+
+    def hold(self):
+        """The current bundle, counted as in flight until release(bundle); a reload does not affect it."""
+        with self._lock:
+            bundle = self._bundle
+            self._in_flight[bundle.version] = self._in_flight.get(bundle.version, 0) + 1
+        IN_FLIGHT.labels(bundle.version).inc()
+        return bundle
+
+    def release(self, bundle):
+        with self._lock:
+            self._in_flight[bundle.version] -= 1
+            if not self._in_flight[bundle.version]:
+                del self._in_flight[bundle.version]
+        IN_FLIGHT.labels(bundle.version).dec()
+
+    @contextmanager
+    def acquire(self):
+        """hold() for the duration of a with block."""
+        bundle = self.hold()
+        try:
+            yield bundle
+        finally:
+            self.release(bundle)
+
+    def in_flight(self):
+        """Requests still running per bundle version (old versions drain after a reload)."""
+        with self._lock:
+            return dict(self._in_flight)
+
+    def reload(self, force=False):
+        """
+        Loads a new bundle and swaps it in if its version differs (or force). Returns (bundle, swapped).
+        A failed load leaves the current bundle in place and re-raises.
+        """
+        with self._reload_lock:
+            signature = file_signature(self._watched_paths())
+            try:
+                bundle = self._load_bundle()
+            except Exception:
+                RELOADS.labels("failed").inc()
+                raise
+            with self._lock:
+                previous = self._bundle
+                swapped = force or bundle.version != previous.version
+                if swapped:
+                    self._bundle = bundle
+                self._signature = signature
+            RELOADS.labels("swapped" if swapped else "unchanged").inc()
+        if swapped and self._on_reload:
+            self._on_reload(previous, bundle)
+        return (bundle if swapped else previous), swapped
+
+    def _watch(self):
+        pending = None # Signature seen changed on the previous poll, reloaded once it is stable
+        while not self._stopped.wait(self._poll_seconds):
+            signature = file_signature(self._watched_paths())
+            with self._lock:
+                unchanged = signature == self._signature
+            if unchanged:
+                pending = None
+                continue
+            if signature != pending:
+                pending = signature
+                continue
+            try:
+                bundle, swapped = self.reload()
+                if swapped:
+                    print(f"Model registry: switched to version {bundle.version}.")
+            except Exception as e:
+                print(f"Model registry: reload failed, keeping version {self.current().version}: {e}")
+            pending = None
+
+    def start_watching(self):
+        """Polls the watched files on a daemon thread and reloads when they change."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._watch, name="model-registry-watch", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
@@ -1,7 +1,15 @@
 import joblib
+import numpy as np
 import os
+import sys
 from sklearn.tree import _tree # For accessing tree internals
 
+# Add project root to sys.path to allow importing config_loader
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+import config_loader as cfg # Import your configuration
+import tree_rules
+
 # --- Configuration ---
 current_script_dir = os.path.dirname(__file__) # 1. Determine the path to the directory containing *this* script 
 BASE_DIR = os.path.abspath(os.path.join(current_script_dir, '..')) # 2. Go up one level to reach the project root ('your_root_directory')
@@ -9,59 +17,34 @@ BASE_DIR = os.path.abspath(os.path.join(current_script_dir, '..')) # 2. Go up on
 MODEL_PATH = os.path.join(BASE_DIR, "artifacts", "model", "decision_tree_model.joblib" ) # From the run with class_weight='balanced'
 FEATURE_NAMES_PATH = os.path.join(BASE_DIR, "artifacts", "model", "feature_names.joblib" )
 
-def get_tree_rules(tree_model, feature_names, node_index=0, depth=0, current_rule=""):
-    """
-    Recursively extracts rules from a decision tree.
-    Returns a list of rules, where each rule is a string leading to a classification.
-    """
-    rules_list = []
-
-    # Check if the node is a leaf node
-    is_leaf = tree_model.tree_.children_left[node_index] == tree_model.tree_.children_right[node_index]
-
-    # Indentation for readability
-    indent = "  " * depth
-
-    if is_leaf:
-        # Get the class prediction for this leaf
-        # tree_.value[node_index] gives an array like [[num_samples_class_0, num_samples_class_1]]
-        class_counts = tree_model.tree_.value[node_index][0]
-        predicted_class = class_counts.argmax() # 0 for 'No Failure', 1 for 'Failure'
-        class_name = "Failure" if predicted_class == 1 else "No Failure"
-
-        # Purity of the leaf
-        purity = class_counts[predicted_class] / class_counts.sum()
-
-        rule_str = f"{current_rule} THEN Class: {class_name} (Samples: {class_counts.sum()}, Purity: {purity:.2f}, Values: {class_counts})"
-        rules_list.append(rule_str)
-        # For printing directly:
-        print(f"{indent}LEAF: Predict {class_name} (Samples: {int(class_counts.sum())}, Values: {class_counts.astype(int)})")
-
-    else:
-        # It's a split node
-        feature_index = tree_model.tree_.feature[node_index]
-        feature_name = feature_names[feature_index]
-        threshold = tree_model.tree_.threshold[node_index]
-
-        # For printing directly:
+def print_tree(tree_model, feature_names):
+    """Prints the tree as indented IF/ELSE blocks, walking the node arrays iteratively."""
+    tree_ = tree_model.tree_
+    stack = [(0, 0, None)] # (node, depth, pending else-line for the parent)
+    while stack:
+        node_index, depth, else_line = stack.pop()
+        if else_line is not None:
+            print(else_line)
+        indent = "  " * depth
+        if tree_.children_left[node_index] == tree_.children_right[node_index]:
+            class_counts = tree_.value[node_index][0]
+            class_name = tree_rules.CLASS_NAMES[int(class_counts.argmax())]
+            print(f"{indent}LEAF: Predict {class_name} (Samples: {int(tree_.n_node_samples[node_index])}, Values: {np.round(class_counts, 4)})")
+            continue
+        feature_name = feature_names[tree_.feature[node_index]]
+        threshold = tree_.threshold[node_index]
         print(f"{indent}NODE {node_index}: If {feature_name} <= {threshold:.4f}")
+        stack.append((tree_.children_right[node_index], depth + 1,
+                      f"{indent}NODE {node_index}: Else (If {feature_name} > {threshold:.4f})"))
+        stack.append((tree_.children_left[node_index], depth + 1, None))
 
-        # Recurse for the 'True' condition (left child)
-        left_child_index = tree_model.tree_.children_left[node_index]
-        rule_true_condition = f"{current_rule}IF ({feature_name} <= {threshold:.4f}) AND " if current_rule else f"IF ({feature_name} <= {threshold:.4f}) AND "
-        # For printing directly:
-        get_tree_rules(tree_model, feature_names, left_child_index, depth + 1, rule_true_condition)
-
-        # For printing directly:
-        print(f"{indent}NODE {node_index}: Else (If {feature_name} > {threshold:.4f})")
-
-        # Recurse for the 'False' condition (right child)
-        right_child_index = tree_model.tree_.children_right[node_index]
-        rule_false_condition = f"{current_rule}IF ({feature_name} > {threshold:.4f}) AND " if current_rule else f"IF ({feature_name} > {threshold:.4f}) AND "
-        # For printing directly:
-        get_tree_rules(tree_model, feature_names, right_child_index, depth + 1, rule_false_condition)
-
-    return rules_list # Though for this script, we are mostly using print statements
+def get_tree_rules(tree_model, feature_names, scaler=None):
+    """
+    Extracts one rule per leaf from a decision tree.
+    Returns (structured rules from tree_rules.export_leaf_rules, list of rule strings).
+    """
+    rules = tree_rules.export_leaf_rules(tree_model, feature_names, scaler)
+    return rules, [tree_rules.format_rule(rule) for rule in rules]
 
 # --- Main execution ---
 if __name__ == "__main__":
@@ -70,16 +53,21 @@ if __name__ == "__main__":
         feature_names = joblib.load(FEATURE_NAMES_PATH)
         print(f"Loaded model from {MODEL_PATH}")
         print(f"Loaded feature names: {feature_names}")
-        print("\n--- Decision Tree Rules ---")
-
-        # The get_tree_rules function as written above prints rules directly.
-        # If you wanted to collect them into a list:
-        # collected_rules = get_tree_rules(model, feature_names)
-        # for rule in collected_rules:
-        #    print(rule)
-        # For now, direct printing during recursion is fine for inspection.
-        get_tree_rules(model, feature_names)
-
+        print("\n--- Decision Tree ---")
+        print_tree(model, feature_names)
+
+        scaler = joblib.load(cfg.SCALER_PATH) if os.path.exists(cfg.SCALER_PATH) else None
+        rules, rule_strings = get_tree_rules(model, feature_names, scaler)
+        print("\n--- Decision Tree Rules (thresholds in raw units where scaled) ---")
+        for rule_string in rule_strings:
+            print(rule_string)
+
+        for output_path in cfg.TREE_RULES_EXPORT_PATHS:
+            try:
+                tree_rules.write_rules(rules, output_path)
+                print(f"Structured rules ({len(rules)} leaves) written to {output_path}")
+            except ImportError as e:
+                print(f"Skipping {output_path}: {e}")
         print("\nScript finished.")
 
     except FileNotFoundError as e:
@@ -2,8 +2,13 @@ import pandas as pd
 import numpy as np
 import json
 import os
+import sys
 import joblib # To load the scaler
 
+# Add project root to sys.path to allow importing the shared dataset loader
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import dataset_cache
+
 # --- Configuration ---
 current_script_dir = os.path.dirname(__file__) # 1. Determine the path to the directory containing *this* script 
 BASE_DIR = os.path.abspath(os.path.join(current_script_dir, '..')) # 2. Go up one level to reach the project root ('your_root_directory')
@@ -196,7 +201,7 @@ def prepare_input_for_circuit(original_df, sample_idx, scaler, feature_names_ord
 # --- Main execution ---
 if __name__ == "__main__":
     try:
-        df_original = pd.read_csv(DATASET_PATH)
+        df_original = dataset_cache.load_dataset(DATASET_PATH)
         scaler_loaded = joblib.load(SCALER_PATH)
 
         print(f"Preparing input for sample index: {SAMPLE_INDEX}")
@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
 import json
+import sys
 import joblib # To load the scaler and model
 import subprocess # To run external commands
 import os
@@ -10,6 +11,11 @@ from dotenv import load_dotenv
 load_dotenv() # Load variables from .env file
 
 
+# Add project root to sys.path to allow importing the shared dataset loader
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import dataset_cache
+import prover_backends
+
 # --- Configuration ---
 current_script_dir = os.path.dirname(__file__) # 1. Determine the path to the directory containing *this* script 
 BASE_DIR = os.path.abspath(os.path.join(current_script_dir, '..')) # 2. Go up one level to reach the project root ('your_root_directory')
@@ -47,6 +53,10 @@ else:
     SNARKJS_CMD_PATH = "snarkjs" # Fallback, assumes snarkjs is in system PATH
     print(f"SNARKJS_CMD_PATH not found in .env or default Windows path. Assuming 'snarkjs' is in system PATH.")
 
+# Prover backend: "snarkjs" or "native" (NATIVE_PROVER_PATH, rapidsnark command line)
+PROVER = prover_backends.get_prover(os.getenv("PROVER_BACKEND", "snarkjs"), SNARKJS_CMD_PATH,
+                                    os.getenv("NATIVE_PROVER_PATH", "prover"))
+
 
 
 # Feature and model parameters (should match previous scripts)
@@ -126,7 +136,7 @@ if __name__ == "__main__":
 
     # 1. Load data, scaler, and ML model
     try:
-        df_original = pd.read_csv(DATASET_PATH)
+        df_original = dataset_cache.load_dataset(DATASET_PATH)
         scaler = joblib.load(SCALER_PATH)
         ml_model = joblib.load(MODEL_PATH)
         print("Dataset, scaler, and ML model loaded successfully.")
@@ -184,27 +194,24 @@ if __name__ == "__main__":
 
     # 5. Generate Proof
     print("\n--- Generating Proof ---")
-    prove_command = [
-        #"snarkjs", "groth16", "prove",
-        SNARKJS_CMD_PATH, "groth16", "prove", # Changed "snarkjs" to SNARKJS_CMD_PATH
+    print(f"Prover backend: {PROVER.name}")
+    prove_command = PROVER.prove_command(
         PROVING_KEY_PATH,
         WITNESS_FILE_PATH, # Path from project root
         PROOF_JSON_PATH,
         PUBLIC_JSON_PATH
-    ]
+    )
     if not run_command(prove_command, working_dir=BASE_DIR): # Run snarkjs from project root
         print("Proof generation failed. Exiting.")
         exit()
 
     # 6. Verify Proof
     print("\n--- Verifying Proof ---")
-    verify_command = [
-        #"snarkjs", "groth16", "verify",
-        SNARKJS_CMD_PATH, "groth16", "verify", # Changed "snarkjs" to SNARKJS_CMD_PATH
+    verify_command = PROVER.verify_command(
         VERIFICATION_KEY_PATH,
         PUBLIC_JSON_PATH,
         PROOF_JSON_PATH
-    ]
+    )
     if not run_command(verify_command, working_dir=BASE_DIR): # Run snarkjs from project root
         print("Proof verification failed.")
     else:
@@ -0,0 +1,260 @@
+# pipeline_scripts/11_benchmark_pipeline.py
+"""
+Offline throughput/latency benchmark for the end-to-end pipeline.
+
+Starts an in-process EVM (eth-tester / py-evm) or attaches to a local dev node (--rpc-url, e.g. anvil or
+hardhat), deploys PredictionLogger, and drives 08's process_single_sample over N samples at the chosen
+concurrency. Reports samples/s, p50/p95/p99 latency per stage, gas per record and peak memory, and writes
+the numbers to runtime_outputs/benchmark/.
+
+Needs the circuit artifacts (zkp_scripts/09_build_zkp_artifacts.py) and the compiled contract: either a
+local solc for py-solc-x (installed once while online: python -m solcx.install v0.8.20) or a compiled
+artifact JSON with "abi" and "bytecode" (--contract-artifact; Hardhat/Foundry/Remix output works).
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import joblib
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+import config_loader as cfg
+import artifact_cache
+import dataset_cache
+import metrics
+import script_loader
+import tree_scorer
+from web3 import Web3, HTTPProvider
+
+try:
+    import resource # Unix only; peak memory is reported as unavailable elsewhere
+except ImportError:
+    resource = None
+
+# --- Configuration ---
+CONTRACT_SOURCE_PATH = os.path.join(PROJECT_ROOT, "contracts", "PredictionLogger.sol")
+CONTRACT_NAME = "PredictionLogger"
+# Compiled ABI + bytecode, reused while the .sol file is unchanged
+CONTRACT_ARTIFACT_PATH = os.path.join(PROJECT_ROOT, "artifacts", "contracts", "PredictionLogger.json")
+SOLC_VERSION = os.getenv("SOLC_VERSION", "0.8.20")
+BENCHMARK_OUTPUT_DIR = os.path.join(PROJECT_ROOT, "runtime_outputs", "benchmark")
+STAGES = ['prepare_input', 'ml_prediction', 'witness', 'prove', 'verify', 'submit']
+PERCENTILES = [50, 95, 99]
+ACCOUNT_FUNDING_ETH = 100
+
+
+def load_contract_artifact(artifact_path=None):
+    """
+    Returns (abi, bytecode) for PredictionLogger: from artifact_path if given, else from the cached
+    compilation when the source hash matches, else compiled with py-solc-x and cached.
+    """
+    if artifact_path:
+        with open(artifact_path, 'r') as f:
+            artifact = json.load(f)
+        bytecode = artifact.get("bytecode") or artifact.get("bin")
+        if isinstance(bytecode, dict): # Foundry: {"object": "0x..."}
+            bytecode = bytecode.get("object")
+        if not bytecode:
+            raise ValueError(f"{artifact_path} has no bytecode")
+        return artifact["abi"], bytecode
+
+    source_sha256 = artifact_cache.sha256_file(CONTRACT_SOURCE_PATH)
+    if os.path.exists(CONTRACT_ARTIFACT_PATH):
+        with open(CONTRACT_ARTIFACT_PATH, 'r') as f:
+            cached = json.load(f)
+        if cached.get("source_sha256") == source_sha256:
+            return cached["abi"], cached["bytecode"]
+
+    try:
+        import solcx
+    except ImportError:
+        raise RuntimeError("py-solc-x is not installed; pip install py-solc-x or pass --contract-artifact")
+    try:
+        compiled = solcx.compile_files([CONTRACT_SOURCE_PATH], output_values=["abi", "bin"], solc_version=SOLC_VERSION)
+    except solcx.exceptions.SolcNotInstalled:
+        raise RuntimeError(f"solc {SOLC_VERSION} is not installed; run `python -m solcx.install v{SOLC_VERSION}` "
+                           f"once while online, or pass --contract-artifact")
+    contract_output = next(value for key, value in compiled.items() if key.endswith(f":{CONTRACT_NAME}"))
+    os.makedirs(os.path.dirname(CONTRACT_ARTIFACT_PATH), exist_ok=True)
+    with open(CONTRACT_ARTIFACT_PATH, 'w') as f:
+        json.dump({"source_sha256": source_sha256, "solc_version": SOLC_VERSION,
+                   "abi": contract_output["abi"], "bytecode": contract_output["bin"]}, f)
+    return contract_output["abi"], contract_output["bin"]
+
+
+def connect_local_chain(rpc_url=None):
+    """Returns a Web3 instance on an in-process eth-tester chain, or on the dev node at rpc_url."""
+    if rpc_url:
+        w3 = Web3(HTTPProvider(rpc_url))
+        if not w3.is_connected():
+            raise ConnectionError(f"No dev node at {rpc_url}")
+        return w3
+    try:
+        from web3 import EthereumTesterProvider
+        w3 = Web3(EthereumTesterProvider())
+    except Exception as e:
+        raise RuntimeError(f"In-process chain unavailable ({e}); pip install 'web3[tester]' or pass --rpc-url")
+    return w3
+
+
+def create_funded_account(w3):
+    """A fresh key funded from the node's first unlocked account, so transactions are signed like on Sepolia."""
+    account = w3.eth.account.create()
+    tx_hash = w3.eth.send_transaction({'from': w3.eth.accounts[0], 'to': account.address,
+                                       'value': w3.to_wei(ACCOUNT_FUNDING_ETH, 'ether')})
+    w3.eth.wait_for_transaction_receipt(tx_hash)
+    return account
+
+
+def deploy_contract(w3, account, abi, bytecode, name=CONTRACT_NAME):
+    factory = w3.eth.contract(abi=abi, bytecode=bytecode)
+    tx = factory.constructor().build_transaction({
+        'from': account.address,
+        'nonce': w3.eth.get_transaction_count(account.address),
+        'gasPrice': w3.to_wei('10', 'gwei'),
+    })
+    signed_tx = w3.eth.account.sign_transaction(tx, private_key=account.key)
+    receipt = w3.eth.wait_for_transaction_receipt(w3.eth.send_raw_transaction(signed_tx.raw_transaction))
+    if receipt.status != 1:
+        raise RuntimeError(f"{name} deployment failed")
+    print(f"{name} deployed at {receipt.contractAddress} (gas {receipt.gasUsed})")
+    return w3.eth.contract(address=receipt.contractAddress, abi=abi)
+
+
+def peak_memory_mb():
+    """Peak RSS of this process and of its largest finished child (snarkjs/node), in MB."""
+    if resource is None:
+        return None, None
+    to_mb = 1 / 1024 if sys.platform != "darwin" else 1 / (1024 * 1024) # ru_maxrss is KB on Linux, bytes on macOS
+    return (round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * to_mb, 1),
+            round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * to_mb, 1))
+
+
+def summarize(run_logs, wall_seconds):
+    """Throughput, per-stage latency percentiles (ms) and gas statistics from the run logs."""
+    stage_values = {stage: [log['stage_seconds'][stage] for log in run_logs if stage in log['stage_seconds']]
+                    for stage in STAGES}
+    stage_values['total'] = [sum(log['stage_seconds'].values()) for log in run_logs if log['stage_seconds']]
+    latency_ms = {stage: {f"p{q}": round(float(np.percentile(values, q)) * 1000, 2) for q in PERCENTILES}
+                  for stage, values in stage_values.items() if values}
+    gas = [int(log['gas_used']) for log in run_logs if log.get('gas_used')]
+    succeeded = sum(1 for log in run_logs if log.get('tx_status') == 'Success')
+    self_mb, children_mb = peak_memory_mb()
+    return {
+        "samples": len(run_logs),
+        "succeeded": succeeded,
+        "wall_seconds": round(wall_seconds, 3),
+        "samples_per_second": round(len(run_logs) / wall_seconds, 3) if wall_seconds > 0 else None,
+        "latency_ms": latency_ms,
+        "gas_per_record": {"mean": round(float(np.mean(gas)), 1), "min": min(gas), "max": max(gas)} if gas else None,
+        "peak_rss_mb": {"benchmark_process": self_mb, "largest_child": children_mb},
+    }
+
+
+def print_report(report):
+    print("\n--- Benchmark Results ---")
+    print(f"Samples: {report['samples']} ({report['succeeded']} logged on-chain), concurrency {report['concurrency']}")
+    print(f"Wall time: {report['wall_seconds']}s -> {report['samples_per_second']} samples/s")
+    print(f"{'stage':<15}" + "".join(f"{f'p{q} (ms)':>12}" for q in PERCENTILES))
+    for stage, values in report['latency_ms'].items():
+        print(f"{stage:<15}" + "".join(f"{values[f'p{q}']:>12}" for q in PERCENTILES))
+    print(f"Gas per record: {report['gas_per_record']}")
+    print("Latency per job class (queued -> logged):")
+    for job_class, values in report['latency_per_job_class'].items():
+        print(f"  {job_class:<14} {values['jobs']:>5} jobs, {values['within_target']:.0%} within {values['target_s']}s "
+              f"(mean {values['mean_s']}s, max {values['max_s']}s)")
+    print(f"Peak RSS (MB): {report['peak_rss_mb']}")
+
+
+# --- Main execution ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the end-to-end pipeline against a local chain.")
+    parser.add_argument("--samples", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=42, help="Seed for picking the sample rows.")
+    parser.add_argument("--rpc-url", default=None, help="Local dev node instead of the in-process chain.")
+    parser.add_argument("--contract-artifact", default=None, help="Compiled PredictionLogger JSON (abi + bytecode).")
+    parser.add_argument("--verbose", action="store_true", help="Keep the pipeline's per-sample output.")
+    parser.add_argument("--metrics-port", type=int, default=cfg.PIPELINE_METRICS_PORT,
+                        help="Serve Prometheus metrics on this port while the benchmark runs (0 = off).")
+    args = parser.parse_args()
+
+    if cfg.PROOF_BATCH_SIZE > 1:
+        print("Note: the benchmark proves one sample per proof; PROOF_BATCH_SIZE is ignored.")
+    committed = cfg.PUBLIC_INPUT_MODE == "commitment"
+    wasm_path = cfg.COMMITTED_WASM_FILE_PATH if committed else cfg.WASM_FILE_PATH
+    zkey_path = cfg.COMMITTED_PROVING_KEY_PATH if committed else cfg.PROVING_KEY_PATH
+    missing = [path for path in (wasm_path, zkey_path) if not os.path.exists(path)]
+    if missing:
+        print(f"Error: circuit artifacts missing ({', '.join(missing)}). Run zkp_scripts/09_build_zkp_artifacts.py first.")
+        sys.exit(1)
+
+    pipeline = script_loader.load_pipeline()
+    df_original = dataset_cache.load_dataset(cfg.DATASET_PATH)
+    scaler = joblib.load(cfg.SCALER_PATH)
+    ml_model = joblib.load(cfg.MODEL_PATH)
+    if os.path.exists(cfg.TREE_SCORER_PATH):
+        scorer = tree_scorer.load_scorer(cfg.TREE_SCORER_PATH)
+        if scorer.matches_model(cfg.MODEL_PATH):
+            ml_model = scorer
+
+    abi, bytecode = load_contract_artifact(args.contract_artifact)
+    w3 = metrics.instrument_web3(connect_local_chain(args.rpc_url))
+    if args.metrics_port:
+        metrics.start_http_server(args.metrics_port)
+    print(f"Local chain ready. Chain ID: {w3.eth.chain_id}")
+    account = create_funded_account(w3)
+    contract = deploy_contract(w3, account, abi, bytecode)
+    if cfg.PROOF_SYSTEM != "groth16":
+        vkey_path = cfg.COMMITTED_VERIFICATION_KEY_PATH if committed else cfg.VERIFICATION_KEY_PATH
+        pipeline.ensure_verification_key_registered(w3, contract, account, vkey_path, cfg.PROOF_SYSTEM)
+
+    # Keep benchmark records out of the real results and commitment files
+    run_id = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    run_dir = os.path.join(BENCHMARK_OUTPUT_DIR, run_id)
+    os.makedirs(run_dir, exist_ok=True)
+    cfg.RESULTS_CSV_PATH = os.path.join(run_dir, "results.csv")
+    cfg.COMMITMENT_OPENINGS_CSV_PATH = os.path.join(run_dir, "commitment_openings.csv")
+
+    rng = np.random.default_rng(args.seed)
+    sample_indices = rng.choice(len(df_original), size=min(args.samples, len(df_original)), replace=False).tolist()
+    commitments = (pipeline.precompute_feature_commitments(sample_indices, df_original, scaler)
+                   if committed else {})
+
+    def run_scheduled_samples():
+        """One benchmark thread: proves the most urgent queued sample until the scheduler is empty."""
+        run_logs = []
+        for sample_idx, job_class, enqueued_at in scheduler.jobs():
+            run_logs.append(pipeline.process_single_sample(sample_idx, df_original, scaler, ml_model, w3, contract, account,
+                                                           commitment_info=commitments.get(sample_idx),
+                                                           work_dir=os.path.join(run_dir, "work", str(sample_idx)),
+                                                           ml_prediction=ml_predictions[sample_idx]))
+            scheduler.finished(job_class, enqueued_at)
+        return run_logs
+
+    print(f"Running {len(sample_indices)} samples at concurrency {args.concurrency}...")
+    pipeline.PROOF_QUEUE_DEPTH.set(len(sample_indices))
+    scheduler, ml_predictions = pipeline.schedule_samples(sample_indices, df_original, scaler, ml_model)
+    output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(open(os.devnull, 'w'))
+    start_time = time.perf_counter()
+    with output, ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        threads = [executor.submit(run_scheduled_samples) for _ in range(args.concurrency)]
+        run_logs = [run_log for thread in threads for run_log in thread.result()]
+    wall_seconds = time.perf_counter() - start_time
+
+    report = summarize(run_logs, wall_seconds)
+    report["latency_per_job_class"] = scheduler.summary()
+    report.update({"run_id": run_id, "concurrency": args.concurrency, "mode": cfg.PUBLIC_INPUT_MODE,
+                   "proof_system": cfg.PROOF_SYSTEM, "chain": args.rpc_url or "eth-tester", "dataset": cfg.DATASET_PATH})
+    print_report(report)
+    report_path = os.path.join(run_dir, "report.json")
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport written to {report_path} (per-sample rows in {cfg.RESULTS_CSV_PATH})")
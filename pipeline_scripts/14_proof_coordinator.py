@@ -0,0 +1,283 @@
+# pipeline_scripts/14_proof_coordinator.py
+"""
+Coordinator of distributed proving: enqueues samples into the proof queue (proof_queue.py) and
+submits the proofs that workers (15_proof_worker.py) return.
+
+The coordinator prepares each sample once (fixed-point circuit input, scikit-learn prediction and, in
+commitment mode, the salted Poseidon commitment), enqueues it, and then polls the queue. Every proven
+job is logged on chain from this process only, so the deployer account's nonces are allocated by a
+single submitter no matter how many workers prove. Rows go to the results CSV as in 08.
+
+Rerunning the coordinator is safe: samples already in the queue are not enqueued again, and jobs left
+'submitted' by a crash are reconciled by transaction hash before anything is resent.
+
+With CHAIN_LOGGING_MODE=merkle, proven jobs are added to the current Merkle window (merkle_store.py)
+instead, and the roots of finished windows are logged once the queue is drained.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import traceback
+from datetime import datetime, timezone
+
+import joblib
+from web3.exceptions import TimeExhausted, TransactionNotFound
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+import config_loader as cfg
+import dataset_cache
+import merkle_store
+import metrics
+import proof_queue
+import proof_scheduler
+import run_journal
+import script_loader
+
+# --- Configuration ---
+WORK_DIR = os.path.join(PROJECT_ROOT, "runtime_outputs", "coordinator_work")
+DEFAULT_SAMPLE_INDICES = [0, 49, 77, 160, 500] # Same targeted samples as 08
+
+
+def parse_sample_indices(value):
+    """'0,49,77' or '0-999' (inclusive ranges may be mixed with single indices)."""
+    indices = []
+    for part in value.split(","):
+        part = part.strip()
+        if "-" in part:
+            first, last = part.split("-", 1)
+            indices.extend(range(int(first), int(last) + 1))
+        elif part:
+            indices.append(int(part))
+    return indices
+
+
+def build_jobs(pipeline, sample_indices, df_original, scaler, ml_model, circuit_id, committed):
+    """
+    One queue job per sample: the circuit input file contents plus what the CSV row needs later, with the
+    job class and deadline from cfg.SCHEDULING_POLICY so workers prove likely failures first.
+    """
+    policy = cfg.SCHEDULING_POLICY
+    enqueued_at = time.time()
+    feature_commitments = pipeline.precompute_feature_commitments(sample_indices, df_original, scaler) if committed else {}
+    jobs = []
+    for sample_idx in sample_indices:
+        udi, actual_label, circuit_input_array = pipeline.prepare_input_for_circuit(
+            df_original, sample_idx, scaler, cfg.FEATURE_NAMES_ORDER,
+            cfg.NUMERICAL_FEATURES_FOR_SCALING, cfg.FIXED_POINT_MULTIPLIER, None)
+        circuit_input = {"features": circuit_input_array}
+        ml_prediction = int(pipeline.get_ml_prediction(df_original, sample_idx, scaler, ml_model))
+        context = {'actual_label': int(actual_label), 'ml_prediction': ml_prediction}
+        job_class = policy.classify_row(df_original.iloc[sample_idx], ml_prediction)
+        if committed:
+            salt, feature_commitment = feature_commitments[sample_idx]
+            circuit_input.update({"salt": str(salt), "feature_commitment": str(feature_commitment)})
+            context['feature_commitment'] = str(feature_commitment)
+        jobs.append({'circuit_id': circuit_id, 'udi': int(udi), 'sample_index': int(sample_idx),
+                     'input': circuit_input, 'context': context, 'job_class': job_class,
+                     'priority': policy.priority(job_class), 'deadline_at': policy.deadline(job_class, enqueued_at)})
+    return jobs
+
+
+def run_log_for_job(job):
+    """The results-CSV row of a proven job (filled in further once it is submitted)."""
+    context = job['context']
+    return {
+        'run_timestamp_utc': datetime.now(timezone.utc).isoformat(),
+        'sample_index': job['sample_index'], 'sample_udi': job['udi'],
+        'actual_label': context.get('actual_label'), 'ml_prediction': context.get('ml_prediction'),
+        'circuit_prediction': None, 'inputs_for_circuit': json.dumps(json.loads(job['input_json'])['features']),
+        'zkp_time_seconds': job['zkp_time_seconds'], 'local_zkp_verified': bool(job['local_zkp_verified']),
+        'blockchain_tx_hash': None, 'gas_used': None, 'tx_status': None,
+        'notes': f"Proved by worker {job['worker_id']} (attempt {job['attempts']}).",
+    }
+
+
+def reconcile_submitted_jobs(queue, w3, circuit_id):
+    """Resolves jobs a previous coordinator left at 'submitted' from their transaction hash."""
+    for job in queue.jobs_with_status('submitted', circuit_id):
+        tx_hash = job['tx_hash'] if job['tx_hash'].startswith('0x') else '0x' + job['tx_hash']
+        try:
+            receipt = w3.eth.wait_for_transaction_receipt(tx_hash, timeout=120)
+        except (TransactionNotFound, TimeExhausted):
+            try:
+                w3.eth.get_transaction(tx_hash)
+                print(f"Queue: transaction {tx_hash} for UDI {job['udi']} is still pending; leaving it for the next run.")
+                continue
+            except TransactionNotFound:
+                receipt = None
+        if receipt is not None and receipt.status == 1:
+            print(f"Queue: transaction {tx_hash} for UDI {job['udi']} confirmed.")
+            queue.mark_done(job['job_id'])
+        else:
+            print(f"Queue: transaction {tx_hash} for UDI {job['udi']} reverted or was dropped; it will be resent.")
+            queue.return_to_proved(job['job_id'])
+
+
+def submit_job(pipeline, queue, job, w3, contract, account, committed, verification_key_path, window_store=None):
+    """
+    Checks a proven job's public signals, logs it on chain (or adds it to the current Merkle window of
+    window_store) and records the outcome in the queue and the CSV.
+    """
+    run_log = run_log_for_job(job)
+    paths = pipeline.sample_work_paths(WORK_DIR, committed)
+    try:
+        with open(paths["proof_json"], 'w') as f:
+            f.write(job['proof_json'])
+        with open(paths["public_json"], 'w') as f:
+            f.write(job['public_json'])
+        feature_commitment = None
+        public_inputs = None
+        if committed:
+            circuit_predicted_class, public_commitment = pipeline.get_committed_public_signals_for_contract(paths["public_json"])
+            feature_commitment = int(job['context']['feature_commitment'])
+            if public_commitment != feature_commitment:
+                raise ValueError(f"Circuit commitment {public_commitment} does not match the enqueued commitment {feature_commitment}")
+        else:
+            circuit_predicted_class, public_inputs = pipeline.get_public_signals_for_contract(paths["public_json"])
+        run_log['circuit_prediction'] = int(circuit_predicted_class)
+
+        if window_store is not None:
+            if not run_log['local_zkp_verified']:
+                raise ValueError("Local ZKP verification failed; the prediction is not added to a Merkle window.")
+            input_commitment = feature_commitment if committed else pipeline.poseidon_hash.commit_features(public_inputs, 0)
+            window_id, leaf_index = pipeline.add_to_merkle_window(window_store, job['udi'], circuit_predicted_class,
+                                                                  input_commitment, paths["proof_json"], run_log)
+            print(f"UDI {job['udi']} added to Merkle window {window_id} as leaf {leaf_index}.")
+            run_log['tx_status'] = 'Merkle (Pending Root)'
+            run_log['notes'] += f" | Added to Merkle window {window_id} (leaf {leaf_index})."
+            queue.mark_done(job['job_id'])
+            proof_scheduler.record_attestation(cfg.SCHEDULING_POLICY, job['job_class'], time.time() - job['enqueued_at'])
+            return run_log
+
+        if not (w3 and contract and account):
+            run_log['notes'] += " | Skipped blockchain logging (config or connection issue)."
+            queue.mark_done(job['job_id'])
+            return run_log
+
+        tx_notes_for_chain = f"ZKP Verified Prediction for UDI {job['udi']}. LocalVerify: {run_log['local_zkp_verified']}"
+        contract_call = pipeline.build_log_prediction_call(
+            contract, job['udi'], circuit_predicted_class, public_inputs, paths["proof_json"],
+            verification_key_path, feature_commitment, tx_notes_for_chain)
+        with pipeline.STAGE_SECONDS.labels('submit').time():
+            tx_hash, tx_receipt = pipeline.send_contract_transaction(
+                w3, account, contract_call, f"UDI {job['udi']}",
+                before_send=lambda signed_hash: queue.mark_submitted(job['job_id'], signed_hash.hex()))
+        run_log['blockchain_tx_hash'] = tx_hash.hex()
+        if tx_receipt.status == 1:
+            print(f"Transaction for UDI {job['udi']} successful! Gas used: {tx_receipt.gasUsed}")
+            run_log['gas_used'] = tx_receipt.gasUsed
+            run_log['tx_status'] = 'Success'
+            run_log['notes'] += " | Logged to blockchain."
+            queue.mark_done(job['job_id'])
+            proof_scheduler.record_attestation(cfg.SCHEDULING_POLICY, job['job_class'], time.time() - job['enqueued_at'])
+        else:
+            run_log['notes'] += f" | Blockchain transaction FAILED (Receipt Status 0). TxHash: {tx_hash.hex()}"
+            run_log['tx_status'] = 'Failed (On-Chain)'
+            queue.return_to_proved(job['job_id'], error="Transaction reverted")
+    except Exception as e:
+        print(f"Error submitting UDI {job['udi']}: {e}")
+        run_log['notes'] += f" | Blockchain interaction error: {type(e).__name__} - {e}"
+        run_log['tx_status'] = 'Error'
+        traceback.print_exc()
+    finally:
+        pipeline.log_to_csv(run_log)
+        pipeline.SAMPLES_PROCESSED.labels(run_log['tx_status'] or 'none').inc()
+    return run_log
+
+
+# --- Main execution ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Enqueue samples for proof workers and submit their proofs on chain.")
+    parser.add_argument("--samples", default=",".join(str(i) for i in DEFAULT_SAMPLE_INDICES),
+                        help="Dataset indices to prove, e.g. '0,49,77' or '0-999'.")
+    parser.add_argument("--queue", default=cfg.PROOF_QUEUE_PATH, help="Proof queue database shared with the workers.")
+    parser.add_argument("--enqueue-only", action="store_true", help="Enqueue and exit; run again without it to submit.")
+    parser.add_argument("--retry-failed", action="store_true", help="Requeue jobs that ran out of attempts.")
+    parser.add_argument("--poll-seconds", type=float, default=5.0)
+    parser.add_argument("--tx-delay", type=float, default=10.0, help="Pause between transactions (Sepolia).")
+    args = parser.parse_args()
+
+    pipeline = script_loader.load_pipeline()
+    committed = cfg.PUBLIC_INPUT_MODE == "commitment"
+    proving_key_path = cfg.COMMITTED_PROVING_KEY_PATH if committed else cfg.PROVING_KEY_PATH
+    verification_key_path = cfg.COMMITTED_VERIFICATION_KEY_PATH if committed else cfg.VERIFICATION_KEY_PATH
+    if not os.path.exists(proving_key_path):
+        print(f"Error: {proving_key_path} not found. Run zkp_scripts/09_build_zkp_artifacts.py first.")
+        sys.exit(1)
+    if cfg.PROOF_BATCH_SIZE > 1:
+        print("Note: distributed proving proves one sample per proof; PROOF_BATCH_SIZE is ignored.")
+    circuit_id = run_journal.circuit_id_for(proving_key_path) # Workers only lease jobs for the keys they hold
+    queue = proof_queue.ProofQueue(args.queue, cfg.PROOF_QUEUE_LEASE_SECONDS, cfg.PROOF_QUEUE_MAX_ATTEMPTS)
+    print(f"Proof queue {args.queue} (circuit {circuit_id}): {queue.status_counts(circuit_id)}")
+
+    if cfg.PIPELINE_METRICS_PORT:
+        pipeline.PROOF_QUEUE_DEPTH.set_function(
+            lambda: sum(queue.status_counts(circuit_id)[status] for status in ('queued', 'leased', 'proved')))
+        for job_class in proof_scheduler.JOB_CLASSES:
+            proof_scheduler.QUEUE_DEPTH.labels(job_class).set_function(
+                lambda job_class=job_class: queue.class_counts(('queued', 'leased'), circuit_id).get(job_class, 0))
+        metrics.start_http_server(cfg.PIPELINE_METRICS_PORT)
+        print(f"Metrics exporter listening on :{cfg.PIPELINE_METRICS_PORT}/metrics")
+
+    if args.retry_failed:
+        print(f"Requeued {queue.retry_failed(circuit_id)} failed jobs.")
+
+    # --- Enqueue ---
+    sample_indices = parse_sample_indices(args.samples)
+    df_original = dataset_cache.load_dataset(cfg.DATASET_PATH)
+    scaler = joblib.load(cfg.SCALER_PATH)
+    ml_model = pipeline.load_ml_model()
+    jobs = build_jobs(pipeline, sample_indices, df_original, scaler, ml_model, circuit_id, committed)
+    added = set(queue.enqueue(jobs))
+    print(f"Enqueued {len(added)} of {len(jobs)} samples ({len(jobs) - len(added)} were already queued). "
+          f"Waiting per job class: {queue.class_counts(('queued',), circuit_id)}")
+    if committed:
+        for job in jobs:
+            if job['udi'] in added: # Openings of samples queued by an earlier run were recorded then
+                pipeline.log_commitment_opening(job['udi'], job['input']['features'],
+                                                job['input']['salt'], job['input']['feature_commitment'])
+    if args.enqueue_only:
+        queue.close()
+        sys.exit(0)
+
+    # --- Submit proofs as workers return them ---
+    w3, contract, account = pipeline.connect_to_chain()
+    if w3:
+        reconcile_submitted_jobs(queue, w3, circuit_id)
+    window_store = None
+    if cfg.CHAIN_LOGGING_MODE == "merkle":
+        window_store = merkle_store.MerkleStore(cfg.MERKLE_STORE_PATH, cfg.MERKLE_WINDOW_SECONDS)
+        print(f"Merkle logging enabled: {cfg.MERKLE_WINDOW_SECONDS}s windows in {cfg.MERKLE_STORE_PATH}.")
+    reported_failures = set()
+    attempted = set() # Each proof is submitted at most once per run, like 08; a rerun resends reverted ones
+    while True:
+        proved = [job for job in queue.jobs_with_status('proved', circuit_id) if job['job_id'] not in attempted]
+        for job in proved:
+            attempted.add(job['job_id'])
+            run_log = submit_job(pipeline, queue, job, w3, contract, account, committed, verification_key_path,
+                                 window_store)
+            if w3 and window_store is None:
+                time.sleep(args.tx_delay)
+        for job in queue.jobs_with_status('failed', circuit_id):
+            if job['job_id'] not in reported_failures:
+                reported_failures.add(job['job_id'])
+                print(f"UDI {job['udi']} failed after {job['attempts']} attempts: {job['error']}")
+        counts = queue.status_counts(circuit_id)
+        if not proved and not (counts['queued'] + counts['leased']):
+            break
+        if not proved:
+            print(f"Waiting for workers: {counts}")
+            time.sleep(args.poll_seconds)
+
+    if window_store is not None:
+        if w3:
+            print(f"Published {len(pipeline.publish_merkle_windows(w3, contract, account, window_store))} Merkle windows.")
+        window_store.close()
+    print(f"Proof queue: {queue.status_counts(circuit_id)}")
+    if queue.status_counts(circuit_id)['failed']:
+        print("Rerun with --retry-failed to give failed jobs another round of attempts.")
+    queue.close()
+    print("\n--- Coordinator Finished ---")
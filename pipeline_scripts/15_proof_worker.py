@@ -0,0 +1,145 @@
+# pipeline_scripts/15_proof_worker.py
+"""
+Proof worker for distributed proving: leases jobs from the proof queue (proof_queue.py), generates the
+witness, proves and verifies locally, and stores proof.json/public.json back in the queue for the
+coordinator (14_proof_coordinator.py) to submit. Run one or more per machine; each machine needs the
+same circuit artifacts and keys (zkp_scripts/09_build_zkp_artifacts.py) and access to the queue file.
+
+Jobs are leased most urgent first (earliest deadline from proof_scheduler.py, so likely failures
+before routine readings), and only jobs enqueued for the proving key this worker holds. While a job
+is being proven the lease is renewed in the background, so slow proofs are not handed to another
+worker; if the worker dies, its lease expires and the job is retried elsewhere. Workers never touch
+the chain.
+"""
+import argparse
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import traceback
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+import config_loader as cfg
+import metrics
+import proof_queue
+import proof_scheduler
+import run_journal
+import script_loader
+
+# --- Configuration ---
+WORK_DIR_ROOT = os.path.join(PROJECT_ROOT, "runtime_outputs", "worker_work")
+
+
+class LeaseKeeper:
+    """Renews a job's lease every lease_seconds/3 on a daemon thread until stopped (or the lease is lost)."""
+
+    def __init__(self, queue, job_id, worker_id, lease_seconds):
+        self._queue = queue
+        self._job_id = job_id
+        self._worker_id = worker_id
+        self._lease_seconds = lease_seconds
+        self._stopped = threading.Event()
+        self.lost = False
+        self._thread = threading.Thread(target=self._run, name=f"lease-{job_id}", daemon=True)
+
+    def _run(self):
+        while not self._stopped.wait(self._lease_seconds / 3):
+            if not self._queue.heartbeat(self._job_id, self._worker_id, self._lease_seconds):
+                self.lost = True
+                print(f"Lease on job {self._job_id} was lost; another worker may prove it too.")
+                return
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stopped.set()
+        self._thread.join()
+
+
+def prove_job(pipeline, job, work_dir, committed):
+    """Witness -> prove -> verify for one leased job; returns (proof_json, public_json, verified, zkp_time_seconds)."""
+    paths = pipeline.sample_work_paths(work_dir, committed)
+    wasm_file_path = cfg.COMMITTED_WASM_FILE_PATH if committed else cfg.WASM_FILE_PATH
+    witness_gen_script_path = cfg.COMMITTED_WITNESS_GEN_SCRIPT_PATH if committed else cfg.WITNESS_GEN_SCRIPT_PATH
+    proving_key_path = cfg.COMMITTED_PROVING_KEY_PATH if committed else cfg.PROVING_KEY_PATH
+    verification_key_path = cfg.COMMITTED_VERIFICATION_KEY_PATH if committed else cfg.VERIFICATION_KEY_PATH
+
+    start_time_zkp = time.time()
+    with open(paths["input_json"], 'w') as f:
+        json.dump(json.loads(job['input_json']), f, indent=2)
+    witness_gen_command = pipeline.build_witness_command(witness_gen_script_path, wasm_file_path,
+                                                         paths["input_json"], paths["witness"])
+    with pipeline.STAGE_SECONDS.labels('witness').time():
+        if not pipeline.run_command(witness_gen_command, working_dir=os.path.dirname(wasm_file_path)):
+            raise RuntimeError("Witness generation failed.")
+    prove_command = cfg.PROVER.prove_command(proving_key_path, paths["witness"], paths["proof_json"], paths["public_json"])
+    with pipeline.STAGE_SECONDS.labels('prove').time():
+        if not pipeline.run_command(prove_command, working_dir=cfg.BASE_DIR):
+            raise RuntimeError("Proof generation failed.")
+    zkp_time_seconds = round(time.time() - start_time_zkp, 2)
+
+    with pipeline.STAGE_SECONDS.labels('verify').time():
+        verified = cfg.PROVER.verify(verification_key_path, paths["public_json"], paths["proof_json"], cwd=cfg.BASE_DIR)
+    print(f"Local ZKP verification for UDI {job['udi']}: {'OK' if verified else 'FAILED'}")
+    with open(paths["proof_json"], 'r') as proof_file, open(paths["public_json"], 'r') as public_file:
+        return proof_file.read(), public_file.read(), verified, zkp_time_seconds
+
+
+# --- Main execution ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lease proving jobs from the proof queue and return the proofs.")
+    parser.add_argument("--queue", default=cfg.PROOF_QUEUE_PATH, help="Proof queue database shared with the coordinator.")
+    parser.add_argument("--worker-id", default=f"{socket.gethostname()}-{os.getpid()}")
+    parser.add_argument("--poll-seconds", type=float, default=5.0, help="Wait between polls of an empty queue.")
+    parser.add_argument("--exit-when-idle", action="store_true", help="Exit once the queue has no job to lease.")
+    parser.add_argument("--max-jobs", type=int, default=0, help="Exit after this many jobs (0 = no limit).")
+    args = parser.parse_args()
+
+    pipeline = script_loader.load_pipeline()
+    committed = cfg.PUBLIC_INPUT_MODE == "commitment"
+    proving_key_path = cfg.COMMITTED_PROVING_KEY_PATH if committed else cfg.PROVING_KEY_PATH
+    if not os.path.exists(proving_key_path):
+        print(f"Error: {proving_key_path} not found. Run zkp_scripts/09_build_zkp_artifacts.py first.")
+        sys.exit(1)
+    if cfg.PROVER.missing_executables():
+        print(f"Error: prover executables not found: {cfg.PROVER.missing_executables()}")
+        sys.exit(1)
+    circuit_id = run_journal.circuit_id_for(proving_key_path)
+    queue = proof_queue.ProofQueue(args.queue, cfg.PROOF_QUEUE_LEASE_SECONDS, cfg.PROOF_QUEUE_MAX_ATTEMPTS)
+    work_dir = os.path.join(WORK_DIR_ROOT, args.worker_id)
+    print(f"Worker {args.worker_id}: prover {cfg.PROVER.name}, proof system {cfg.PROOF_SYSTEM}, circuit {circuit_id}")
+    if cfg.PIPELINE_METRICS_PORT:
+        metrics.start_http_server(cfg.PIPELINE_METRICS_PORT)
+        print(f"Metrics exporter listening on :{cfg.PIPELINE_METRICS_PORT}/metrics")
+
+    jobs_done = 0
+    while not args.max_jobs or jobs_done < args.max_jobs:
+        job = queue.lease(args.worker_id, circuit_id)
+        if job is None:
+            if args.exit_when_idle:
+                break
+            time.sleep(args.poll_seconds)
+            continue
+        proof_scheduler.WAIT_SECONDS.labels(job['job_class']).observe(time.time() - job['enqueued_at'])
+        print(f"\n=== Job {job['job_id']}: UDI {job['udi']}, {job['job_class']} "
+              f"(attempt {job['attempts']}/{queue.max_attempts}) ===")
+        try:
+            with LeaseKeeper(queue, job['job_id'], args.worker_id, queue.lease_seconds):
+                proof_json, public_json, verified, zkp_time_seconds = prove_job(pipeline, job, work_dir, committed)
+            if queue.complete(job['job_id'], args.worker_id, proof_json, public_json, verified, zkp_time_seconds):
+                print(f"Proof for UDI {job['udi']} stored ({zkp_time_seconds}s).")
+            else:
+                print(f"UDI {job['udi']} was already proven by another worker; discarding this proof.")
+        except Exception as e:
+            print(f"ERROR proving UDI {job['udi']}: {e}")
+            traceback.print_exc()
+            queue.fail(job['job_id'], args.worker_id, f"{type(e).__name__}: {e}")
+        jobs_done += 1
+
+    print(f"Worker {args.worker_id} finished after {jobs_done} jobs. Queue: {queue.status_counts(circuit_id)}")
+    queue.close()
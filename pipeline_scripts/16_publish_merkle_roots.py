@@ -0,0 +1,66 @@
+# pipeline_scripts/16_publish_merkle_roots.py
+"""
+Publishes the Merkle roots of the prediction windows collected with CHAIN_LOGGING_MODE=merkle
+(merkle_store.py): seals every window whose time range has passed and logs its root with
+PredictionLogger.logMerkleRoot. 08 and 14 do this at the end of each run; run this script on a
+schedule (e.g. hourly, matching MERKLE_WINDOW_SECONDS) when predictions arrive continuously.
+
+Roots whose transaction was sent by an earlier run are reconciled by hash before anything is resent.
+"""
+import argparse
+import os
+import sys
+from datetime import datetime, timezone
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+import config_loader as cfg
+import merkle_store
+import script_loader
+
+# --- Configuration ---
+
+
+def format_window(window):
+    start = datetime.fromtimestamp(window['window_start'], timezone.utc).isoformat()
+    line = f"Window {window['window_id']}: {start}, {window['leaf_count']} predictions, {window['status']}"
+    if window['root']:
+        line += f", root {window['root']}"
+    if window['chain_window_id'] is not None:
+        line += f", on-chain window {window['chain_window_id']}"
+    return line
+
+
+# --- Main execution ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seal finished Merkle windows and log their roots on chain.")
+    parser.add_argument("--store", default=cfg.MERKLE_STORE_PATH, help="Merkle store database.")
+    parser.add_argument("--include-open", action="store_true",
+                        help="Also seal and publish windows whose time range has not ended yet.")
+    parser.add_argument("--list", action="store_true", help="List the most recent windows and exit.")
+    args = parser.parse_args()
+
+    store = merkle_store.MerkleStore(args.store, cfg.MERKLE_WINDOW_SECONDS)
+    if args.list:
+        for window in store.windows(limit=50):
+            print(format_window(window))
+        store.close()
+        sys.exit(0)
+
+    pipeline = script_loader.load_pipeline()
+    w3, contract, account = pipeline.connect_to_chain()
+    if not w3:
+        print("Error: no blockchain connection; nothing was published.")
+        store.close()
+        sys.exit(1)
+    published = pipeline.publish_merkle_windows(w3, contract, account, store, include_open=args.include_open)
+    for window in published:
+        print(format_window(window))
+    print(f"Published {len(published)} Merkle windows.")
+    waiting = store.windows(('open', 'sealed', 'submitted'))
+    if waiting:
+        print(f"{len(waiting)} windows are not published yet:")
+        for window in waiting:
+            print(format_window(window))
+    store.close()
+    print("\n--- Merkle Root Publishing Finished ---")
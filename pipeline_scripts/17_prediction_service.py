@@ -0,0 +1,366 @@
+# pipeline_scripts/17_prediction_service.py
+"""
+Long-running prediction and proving service. The model, scaler and circuit artifacts are loaded once
+and kept warm; each request with a raw sensor reading gets the ML prediction immediately plus a proof
+handle that resolves once the witness, proof and local verification have run on a background pool.
+
+    POST /predict              {"UDI": 1, "Type": "M", "Air temperature [K]": 298.1, ...,
+                                "callback_url": "http://..." (optional)}  -> prediction + proof handle
+    GET  /proofs/<handle>      handle status (queued, proving, done, failed); ?wait=N long-polls N seconds
+    GET  /status               current model version, in-flight requests per version, pending proofs
+    POST /admin/reload         reload now (?force=1 swaps even if nothing changed)
+    GET  /metrics              Prometheus text-format metrics
+
+Model, scaler and circuit artifacts are versioned and hot-swapped by model_registry.py: a retrained
+model or a rebuilt circuit (03 / 09) is picked up without a restart, and requests already in flight
+finish with the version they started with. With --log-on-chain, finished proofs are logged as in 08
+(or added to the current Merkle window when CHAIN_LOGGING_MODE=merkle); every result is also
+appended to the results CSV.
+"""
+import argparse
+import collections
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+import traceback
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import joblib
+import pandas as pd
+from flask import Flask, Response, jsonify, request
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+import config_loader as cfg
+import artifact_cache
+import merkle_store
+import metrics
+import model_registry
+import poseidon_hash
+import run_journal
+import script_loader
+
+# --- Configuration ---
+WORK_DIR_ROOT = os.path.join(PROJECT_ROOT, "runtime_outputs", "service_work")
+MACHINE_TYPES = ("H", "L", "M")
+MAX_FINISHED_HANDLES = 10000 # Finished handles kept for polling; the oldest are forgotten first
+CALLBACK_TIMEOUT_SECONDS = 10
+MAX_WAIT_SECONDS = 60
+
+PREDICTION_SECONDS = metrics.histogram("service_prediction_seconds", "Time to answer /predict (ML prediction only).")
+PROOF_SECONDS = metrics.histogram("service_proof_seconds", "Time from /predict to a finished proof handle.",
+                                  buckets=(1, 2, 5, 10, 15, 30, 60, 120, 300, 600))
+PROOFS_FINISHED = metrics.counter("service_proofs_finished", "Proof handles finished, by status.", ["status"])
+PROOFS_PENDING = metrics.gauge("service_proofs_pending", "Proof handles queued or proving.")
+
+
+def load_bundle(pipeline, committed):
+    """Model, scaler and the circuit artifacts currently in the build manifest, as one versioned bundle."""
+    paths = cfg.resolve_circuit_paths(committed)
+    circuit_id = run_journal.circuit_id_for(paths["zkey"]) if os.path.exists(paths["zkey"]) else ""
+    version = model_registry.content_version([artifact_cache.sha256_file(cfg.MODEL_PATH),
+                                              artifact_cache.sha256_file(cfg.SCALER_PATH), circuit_id])
+    return model_registry.ModelBundle(version, pipeline.load_ml_model(), joblib.load(cfg.SCALER_PATH), paths,
+                                      circuit_id=circuit_id)
+
+
+def watched_paths(committed):
+    """Files whose change means a new bundle version (the manifest moves when 09 rebuilds a circuit)."""
+    paths = cfg.resolve_circuit_paths(committed)
+    return [cfg.MODEL_PATH, cfg.SCALER_PATH, cfg.TREE_SCORER_PATH, artifact_cache.MANIFEST_PATH,
+            paths["zkey"], paths["vkey"], paths["wasm"]]
+
+
+def reading_to_frame(reading):
+    """A one-row dataset frame from a raw reading (UDI, Type and the numerical sensor columns)."""
+    missing = [name for name in ['UDI', 'Type'] + cfg.NUMERICAL_FEATURES_FOR_SCALING if name not in reading]
+    if missing:
+        raise ValueError(f"Reading is missing {missing}")
+    if reading['Type'] not in MACHINE_TYPES:
+        raise ValueError(f"Type must be one of {MACHINE_TYPES}, got {reading['Type']!r}")
+    row = {'UDI': int(reading['UDI']), 'Type': reading['Type'], 'Machine failure': reading.get('Machine failure')}
+    for name in cfg.NUMERICAL_FEATURES_FOR_SCALING:
+        row[name] = float(reading[name])
+    return pd.DataFrame([row])
+
+
+class ProofHandles:
+    """Thread-safe proof handles; waiters block on a condition until a handle finishes."""
+
+    def __init__(self, max_finished=MAX_FINISHED_HANDLES):
+        self._handles = collections.OrderedDict()
+        self._finished = collections.deque()
+        self._max_finished = max_finished
+        self._condition = threading.Condition()
+
+    def create(self, **fields):
+        handle = {'handle': uuid.uuid4().hex, 'status': 'queued', 'created_at': time.time(), 'finished_at': None, **fields}
+        with self._condition:
+            self._handles[handle['handle']] = handle
+        PROOFS_PENDING.inc()
+        return dict(handle)
+
+    def update(self, handle_id, **fields):
+        with self._condition:
+            handle = self._handles[handle_id]
+            handle.update(fields)
+            if handle['status'] in ('done', 'failed'):
+                handle['finished_at'] = time.time()
+                self._finished.append(handle_id)
+                while len(self._finished) > self._max_finished:
+                    self._handles.pop(self._finished.popleft(), None)
+                self._condition.notify_all()
+            return dict(handle)
+
+    def get(self, handle_id, wait_seconds=0):
+        """The handle (None if unknown), after waiting up to wait_seconds for it to finish."""
+        deadline = time.time() + wait_seconds
+        with self._condition:
+            while True:
+                handle = self._handles.get(handle_id)
+                remaining = deadline - time.time()
+                if handle is None or handle['status'] in ('done', 'failed') or remaining <= 0:
+                    return dict(handle) if handle else None
+                self._condition.wait(remaining)
+
+    def pending(self):
+        with self._condition:
+            return sum(1 for handle in self._handles.values() if handle['status'] in ('queued', 'proving'))
+
+
+class PredictionService:
+    """Answers predictions from the current bundle and proves them on a thread pool with the same bundle."""
+
+    def __init__(self, pipeline, registry, committed, provers, chain=None, window_store=None):
+        self.pipeline = pipeline
+        self.registry = registry
+        self.committed = committed
+        self.chain = chain # (w3, contract, account) when --log-on-chain, else None
+        self.window_store = window_store
+        self.handles = ProofHandles()
+        self.executor = ThreadPoolExecutor(max_workers=provers, thread_name_prefix="prover")
+
+    def predict(self, reading, callback_url=None):
+        """ML prediction for one raw reading, plus the handle of its proof (proving continues in the background)."""
+        start = time.time()
+        frame = reading_to_frame(reading)
+        bundle = self.registry.hold() # Released when the proof finishes, so a reload cannot swap it mid-proof
+        try:
+            with PREDICTION_SECONDS.time():
+                udi, actual_label, circuit_input_array = self.pipeline.prepare_input_for_circuit(
+                    frame, 0, bundle.scaler, cfg.FEATURE_NAMES_ORDER, cfg.NUMERICAL_FEATURES_FOR_SCALING,
+                    cfg.FIXED_POINT_MULTIPLIER, None)
+                ml_prediction = int(self.pipeline.get_ml_prediction(frame, 0, bundle.scaler, bundle.model))
+            handle = self.handles.create(udi=int(udi), model_version=bundle.version, ml_prediction=ml_prediction,
+                                         callback_url=callback_url)
+            self.executor.submit(self._prove, handle['handle'], bundle, int(udi), actual_label, circuit_input_array,
+                                 ml_prediction, start)
+        except BaseException:
+            self.registry.release(bundle)
+            raise
+        return {'udi': int(udi), 'ml_prediction': ml_prediction, 'model_version': bundle.version,
+                'proof': {'handle': handle['handle'], 'status': handle['status'], 'url': f"/proofs/{handle['handle']}"}}
+
+    def _prove(self, handle_id, bundle, udi, actual_label, circuit_input_array, ml_prediction, start):
+        work_dir = os.path.join(WORK_DIR_ROOT, handle_id)
+        paths = self.pipeline.sample_work_paths(work_dir, self.committed)
+        run_log = {
+            'run_timestamp_utc': datetime.now(timezone.utc).isoformat(), 'sample_index': None, 'sample_udi': udi,
+            'actual_label': None if pd.isna(actual_label) else int(actual_label), 'ml_prediction': ml_prediction,
+            'circuit_prediction': None, 'inputs_for_circuit': json.dumps(circuit_input_array),
+            'zkp_time_seconds': None, 'local_zkp_verified': False, 'blockchain_tx_hash': None, 'gas_used': None,
+            'tx_status': None, 'notes': f"Prediction service, model version {bundle.version}.",
+        }
+        try:
+            self.handles.update(handle_id, status='proving')
+            if not bundle.extra['circuit_id']:
+                raise FileNotFoundError(f"{bundle.paths['zkey']} not found; run zkp_scripts/09_build_zkp_artifacts.py.")
+            circuit_input = {"features": circuit_input_array}
+            feature_commitment = None
+            if self.committed:
+                salt = poseidon_hash.random_salt() if cfg.COMMITMENT_SALTED else 0
+                feature_commitment = poseidon_hash.commit_features(circuit_input_array, salt)
+                circuit_input.update({"salt": str(salt), "feature_commitment": str(feature_commitment)})
+                self.pipeline.log_commitment_opening(udi, circuit_input_array, salt, feature_commitment)
+            with open(paths["input_json"], 'w') as f:
+                json.dump(circuit_input, f, indent=2)
+
+            zkp_start = time.time()
+            witness_command = self.pipeline.build_witness_command(bundle.paths["witness_gen"], bundle.paths["wasm"],
+                                                                  paths["input_json"], paths["witness"])
+            with self.pipeline.STAGE_SECONDS.labels('witness').time():
+                if not self.pipeline.run_command(witness_command, working_dir=os.path.dirname(bundle.paths["wasm"])):
+                    raise RuntimeError("Witness generation failed.")
+            prove_command = cfg.PROVER.prove_command(bundle.paths["zkey"], paths["witness"], paths["proof_json"],
+                                                     paths["public_json"])
+            with self.pipeline.STAGE_SECONDS.labels('prove').time():
+                if not self.pipeline.run_command(prove_command, working_dir=cfg.BASE_DIR):
+                    raise RuntimeError("Proof generation failed.")
+            run_log['zkp_time_seconds'] = round(time.time() - zkp_start, 2)
+            with self.pipeline.STAGE_SECONDS.labels('verify').time():
+                run_log['local_zkp_verified'] = cfg.PROVER.verify(bundle.paths["vkey"], paths["public_json"],
+                                                                  paths["proof_json"], cwd=cfg.BASE_DIR)
+
+            if self.committed:
+                circuit_predicted_class, public_commitment = self.pipeline.get_committed_public_signals_for_contract(paths["public_json"])
+                if public_commitment != feature_commitment:
+                    raise ValueError(f"Circuit commitment {public_commitment} does not match {feature_commitment}")
+                public_inputs = None
+            else:
+                circuit_predicted_class, public_inputs = self.pipeline.get_public_signals_for_contract(paths["public_json"])
+            run_log['circuit_prediction'] = int(circuit_predicted_class)
+            with open(paths["proof_json"], 'r') as proof_file, open(paths["public_json"], 'r') as public_file:
+                proof, public_signals = json.load(proof_file), json.load(public_file)
+            result = {'circuit_prediction': int(circuit_predicted_class), 'local_zkp_verified': run_log['local_zkp_verified'],
+                      'zkp_time_seconds': run_log['zkp_time_seconds'], 'proof': proof, 'public_signals': public_signals,
+                      'circuit_id': bundle.extra['circuit_id']}
+            if self.chain is not None and run_log['local_zkp_verified']:
+                result.update(self._log_on_chain(bundle, udi, circuit_predicted_class, public_inputs, feature_commitment,
+                                                 paths, run_log))
+            handle = self.handles.update(handle_id, status='done', **result)
+        except Exception as e:
+            print(f"ERROR proving UDI {udi} (handle {handle_id}): {e}")
+            traceback.print_exc()
+            run_log['notes'] += f" | Proving error: {type(e).__name__} - {e}"
+            handle = self.handles.update(handle_id, status='failed', error=f"{type(e).__name__}: {e}")
+        finally:
+            self.registry.release(bundle)
+            PROOFS_PENDING.dec()
+            shutil.rmtree(work_dir, ignore_errors=True)
+        self.pipeline.log_to_csv(run_log)
+        PROOFS_FINISHED.labels(handle['status']).inc()
+        PROOF_SECONDS.observe(time.time() - start)
+        if handle.get('callback_url'):
+            self._callback(handle)
+
+    def _log_on_chain(self, bundle, udi, circuit_predicted_class, public_inputs, feature_commitment, paths, run_log):
+        """Logs a verified proof (or adds it to the current Merkle window); returns the fields for the handle."""
+        if self.window_store is not None:
+            input_commitment = feature_commitment if self.committed else poseidon_hash.commit_features(public_inputs, 0)
+            window_id, leaf_index = self.pipeline.add_to_merkle_window(self.window_store, udi, circuit_predicted_class,
+                                                                       input_commitment, paths["proof_json"], run_log)
+            run_log['tx_status'] = 'Merkle (Pending Root)'
+            run_log['notes'] += f" | Added to Merkle window {window_id} (leaf {leaf_index})."
+            return {'merkle_window_id': window_id, 'merkle_leaf_index': leaf_index, 'tx_status': run_log['tx_status']}
+        w3, contract, account = self.chain
+        contract_call = self.pipeline.build_log_prediction_call(
+            contract, udi, circuit_predicted_class, public_inputs, paths["proof_json"], bundle.paths["vkey"],
+            feature_commitment, f"ZKP Verified Prediction for UDI {udi}. LocalVerify: {run_log['local_zkp_verified']}")
+        with self.pipeline.STAGE_SECONDS.labels('submit').time():
+            tx_hash, tx_receipt = self.pipeline.send_contract_transaction(w3, account, contract_call, f"UDI {udi}")
+        run_log['blockchain_tx_hash'] = tx_hash.hex()
+        if tx_receipt.status == 1:
+            run_log.update({'gas_used': tx_receipt.gasUsed, 'tx_status': 'Success'})
+            run_log['notes'] += " | Logged to blockchain."
+        else:
+            run_log['tx_status'] = 'Failed (On-Chain)'
+        return {'blockchain_tx_hash': run_log['blockchain_tx_hash'], 'gas_used': run_log['gas_used'],
+                'tx_status': run_log['tx_status']}
+
+    def _callback(self, handle):
+        """POSTs the finished handle to its callback_url; failures are only logged (the handle can still be polled)."""
+        body = json.dumps(handle, default=str).encode()
+        callback = urllib.request.Request(handle['callback_url'], data=body, method='POST',
+                                          headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(callback, timeout=CALLBACK_TIMEOUT_SECONDS):
+                pass
+        except Exception as e:
+            print(f"Callback to {handle['callback_url']} for handle {handle['handle']} failed: {e}")
+
+
+def create_app(service):
+    app = Flask(__name__)
+
+    @app.route('/predict', methods=['POST'])
+    def predict():
+        reading = request.get_json(silent=True)
+        if not isinstance(reading, dict):
+            return jsonify({"error": "Expected a JSON object with the raw reading."}), 400
+        try:
+            return jsonify(service.predict(reading, reading.get('callback_url'))), 202
+        except (ValueError, TypeError) as e:
+            return jsonify({"error": str(e)}), 400
+
+    @app.route('/proofs/<handle_id>')
+    def get_proof(handle_id):
+        wait_seconds = min(max(request.args.get('wait', 0, type=float), 0), MAX_WAIT_SECONDS)
+        handle = service.handles.get(handle_id, wait_seconds)
+        if handle is None:
+            return jsonify({"error": f"Unknown proof handle {handle_id}."}), 404
+        return jsonify(handle)
+
+    @app.route('/status')
+    def get_status():
+        return jsonify({'model': service.registry.current().describe(), 'in_flight': service.registry.in_flight(),
+                        'pending_proofs': service.handles.pending()})
+
+    @app.route('/admin/reload', methods=['POST'])
+    def reload_model():
+        try:
+            bundle, swapped = service.registry.reload(force=request.args.get('force', '0') in ('1', 'true', 'yes'))
+        except Exception as e:
+            traceback.print_exc()
+            return jsonify({"error": f"Reload failed, still serving {service.registry.current().version}: {e}"}), 500
+        return jsonify({'version': bundle.version, 'swapped': swapped})
+
+    @app.route('/metrics')
+    def get_metrics():
+        return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+    return app
+
+
+# --- Main execution ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve ML predictions with background ZK proofs and model hot-reload.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5002)
+    parser.add_argument("--provers", type=int, default=2, help="Proofs generated concurrently.")
+    parser.add_argument("--poll-seconds", type=float, default=10.0, help="How often model and artifact files are checked.")
+    parser.add_argument("--no-watch", action="store_true", help="Only reload through POST /admin/reload.")
+    parser.add_argument("--log-on-chain", action="store_true",
+                        help="Log verified proofs on chain (or to the Merkle store with CHAIN_LOGGING_MODE=merkle).")
+    args = parser.parse_args()
+
+    pipeline = script_loader.load_pipeline()
+    committed = cfg.PUBLIC_INPUT_MODE == "commitment"
+    if cfg.PROVER.missing_executables():
+        print(f"Warning: prover executables not found: {cfg.PROVER.missing_executables()}")
+
+    chain = None
+    window_store = None
+    if args.log_on_chain:
+        if cfg.CHAIN_LOGGING_MODE == "merkle":
+            window_store = merkle_store.MerkleStore(cfg.MERKLE_STORE_PATH, cfg.MERKLE_WINDOW_SECONDS)
+            chain = (None, None, None)
+            print(f"Verified proofs go to Merkle windows in {cfg.MERKLE_STORE_PATH}; "
+                  "publish roots with pipeline_scripts/16_publish_merkle_roots.py.")
+        else:
+            w3, contract, account = pipeline.connect_to_chain()
+            if w3:
+                chain = (w3, contract, account)
+            else:
+                print("Warning: no blockchain connection; proofs will not be logged on chain.")
+
+    def on_reload(previous, bundle):
+        print(f"Model version {previous.version} -> {bundle.version}; in flight: {registry.in_flight()}")
+        if chain is not None and window_store is None and cfg.PROOF_SYSTEM != "groth16" and bundle.extra['circuit_id']:
+            pipeline.ensure_verification_key_registered(chain[0], chain[1], chain[2], bundle.paths["vkey"], cfg.PROOF_SYSTEM)
+
+    registry = model_registry.ModelRegistry(lambda: load_bundle(pipeline, committed), lambda: watched_paths(committed),
+                                            args.poll_seconds, on_reload)
+    bundle = registry.current()
+    print(f"Serving model version {bundle.version} (circuit {bundle.extra['circuit_id'] or 'not built'}), "
+          f"prover {cfg.PROVER.name}, proof system {cfg.PROOF_SYSTEM}")
+    if not args.no_watch:
+        registry.start_watching()
+
+    service = PredictionService(pipeline, registry, committed, args.provers, chain, window_store)
+    create_app(service).run(host=args.host, port=args.port, threaded=True)
@@ -0,0 +1,73 @@
+# pipeline_scripts/18_machine_history.py
+"""
+Prints one machine's on-chain prediction history from PredictionLogger's per-UDI index
+(machine_history.py), newest first, without scanning the fleet's PredictionLogged events.
+
+    python pipeline_scripts/18_machine_history.py 50               # latest 20 records of UDI 50
+    python pipeline_scripts/18_machine_history.py 50 --all --json  # every record, as JSON lines
+    python pipeline_scripts/18_machine_history.py 50 --latest
+"""
+import argparse
+import json
+import os
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+import config_loader as cfg
+import machine_history
+import script_loader
+
+# --- Configuration ---
+
+
+def format_record(record):
+    prediction = "Failure (1)" if record['predicted_class'] == 1 else "No Failure (0)"
+    inputs = f"commitment {record['feature_commitment']}" if record['feature_commitment'] else \
+        f"inputs [{', '.join(record['public_inputs'])}]"
+    notes = f"batch #{record['batch_id']}: {record['notes']}" if record['batch_id'] is not None else record['notes']
+    return f"Record {record['record_id']}: {record['timestamp_utc']}, {prediction}, {inputs}, notes: {notes}"
+
+
+# --- Main execution ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Read one machine's prediction history from the contract's per-UDI index.")
+    parser.add_argument("udi", type=int, help="Machine UDI.")
+    parser.add_argument("--limit", type=int, default=20, help="Records to print (default 20).")
+    parser.add_argument("--offset", type=int, default=0, help="Records to skip from the newest (or oldest) one.")
+    parser.add_argument("--oldest-first", action="store_true", help="Page from the first record onwards.")
+    parser.add_argument("--all", action="store_true", help="Print every record, one page at a time.")
+    parser.add_argument("--latest", action="store_true", help="Print only the most recent record.")
+    parser.add_argument("--json", action="store_true", help="Print records as JSON lines.")
+    args = parser.parse_args()
+
+    pipeline = script_loader.load_pipeline()
+    w3, contract, _ = pipeline.connect_to_chain()
+    if not w3:
+        print("Error: no blockchain connection.")
+        sys.exit(1)
+
+    def emit(record):
+        print(json.dumps(record) if args.json else format_record(record))
+
+    if args.latest:
+        record = machine_history.latest_record(contract, args.udi)
+        if record is None:
+            print(f"No on-chain record found for UDI {args.udi}.")
+            sys.exit(1)
+        emit(record)
+        sys.exit(0)
+
+    offset, printed = args.offset, 0
+    while True:
+        page_size = machine_history.MAX_PAGE_SIZE if args.all else min(args.limit - printed, machine_history.MAX_PAGE_SIZE)
+        history = machine_history.machine_history(contract, args.udi, offset, page_size,
+                                                  newest_first=not args.oldest_first)
+        for record in history['records']:
+            emit(record)
+        printed += len(history['records'])
+        offset += len(history['records'])
+        if not history['records'] or offset >= history['total'] or (not args.all and printed >= args.limit):
+            break
+    if not args.json:
+        print(f"\nUDI {args.udi}: printed {printed} of {history['total']} on-chain records.")
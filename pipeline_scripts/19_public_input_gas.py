@@ -0,0 +1,171 @@
+# pipeline_scripts/19_public_input_gas.py
+"""
+Gas comparison of unpacked and packed public inputs (public_input_packing.py) on a local EVM.
+
+Deploys PredictionLogger on an in-process eth-tester chain (or a dev node, --rpc-url), then logs the same
+dataset samples with logPrediction and logPackedPrediction, and one batch with logPredictionBatch and
+logPackedPredictionBatch. Proofs are random words: the contract stores proofs without verifying them, so
+only the input encoding differs between the runs. Reports gas and calldata bytes per record, checks that
+getPublicInputs returns each sample's original inputs and that the contract's unpackPublicInputs matches
+the Python unpacker, and writes the numbers to runtime_outputs/benchmark/.
+
+Needs the compiled contract, as for 11_benchmark_pipeline.py (py-solc-x with a local solc, or
+--contract-artifact).
+"""
+import argparse
+import contextlib
+import json
+import os
+import secrets
+import sys
+from datetime import datetime, timezone
+
+import joblib
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+import config_loader as cfg
+import dataset_cache
+import public_input_packing
+import script_loader
+
+# --- Configuration ---
+BENCHMARK_SCRIPT_PATH = os.path.join(PROJECT_ROOT, "pipeline_scripts", "11_benchmark_pipeline.py")
+BENCHMARK_OUTPUT_DIR = os.path.join(PROJECT_ROOT, "runtime_outputs", "benchmark")
+TX_NOTES = "Gas comparison record"
+
+
+def sample_public_inputs(pipeline, df_original, scaler, sample_indices):
+    """Each sample's 8 circuit inputs as public-signal field elements, as they appear in public.json."""
+    rows = []
+    for sample_idx in sample_indices:
+        _, _, circuit_input_array = pipeline.prepare_input_for_circuit(
+            df_original, sample_idx, scaler, cfg.FEATURE_NAMES_ORDER,
+            cfg.NUMERICAL_FEATURES_FOR_SCALING, cfg.FIXED_POINT_MULTIPLIER, None
+        )
+        rows.append([public_input_packing.to_field(int(value)) for value in circuit_input_array])
+    return rows
+
+
+def random_proof():
+    """pi_a, pi_b, pi_c filled with random field elements (the contract does not verify them)."""
+    word = lambda: secrets.randbelow(public_input_packing.SNARK_SCALAR_FIELD)
+    return [word(), word()], [[word(), word()], [word(), word()]], [word(), word()]
+
+
+def calldata_cost(w3, tx_hash):
+    """(bytes, gas) of a transaction's calldata: 4 gas per zero byte, 16 per non-zero byte."""
+    data = bytes(w3.eth.get_transaction(tx_hash)['input'])
+    zero_bytes = data.count(0)
+    return len(data), 4 * zero_bytes + 16 * (len(data) - zero_bytes)
+
+
+def send(pipeline, w3, account, contract_call, label):
+    tx_hash, receipt = pipeline.send_contract_transaction(w3, account, contract_call, label, gas_limit=10000000)
+    if receipt.status != 1:
+        raise RuntimeError(f"{label} reverted (tx {tx_hash.hex()})")
+    calldata_bytes, calldata_gas = calldata_cost(w3, tx_hash)
+    return {"gas": receipt.gasUsed, "calldata_bytes": calldata_bytes, "calldata_gas": calldata_gas}
+
+
+def per_record(results, records):
+    return {key: round(sum(result[key] for result in results) / records, 1) for key in results[0]}
+
+
+def check_public_inputs(contract, first_record_id, public_inputs):
+    """Number of records whose getPublicInputs differs from the inputs they were logged with."""
+    return sum(1 for offset, inputs in enumerate(public_inputs)
+               if [int(value) for value in contract.functions.getPublicInputs(first_record_id + offset).call()] != inputs)
+
+
+# --- Main execution ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare gas for unpacked and packed public inputs on a local chain.")
+    parser.add_argument("--samples", type=int, default=20, help="Records logged one per transaction in each mode.")
+    parser.add_argument("--batch-size", type=int, default=8, help="Records in the batched comparison (0 = skip).")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for picking the sample rows.")
+    parser.add_argument("--rpc-url", default=None, help="Local dev node instead of the in-process chain.")
+    parser.add_argument("--contract-artifact", default=None, help="Compiled PredictionLogger JSON (abi + bytecode).")
+    parser.add_argument("--verbose", action="store_true", help="Keep the per-transaction output.")
+    args = parser.parse_args()
+
+    pipeline = script_loader.load_pipeline()
+    benchmark = script_loader.load_script(BENCHMARK_SCRIPT_PATH, "benchmark_pipeline")
+    df_original = dataset_cache.load_dataset(cfg.DATASET_PATH)
+    scaler = joblib.load(cfg.SCALER_PATH)
+    rng = np.random.default_rng(args.seed)
+    sample_indices = rng.choice(len(df_original), size=min(max(args.samples, args.batch_size), len(df_original)),
+                                replace=False).tolist()
+    public_inputs = sample_public_inputs(pipeline, df_original, scaler, sample_indices)
+    udis = [int(df_original.iloc[sample_idx]['UDI']) for sample_idx in sample_indices]
+    predicted_classes = [int(value) for value in rng.integers(0, 2, size=len(sample_indices))]
+
+    abi, bytecode = benchmark.load_contract_artifact(args.contract_artifact)
+    w3 = benchmark.connect_local_chain(args.rpc_url)
+    print(f"Local chain ready. Chain ID: {w3.eth.chain_id}")
+    account = benchmark.create_funded_account(w3)
+    contract = benchmark.deploy_contract(w3, account, abi, bytecode)
+
+    unpack_mismatches = sum(1 for inputs in public_inputs if [int(value) for value in contract.functions.unpackPublicInputs(
+        public_input_packing.pack_public_inputs(inputs)).call()] != inputs)
+
+    results = {"single": {"unpacked": [], "packed": []}, "batch": {}}
+    read_mismatches = 0
+    output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(open(os.devnull, 'w'))
+    with output:
+        for mode in ("unpacked", "packed"):
+            first_record_id = contract.functions.recordCount().call()
+            for udi, predicted_class, inputs in zip(udis[:args.samples], predicted_classes, public_inputs):
+                pi_a, pi_b, pi_c = random_proof()
+                if mode == "packed":
+                    contract_call = contract.functions.logPackedPrediction(
+                        udi, predicted_class, public_input_packing.pack_public_inputs(inputs), pi_a, pi_b, pi_c, TX_NOTES)
+                else:
+                    contract_call = contract.functions.logPrediction(udi, predicted_class, inputs, pi_a, pi_b, pi_c, TX_NOTES)
+                results["single"][mode].append(send(pipeline, w3, account, contract_call, f"{mode} UDI {udi}"))
+            read_mismatches += check_public_inputs(contract, first_record_id, public_inputs[:args.samples])
+
+        if args.batch_size > 0:
+            batch = slice(0, args.batch_size)
+            for mode in ("unpacked", "packed"):
+                first_record_id = contract.functions.recordCount().call()
+                pi_a, pi_b, pi_c = random_proof()
+                if mode == "packed":
+                    contract_call = contract.functions.logPackedPredictionBatch(
+                        udis[batch], predicted_classes[batch],
+                        [public_input_packing.pack_public_inputs(inputs) for inputs in public_inputs[batch]],
+                        pi_a, pi_b, pi_c, TX_NOTES)
+                else:
+                    contract_call = contract.functions.logPredictionBatch(
+                        udis[batch], predicted_classes[batch], public_inputs[batch], pi_a, pi_b, pi_c, TX_NOTES)
+                results["batch"][mode] = [send(pipeline, w3, account, contract_call, f"{mode} batch")]
+                read_mismatches += check_public_inputs(contract, first_record_id, public_inputs[batch])
+
+    report = {
+        "run_id": datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ"),
+        "chain": args.rpc_url or "eth-tester",
+        "samples": min(args.samples, len(sample_indices)),
+        "batch_size": args.batch_size,
+        "single": {mode: per_record(values, len(values)) for mode, values in results["single"].items() if values},
+        "batch": {mode: per_record(values, args.batch_size) for mode, values in results["batch"].items()},
+        "unpack_mismatches": unpack_mismatches,
+        "read_mismatches": read_mismatches,
+    }
+
+    print("\n--- Public Input Gas Comparison (per record) ---")
+    print(f"{'':<20}{'gas':>12}{'calldata bytes':>16}{'calldata gas':>14}")
+    for kind in ("single", "batch"):
+        for mode, values in report[kind].items():
+            print(f"{kind + ' ' + mode:<20}{values['gas']:>12}{values['calldata_bytes']:>16}{values['calldata_gas']:>14}")
+        if len(report[kind]) == 2:
+            print(f"{kind} packed/unpacked gas: {report[kind]['packed']['gas'] / report[kind]['unpacked']['gas']:.2f}")
+    print(f"Contract unpack mismatches: {unpack_mismatches}, getPublicInputs mismatches: {read_mismatches}")
+
+    os.makedirs(BENCHMARK_OUTPUT_DIR, exist_ok=True)
+    report_path = os.path.join(BENCHMARK_OUTPUT_DIR, f"public_input_gas_{report['run_id']}.json")
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport written to {report_path}")
+    if unpack_mismatches or read_mismatches:
+        sys.exit(1)
@@ -0,0 +1,194 @@
+# poseidon_hash.py
+"""
+Native Python Poseidon hash over the BN254 scalar field, matching circomlib's Poseidon(nInputs) template.
+
+Round constants and the MDS matrix are derived with the Grain LFSR procedure from the Poseidon reference
+implementation (the same procedure circomlib's constants come from), so no constant tables are shipped here.
+Checked against circomlib: poseidon([1, 2]) ==
+7853200120776062878684798364095072458815029376092732009249414926327459813530.
+"""
+import secrets
+from functools import lru_cache
+from multiprocessing import Pool
+
+SNARK_SCALAR_FIELD = 21888242871839275222246405745257275088548364400416034343698204186575808495617
+
+N_ROUNDS_F = 8
+# Partial rounds for state widths t = 2..17 (circomlib's N_ROUNDS_P)
+N_ROUNDS_P = [56, 57, 56, 60, 60, 63, 64, 63, 60, 66, 60, 65, 70, 60, 64, 68]
+
+BULK_CHUNK_SIZE = 256 # Rows per worker task in poseidon_many
+
+
+def _grain_bits(t, n_rounds_f, n_rounds_p):
+    """Yields the self-shrinking Grain LFSR bit stream seeded with the Poseidon instance parameters."""
+    # field=1 (prime field), sbox=0 (x^5), n=254 bits, then t, R_F, R_P and 30 ones
+    seed = format(1, '02b') + format(0, '04b') + format(254, '012b') + format(t, '012b') + \
+        format(n_rounds_f, '010b') + format(n_rounds_p, '010b')
+    state = [int(b) for b in seed] + [1] * 30
+
+    def step():
+        new_bit = state[62] ^ state[51] ^ state[38] ^ state[23] ^ state[13] ^ state[0]
+        state.pop(0)
+        state.append(new_bit)
+        return new_bit
+
+    for _ in range(160):
+        step()
+    while True:
+        # Bits are taken in pairs; the second bit is emitted only when the first one is 1
+        first_bit = step()
+        while first_bit == 0:
+            step()
+            first_bit = step()
+        yield step()
+
+
+@lru_cache(maxsize=None)
+def _poseidon_params(t):
+    """Returns (per-round constants, mds_matrix, n_rounds_p) for state width t, generated once per width."""
+    if not 2 <= t <= len(N_ROUNDS_P) + 1:
+        raise ValueError(f"Poseidon supports 1 to {len(N_ROUNDS_P)} inputs, got {t - 1}")
+    n_rounds_p = N_ROUNDS_P[t - 2]
+    bits = _grain_bits(t, N_ROUNDS_F, n_rounds_p)
+
+    def random_field_bits():
+        value = 0
+        for _ in range(254):
+            value = (value << 1) | next(bits)
+        return value
+
+    round_constants = []
+    for _ in range((N_ROUNDS_F + n_rounds_p) * t):
+        value = random_field_bits()
+        while value >= SNARK_SCALAR_FIELD: # Rejection sampling keeps the constants uniform
+            value = random_field_bits()
+        round_constants.append(value)
+
+    # Cauchy MDS matrix M[i][j] = 1 / (x_i + y_j)
+    xs_and_ys = [random_field_bits() % SNARK_SCALAR_FIELD for _ in range(2 * t)]
+    xs, ys = xs_and_ys[:t], xs_and_ys[t:]
+    mds_matrix = [[pow((xs[i] + ys[j]) % SNARK_SCALAR_FIELD, SNARK_SCALAR_FIELD - 2, SNARK_SCALAR_FIELD)
+                   for j in range(t)] for i in range(t)]
+    round_constants_by_round = [round_constants[r * t:(r + 1) * t] for r in range(N_ROUNDS_F + n_rounds_p)]
+    return round_constants_by_round, mds_matrix, n_rounds_p
+
+
+def _invert_matrix(matrix):
+    """Inverse of a square matrix over the field (Gauss-Jordan elimination)."""
+    p = SNARK_SCALAR_FIELD
+    n = len(matrix)
+    rows = [list(row) + [int(i == j) for j in range(n)] for i, row in enumerate(matrix)]
+    for col in range(n):
+        pivot = next(r for r in range(col, n) if rows[r][col] % p)
+        rows[col], rows[pivot] = rows[pivot], rows[col]
+        inverse = pow(rows[col][col], p - 2, p)
+        rows[col] = [x * inverse % p for x in rows[col]]
+        for r in range(n):
+            if r != col and rows[r][col]:
+                factor = rows[r][col]
+                rows[r] = [(x - factor * y) % p for x, y in zip(rows[r], rows[col])]
+    return [row[n:] for row in rows]
+
+
+def _mat_mul(a, b):
+    p = SNARK_SCALAR_FIELD
+    return [[sum(a[i][k] * b[k][j] for k in range(len(b))) % p for j in range(len(b[0]))] for i in range(len(a))]
+
+
+@lru_cache(maxsize=None)
+def _poseidon_fast_params(t):
+    """
+    The same permutation as _poseidon_params(t), rewritten so each partial round costs O(t) instead of
+    O(t^2) (the Poseidon paper's optimisation, Appendix B):
+    - partial-round constants on state[1:] commute with the S-box, so they are pushed forward through
+      the MDS matrix into the next round, leaving one constant per partial round;
+    - each partial round's matrix is split as sparse * diag(1, X); diag(1, X) leaves state[0] alone, so
+      it commutes with that round's S-box and is folded into the previous round's matrix.
+    Returns (full-round constants, full-round matrices, partial-round constants, sparse partial matrices).
+    """
+    round_constants, mds_matrix, n_rounds_p = _poseidon_params(t)
+    p = SNARK_SCALAR_FIELD
+    half_full = N_ROUNDS_F // 2
+    constants = [list(c) for c in round_constants]
+    for r in range(half_full, half_full + n_rounds_p):
+        carried = [0] + constants[r][1:]
+        constants[r] = [constants[r][0]] + [0] * (t - 1)
+        pushed = [sum(m * c for m, c in zip(row, carried)) % p for row in mds_matrix]
+        constants[r + 1] = [(c + d) % p for c, d in zip(constants[r + 1], pushed)]
+
+    # Walk the partial rounds backwards, splitting M_eff = A * diag(1, X) and passing diag(1, X) back
+    sparse_matrices = []
+    effective = mds_matrix
+    for _ in range(n_rounds_p):
+        x_block = [row[1:] for row in effective[1:]]
+        x_inverse = _invert_matrix(x_block)
+        a_row = [sum(effective[0][1 + k] * x_inverse[k][j] for k in range(t - 1)) % p for j in range(t - 1)]
+        a_col = [effective[1 + i][0] for i in range(t - 1)]
+        sparse_matrices.append((effective[0][0], a_row, a_col))
+        diag_block = [[1] + [0] * (t - 1)] + [[0] + row for row in x_block]
+        effective = _mat_mul(diag_block, mds_matrix)
+    sparse_matrices.reverse()
+    full_matrices = [mds_matrix] * N_ROUNDS_F
+    full_matrices[half_full - 1] = effective # The last full round before the partial rounds absorbs the rest
+    full_constants = constants[:half_full] + constants[half_full + n_rounds_p:]
+    partial_constants = [c[0] for c in constants[half_full:half_full + n_rounds_p]]
+    return full_constants, full_matrices, partial_constants, sparse_matrices
+
+
+def to_field(value):
+    """Maps a (possibly negative) integer to its BN254 field representation, as circom and snarkjs do."""
+    return int(value) % SNARK_SCALAR_FIELD
+
+
+def poseidon(inputs):
+    """Hashes a list of 1..16 integers exactly like circomlib's Poseidon(len(inputs)) component."""
+    t = len(inputs) + 1
+    full_constants, full_matrices, partial_constants, sparse_matrices = _poseidon_fast_params(t)
+    p = SNARK_SCALAR_FIELD
+    half_full = N_ROUNDS_F // 2
+
+    state = [0] + [to_field(x) for x in inputs]
+    for r in range(half_full):
+        state = [pow(x + c, 5, p) for x, c in zip(state, full_constants[r])]
+        state = [sum(map(int.__mul__, row, state)) % p for row in full_matrices[r]]
+    for constant, (a00, a_row, a_col) in zip(partial_constants, sparse_matrices):
+        first = pow(state[0] + constant, 5, p)
+        rest = state[1:]
+        state = [(a00 * first + sum(map(int.__mul__, a_row, rest))) % p] + \
+            [(c * first + x) % p for c, x in zip(a_col, rest)]
+    for r in range(half_full, N_ROUNDS_F):
+        state = [pow(x + c, 5, p) for x, c in zip(state, full_constants[r])]
+        state = [sum(map(int.__mul__, row, state)) % p for row in full_matrices[r]]
+    return state[0]
+
+
+def commit_features(features, salt=0):
+    """Poseidon commitment to a circuit feature vector: Poseidon(features..., salt)."""
+    return poseidon(list(features) + [salt])
+
+
+def random_salt():
+    """Returns a uniformly random field element to blind a feature commitment."""
+    return secrets.randbelow(SNARK_SCALAR_FIELD)
+
+
+def poseidon_rows(rows, processes=None):
+    """
+    Hashes many input lists at once (poseidon(row) for each row), spreading the work over a process pool.
+    Small inputs are hashed in-process, where pool start-up would cost more than it saves.
+    """
+    rows = [list(row) for row in rows]
+    if len(rows) <= BULK_CHUNK_SIZE:
+        return [poseidon(row) for row in rows]
+    with Pool(processes=processes) as pool:
+        return pool.map(poseidon, rows, chunksize=BULK_CHUNK_SIZE)
+
+
+def poseidon_many(feature_rows, salts=None, processes=None):
+    """Computes commit_features for many rows at once (see poseidon_rows)."""
+    if salts is None:
+        salts = [0] * len(feature_rows)
+    if len(feature_rows) != len(salts):
+        raise ValueError(f"Got {len(feature_rows)} feature rows but {len(salts)} salts")
+    return poseidon_rows([list(features) + [salt] for features, salt in zip(feature_rows, salts)], processes)
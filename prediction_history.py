@@ -0,0 +1,225 @@
+# prediction_history.py
+"""
+Indexed copy of the pipeline's results CSV for bulk export (the dashboard's /api/export).
+
+Rows appended to the CSV are copied into a typed SQLite table as they arrive, tailing the file from a
+stored byte offset (csv_tailer.py); the dashboard does this on a background thread, so an export
+request never ingests. Exports page through the table by key (history_id), holding
+the lock for one page at a time, and encode each page as it is read. NDJSON needs nothing extra; Arrow
+IPC (stream format) and Parquet (one row group per page) need pyarrow. Server memory is bounded by the
+page size, whatever the length of the history, and no chain calls are made.
+"""
+import io
+import json
+from datetime import datetime, timezone
+
+from csv_tailer import CsvTailStore, float_or_none, int_or_none
+
+EXPORT_FORMATS = ('ndjson', 'arrow', 'parquet')
+MEDIA_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'arrow': 'application/vnd.apache.arrow.stream',
+    'parquet': 'application/vnd.apache.parquet',
+}
+FILE_EXTENSIONS = {'ndjson': 'ndjson', 'arrow': 'arrows', 'parquet': 'parquet'}
+
+# (column, SQLite type, Arrow type name); the CSV columns of 08's log_to_csv plus the index key and parsed time
+COLUMNS = (
+    ('history_id', 'INTEGER', 'int64'),
+    ('run_timestamp_utc', 'TEXT', 'string'),
+    ('timestamp', 'REAL', 'float64'),
+    ('sample_udi', 'INTEGER', 'int64'),
+    ('sample_index', 'INTEGER', 'int64'),
+    ('actual_label', 'INTEGER', 'int8'),
+    ('ml_prediction', 'INTEGER', 'int8'),
+    ('circuit_prediction', 'INTEGER', 'int8'),
+    ('inputs_for_circuit', 'TEXT', 'string'),
+    ('zkp_time_seconds', 'REAL', 'float64'),
+    ('local_zkp_verified', 'INTEGER', 'bool_'),
+    ('blockchain_tx_hash', 'TEXT', 'string'),
+    ('gas_used', 'INTEGER', 'int64'),
+    ('tx_status', 'TEXT', 'string'),
+    ('notes', 'TEXT', 'string'),
+)
+COLUMN_NAMES = [name for name, _, _ in COLUMNS]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    history_id INTEGER PRIMARY KEY,
+    %s
+);
+CREATE INDEX IF NOT EXISTS predictions_timestamp ON predictions (timestamp);
+CREATE INDEX IF NOT EXISTS predictions_udi ON predictions (sample_udi, timestamp);
+""" % ",\n    ".join(f"{name} {sql_type}" for name, sql_type, _ in COLUMNS[1:])
+
+
+def parse_time(value):
+    """Epoch seconds from an ISO-8601 string (naive means UTC) or a number; None for empty values."""
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def _bool_or_none(value):
+    text = str(value).strip().lower()
+    if text in ('true', '1'):
+        return 1
+    if text in ('false', '0'):
+        return 0
+    return None
+
+
+def _row_values(record):
+    try:
+        timestamp = parse_time(record.get('run_timestamp_utc'))
+    except ValueError:
+        timestamp = None
+    return (
+        record.get('run_timestamp_utc') or None,
+        timestamp,
+        int_or_none(record.get('sample_udi')),
+        int_or_none(record.get('sample_index')),
+        int_or_none(record.get('actual_label')),
+        int_or_none(record.get('ml_prediction')),
+        int_or_none(record.get('circuit_prediction')),
+        record.get('inputs_for_circuit') or None,
+        float_or_none(record.get('zkp_time_seconds')),
+        _bool_or_none(record.get('local_zkp_verified')),
+        record.get('blockchain_tx_hash') or None,
+        int_or_none(record.get('gas_used')),
+        record.get('tx_status') or None,
+        record.get('notes') or None,
+    )
+
+
+class PredictionHistory(CsvTailStore):
+    """Thread-safe history index at path."""
+
+    NAME = "Prediction history"
+    TABLES = ('predictions',)
+
+    def __init__(self, path):
+        super().__init__(path, _SCHEMA)
+
+    def _apply_rows(self, records):
+        self._conn.executemany(
+            f"INSERT INTO predictions ({', '.join(COLUMN_NAMES[1:])}) "
+            f"VALUES ({', '.join('?' * (len(COLUMN_NAMES) - 1))})",
+            [_row_values(record) for record in records])
+
+    def pages(self, start=None, end=None, udis=None, after_id=None, page_rows=10000):
+        """
+        Yields the matching rows in history_id order, page_rows at a time, as lists of tuples in
+        COLUMN_NAMES order. start/end are epoch seconds (end exclusive); udis is a collection of UDIs;
+        after_id resumes an earlier export after its last history_id.
+        """
+        conditions, parameters = ["history_id > ?"], []
+        if start is not None:
+            conditions.append("timestamp >= ?")
+            parameters.append(start)
+        if end is not None:
+            conditions.append("timestamp < ?")
+            parameters.append(end)
+        if udis:
+            udis = sorted(set(int(udi) for udi in udis))
+            conditions.append(f"sample_udi IN ({', '.join('?' * len(udis))})")
+            parameters.extend(udis)
+        query = (f"SELECT {', '.join(COLUMN_NAMES)} FROM predictions WHERE {' AND '.join(conditions)} "
+                 f"ORDER BY history_id LIMIT ?")
+        last_id = after_id or 0
+        if start is not None: # Rows are appended roughly in time order: skip straight to the first match
+            with self._lock:
+                first = self._conn.execute("SELECT MIN(history_id) FROM predictions WHERE timestamp >= ?",
+                                           (start,)).fetchone()[0]
+            if first is None:
+                return
+            last_id = max(last_id, first - 1)
+        while True:
+            with self._lock: # Released between pages so ingestion and other requests are not blocked
+                page = [tuple(row) for row in self._conn.execute(query, [last_id, *parameters, page_rows])]
+            if not page:
+                return
+            yield page
+            last_id = page[-1][0]
+            if len(page) < page_rows:
+                return
+
+
+def _row_dict(row):
+    record = dict(zip(COLUMN_NAMES, row))
+    if record['local_zkp_verified'] is not None:
+        record['local_zkp_verified'] = bool(record['local_zkp_verified'])
+    return record
+
+
+def _import_pyarrow(format_name):
+    try:
+        import pyarrow as pa
+    except ImportError as e:
+        raise ImportError(f"Exporting {format_name} requires pyarrow (pip install pyarrow); use format=ndjson instead.") from e
+    return pa
+
+
+def _arrow_schema(pa):
+    return pa.schema([(name, getattr(pa, type_name)()) for name, _, type_name in COLUMNS])
+
+
+def _arrow_batch(pa, schema, page):
+    columns = list(zip(*page))
+    columns[COLUMN_NAMES.index('local_zkp_verified')] = [
+        None if value is None else bool(value) for value in columns[COLUMN_NAMES.index('local_zkp_verified')]]
+    return pa.record_batch([pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                           schema=schema)
+
+
+def _drain(sink):
+    data = sink.getvalue()
+    sink.seek(0)
+    sink.truncate()
+    return data
+
+
+def encode_pages(pages, format_name):
+    """
+    Encodes pages (from PredictionHistory.pages) as a stream of byte chunks, one or more per page:
+    NDJSON lines, an Arrow IPC stream (one record batch per page) or a Parquet file (one row group
+    per page). Raises ImportError before anything is produced if the format needs pyarrow.
+    """
+    if format_name not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {format_name!r}; expected one of {EXPORT_FORMATS}")
+    if format_name == 'ndjson':
+        return (''.join(json.dumps(_row_dict(row)) + '\n' for row in page).encode() for page in pages)
+    pa = _import_pyarrow(format_name)
+    if format_name == 'parquet':
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Exporting parquet requires pyarrow built with Parquet support.") from e
+    else:
+        pq = None
+    return _encode_arrow_pages(pages, pa, pq)
+
+
+def _encode_arrow_pages(pages, pa, pq):
+    schema = _arrow_schema(pa)
+    sink = io.BytesIO()
+    writer = pq.ParquetWriter(sink, schema) if pq else pa.ipc.new_stream(sink, schema)
+    try:
+        yield _drain(sink) # Arrow stream schema message / Parquet magic, so an empty export is still valid
+        for page in pages:
+            batch = _arrow_batch(pa, schema, page)
+            if pq:
+                writer.write_table(pa.Table.from_batches([batch]))
+            else:
+                writer.write_batch(batch)
+            yield _drain(sink)
+    finally:
+        writer.close()
+    yield _drain(sink) # End-of-stream marker / Parquet footer
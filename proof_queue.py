@@ -0,0 +1,237 @@
+# proof_queue.py
+"""
+Durable work queue for distributed proving (SQLite, one row per sample and circuit).
+
+A coordinator (pipeline_scripts/14_proof_coordinator.py) enqueues prepared circuit inputs; workers
+(pipeline_scripts/15_proof_worker.py), on this or other machines, lease one job at a time, prove and
+verify it and store the proof back; the coordinator then submits proven jobs from a single account,
+so only one process ever allocates nonces.
+
+Jobs carry the job class, priority and deadline assigned by proof_scheduler.py and are leased and
+submitted earliest deadline first. A job moves through queued -> leased -> proved -> submitted -> done. A lease expires after
+lease_seconds unless the worker renews it (heartbeat), after which another worker may take the job;
+failed or expired attempts are retried until max_attempts, then the job is marked failed. The first
+result stored for a job wins, so a slow worker whose lease expired cannot overwrite a newer proof.
+
+Every state change is a single IMMEDIATE transaction, so any number of processes can share the file.
+Workers on other machines need the database on a filesystem with working POSIX locks (a local disk,
+or a network share that supports them).
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+STATUSES = ('queued', 'leased', 'proved', 'submitted', 'done', 'failed')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    circuit_id TEXT NOT NULL,
+    udi INTEGER NOT NULL,
+    sample_index INTEGER,
+    input_json TEXT NOT NULL,
+    context TEXT,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker_id TEXT,
+    lease_expires_at REAL,
+    proof_json TEXT,
+    public_json TEXT,
+    local_zkp_verified INTEGER,
+    zkp_time_seconds REAL,
+    tx_hash TEXT,
+    error TEXT,
+    job_class TEXT NOT NULL DEFAULT 'routine',
+    priority INTEGER NOT NULL DEFAULT 0,
+    deadline_at REAL NOT NULL DEFAULT 0,
+    enqueued_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    UNIQUE (circuit_id, udi)
+);
+"""
+# Columns added after the first release, for queue files created before them
+_ADDED_COLUMNS = {
+    'job_class': "TEXT NOT NULL DEFAULT 'routine'",
+    'priority': "INTEGER NOT NULL DEFAULT 0",
+    'deadline_at': "REAL NOT NULL DEFAULT 0",
+}
+_INDEXES = """
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, circuit_id, job_id);
+CREATE INDEX IF NOT EXISTS jobs_schedule ON jobs (status, circuit_id, deadline_at, priority);
+"""
+# Lease and submission order: earliest deadline first, then class priority, then arrival (see proof_scheduler.py)
+_SCHEDULE_ORDER = " ORDER BY deadline_at, priority DESC, job_id"
+
+
+def _decode(row):
+    if row is None:
+        return None
+    job = dict(row)
+    job['context'] = json.loads(job['context']) if job['context'] else {}
+    return job
+
+
+class ProofQueue:
+    """Queue database at path (created on first use); one instance per process, shared by its threads."""
+
+    def __init__(self, path, lease_seconds=300, max_attempts=3):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        # timeout: wait for another process's write transaction instead of failing with "database is locked"
+        self._conn = sqlite3.connect(path, timeout=60, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        existing = {row['name'] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column, definition in _ADDED_COLUMNS.items():
+            if column not in existing:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {definition}")
+        self._conn.executescript(_INDEXES)
+
+    def _transaction(self, work):
+        """Runs work(conn) inside BEGIN IMMEDIATE ... COMMIT, so concurrent writers are serialised."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = work(self._conn)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return result
+
+    # --- Coordinator side ---
+    def enqueue(self, jobs):
+        """
+        Adds jobs (dicts with circuit_id, udi, sample_index, input and optional context, job_class,
+        priority and deadline_at) that are not in the queue yet for their circuit. Returns the UDIs added.
+        """
+        now = time.time()
+
+        def work(conn):
+            added = []
+            for job in jobs:
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO jobs (circuit_id, udi, sample_index, input_json, context, job_class, priority, "
+                    "deadline_at, enqueued_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (job['circuit_id'], int(job['udi']), job.get('sample_index'), json.dumps(job['input']),
+                     json.dumps(job.get('context') or {}, default=str), job.get('job_class', 'routine'),
+                     job.get('priority', 0), job.get('deadline_at', now), now, now))
+                if cursor.rowcount:
+                    added.append(int(job['udi']))
+            return added
+        return self._transaction(work)
+
+    def jobs_with_status(self, status, circuit_id=None):
+        """Jobs in status (e.g. 'proved': ready to submit), most urgent first."""
+        query = "SELECT * FROM jobs WHERE status = ?"
+        params = [status]
+        if circuit_id is not None:
+            query += " AND circuit_id = ?"
+            params.append(circuit_id)
+        with self._lock:
+            return [_decode(row) for row in self._conn.execute(query + _SCHEDULE_ORDER, params).fetchall()]
+
+    def mark_submitted(self, job_id, tx_hash):
+        self._set(job_id, 'submitted', tx_hash=tx_hash)
+
+    def mark_done(self, job_id):
+        self._set(job_id, 'done', error=None)
+
+    def return_to_proved(self, job_id, error=None):
+        """The transaction reverted or was dropped: submit the stored proof again."""
+        self._set(job_id, 'proved', tx_hash=None, error=error)
+
+    def retry_failed(self, circuit_id=None):
+        """Puts jobs that ran out of attempts back in the queue with a fresh attempt budget."""
+        query = "UPDATE jobs SET status = 'queued', attempts = 0, worker_id = NULL, updated_at = ? WHERE status = 'failed'"
+        params = [time.time()]
+        if circuit_id is not None:
+            query += " AND circuit_id = ?"
+            params.append(circuit_id)
+        return self._transaction(lambda conn: conn.execute(query, params).rowcount)
+
+    def _set(self, job_id, status, **fields):
+        assignments = ', '.join(f"{name} = ?" for name in ['status', 'updated_at'] + list(fields))
+        self._transaction(lambda conn: conn.execute(f"UPDATE jobs SET {assignments} WHERE job_id = ?",
+                                                    [status, time.time()] + list(fields.values()) + [job_id]))
+
+    # --- Worker side ---
+    def lease(self, worker_id, circuit_id=None, lease_seconds=None):
+        """
+        Takes the most urgent queued job (or one whose lease expired) for circuit_id and leases it to
+        worker_id. Expired jobs that used up max_attempts are marked failed instead. Returns the job or None.
+        """
+        lease_seconds = lease_seconds or self.lease_seconds
+
+        def work(conn):
+            now = time.time()
+            conn.execute("UPDATE jobs SET status = 'failed', error = 'Lease expired on the last attempt', updated_at = ? "
+                         "WHERE status = 'leased' AND lease_expires_at < ? AND attempts >= ?",
+                         (now, now, self.max_attempts))
+            query = ("SELECT job_id FROM jobs WHERE (status = 'queued' OR (status = 'leased' AND lease_expires_at < ?))")
+            params = [now]
+            if circuit_id is not None:
+                query += " AND circuit_id = ?"
+                params.append(circuit_id)
+            row = conn.execute(query + _SCHEDULE_ORDER + " LIMIT 1", params).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE jobs SET status = 'leased', worker_id = ?, lease_expires_at = ?, attempts = attempts + 1, "
+                         "updated_at = ? WHERE job_id = ?", (worker_id, now + lease_seconds, now, row['job_id']))
+            return _decode(conn.execute("SELECT * FROM jobs WHERE job_id = ?", (row['job_id'],)).fetchone())
+        return self._transaction(work)
+
+    def heartbeat(self, job_id, worker_id, lease_seconds=None):
+        """Extends worker_id's lease on the job; False if the lease was lost to another worker."""
+        lease_seconds = lease_seconds or self.lease_seconds
+        now = time.time()
+        return self._transaction(lambda conn: conn.execute(
+            "UPDATE jobs SET lease_expires_at = ?, updated_at = ? WHERE job_id = ? AND status = 'leased' AND worker_id = ?",
+            (now + lease_seconds, now, job_id, worker_id)).rowcount == 1)
+
+    def complete(self, job_id, worker_id, proof_json, public_json, local_zkp_verified, zkp_time_seconds):
+        """Stores the job's proof unless another attempt already did. Returns whether it was stored."""
+        return self._transaction(lambda conn: conn.execute(
+            "UPDATE jobs SET status = 'proved', worker_id = ?, proof_json = ?, public_json = ?, local_zkp_verified = ?, "
+            "zkp_time_seconds = ?, error = NULL, updated_at = ? WHERE job_id = ? AND status IN ('queued', 'leased')",
+            (worker_id, proof_json, public_json, int(bool(local_zkp_verified)), zkp_time_seconds, time.time(),
+             job_id)).rowcount == 1)
+
+    def fail(self, job_id, worker_id, error):
+        """Gives up worker_id's attempt: the job is queued again, or failed after max_attempts."""
+        return self._transaction(lambda conn: conn.execute(
+            "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END, error = ?, "
+            "lease_expires_at = NULL, updated_at = ? WHERE job_id = ? AND status = 'leased' AND worker_id = ?",
+            (self.max_attempts, str(error), time.time(), job_id, worker_id)).rowcount == 1)
+
+    # --- Both ---
+    def status_counts(self, circuit_id=None):
+        query = "SELECT status, COUNT(*) AS n FROM jobs"
+        params = ()
+        if circuit_id is not None:
+            query += " WHERE circuit_id = ?"
+            params = (circuit_id,)
+        with self._lock:
+            counts = {row['status']: row['n'] for row in self._conn.execute(query + " GROUP BY status", params)}
+        return {status: counts.get(status, 0) for status in STATUSES}
+
+    def class_counts(self, statuses=('queued',), circuit_id=None):
+        """Number of jobs per job class among those in statuses (e.g. the queue depth per class)."""
+        query = f"SELECT job_class, COUNT(*) AS n FROM jobs WHERE status IN ({', '.join('?' * len(statuses))})"
+        params = list(statuses)
+        if circuit_id is not None:
+            query += " AND circuit_id = ?"
+            params.append(circuit_id)
+        with self._lock:
+            return {row['job_class']: row['n'] for row in self._conn.execute(query + " GROUP BY job_class", params)}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,167 @@
+# proof_scheduler.py
+"""
+Priority and deadline-aware ordering of proof jobs, in front of witness generation and proving.
+
+Every sample is put in a job class when it is queued:
+    failure        the model predicts a failure (ml_prediction == 1)
+    high_wear      tool wear at or above high_tool_wear_min
+    priority_type  a machine Type listed in priority_types (e.g. H)
+    routine        everything else
+Each class has a latency target (seconds from queueing to on-chain attestation), which gives every job
+an absolute deadline. Jobs are served earliest deadline first, with the class order breaking ties.
+Failure predictions (30 s target by default) therefore jump ahead of routine readings (1 h), but a
+routine reading that has waited close to its own deadline is served before newer urgent work, so
+low-priority jobs cannot starve.
+
+PriorityScheduler orders jobs inside one process (08, the offline benchmark); proof_queue.py stores
+the same class and deadline with each job so distributed workers lease in the same order. Queue depth,
+wait time, end-to-end latency and deadline misses are exported per class (metrics.py), together with
+the targets, so a dashboard can show whether each class meets its target.
+
+This module must not import config_loader (config_loader imports it).
+"""
+import heapq
+import itertools
+import threading
+import time
+
+import metrics
+
+JOB_CLASSES = ("failure", "high_wear", "priority_type", "routine") # Highest priority first
+DEFAULT_LATENCY_TARGETS = {"failure": 30.0, "high_wear": 300.0, "priority_type": 900.0, "routine": 3600.0}
+LATENCY_BUCKETS = (1, 5, 10, 15, 30, 60, 120, 300, 600, 900, 1800, 3600, 7200, 14400)
+
+QUEUE_DEPTH = metrics.gauge("scheduler_queue_depth", "Proof jobs waiting to be started, by job class.", ["job_class"])
+WAIT_SECONDS = metrics.histogram("scheduler_wait_seconds", "Time from queueing to the start of proving, by job class.",
+                                 ["job_class"], buckets=LATENCY_BUCKETS)
+ATTESTATION_SECONDS = metrics.histogram("scheduler_attestation_seconds",
+                                        "Time from queueing to the finished (logged) proof, by job class.",
+                                        ["job_class"], buckets=LATENCY_BUCKETS)
+DEADLINE_MISSES = metrics.counter("scheduler_deadline_misses", "Jobs finished after their class's latency target.",
+                                  ["job_class"])
+LATENCY_TARGET_SECONDS = metrics.gauge("scheduler_latency_target_seconds", "Latency target per job class.", ["job_class"])
+
+
+def parse_latency_targets(value):
+    """'failure:30,routine:3600' -> {'failure': 30.0, 'routine': 3600.0}; classes left out keep their default."""
+    targets = dict(DEFAULT_LATENCY_TARGETS)
+    for part in (value or "").split(","):
+        if not part.strip():
+            continue
+        job_class, _, seconds = part.partition(":")
+        job_class = job_class.strip()
+        if job_class not in JOB_CLASSES:
+            raise ValueError(f"Unknown job class '{job_class}' in latency targets; expected one of {JOB_CLASSES}")
+        targets[job_class] = float(seconds)
+    return targets
+
+
+class SchedulingPolicy:
+    """Job classes, priorities and deadlines for proof jobs."""
+
+    def __init__(self, latency_targets=None, high_tool_wear_min=200, priority_types=("H",)):
+        self.latency_targets = dict(DEFAULT_LATENCY_TARGETS, **(latency_targets or {}))
+        self.high_tool_wear_min = high_tool_wear_min
+        self.priority_types = tuple(priority_types)
+        for job_class, target in self.latency_targets.items():
+            LATENCY_TARGET_SECONDS.labels(job_class).set(target)
+
+    def classify(self, ml_prediction, tool_wear, machine_type):
+        """Job class of a sample from its model prediction, raw tool wear [min] and machine Type."""
+        if int(ml_prediction) == 1:
+            return "failure"
+        if tool_wear is not None and float(tool_wear) >= self.high_tool_wear_min:
+            return "high_wear"
+        if machine_type in self.priority_types:
+            return "priority_type"
+        return "routine"
+
+    def classify_row(self, row, ml_prediction):
+        """classify() for a dataset row (pandas Series or dict with 'Tool wear [min]' and 'Type')."""
+        return self.classify(ml_prediction, row.get('Tool wear [min]'), row.get('Type'))
+
+    def priority(self, job_class):
+        """Larger is more urgent (failure = 3 ... routine = 0)."""
+        return len(JOB_CLASSES) - 1 - JOB_CLASSES.index(job_class)
+
+    def deadline(self, job_class, enqueued_at):
+        return enqueued_at + self.latency_targets[job_class]
+
+
+class PriorityScheduler:
+    """
+    Thread-safe in-process job queue served earliest deadline first (class priority, then arrival order,
+    break ties). Callers push() jobs, pop() the next one to prove, and call finished() when it is logged.
+    """
+
+    def __init__(self, policy):
+        self.policy = policy
+        self._lock = threading.Lock()
+        self._heap = []
+        self._sequence = itertools.count()
+        self._finished = {job_class: [] for job_class in JOB_CLASSES} # (latency, met target) per job
+
+    def push(self, item, job_class, enqueued_at=None):
+        enqueued_at = time.time() if enqueued_at is None else enqueued_at
+        entry = (self.policy.deadline(job_class, enqueued_at), -self.policy.priority(job_class),
+                 next(self._sequence), item, job_class, enqueued_at)
+        with self._lock:
+            heapq.heappush(self._heap, entry)
+        QUEUE_DEPTH.labels(job_class).inc()
+
+    def pop(self):
+        """The most urgent job as (item, job_class, enqueued_at), or None when the queue is empty."""
+        with self._lock:
+            if not self._heap:
+                return None
+            _, _, _, item, job_class, enqueued_at = heapq.heappop(self._heap)
+        QUEUE_DEPTH.labels(job_class).dec()
+        WAIT_SECONDS.labels(job_class).observe(time.time() - enqueued_at)
+        return item, job_class, enqueued_at
+
+    def jobs(self):
+        """Pops jobs until the queue is empty; several threads may each iterate their own jobs()."""
+        while True:
+            job = self.pop()
+            if job is None:
+                return
+            yield job
+
+    def finished(self, job_class, enqueued_at):
+        """Records that a popped job was attested; returns its end-to-end latency in seconds."""
+        latency = time.time() - enqueued_at
+        met = record_attestation(self.policy, job_class, latency)
+        with self._lock:
+            self._finished[job_class].append((latency, met))
+        return latency
+
+    def __len__(self):
+        with self._lock:
+            return len(self._heap)
+
+    def summary(self):
+        """Per class: jobs finished, target, share within target, and mean/max latency in seconds."""
+        with self._lock:
+            finished = {job_class: list(results) for job_class, results in self._finished.items()}
+        report = {}
+        for job_class, results in finished.items():
+            if not results:
+                continue
+            latencies = [latency for latency, _ in results]
+            report[job_class] = {
+                "jobs": len(results),
+                "target_s": self.policy.latency_targets[job_class],
+                "within_target": round(sum(1 for _, met in results if met) / len(results), 3),
+                "mean_s": round(sum(latencies) / len(latencies), 2),
+                "max_s": round(max(latencies), 2),
+            }
+        return report
+
+
+def record_attestation(policy, job_class, latency):
+    """Exports one finished job's end-to-end latency; returns whether it met its class's target."""
+    ATTESTATION_SECONDS.labels(job_class).observe(latency)
+    met = latency <= policy.latency_targets[job_class]
+    if not met:
+        DEADLINE_MISSES.labels(job_class).inc()
+    return met
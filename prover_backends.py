@@ -0,0 +1,100 @@
+# prover_backends.py
+"""
+Prover backends used by the proof scripts (07, 08, the benchmarks).
+
+Each backend turns (zkey, witness) into the snarkjs-format proof.json/public.json and verifies a proof
+against a verification key. "snarkjs" runs `snarkjs <proof system> prove` for groth16, plonk or fflonk;
+"native" runs a locally installed Groth16 prover with the rapidsnark command line
+(`prover <zkey> <wtns> <proof.json> <public.json>`), which reads the same .zkey/.wtns files and writes
+the same JSON, so nothing downstream changes. Native provers do not verify, so that backend still
+verifies with snarkjs.
+
+Pick the backend with PROVER_BACKEND (and NATIVE_PROVER_PATH) and the proof system with PROOF_SYSTEM
+in .env. This module must not import config_loader (config_loader imports it).
+"""
+import os
+import shutil
+import subprocess
+import time
+
+import metrics
+
+
+PROOF_SYSTEMS = ("groth16", "plonk", "fflonk")
+
+
+class SnarkjsProver:
+    """`snarkjs <proof system> prove` / `snarkjs <proof system> verify`."""
+
+    name = "snarkjs"
+    proof_systems = PROOF_SYSTEMS
+
+    def __init__(self, snarkjs_cmd="snarkjs", proof_system="groth16"):
+        if proof_system not in self.proof_systems:
+            raise ValueError(f"The {self.name} backend supports {self.proof_systems}, not '{proof_system}'")
+        self.snarkjs_cmd = snarkjs_cmd
+        self.proof_system = proof_system
+
+    def prove_command(self, zkey_path, witness_path, proof_json_path, public_json_path):
+        return [self.snarkjs_cmd, self.proof_system, "prove", zkey_path, witness_path, proof_json_path, public_json_path]
+
+    def verify_command(self, verification_key_path, public_json_path, proof_json_path):
+        return [self.snarkjs_cmd, self.proof_system, "verify", verification_key_path, public_json_path, proof_json_path]
+
+    def verify_succeeded(self, completed_process):
+        """True if a finished verify_command run accepted the proof."""
+        return completed_process.returncode == 0 and "snarkJS: OK!" in completed_process.stdout
+
+    def executables(self):
+        return [self.snarkjs_cmd]
+
+    def missing_executables(self):
+        """Executables of this backend that are neither an existing path nor on PATH."""
+        return [cmd for cmd in self.executables() if not (os.path.exists(cmd) or shutil.which(cmd))]
+
+    def prove(self, zkey_path, witness_path, proof_json_path, public_json_path, cwd=None):
+        """Runs the prover; returns the wall time in seconds. Raises subprocess.CalledProcessError on failure."""
+        start_time = time.perf_counter()
+        metrics.record_spawn(self.executables())
+        subprocess.run(self.prove_command(zkey_path, witness_path, proof_json_path, public_json_path),
+                       cwd=cwd, capture_output=True, text=True, check=True)
+        return time.perf_counter() - start_time
+
+    def verify(self, verification_key_path, public_json_path, proof_json_path, cwd=None):
+        metrics.record_spawn([self.snarkjs_cmd])
+        process = subprocess.run(self.verify_command(verification_key_path, public_json_path, proof_json_path),
+                                 cwd=cwd, capture_output=True, text=True)
+        return self.verify_succeeded(process)
+
+
+class NativeProver(SnarkjsProver):
+    """A native Groth16 prover binary with the rapidsnark interface; verification stays on snarkjs."""
+
+    name = "native"
+    proof_systems = ("groth16",)
+
+    def __init__(self, prover_cmd="prover", snarkjs_cmd="snarkjs", proof_system="groth16"):
+        super().__init__(snarkjs_cmd, proof_system)
+        self.prover_cmd = prover_cmd
+
+    def prove_command(self, zkey_path, witness_path, proof_json_path, public_json_path):
+        return [self.prover_cmd, zkey_path, witness_path, proof_json_path, public_json_path]
+
+    def executables(self):
+        return [self.prover_cmd, self.snarkjs_cmd]
+
+
+PROVER_BACKENDS = {
+    SnarkjsProver.name: SnarkjsProver,
+    NativeProver.name: NativeProver,
+}
+
+
+def get_prover(name="snarkjs", snarkjs_cmd="snarkjs", native_prover_cmd="prover", proof_system="groth16"):
+    """Backend instance for name ('snarkjs' or 'native') proving with proof_system."""
+    name = (name or "snarkjs").lower()
+    if name == NativeProver.name:
+        return NativeProver(native_prover_cmd, snarkjs_cmd, proof_system)
+    if name == SnarkjsProver.name:
+        return SnarkjsProver(snarkjs_cmd, proof_system)
+    raise ValueError(f"Unknown prover backend '{name}'; expected one of {sorted(PROVER_BACKENDS)}")
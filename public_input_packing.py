@@ -0,0 +1,45 @@
+# public_input_packing.py
+"""
+Packs the circuit's 8 public inputs into one uint256 for PredictionLogger.logPackedPrediction.
+
+Each input takes a 32-bit lane (input i in bits 32*i .. 32*i+31) holding value + 2^31, so signed
+fixed-point features and 0/1 Type flags both fit. The scaled-mode circuit compares with LessEqThan(32),
+which is only sound for |value| < 2^31, so any input a valid proof can carry fits in its lane. Because of
+the offset no packed word is 0, which the contract uses to tell packed records from the rest.
+
+Inputs and unpacked outputs are public-signal field elements (negatives as p - |x|), like public.json
+and the uint256[8] publicInputs of unpacked records. The contract's unpackPublicInputs is the inverse.
+"""
+from poseidon_hash import SNARK_SCALAR_FIELD, to_field
+
+NUM_INPUTS = 8
+LANE_BITS = 32
+LANE_MASK = (1 << LANE_BITS) - 1
+LANE_OFFSET = 1 << (LANE_BITS - 1)
+
+
+def to_signed(value):
+    """A field element as a signed integer (values above p/2 are negative)."""
+    value = int(value) % SNARK_SCALAR_FIELD
+    return value - SNARK_SCALAR_FIELD if value > SNARK_SCALAR_FIELD // 2 else value
+
+
+def pack_public_inputs(public_inputs):
+    """The 8 public inputs (field elements or signed ints) as one packed uint256."""
+    if len(public_inputs) != NUM_INPUTS:
+        raise ValueError(f"Expected {NUM_INPUTS} public inputs to pack, got {len(public_inputs)}")
+    packed = 0
+    for i, value in enumerate(public_inputs):
+        signed = to_signed(value)
+        if not -LANE_OFFSET <= signed < LANE_OFFSET:
+            raise ValueError(f"Public input {i} ({signed}) does not fit in a signed {LANE_BITS}-bit lane")
+        packed |= (signed + LANE_OFFSET) << (i * LANE_BITS)
+    return packed
+
+
+def unpack_public_inputs(packed):
+    """The 8 public inputs of a packed uint256, as field elements."""
+    packed = int(packed)
+    if not 0 < packed < 1 << (NUM_INPUTS * LANE_BITS):
+        raise ValueError(f"{packed} is not a packed public-input word")
+    return [to_field(((packed >> (i * LANE_BITS)) & LANE_MASK) - LANE_OFFSET) for i in range(NUM_INPUTS)]
@@ -0,0 +1,142 @@
+# run_journal.py
+"""
+Durable per-sample progress journal for the end-to-end pipeline (SQLite, one row per sample and circuit).
+
+Each sample moves through prepared -> proved -> verified -> submitted -> confirmed. The proof, public
+signals, commitment salt and transaction hash are stored as the sample reaches each stage, so a rerun
+after a crash skips finished work: confirmed samples are not touched, proven samples are not proven
+again, and submitted samples are reconciled by transaction hash instead of being sent twice.
+
+Rows are keyed by (UDI, circuit id); the circuit id is a hash of the proving key and of the logging
+target (chain logging mode and contract address), so retraining the model, rebuilding the circuit,
+switching between records and Merkle logging or redeploying the contract starts a fresh history
+instead of reusing stale proofs or skipping samples that were never logged to the new target.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+STAGES = ('prepared', 'proved', 'verified', 'submitted', 'confirmed')
+STAGE_RANK = {stage: rank for rank, stage in enumerate(STAGES)}
+CIRCUIT_ID_LENGTH = 16 # Hex characters of the proving key's SHA-256
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    udi INTEGER NOT NULL,
+    circuit_id TEXT NOT NULL,
+    sample_index INTEGER,
+    stage TEXT NOT NULL,
+    salt TEXT,
+    feature_commitment TEXT,
+    proof_json TEXT,
+    public_json TEXT,
+    local_zkp_verified INTEGER,
+    tx_hash TEXT,
+    gas_used INTEGER,
+    run_log TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (udi, circuit_id)
+);
+CREATE INDEX IF NOT EXISTS samples_stage ON samples (stage);
+"""
+
+_FIELDS = ('sample_index', 'salt', 'feature_commitment', 'proof_json', 'public_json', 'local_zkp_verified',
+           'tx_hash', 'gas_used', 'run_log', 'attempts')
+
+
+def circuit_id_for(proving_key_path, logging_target=None):
+    """
+    Short, stable id of the circuit a proof belongs to (hash of its proving key). With logging_target
+    (e.g. "records:0xContract"), the id also names where the samples are logged.
+    """
+    digest = hashlib.sha256()
+    with open(proving_key_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    if logging_target is not None:
+        digest.update(b'\x00' + str(logging_target).encode('utf-8'))
+    return digest.hexdigest()[:CIRCUIT_ID_LENGTH]
+
+
+class RunJournal:
+    """Thread-safe access to the journal database at path (created on first use)."""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL") # Readers (e.g. a status query) do not block the pipeline
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def get(self, udi, circuit_id):
+        """The sample's row as a dict (run_log decoded), or None if it was never started."""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM samples WHERE udi = ? AND circuit_id = ?",
+                                     (int(udi), circuit_id)).fetchone()
+        if row is None:
+            return None
+        entry = dict(row)
+        entry['run_log'] = json.loads(entry['run_log']) if entry['run_log'] else None
+        return entry
+
+    def advance(self, udi, circuit_id, stage, **fields):
+        """Records that the sample reached stage, storing fields with it. Never moves a sample backwards."""
+        self._write(udi, circuit_id, stage, fields, only_forward=True)
+
+    def reset(self, udi, circuit_id, stage, **fields):
+        """Moves the sample back to stage (e.g. 'verified' after a reverted or dropped transaction)."""
+        self._write(udi, circuit_id, stage, fields, only_forward=False)
+
+    def _write(self, udi, circuit_id, stage, fields, only_forward):
+        if stage not in STAGE_RANK:
+            raise ValueError(f"Unknown stage '{stage}'; expected one of {STAGES}")
+        unknown = set(fields) - set(_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown journal fields: {sorted(unknown)}")
+        if 'run_log' in fields and fields['run_log'] is not None:
+            fields['run_log'] = json.dumps(fields['run_log'], default=str)
+        now = datetime.now(timezone.utc).isoformat()
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT stage FROM samples WHERE udi = ? AND circuit_id = ?",
+                                     (int(udi), circuit_id)).fetchone()
+            if row is None:
+                columns = ['udi', 'circuit_id', 'stage', 'updated_at'] + list(fields)
+                self._conn.execute(f"INSERT INTO samples ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                                   [int(udi), circuit_id, stage, now] + list(fields.values()))
+                return
+            if only_forward and STAGE_RANK[stage] < STAGE_RANK[row['stage']]:
+                stage = row['stage']
+            assignments = ', '.join(f"{name} = ?" for name in ['stage', 'updated_at'] + list(fields))
+            self._conn.execute(f"UPDATE samples SET {assignments} WHERE udi = ? AND circuit_id = ?",
+                               [stage, now] + list(fields.values()) + [int(udi), circuit_id])
+
+    def pending_submissions(self, circuit_id=None):
+        """Samples whose transaction was sent but not yet confirmed."""
+        query = "SELECT udi, circuit_id, tx_hash FROM samples WHERE stage = 'submitted'"
+        params = ()
+        if circuit_id is not None:
+            query += " AND circuit_id = ?"
+            params = (circuit_id,)
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(query, params).fetchall()]
+
+    def stage_counts(self, circuit_id=None):
+        query = "SELECT stage, COUNT(*) AS n FROM samples"
+        params = ()
+        if circuit_id is not None:
+            query += " WHERE circuit_id = ?"
+            params = (circuit_id,)
+        with self._lock:
+            counts = {row['stage']: row['n'] for row in self._conn.execute(query + " GROUP BY stage", params)}
+        return {stage: counts.get(stage, 0) for stage in STAGES}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
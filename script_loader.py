@@ -0,0 +1,30 @@
+# script_loader.py
+"""
+Imports the numbered scripts (e.g. pipeline_scripts/08_end_to_end_pipeline.py) as modules, so the
+benchmarks, the coordinator/worker and the services reuse their functions. Their file names are not
+valid identifiers, so a plain import cannot load them. Each call executes the script's top level again.
+"""
+import importlib.util
+import os
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+PIPELINE_SCRIPT_PATH = os.path.join(PROJECT_ROOT, "pipeline_scripts", "08_end_to_end_pipeline.py")
+GENERATOR_SCRIPT_PATH = os.path.join(PROJECT_ROOT, "zkp_scripts", "05_generate_circom_circuit.py")
+
+
+def load_script(path, module_name):
+    """Imports the script at path as a module named module_name."""
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_pipeline():
+    """08_end_to_end_pipeline.py as a module."""
+    return load_script(PIPELINE_SCRIPT_PATH, "end_to_end_pipeline")
+
+
+def load_generator():
+    """05_generate_circom_circuit.py as a module."""
+    return load_script(GENERATOR_SCRIPT_PATH, "generate_circom_circuit")
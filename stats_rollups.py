@@ -0,0 +1,253 @@
+# stats_rollups.py
+"""
+Incrementally maintained fleet statistics for the dashboard's /api/stats (SQLite, like run_journal.py).
+
+New rows of the pipeline's results CSV are folded into fixed-size rollups as they arrive; the CSV is
+tailed from a stored byte offset (csv_tailer.py), so each row is read once. The rollups are:
+- records and predicted failures (circuit prediction = 1) per machine Type and time bucket,
+- circuit/ML/actual agreement counters,
+- a DDSketch of zkp_time_seconds (log-spaced bins, 1% relative error on every quantile),
+- gas-used totals of successful records and the number of distinct transactions they were sent in
+  (a batch's records share one transaction hash; each carries its share of the gas).
+A stats query reads the counters, the last few buckets and the sketch bins, so its cost does not grow
+with the history.
+"""
+import json
+import math
+from datetime import datetime, timezone
+
+from csv_tailer import CsvTailStore, float_or_none, int_or_none
+
+MACHINE_TYPES = ('H', 'L', 'M')
+TYPE_FEATURE_OFFSET = 5 # inputs_for_circuit = 5 scaled numeric features, then Type_H, Type_L, Type_M
+SKETCH_RELATIVE_ACCURACY = 0.01
+SKETCH_GAMMA = (1 + SKETCH_RELATIVE_ACCURACY) / (1 - SKETCH_RELATIVE_ACCURACY)
+SKETCH_MIN_VALUE = 1e-6 # Smaller values (including 0) share one bin that reports 0
+SKETCH_ZERO_BIN = -(2 ** 31)
+QUANTILES = (0.5, 0.9, 0.95, 0.99)
+ROLLUP_VERSION = '2' # Bumped when a rollup's definition changes; older stores are rebuilt from the CSV
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS failure_buckets (
+    machine_type TEXT NOT NULL,
+    bucket_start INTEGER NOT NULL,
+    records INTEGER NOT NULL,
+    predicted_failures INTEGER NOT NULL,
+    PRIMARY KEY (bucket_start, machine_type)
+);
+CREATE TABLE IF NOT EXISTS gas_transactions (
+    tx_hash TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS sketch_bins (
+    sketch TEXT NOT NULL,
+    bin INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (sketch, bin)
+);
+"""
+
+
+def sketch_bin(value):
+    """DDSketch bin of a non-negative value."""
+    if value < SKETCH_MIN_VALUE:
+        return SKETCH_ZERO_BIN
+    return math.ceil(math.log(value, SKETCH_GAMMA))
+
+
+def sketch_value(bin_index):
+    """Representative value of a bin (within SKETCH_RELATIVE_ACCURACY of every value in it)."""
+    if bin_index == SKETCH_ZERO_BIN:
+        return 0.0
+    return 2 * SKETCH_GAMMA ** bin_index / (SKETCH_GAMMA + 1)
+
+
+def sketch_quantiles(bins, quantiles=QUANTILES):
+    """{q: value} from [(bin, count), ...] sorted by bin."""
+    total = sum(count for _, count in bins)
+    if total == 0:
+        return {q: None for q in quantiles}
+    result = {}
+    for q in quantiles:
+        rank = q * (total - 1)
+        seen = 0
+        for bin_index, count in bins:
+            seen += count
+            if seen > rank:
+                result[q] = sketch_value(bin_index)
+                break
+    return result
+
+
+def machine_type_from_inputs(inputs_for_circuit):
+    """'H', 'L' or 'M' from the one-hot Type columns of a CSV row's circuit inputs, or None."""
+    try:
+        one_hot = [float(x) for x in json.loads(inputs_for_circuit)[TYPE_FEATURE_OFFSET:TYPE_FEATURE_OFFSET + 3]]
+    except (TypeError, ValueError, IndexError):
+        return None
+    if len(one_hot) != 3 or max(one_hot) <= 0:
+        return None
+    return MACHINE_TYPES[one_hot.index(max(one_hot))]
+
+
+class StatsRollups(CsvTailStore):
+    """Thread-safe rollup store at path; bucket_seconds is the width of the failure-rate time buckets."""
+
+    NAME = "Stats rollups"
+    TABLES = ('counters', 'failure_buckets', 'sketch_bins', 'gas_transactions')
+
+    def __init__(self, path, bucket_seconds=3600):
+        super().__init__(path, _SCHEMA)
+        self.bucket_seconds = int(bucket_seconds)
+        if self._meta('bucket_seconds') not in (None, str(self.bucket_seconds)):
+            print(f"Stats rollups: bucket width changed to {self.bucket_seconds}s; rebuilding from the CSV.")
+            self._transaction(self._reset)
+        elif self._meta('csv_offset') is not None and self._meta('rollup_version') != ROLLUP_VERSION:
+            print("Stats rollups: rollup definitions changed; rebuilding from the CSV.")
+            self._transaction(self._reset)
+        self._set_meta('bucket_seconds', str(self.bucket_seconds))
+        self._set_meta('rollup_version', ROLLUP_VERSION)
+
+    def _reset(self):
+        super()._reset()
+        self._set_meta('bucket_seconds', str(self.bucket_seconds))
+        self._set_meta('rollup_version', ROLLUP_VERSION)
+
+    def add_records(self, records):
+        """Folds result dicts (the CSV's columns) into the rollups."""
+        self._transaction(lambda: self._apply_rows(records))
+
+    def _apply_rows(self, records):
+        counters = {}
+        buckets = {}
+        bins = {}
+        tx_hashes = set()
+
+        def bump(name, amount=1):
+            counters[name] = counters.get(name, 0) + amount
+
+        for record in records:
+            circuit = int_or_none(record.get('circuit_prediction'))
+            ml = int_or_none(record.get('ml_prediction'))
+            actual = int_or_none(record.get('actual_label'))
+            bump('rows')
+            if circuit is not None:
+                machine_type = machine_type_from_inputs(record.get('inputs_for_circuit')) or 'unknown'
+                bump('records')
+                bump(f'records:{machine_type}')
+                bump(f'predicted_failures:{machine_type}', circuit == 1)
+                bump('predicted_failures', circuit == 1)
+                try:
+                    timestamp = datetime.fromisoformat(record.get('run_timestamp_utc')).timestamp()
+                    bucket_start = int(timestamp // self.bucket_seconds * self.bucket_seconds)
+                    counts = buckets.setdefault((bucket_start, machine_type), [0, 0])
+                    counts[0] += 1
+                    counts[1] += circuit == 1
+                except (TypeError, ValueError):
+                    pass
+            for name, left, right in (('circuit_ml', circuit, ml), ('circuit_actual', circuit, actual),
+                                      ('ml_actual', ml, actual)):
+                if left is not None and right is not None:
+                    bump(f'compared:{name}')
+                    bump(f'agreed:{name}', left == right)
+            if None not in (circuit, ml, actual):
+                bump('compared:all')
+                bump('agreed:all', circuit == ml == actual)
+            zkp_time = float_or_none(record.get('zkp_time_seconds'))
+            if zkp_time is not None and zkp_time >= 0:
+                bin_index = sketch_bin(zkp_time)
+                bins[bin_index] = bins.get(bin_index, 0) + 1
+                bump('zkp_time_count')
+                bump('zkp_time_sum', zkp_time)
+            gas_used = int_or_none(record.get('gas_used'))
+            if gas_used is not None and str(record.get('tx_status', '')).startswith('Success'):
+                bump('gas_used_total', gas_used)
+                bump('gas_used_records')
+                if record.get('blockchain_tx_hash'):
+                    tx_hashes.add(record['blockchain_tx_hash'])
+            if record.get('tx_status'):
+                bump(f"tx_status:{record['tx_status']}")
+
+        changes = self._conn.total_changes
+        self._conn.executemany("INSERT OR IGNORE INTO gas_transactions (tx_hash) VALUES (?)",
+                               [(tx_hash,) for tx_hash in tx_hashes])
+        counters['gas_used_transactions'] = self._conn.total_changes - changes # Hashes not seen in earlier chunks
+        self._conn.executemany("INSERT INTO counters (name, value) VALUES (?, ?) "
+                               "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                               counters.items())
+        self._conn.executemany(
+            "INSERT INTO failure_buckets (bucket_start, machine_type, records, predicted_failures) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(bucket_start, machine_type) DO UPDATE SET records = records + excluded.records, "
+            "predicted_failures = predicted_failures + excluded.predicted_failures",
+            [(start, machine_type, n, failures) for (start, machine_type), (n, failures) in buckets.items()])
+        self._conn.executemany("INSERT INTO sketch_bins (sketch, bin, count) VALUES ('zkp_time_seconds', ?, ?) "
+                               "ON CONFLICT(sketch, bin) DO UPDATE SET count = count + excluded.count",
+                               bins.items())
+        if buckets:
+            latest = max(start for start, _ in buckets)
+            if latest > int(self._meta('latest_bucket') or -1):
+                self._set_meta('latest_bucket', str(latest))
+
+    def stats(self, recent_buckets=24):
+        """The /api/stats payload: totals, per-Type and recent per-bucket failure rates, agreement, zkp-time quantiles, gas."""
+        with self._lock:
+            counters = {row['name']: row['value'] for row in self._conn.execute("SELECT name, value FROM counters")}
+            latest = self._meta('latest_bucket')
+            bucket_rows = []
+            if latest is not None:
+                bucket_rows = self._conn.execute(
+                    "SELECT bucket_start, machine_type, records, predicted_failures FROM failure_buckets "
+                    "WHERE bucket_start > ? ORDER BY bucket_start",
+                    (int(latest) - recent_buckets * self.bucket_seconds,)).fetchall()
+            bins = [(row['bin'], row['count']) for row in self._conn.execute(
+                "SELECT bin, count FROM sketch_bins WHERE sketch = 'zkp_time_seconds' ORDER BY bin")]
+
+        def rate(numerator, denominator):
+            return round(numerator / denominator, 6) if denominator else None
+
+        def count(name):
+            return int(counters.get(name, 0))
+
+        per_type = {}
+        for machine_type in MACHINE_TYPES + ('unknown',):
+            if count(f'records:{machine_type}'):
+                per_type[machine_type] = {
+                    "records": count(f'records:{machine_type}'),
+                    "predicted_failures": count(f'predicted_failures:{machine_type}'),
+                    "failure_rate": rate(count(f'predicted_failures:{machine_type}'), count(f'records:{machine_type}')),
+                }
+        buckets = {}
+        for row in bucket_rows:
+            bucket = buckets.setdefault(row['bucket_start'], {
+                "bucket_start_utc": datetime.fromtimestamp(row['bucket_start'], tz=timezone.utc).isoformat(), "types": {}})
+            bucket["types"][row['machine_type']] = {
+                "records": row['records'], "predicted_failures": row['predicted_failures'],
+                "failure_rate": rate(row['predicted_failures'], row['records'])}
+        quantiles = sketch_quantiles(bins)
+        return {
+            "rows": count('rows'),
+            "records": count('records'),
+            "predicted_failure_rate": rate(count('predicted_failures'), count('records')),
+            "failure_rate_by_type": per_type,
+            "bucket_seconds": self.bucket_seconds,
+            "failure_rate_by_bucket": list(buckets.values()),
+            "agreement": {name: {"compared": count(f'compared:{name}'), "agreed": count(f'agreed:{name}'),
+                                 "rate": rate(count(f'agreed:{name}'), count(f'compared:{name}'))}
+                          for name in ('circuit_ml', 'circuit_actual', 'ml_actual', 'all')},
+            "zkp_time_seconds": {
+                "count": count('zkp_time_count'),
+                "mean": rate(counters.get('zkp_time_sum', 0.0), count('zkp_time_count')),
+                "quantiles": {f"p{int(q * 100)}": None if v is None else round(v, 4) for q, v in quantiles.items()},
+                "relative_accuracy": SKETCH_RELATIVE_ACCURACY,
+            },
+            "gas_used": {"total": count('gas_used_total'), "records": count('gas_used_records'),
+                         "transactions": count('gas_used_transactions'),
+                         "mean_per_record": rate(count('gas_used_total'), count('gas_used_records')),
+                         "mean_per_transaction": rate(count('gas_used_total'), count('gas_used_transactions'))},
+            "tx_status": {name.split(':', 1)[1]: int(value) for name, value in counters.items()
+                          if name.startswith('tx_status:')},
+        }
+
@@ -0,0 +1,193 @@
+# tree_rules.py
+"""
+Structured rules for the decision tree: one record per leaf with its node path, the per-feature interval
+it covers and its class counts, plus a leaf-indexed lookup that explains whole batches of samples with
+a single vectorised model.apply / decision_path call.
+
+Used by pipeline_scripts/04_extract_tree_rules.py (export) and the dashboard (the "why" of a prediction).
+"""
+import json
+
+import numpy as np
+import pandas as pd
+
+from poseidon_hash import SNARK_SCALAR_FIELD
+
+CLASS_NAMES = {0: "No Failure", 1: "Failure"}
+
+
+def _unscale(scaler, feature_name, value):
+    """Maps a threshold on a standardised feature back to raw units (None if the feature is not scaled)."""
+    if scaler is None or feature_name not in list(getattr(scaler, 'feature_names_in_', [])):
+        return None
+    column = list(scaler.feature_names_in_).index(feature_name)
+    return float(value * scaler.scale_[column] + scaler.mean_[column])
+
+
+def export_leaf_rules(model, feature_names, scaler=None):
+    """
+    Returns one dict per leaf (in pre-order):
+      leaf_id, node_path, conditions [{node, feature, op, threshold, raw_threshold}],
+      bounds {feature: [lower, upper]} (lower < x <= upper; None = unbounded), raw_bounds (same, in raw units
+      for the scaled features when a scaler is given), class_counts (tree_.value, i.e. class-weighted and
+      normalised in recent scikit-learn), samples, predicted_class, class_name, purity.
+    The tree is walked iteratively, so depth is not limited by the recursion limit.
+    """
+    tree_ = model.tree_
+    children_left = tree_.children_left.tolist()
+    children_right = tree_.children_right.tolist()
+    node_features = tree_.feature.tolist()
+    node_thresholds = tree_.threshold.tolist()
+    leaf_values = tree_.value[:, 0, :]
+    node_samples = tree_.n_node_samples.tolist()
+
+    parent = [-1] * tree_.node_count
+    went_left = [False] * tree_.node_count
+    rules = []
+    stack = [0]
+    while stack:
+        node_index = stack.pop()
+        left, right = children_left[node_index], children_right[node_index]
+        if left != right:
+            parent[left], went_left[left] = node_index, True
+            parent[right], went_left[right] = node_index, False
+            stack.append(right)
+            stack.append(left)
+            continue
+
+        # Leaf: walk back up to the root once to collect its path
+        node_path = []
+        node = node_index
+        while node >= 0:
+            node_path.append(node)
+            node = parent[node]
+        node_path.reverse()
+
+        conditions = []
+        bounds = {}
+        for split_node, child in zip(node_path, node_path[1:]):
+            feature_name = feature_names[node_features[split_node]]
+            threshold = node_thresholds[split_node]
+            is_left = went_left[child]
+            conditions.append({
+                "node": split_node, "feature": feature_name, "op": "<=" if is_left else ">",
+                "threshold": threshold, "raw_threshold": _unscale(scaler, feature_name, threshold),
+            })
+            lower, upper = bounds.get(feature_name, [None, None])
+            if is_left:
+                upper = threshold if upper is None else min(upper, threshold)
+            else:
+                lower = threshold if lower is None else max(lower, threshold)
+            bounds[feature_name] = [lower, upper]
+
+        raw_bounds = {feature_name: [_unscale(scaler, feature_name, bound) if bound is not None else None
+                                     for bound in feature_bounds]
+                      for feature_name, feature_bounds in bounds.items()
+                      if _unscale(scaler, feature_name, 0.0) is not None}
+
+        class_counts = leaf_values[node_index]
+        predicted_class = int(np.argmax(class_counts))
+        total = float(class_counts.sum())
+        rules.append({
+            "leaf_id": node_index,
+            "node_path": node_path,
+            "conditions": conditions,
+            "bounds": bounds,
+            "raw_bounds": raw_bounds,
+            "class_counts": [float(c) for c in class_counts],
+            "samples": int(node_samples[node_index]),
+            "predicted_class": predicted_class,
+            "class_name": CLASS_NAMES.get(predicted_class, str(predicted_class)),
+            "purity": float(class_counts[predicted_class] / total) if total else 0.0,
+        })
+    return rules
+
+
+def format_rule(rule, use_raw_units=True):
+    """One-line text form with one merged interval per feature: IF (x <= a) AND (b < y <= c) THEN Class: ..."""
+    clauses = []
+    for feature_name, (lower, upper) in rule["bounds"].items():
+        if use_raw_units and feature_name in rule["raw_bounds"]:
+            lower, upper = rule["raw_bounds"][feature_name]
+        if lower is not None and upper is not None:
+            clauses.append(f"({lower:.4f} < {feature_name} <= {upper:.4f})")
+        elif upper is not None:
+            clauses.append(f"({feature_name} <= {upper:.4f})")
+        else:
+            clauses.append(f"({feature_name} > {lower:.4f})")
+    condition_text = "IF " + " AND ".join(clauses) + " " if clauses else ""
+    return f"{condition_text}THEN Class: {rule['class_name']} (Samples: {rule['samples']}, Purity: {rule['purity']:.2f})"
+
+
+def write_rules(rules, output_path):
+    """Writes rules as JSON (.json) or as an Arrow IPC file (.arrow/.feather, needs pyarrow)."""
+    if output_path.endswith((".arrow", ".feather")):
+        try:
+            import pyarrow as pa
+        except ImportError as e:
+            raise ImportError("Writing Arrow rule files requires pyarrow (pip install pyarrow); use a .json path instead.") from e
+        table = pa.Table.from_pylist([
+            {**rule, "conditions": json.dumps(rule["conditions"]), "bounds": json.dumps(rule["bounds"]),
+             "raw_bounds": json.dumps(rule["raw_bounds"])}
+            for rule in rules])
+        with pa.OSFile(output_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        with open(output_path, "w") as f:
+            json.dump(rules, f, indent=2)
+
+
+class LeafRuleIndex:
+    """
+    Leaf id -> rule lookup for one model. In a decision tree the leaf determines the whole path, so a batch
+    is explained with one vectorised apply() call plus a dictionary lookup per row.
+    """
+
+    def __init__(self, model, feature_names, scaler=None):
+        self.model = model
+        self.feature_names = list(feature_names)
+        self.rules = export_leaf_rules(model, feature_names, scaler)
+        self.rules_by_leaf = {rule["leaf_id"]: rule for rule in self.rules}
+
+    def leaf_ids(self, X):
+        """Leaf id for every row of X (scaled model features)."""
+        return self.model.apply(self._as_array(X))
+
+    def decision_paths(self, X):
+        """Sparse (n_samples x n_nodes) indicator of the nodes each row visits, from model.decision_path."""
+        return self.model.decision_path(self._as_array(X))
+
+    def explain(self, X):
+        """Rule dict (see export_leaf_rules) for every row of X."""
+        return [self.rules_by_leaf[leaf_id] for leaf_id in self.leaf_ids(X).tolist()]
+
+    def _as_array(self, X):
+        if hasattr(X, "columns"): # DataFrame: reorder to the training feature order
+            X = X[self.feature_names].values
+        X = np.asarray(X, dtype=np.float32)
+        if hasattr(self.model, "feature_names_in_"): # Avoids scikit-learn's missing-feature-names warning
+            return pd.DataFrame(X, columns=self.feature_names)
+        return X
+
+
+def features_from_circuit_inputs(circuit_inputs, feature_names, scaled_feature_names, fixed_point_multiplier,
+                                 scaler=None, raw_unit_multipliers=None):
+    """
+    Converts circuit inputs (field elements, negatives wrapped mod p; scaled features multiplied by the
+    fixed-point multiplier, Type flags as 0/1) back into a row of model features. Circuits built with raw
+    input units take raw_unit_multipliers ({feature: multiplier}) and the scaler to standardise the readings.
+    """
+    row = []
+    for feature_name, value in zip(feature_names, circuit_inputs):
+        value = int(value)
+        if value > SNARK_SCALAR_FIELD // 2:
+            value -= SNARK_SCALAR_FIELD
+        if feature_name not in scaled_feature_names:
+            row.append(float(value))
+        elif raw_unit_multipliers:
+            column = list(scaler.feature_names_in_).index(feature_name)
+            raw_value = value / raw_unit_multipliers[feature_name]
+            row.append(float((raw_value - scaler.mean_[column]) / scaler.scale_[column]))
+        else:
+            row.append(value / fixed_point_multiplier)
+    return row
@@ -0,0 +1,149 @@
+# tree_scorer.py
+"""
+Compact in-process scorer compiled from the trained decision tree.
+
+export_scorer() flattens the tree into an uncompressed .npz of plain arrays with the StandardScaler folded
+into the split thresholds (x_scaled <= t  <=>  x_raw <= t * scale + mean), so scoring takes raw sensor
+values and needs neither pandas nor scikit-learn. TreeScorer.predict_one() walks a single row in a few
+microseconds; predict_batch() walks all rows level by level with numpy. Members of the .npz can be
+memory-mapped (load_scorer(path, mmap=True)) for very large trees.
+"""
+import hashlib
+import zipfile
+
+import numpy as np
+
+# Folded thresholds are compared in float64, while scikit-learn compares float32-cast scaled values, so a
+# row lying exactly on a split boundary can land on the other side. Bump the version on layout changes.
+SCORER_FORMAT_VERSION = 1
+
+
+def _sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def export_scorer(model, scaler, feature_names, output_path, model_path=None):
+    """
+    Writes the flat-array form of `model` to output_path (.npz). Features named in the scaler's
+    feature_names_in_ get their thresholds mapped back to raw units; the rest (Type flags) are used as is.
+    If model_path is given its SHA-256 is stored so stale exports can be detected.
+    """
+    tree_ = model.tree_
+    is_leaf = tree_.children_left == tree_.children_right
+    feature = np.where(is_leaf, 0, tree_.feature).astype(np.int32) # Leaves point at feature 0; never read
+    threshold = tree_.threshold.astype(np.float64).copy()
+
+    scaled_names = list(getattr(scaler, 'feature_names_in_', [])) if scaler is not None else []
+    raw_scale = np.ones(len(feature_names))
+    raw_mean = np.zeros(len(feature_names))
+    for i, name in enumerate(feature_names):
+        if name in scaled_names:
+            column = scaled_names.index(name)
+            raw_scale[i] = scaler.scale_[column]
+            raw_mean[i] = scaler.mean_[column]
+    split_nodes = ~is_leaf
+    threshold[split_nodes] = threshold[split_nodes] * raw_scale[feature[split_nodes]] + raw_mean[feature[split_nodes]]
+    threshold[is_leaf] = 0.0
+
+    np.savez( # Uncompressed so members stay memory-mappable
+        output_path,
+        format_version=np.int32(SCORER_FORMAT_VERSION),
+        children_left=np.where(is_leaf, np.arange(tree_.node_count), tree_.children_left).astype(np.int32),
+        children_right=np.where(is_leaf, np.arange(tree_.node_count), tree_.children_right).astype(np.int32),
+        feature=feature,
+        threshold=threshold,
+        is_leaf=is_leaf,
+        leaf_class=np.argmax(tree_.value[:, 0, :], axis=1).astype(np.int8),
+        max_depth=np.int32(tree_.max_depth),
+        feature_names=np.array(list(feature_names), dtype=np.str_),
+        scaler_mean=raw_mean,
+        scaler_scale=raw_scale,
+        model_sha256=np.array(_sha256_file(model_path) if model_path else "", dtype=np.str_),
+    )
+
+
+def _mmap_npz(path):
+    """Memory-maps every member of an uncompressed .npz (np.load cannot mmap inside a zip)."""
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, 'rb') as f:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"{path} is compressed; re-export it with export_scorer to memory-map it")
+            # Local file header: 30 fixed bytes + file name + extra field, then the .npy payload
+            f.seek(info.header_offset + 26)
+            name_length, extra_length = np.frombuffer(f.read(4), dtype='<u2')
+            f.seek(info.header_offset + 30 + int(name_length) + int(extra_length))
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            member = info.filename[:-len(".npy")] if info.filename.endswith(".npy") else info.filename
+            if dtype.hasobject:
+                raise ValueError(f"{path}:{member} holds Python objects and cannot be memory-mapped")
+            arrays[member] = np.memmap(path, dtype=dtype, mode='r', offset=f.tell(), shape=shape,
+                                       order='F' if fortran_order else 'C')
+    return arrays
+
+
+class TreeScorer:
+    """Scores raw feature rows (in feature_names order, Type flags as 0/1) against the exported tree."""
+
+    def __init__(self, arrays):
+        if int(arrays["format_version"]) != SCORER_FORMAT_VERSION:
+            raise ValueError(f"Unsupported scorer format {int(arrays['format_version'])}")
+        self.children_left = arrays["children_left"]
+        self.children_right = arrays["children_right"]
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.is_leaf = arrays["is_leaf"]
+        self.leaf_class = arrays["leaf_class"]
+        self.max_depth = int(arrays["max_depth"])
+        self.feature_names = [str(name) for name in arrays["feature_names"]]
+        self.model_sha256 = str(arrays["model_sha256"])
+        # Plain lists are several times faster than numpy scalars for the single-row walk
+        self._left = self.children_left.tolist()
+        self._right = self.children_right.tolist()
+        self._feature = self.feature.tolist()
+        self._threshold = self.threshold.tolist()
+        self._leaf = self.is_leaf.tolist()
+        self._leaf_class = self.leaf_class.tolist()
+
+    def predict_one(self, row):
+        """Returns (predicted class, leaf id) for one raw feature row."""
+        node = 0
+        left, right, feature, threshold, leaf = self._left, self._right, self._feature, self._threshold, self._leaf
+        while not leaf[node]:
+            node = left[node] if row[feature[node]] <= threshold[node] else right[node]
+        return self._leaf_class[node], node
+
+    def predict_batch(self, rows):
+        """Returns (classes, leaf ids) arrays for a 2-D array of raw feature rows."""
+        rows = np.asarray(rows, dtype=np.float64)
+        row_index = np.arange(rows.shape[0])
+        nodes = np.zeros(rows.shape[0], dtype=np.int32)
+        for _ in range(self.max_depth): # Leaves point at themselves, so extra steps are no-ops
+            goes_left = rows[row_index, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(goes_left, self.children_left[nodes], self.children_right[nodes])
+        return self.leaf_class[nodes], nodes
+
+    def row_from_sample(self, sample):
+        """Builds a raw feature row from a dataset record (mapping with the sensor columns and 'Type')."""
+        machine_type = sample['Type']
+        return [float(machine_type == name[len("Type_"):]) if name.startswith("Type_") else float(sample[name])
+                for name in self.feature_names]
+
+    def matches_model(self, model_path):
+        """True if the export was made from the model file at model_path."""
+        return bool(self.model_sha256) and self.model_sha256 == _sha256_file(model_path)
+
+
+def load_scorer(path, mmap=False):
+    if mmap:
+        return TreeScorer(_mmap_npz(path))
+    with np.load(path, allow_pickle=False) as arrays:
+        return TreeScorer({name: arrays[name] for name in arrays.files})
@@ -1,7 +1,17 @@
+import io
+import functools
+import math
 import joblib
 import numpy as np
 from sklearn.tree import _tree # For accessing tree internals
 import os
+import sys
+
+# Add project root to sys.path to allow importing config_loader
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+import config_loader as cfg # Import your configuration
+import poseidon_hash
 
 # --- Configuration ---
 current_script_dir = os.path.dirname(__file__) # 1. Determine the path to the directory containing *this* script (zkp_scripts)
@@ -11,197 +21,550 @@ BASE_DIR = os.path.abspath(os.path.join(current_script_dir, '..')) # 2. Go up on
 MODEL_PATH = os.path.join(BASE_DIR, "artifacts", "model", "decision_tree_model.joblib" )
 FEATURE_NAMES_PATH = os.path.join(BASE_DIR, "artifacts", "model", "feature_names.joblib" )
 CIRCOM_OUTPUT_FILE = os.path.join(BASE_DIR, "artifacts", "circuit", "decision_tree.circom" )
+BATCH_CIRCOM_OUTPUT_FILE = os.path.join(BASE_DIR, "artifacts", "circuit", "decision_tree_batch.circom" )
+COMMITTED_CIRCOM_OUTPUT_FILE = os.path.join(BASE_DIR, "artifacts", "circuit", "decision_tree_committed.circom" )
+
+SCALER_PATH = os.path.join(BASE_DIR, "artifacts", "model", "standard_scaler.joblib" )
 
 FIXED_POINT_MULTIPLIER = 10000
 COMPARATOR_N_BITS = 32 
+INPUT_UNITS = cfg.CIRCUIT_INPUT_UNITS # "raw" folds the scaler into the thresholds (see load_raw_units)
+RAW_UNIT_MULTIPLIERS = cfg.RAW_UNIT_MULTIPLIERS
+RAW_COMPARATOR_N_BITS = 16 # Raw readings are non-negative integers well below 2^16 (rpm < 3000, 0.1 K < 4000)
+# "full" evaluates every split node; "path" checks only the root-to-leaf path hinted by the witness generator
+# against a Poseidon Merkle commitment of the node table (O(depth) lookups, for large trees)
+TREE_EVALUATION = cfg.CIRCUIT_TREE_EVALUATION
+BATCH_SIZE = cfg.PROOF_BATCH_SIZE # K samples per proof in the batch circuit (must match the pipeline)
+PUBLIC_INPUT_MODE = cfg.PUBLIC_INPUT_MODE # "commitment" also emits the Poseidon-committed circuit
+DEBUG_CODEGEN = os.getenv("CIRCOM_CODEGEN_DEBUG", "").lower() in ("1", "true", "yes") # Per-node [DEBUGGER] output
+WRITE_BUFFER_SIZE = 1 << 20 # Circom files for large trees run to many MB
+
+BINARY_FEATURES = ['Type_H', 'Type_L', 'Type_M']
+
+def load_raw_units(scaler=None):
+    """
+    {feature: (scaler mean, scaler scale, unit multiplier)} for every scaled feature when INPUT_UNITS is
+    "raw", else None (fixed-point scaled inputs). Loads the scaler from SCALER_PATH unless one is given.
+    """
+    if INPUT_UNITS != "raw":
+        return None
+    if scaler is None:
+        scaler = joblib.load(SCALER_PATH)
+    scaled_names = list(getattr(scaler, 'feature_names_in_', cfg.NUMERICAL_FEATURES_FOR_SCALING))
+    return {name: (float(scaler.mean_[i]), float(scaler.scale_[i]), RAW_UNIT_MULTIPLIERS[name])
+            for i, name in enumerate(scaled_names)}
+
+def comparator_n_bits(raw_units=None):
+    return RAW_COMPARATOR_N_BITS if raw_units else COMPARATOR_N_BITS
+
+def circom_threshold(feature_name, sklearn_threshold, raw_units=None):
+    """
+    Returns (circuit threshold, comment text) for one split. With raw_units the split x_scaled <= t becomes
+    x_raw <= t * scale + mean, in integer units; scikit-learn thresholds lie halfway between training
+    values, so flooring keeps 'input <= threshold' exact for readings on the unit grid.
+    """
+    if feature_name in BINARY_FEATURES and abs(sklearn_threshold - 0.5) < 1e-6:
+        # For binary (0/1) features scikit-learn splits at 0.5, so 'feature <= 0.5' means 'feature == 0'.
+        # With LessEqThan(A, B) and A in {0, 1}, a threshold of 0 gives 1 for A == 0 and 0 for A == 1.
+        threshold_fixed_point = 0
+        return threshold_fixed_point, f"(Original Threshold: {sklearn_threshold:.4f} for binary {feature_name}, Effective Fixed Threshold for '==0' logic: {threshold_fixed_point})"
+    if raw_units and feature_name in raw_units:
+        mean, scale, unit_multiplier = raw_units[feature_name]
+        raw_threshold = sklearn_threshold * scale + mean
+        threshold_raw = int(math.floor(raw_threshold * unit_multiplier))
+        return threshold_raw, f"(Original Threshold: {sklearn_threshold:.4f}, Raw: {raw_threshold:.4f}, Units x{unit_multiplier}: {threshold_raw})"
+    threshold_fixed_point = int(round(sklearn_threshold * FIXED_POINT_MULTIPLIER))
+    return threshold_fixed_point, f"(Original Threshold: {sklearn_threshold:.4f}, Fixed: {threshold_fixed_point})"
+
+def split_comparator_bits(threshold, n_bits, range_checked):
+    """
+    Width of the comparator for 'input <= threshold', or None for a plain LessEqThan(n_bits). Range-checked
+    (raw) inputs already come as n_bits bits, so input <= t splits into 'the bits from k = bit_length(t) up
+    are all zero' (IsZero of their sum, 2 constraints) and a LessEqThan(k) on the low bits, ANDed with one
+    multiplication: k + 5 constraints, or 2 when t == 0. Used when that beats n_bits + 2.
+    """
+    k = int(threshold).bit_length()
+    if not range_checked or (k > 0 and k + 5 >= n_bits + 2):
+        return None
+    return k
+
+def split_comparator_constraints(threshold, n_bits, range_checked):
+    k = split_comparator_bits(threshold, n_bits, range_checked)
+    if k is None:
+        return n_bits + 2
+    return 2 if k == 0 else k + 5
+
+def estimate_circuit_constraints(model, n_bits=None, raw_units=None, feature_names=cfg.FEATURE_NAMES_ORDER,
+                                 evaluation=TREE_EVALUATION):
+    """
+    Analytic R1CS constraint count of the DecisionTree template generate_circom_code emits, without compiling:
+    - each split is a LessEqThan(n) = Num2Bits(n + 1) plus its packing constraint -> n + 2 constraints; with
+      raw_units a split whose threshold needs k < n - 3 bits costs k + 5 (2 for k = 0), see
+      split_comparator_bits, so the cost follows the thresholds' bit widths,
+    - each path-indicator signal below the root's children is one multiplication -> 1 constraint,
+    - leaf contributions (path * constant) and the prediction sum are linear -> free,
+    - with raw_units every input is range-checked with Num2Bits(n) -> n constraints per feature.
+    The path-hint variant costs, per step, one table lookup (Num2Bits of the node index, Poseidon(5) of the
+    entry and a Poseidon(2) per index bit), a feature selector (IsEqual + product per feature), one
+    comparator and one multiplication; there are max_depth steps and max_depth + 1 lookups.
+    estimated_constraints is for `evaluation`; both variants are returned. Also returns the comparator
+    width the circuit thresholds actually need.
+    """
+    n_bits = n_bits or comparator_n_bits(raw_units)
+    tree_ = model.tree_
+    is_leaf = tree_.children_left == tree_.children_right
+    n_splits = int((~is_leaf).sum())
+    n_leaves = int(is_leaf.sum())
+    path_multiplications = max(0, tree_.node_count - 3) if n_splits else 0
+    if raw_units:
+        circuit_thresholds = np.array([circom_threshold(feature_names[feature], threshold, raw_units)[0]
+            for feature, threshold in zip(tree_.feature[~is_leaf], tree_.threshold[~is_leaf])], dtype=np.int64)
+        range_checks = len(feature_names) * n_bits
+    else:
+        circuit_thresholds = np.round(tree_.threshold[~is_leaf] * FIXED_POINT_MULTIPLIER).astype(np.int64)
+        range_checks = 0
+    sign_bit = 0 if raw_units else 1
+    threshold_bits = int(np.abs(circuit_thresholds).max()).bit_length() + sign_bit if n_splits else 0
+    comparators = sum(split_comparator_constraints(threshold, n_bits, bool(raw_units))
+                      for threshold in circuit_thresholds.tolist())
+    full_constraints = comparators + path_multiplications + range_checks
+    depth = max(int(tree_.max_depth), 1)
+    index_bits = table_index_bits(int(tree_.node_count))
+    lookup = (index_bits + 1) + poseidon_constraints(5) + index_bits * (poseidon_constraints(2) + 1)
+    step = 3 * len(feature_names) + (n_bits + 2) + 1
+    path_constraints = (depth + 1) * lookup + depth * step + range_checks
+    return {
+        "node_count": int(tree_.node_count),
+        "n_splits": n_splits,
+        "n_leaves": n_leaves,
+        "max_depth": int(tree_.max_depth),
+        "threshold_bits": threshold_bits,
+        "estimated_constraints": path_constraints if evaluation == "path" else full_constraints,
+        "estimated_constraints_full": full_constraints,
+        "estimated_constraints_path": path_constraints,
+    }
+
+def generate_circom_code(model, feature_names, extra_includes=(), out=None, debug=DEBUG_CODEGEN, raw_units=None,
+                         evaluation=TREE_EVALUATION):
+    """
+    Emits the DecisionTree(numFeatures) template by walking the tree_ arrays iteratively (pre-order), so
+    generation is O(nodes) and does not depend on the recursion limit.
+
+    Every node gets a path-indicator signal: path = parent_path * (comp or 1 - comp), one multiplication
+    per node instead of a product chain per leaf. Text is written to `out` (any file-like object);
+    without `out` the code is returned as a string. With raw_units (load_raw_units()) the thresholds are in
+    raw sensor units, the comparators are RAW_COMPARATOR_N_BITS wide and every input is range-checked.
+    evaluation="path" emits the path-hint variant instead (generate_path_circom_code), same interface.
+    """
+    if out is None:
+        buffer = io.StringIO()
+        generate_circom_code(model, feature_names, extra_includes, out=buffer, debug=debug, raw_units=raw_units,
+                             evaluation=evaluation)
+        return buffer.getvalue()
+    if evaluation == "path":
+        generate_path_circom_code(model, feature_names, extra_includes, out=out, raw_units=raw_units)
+        return
 
-def generate_circom_code(model, feature_names):
     tree_ = model.tree_
     num_features = len(feature_names)
-    circom_lines = []
-
-    # --- START DEBUG PRINT ---
-    print(f"[DEBUGGER] generate_circom_code: Initial check for root node (0).")
-    if tree_ is not None and hasattr(tree_, 'children_left') and hasattr(tree_, 'children_right'):
-        print(f"[DEBUGGER] Root Node (0) children_left: {tree_.children_left[0]}, children_right: {tree_.children_right[0]}")
-        is_root_split_node = tree_.children_left[0] != tree_.children_right[0]
-        print(f"[DEBUGGER] Root Node (0) is considered a split node: {is_root_split_node}")
-        if is_root_split_node:
-            print(f"[DEBUGGER] Root Node (0) feature index: {tree_.feature[0]}, threshold: {tree_.threshold[0]}")
-            if tree_.feature[0] < len(feature_names):
-                 print(f"[DEBUGGER] Root Node (0) feature name: {feature_names[tree_.feature[0]]}")
-            else:
-                 print(f"[DEBUGGER] Root Node (0) feature index {tree_.feature[0]} is out of bounds for feature_names (len {len(feature_names)})")
+    children_left = tree_.children_left.tolist()
+    children_right = tree_.children_right.tolist()
+    node_features = tree_.feature.tolist()
+    node_thresholds = tree_.threshold.tolist()
+    leaf_predictions = np.argmax(tree_.value[:, 0, :], axis=1).tolist()
+    n_bits = comparator_n_bits(raw_units)
+
+    write = out.write
+    write(f"pragma circom 2.1.5;\n\n")
+    write(f"// Decision tree circuit generated programmatically\n")
+    write(f"// Model used: {os.path.basename(MODEL_PATH)}\n\n")
+    write(f"include \"../../node_modules/circomlib/circuits/comparators.circom\";\n")
+    for include_path in extra_includes:
+        write(f"include \"{include_path}\";\n")
+    write("\n")
+
+    write(f"template DecisionTree(numFeatures) {{\n")
+    write(f"    // --- Inputs ---\n")
+    write(f"    // Expected order: {', '.join(feature_names)}\n")
+    if raw_units:
+        units = ", ".join(f"{name} x{unit}" for name, (_, _, unit) in raw_units.items())
+        write(f"    // Raw integer readings ({units}); Type flags as 0/1\n")
     else:
-        print("[DEBUGGER] tree_ object is problematic or missing children attributes.")
-    # --- END DEBUG PRINT ---
-
-    circom_lines.append(f"pragma circom 2.1.5;\n")
-    circom_lines.append(f"// Decision tree circuit generated programmatically")
-    circom_lines.append(f"// Model used: {MODEL_PATH}\n")
-    circom_lines.append(f"include \"../../node_modules/circomlib/circuits/comparators.circom\";\n")
-    
-    circom_lines.append(f"template DecisionTree(numFeatures) {{")
-    circom_lines.append(f"    // --- Inputs ---")
-    circom_lines.append(f"    // Expected order: {', '.join(feature_names)}")
-    circom_lines.append(f"    // Values should be scaled and multiplied by {FIXED_POINT_MULTIPLIER}")
-    circom_lines.append(f"    signal input features[numFeatures];\n")
-    circom_lines.append(f"    // --- Output ---")
-    circom_lines.append(f"    // 0 for No Failure, 1 for Failure")
-    circom_lines.append(f"    signal output out_prediction;\n")
+        write(f"    // Values should be scaled and multiplied by {FIXED_POINT_MULTIPLIER}\n")
+    write(f"    signal input features[numFeatures];\n\n")
+    if raw_units:
+        # LessEqThan(n) is only sound for inputs below 2^n; without this a wrapped negative would pass as small
+        write(f"    // --- Input Range Checks ---\n")
+        write(f"    component range_check[numFeatures];\n")
+        write(f"    for (var i = 0; i < numFeatures; i++) {{\n")
+        write(f"        range_check[i] = Num2Bits({n_bits});\n")
+        write(f"        range_check[i].in <== features[i];\n")
+        write(f"    }}\n\n")
+    write(f"    // --- Output ---\n")
+    write(f"    // 0 for No Failure, 1 for Failure\n")
+    write(f"    signal output out_prediction;\n\n")
 
-    node_comparator_outputs = {}
-
-    def generate_node_comparators_recursive(node_index):
-        if tree_.children_left[node_index] != tree_.children_right[node_index]: # If not a leaf
-            feature_idx = tree_.feature[node_index]
-            feature_name_for_node = feature_names[feature_idx] # Get the actual name of the feature
-            original_sklearn_threshold = tree_.threshold[node_index] # The threshold from the scikit-learn tree
-
-            # --- START DEBUG PRINT FOR THIS FUNCTION ---
-        print(f"[DEBUGGER] generate_node_comparators_recursive: Entered for node {node_index}.")
-        # --- END DEBUG PRINT ---
-        if tree_.children_left[node_index] != tree_.children_right[node_index]: # If not a leaf
-            feature_idx = tree_.feature[node_index]
-            feature_name_for_node = feature_names[feature_idx] 
-            original_sklearn_threshold = tree_.threshold[node_index]
-            
-            # --- START DEBUG PRINT FOR SPLIT NODE PROCESSING ---
-            print(f"[DEBUGGER] Node {node_index} is SPLIT. Feature: {feature_name_for_node} (idx {feature_idx}), Threshold: {original_sklearn_threshold}")
-            # --- END DEBUG PRINT ---
-
-            # --- START OF THE PROPOSED LOGICAL CHANGE ---
-            if feature_name_for_node in ['Type_H', 'Type_L', 'Type_M'] and \
-               abs(original_sklearn_threshold - 0.5) < 1e-6: # Check if it's a Type_X feature and original threshold is 0.5
-                
-                # For binary (0/1) features where scikit-learn uses a 0.5 threshold,
-                # the rule 'feature <= 0.5' effectively means 'feature == 0'.
-                # To implement 'feature == 0' using 'LessEqThan(A, B)' where A is the feature (0 or 1),
-                # B (the threshold for Circom) should be 0.
-                # So, A <= 0 will be true (1) if A is 0, and false (0) if A is 1.
-                threshold_fixed_point = 0 
-                comment_threshold_explanation = f"(Original Threshold: {original_sklearn_threshold:.4f} for binary {feature_name_for_node}, Effective Fixed Threshold for '==0' logic: {threshold_fixed_point})"
+    # Comparators and path signals are collected separately so every comparator is declared before use
+    comparator_lines = [f"    // --- Comparators for Split Nodes ---\n"]
+    path_lines = [f"    // --- Path Conditions and Leaf Value Aggregation ---\n"]
+    leaf_contributions = []
+    path_signal = {} # node -> name of its path-indicator signal (root has none: it is always active)
+
+    stack = [(0, -1, None)] # (node, parent, went_left)
+    while stack:
+        node_index, parent_index, went_left = stack.pop()
+        is_leaf = children_left[node_index] == children_right[node_index]
+        if debug:
+            print(f"[DEBUGGER] Node {node_index}: parent={parent_index}, left_branch={went_left}, leaf={is_leaf}")
+
+        # Path indicator for this node
+        if is_leaf:
+            signal_name = f"path_leaf{node_index}_active"
+        else:
+            signal_name = f"path_node{node_index}_active"
+        if parent_index < 0:
+            if is_leaf:
+                path_lines.append(f"    signal {signal_name} <== 1;\n")
+        else:
+            comp_out_signal = f"comp_node{parent_index}_out"
+            branch_term = comp_out_signal if went_left else f"(1 - {comp_out_signal})"
+            parent_signal = path_signal.get(parent_index)
+            if parent_signal is None:
+                path_lines.append(f"    signal {signal_name} <== {branch_term};\n")
             else:
-                # For all other features or different thresholds, use the standard fixed-point conversion
-                threshold_fixed_point = int(round(original_sklearn_threshold * FIXED_POINT_MULTIPLIER))
-                comment_threshold_explanation = f"(Original Threshold: {original_sklearn_threshold:.4f}, Fixed: {threshold_fixed_point})"
-            # --- END OF THE PROPOSED LOGICAL CHANGE ---
-            
-            comp_signal_name = f"comp_node{node_index}_out"
-            node_comparator_outputs[node_index] = comp_signal_name
-            # --- START DEBUG PRINT ---
-            print(f"[DEBUGGER] Node {node_index}: Added '{comp_signal_name}' to node_comparator_outputs. Current keys: {list(node_comparator_outputs.keys())}")
-            # --- END DEBUG PRINT ---
-
-            circom_lines.append(f"    // Node {node_index}: If {feature_name_for_node} (features[{feature_idx}]) <= ... {comment_threshold_explanation}")
-            circom_lines.append(f"    component comp_node{node_index} = LessEqThan({COMPARATOR_N_BITS});")
-            circom_lines.append(f"    comp_node{node_index}.in[0] <== features[{feature_idx}];")
-            circom_lines.append(f"    comp_node{node_index}.in[1] <== {threshold_fixed_point};") # Use the potentially adjusted threshold_fixed_point
-            circom_lines.append(f"    signal {comp_signal_name} <== comp_node{node_index}.out; // 1 if true (left), 0 if false (right)\n")
-            
-            generate_node_comparators_recursive(tree_.children_left[node_index])
-            generate_node_comparators_recursive(tree_.children_right[node_index])
+                path_lines.append(f"    signal {signal_name} <== {parent_signal} * {branch_term};\n")
+        if not is_leaf and parent_index >= 0:
+            path_signal[node_index] = signal_name
+
+        if is_leaf:
+            leaf_pred_value = leaf_predictions[node_index]
+            leaf_contribution_signal = f"leaf{node_index}_contribution"
+            path_lines.append(f"    // Leaf {node_index}: Prediction={leaf_pred_value}, PathSignal: {signal_name}\n")
+            path_lines.append(f"    signal {leaf_contribution_signal} <== {signal_name} * {leaf_pred_value};\n")
+            leaf_contributions.append(leaf_contribution_signal)
+            continue
+
+        feature_idx = node_features[node_index]
+        feature_name_for_node = feature_names[feature_idx]
+        threshold_fixed_point, comment_threshold_explanation = circom_threshold(
+            feature_name_for_node, node_thresholds[node_index], raw_units)
+        if raw_units and not 0 <= threshold_fixed_point < (1 << n_bits):
+            raise ValueError(f"Node {node_index}: raw threshold {threshold_fixed_point} for {feature_name_for_node} "
+                             f"does not fit the {n_bits}-bit comparators")
+        comparator_lines.append(
+            f"    // Node {node_index}: If {feature_name_for_node} (features[{feature_idx}]) <= ... {comment_threshold_explanation}\n")
+        low_bits = split_comparator_bits(threshold_fixed_point, n_bits, bool(raw_units))
+        if low_bits is None:
+            comparator_lines.append(
+                f"    component comp_node{node_index} = LessEqThan({n_bits});\n"
+                f"    comp_node{node_index}.in[0] <== features[{feature_idx}];\n"
+                f"    comp_node{node_index}.in[1] <== {threshold_fixed_point};\n"
+                f"    signal comp_node{node_index}_out <== comp_node{node_index}.out; // 1 if true (left), 0 if false (right)\n\n")
         else:
-            # --- START DEBUG PRINT FOR LEAF ---
-            print(f"[DEBUGGER] Node {node_index} is a LEAF (in generate_node_comparators_recursive). Not added to node_comparator_outputs.")
-            # --- END DEBUG PRINT ---
-            pass
-
-
-    circom_lines.append(f"    // --- Comparators for Split Nodes ---")
-    generate_node_comparators_recursive(0) # Call that populates
-
-    # --- START DEBUG PRINT ---
-    print(f"[DEBUGGER] After generate_node_comparators_recursive(0), node_comparator_outputs keys: {list(node_comparator_outputs.keys())}")
-    # --- END DEBUG PRINT ---
-
-    circom_lines.append(f"    // --- Path Conditions and Leaf Value Aggregation ---")
-    leaf_processing_details = []
-
-    def build_leaf_paths_info(node_index, current_path_term_list):
-        # --- START DEBUG PRINT FOR THIS FUNCTION ---
-        print(f"[DEBUGGER] build_leaf_paths_info: Entered for node {node_index}.")
-        # --- END DEBUG PRINT ---
-        # current_path_term_list is a list of strings, e.g., ["comp_node0_out", "(1 - comp_node2_out)"]
-        if tree_.children_left[node_index] == tree_.children_right[node_index]: # Is a Leaf
-            leaf_value_counts = tree_.value[node_index][0]
-            prediction = int(np.argmax(leaf_value_counts))
-            leaf_processing_details.append( (node_index, current_path_term_list, prediction) )
-            # --- START DEBUG PRINT ---
-            print(f"[DEBUGGER] Node {node_index} is LEAF (in build_leaf_paths_info). Path terms: {current_path_term_list}, Prediction: {prediction}")
-            # --- END DEBUG PRINT ---
-        else: # Is a Split Node
-            # --- START DEBUG PRINT ---
-            print(f"[DEBUGGER] Node {node_index} is SPLIT (in build_leaf_paths_info). Attempting to access node_comparator_outputs for key {node_index}.")
-            if node_index not in node_comparator_outputs:
-                print(f"[DEBUGGER] CRITICAL: Key {node_index} NOT FOUND in node_comparator_outputs before access!")
-            # --- END DEBUG PRINT ---
-            comp_out_signal = node_comparator_outputs[node_index]
-            
-            left_path_terms = current_path_term_list + [f"{comp_out_signal}"]
-            build_leaf_paths_info(tree_.children_left[node_index], left_path_terms)
-            
-            right_path_terms = current_path_term_list + [f"(1 - {comp_out_signal})"]
-            build_leaf_paths_info(tree_.children_right[node_index], right_path_terms)
-
-    build_leaf_paths_info(0, [])
-
-    # --- Generating path condition signals and Summing up leaf contributions ---
-    if not leaf_processing_details:
-        circom_lines.append(f"    out_prediction <== 0; // Should not happen for a valid tree")
+            # input <= t: the range-check bits from bit_length(t) up are all zero, and the low bits are <= t
+            bits = [f"range_check[{feature_idx}].out[{i}]" for i in range(n_bits)]
+            comparator_lines.append(
+                f"    component comp_node{node_index}_high = IsZero();\n"
+                f"    comp_node{node_index}_high.in <== {' + '.join(bits[low_bits:])};\n")
+            if low_bits == 0:
+                comparator_lines.append(
+                    f"    signal comp_node{node_index}_out <== comp_node{node_index}_high.out; // 1 if true (left), 0 if false (right)\n\n")
+            else:
+                low_value = " + ".join(f"{1 << i} * {bit}" for i, bit in enumerate(bits[:low_bits]))
+                comparator_lines.append(
+                    f"    component comp_node{node_index} = LessEqThan({low_bits});\n"
+                    f"    comp_node{node_index}.in[0] <== {low_value};\n"
+                    f"    comp_node{node_index}.in[1] <== {threshold_fixed_point};\n"
+                    f"    signal comp_node{node_index}_out <== comp_node{node_index}_high.out * comp_node{node_index}.out; // 1 if true (left), 0 if false (right)\n\n")
+
+        # Right pushed first so the left subtree is emitted first (same pre-order as before)
+        stack.append((children_right[node_index], node_index, False))
+        stack.append((children_left[node_index], node_index, True))
+
+    out.writelines(comparator_lines)
+    out.writelines(path_lines)
+
+    # Iteratively sum: S0=T0, S1=S0+T1, S2=S1+T2 ... SN=S(N-1)+TN
+    current_total_sum_signal = leaf_contributions[0]
+    for k in range(1, len(leaf_contributions)):
+        next_partial_sum_signal = f"prediction_partial_sum_{k-1}"
+        write(f"    signal {next_partial_sum_signal} <== {current_total_sum_signal} + {leaf_contributions[k]};\n")
+        current_total_sum_signal = next_partial_sum_signal
+    write(f"    out_prediction <== {current_total_sum_signal};\n\n")
+
+    write(f"}}\n\n")
+    write(f"// To use this, instantiate it in a main component\n")
+    write(f"// component main {{public [features]}} = DecisionTree({num_features});")
+
+def path_node_table(model, feature_names, raw_units=None):
+    """
+    (feature, threshold, left, right, class) of every node, for the path-hint circuit. Leaves point to
+    themselves (feature 0, threshold 0), so max_depth steps from the root always end on the sample's leaf.
+    """
+    tree_ = model.tree_
+    leaf_predictions = np.argmax(tree_.value[:, 0, :], axis=1).tolist()
+    table = []
+    for node_index in range(tree_.node_count):
+        left, right = int(tree_.children_left[node_index]), int(tree_.children_right[node_index])
+        if left == right:
+            table.append((0, 0, node_index, node_index, leaf_predictions[node_index]))
+            continue
+        feature_idx = int(tree_.feature[node_index])
+        threshold, _ = circom_threshold(feature_names[feature_idx], tree_.threshold[node_index], raw_units)
+        table.append((feature_idx, threshold, left, right, leaf_predictions[node_index]))
+    return table
+
+def table_index_bits(node_count):
+    return max(1, (node_count - 1).bit_length())
+
+def node_table_merkle_tree(table):
+    """
+    Poseidon Merkle tree of the node table in heap order: tree[1] is the root, table slot j is leaf
+    tree[2^bits + j] = Poseidon(entry) (unused slots are 0) and tree[i] = Poseidon(tree[2i], tree[2i + 1]).
+    Each level is hashed in one poseidon_rows call (a process pool for large trees), and the result is
+    cached, since 05 emits the main, batch and committed circuits from the same table.
+    """
+    return _node_table_merkle_tree(tuple(tuple(entry) for entry in table))
+
+@functools.lru_cache(maxsize=4)
+def _node_table_merkle_tree(table):
+    size = 1 << table_index_bits(len(table))
+    tree = [0] * (2 * size)
+    tree[size:size + len(table)] = poseidon_hash.poseidon_rows(table)
+    level_start = size
+    while level_start > 1:
+        parent_start = level_start // 2
+        tree[parent_start:level_start] = poseidon_hash.poseidon_rows(
+            [tree[2 * position], tree[2 * position + 1]] for position in range(parent_start, level_start))
+        level_start = parent_start
+    return tree
+
+def poseidon_constraints(n_inputs):
+    """Approximate R1CS size of circomlib's Poseidon(n_inputs): 3 constraints per S-box."""
+    t = n_inputs + 1
+    return 3 * (poseidon_hash.N_ROUNDS_F * t + poseidon_hash.N_ROUNDS_P[t - 2])
+
+def _circom_array(values, per_line=16):
+    values = [str(value) for value in values]
+    rows = [", ".join(values[i:i + per_line]) for i in range(0, len(values), per_line)]
+    return "[\n        " + ",\n        ".join(rows) + "\n    ]"
+
+def generate_path_circom_code(model, feature_names, extra_includes=(), out=None, raw_units=None):
+    """
+    Emits DecisionTree(numFeatures) with the same inputs and output as generate_circom_code, but evaluated
+    along a single path. The node table (path_node_table) is committed as a Poseidon Merkle root, a
+    constant of the circuit. For each of the max_depth + 1 steps the witness generator supplies the node,
+    its table entry and the entry's Merkle siblings as private hints (<--); the constraints check the entry
+    against the root, compare the entry's feature with its threshold, and require the next node to be the
+    child the comparison picks. The path starts at node 0 and leaves point to themselves, so the last node
+    is the sample's leaf. Cost grows with depth * log2(nodes) instead of with the number of nodes.
+    """
+    if out is None:
+        buffer = io.StringIO()
+        generate_path_circom_code(model, feature_names, extra_includes, out=buffer, raw_units=raw_units)
+        return buffer.getvalue()
+
+    table = path_node_table(model, feature_names, raw_units)
+    merkle_tree = node_table_merkle_tree(table)
+    depth = max(int(model.tree_.max_depth), 1)
+    index_bits = table_index_bits(len(table))
+    n_bits = comparator_n_bits(raw_units)
+    if raw_units:
+        for node_index, (_, threshold, left, right, _) in enumerate(table):
+            if left != right and not 0 <= threshold < (1 << n_bits):
+                raise ValueError(f"Node {node_index}: raw threshold {threshold} does not fit the {n_bits}-bit comparators")
+    includes = ["../../node_modules/circomlib/circuits/comparators.circom",
+                "../../node_modules/circomlib/circuits/poseidon.circom"]
+    includes += [include_path for include_path in extra_includes if include_path not in includes]
+
+    write = out.write
+    write(f"pragma circom 2.1.5;\n\n")
+    write(f"// Decision tree circuit generated programmatically (path-hint evaluation)\n")
+    write(f"// Model used: {os.path.basename(MODEL_PATH)}\n\n")
+    for include_path in includes:
+        write(f"include \"{include_path}\";\n")
+    write("\n")
+
+    write(f"template DecisionTree(numFeatures) {{\n")
+    write(f"    // --- Inputs ---\n")
+    write(f"    // Expected order: {', '.join(feature_names)}\n")
+    if raw_units:
+        units = ", ".join(f"{name} x{unit}" for name, (_, _, unit) in raw_units.items())
+        write(f"    // Raw integer readings ({units}); Type flags as 0/1\n")
     else:
-        sum_terms_for_final_prediction = [] # List of signal names that will be summed for out_prediction
-
-        for i, (leaf_node_idx, path_terms_list, leaf_pred_value) in enumerate(leaf_processing_details):
-            # path_terms_list contains individual factors like "comp_node0_out", "(1 - comp_node1_out)"
-            
-            # Step 1: Calculate the combined path condition signal for this leaf using sequential multiplication
-            leaf_combined_path_condition_signal = f"path_leaf{leaf_node_idx}_active"
-
-            if not path_terms_list: # Should be "1" if root is leaf (no conditions)
-                circom_lines.append(f"    signal {leaf_combined_path_condition_signal} <== 1;")
-            elif len(path_terms_list) == 1: # Only one condition/term in the path
-                circom_lines.append(f"    signal {leaf_combined_path_condition_signal} <== {path_terms_list[0]};")
-            else: # Multiple conditions, requires sequential multiplication
-                current_product_signal = path_terms_list[0]
-                # If the first term is an expression like (1-X), ensure it's assignable or assign to temp if needed.
-                # However, Circom allows `signal s <== (1-X)*Y;` if (1-X) is not too complex.
-                # Our terms are simple: "signal_name" or "(1 - signal_name)" which are fine on RHS.
-
-                for j in range(1, len(path_terms_list)):
-                    intermediate_product_signal_name = f"leaf{leaf_node_idx}_pathprod_step{j-1}"
-                    circom_lines.append(f"    signal {intermediate_product_signal_name} <== {current_product_signal} * {path_terms_list[j]};")
-                    current_product_signal = intermediate_product_signal_name
-                # The final product for this path is now in current_product_signal
-                circom_lines.append(f"    signal {leaf_combined_path_condition_signal} <== {current_product_signal};")
-            
-            circom_lines.append(f"    // Leaf {leaf_node_idx}: Prediction={leaf_pred_value}, PathSignal: {leaf_combined_path_condition_signal}")
-
-            # Step 2: Calculate the contribution of this leaf to the final prediction
-            leaf_contribution_signal = f"leaf{leaf_node_idx}_contribution"
-            circom_lines.append(f"    signal {leaf_contribution_signal} <== {leaf_combined_path_condition_signal} * {leaf_pred_value};")
-            sum_terms_for_final_prediction.append(leaf_contribution_signal)
-        
-        # Step 3: Sum up all leaf_X_contribution signals
-        if not sum_terms_for_final_prediction:
-             circom_lines.append(f"    out_prediction <== 0;") # Should not be reached if leaf_processing_details was populated
-        elif len(sum_terms_for_final_prediction) == 1:
-             circom_lines.append(f"    out_prediction <== {sum_terms_for_final_prediction[0]};\n")
-        else:
-            # Iteratively sum: S0=T0, S1=S0+T1, S2=S1+T2 ... SN=S(N-1)+TN
-            current_total_sum_signal = sum_terms_for_final_prediction[0]
-            for k in range(1, len(sum_terms_for_final_prediction)):
-                # prev_total_sum_signal is current_total_sum_signal before update in this iteration
-                next_partial_sum_signal = f"prediction_partial_sum_{k-1}" # Generate unique names for these intermediate sums
-                circom_lines.append(f"    signal {next_partial_sum_signal} <== {current_total_sum_signal} + {sum_terms_for_final_prediction[k]};")
-                current_total_sum_signal = next_partial_sum_signal # Update for the next iteration
-            circom_lines.append(f"    out_prediction <== {current_total_sum_signal};\n")
+        write(f"    // Values should be scaled and multiplied by {FIXED_POINT_MULTIPLIER}\n")
+    write(f"    signal input features[numFeatures];\n\n")
+    write(f"    // --- Output ---\n")
+    write(f"    // 0 for No Failure, 1 for Failure\n")
+    write(f"    signal output out_prediction;\n\n")
+    if raw_units:
+        write(f"    // --- Input Range Checks ---\n")
+        write(f"    component range_check[numFeatures];\n")
+        write(f"    for (var i = 0; i < numFeatures; i++) {{\n")
+        write(f"        range_check[i] = Num2Bits({n_bits});\n")
+        write(f"        range_check[i].in <== features[i];\n")
+        write(f"    }}\n\n")
+
+    write(f"    // --- Node Table ({len(table)} nodes): feature, threshold, left, right, class; leaves point to themselves ---\n")
+    write(f"    var DEPTH = {depth};\n")
+    write(f"    var INDEX_BITS = {index_bits};\n")
+    for column, name in enumerate(("NODE_FEATURE", "NODE_THRESHOLD", "NODE_LEFT", "NODE_RIGHT", "NODE_CLASS")):
+        write(f"    var {name}[{len(table)}] = {_circom_array([entry[column] for entry in table])};\n")
+    write(f"    // Poseidon Merkle tree of the table entries in heap order: [1] is the root, slot j is at 2^INDEX_BITS + j\n")
+    write(f"    var MERKLE_TREE[{len(merkle_tree)}] = {_circom_array(merkle_tree, per_line=2)};\n\n")
+
+    write(f"    // --- Path Hints (private witness, computed here and constrained below) ---\n")
+    write(f"    signal node[DEPTH + 1];\n")
+    write(f"    signal entry[DEPTH + 1][5];\n")
+    write(f"    signal sibling[DEPTH + 1][INDEX_BITS];\n")
+    write(f"    var current = 0;\n")
+    write(f"    for (var i = 0; i <= DEPTH; i++) {{\n")
+    write(f"        node[i] <-- current;\n")
+    write(f"        entry[i][0] <-- NODE_FEATURE[current];\n")
+    write(f"        entry[i][1] <-- NODE_THRESHOLD[current];\n")
+    write(f"        entry[i][2] <-- NODE_LEFT[current];\n")
+    write(f"        entry[i][3] <-- NODE_RIGHT[current];\n")
+    write(f"        entry[i][4] <-- NODE_CLASS[current];\n")
+    write(f"        var position = (1 << INDEX_BITS) + current;\n")
+    write(f"        for (var k = 0; k < INDEX_BITS; k++) {{\n")
+    write(f"            sibling[i][k] <-- MERKLE_TREE[(position >> k) ^ 1];\n")
+    write(f"        }}\n")
+    write(f"        var value = 0;\n")
+    write(f"        for (var j = 0; j < numFeatures; j++) {{\n")
+    write(f"            if (j == NODE_FEATURE[current]) {{\n")
+    write(f"                value = features[j];\n")
+    write(f"            }}\n")
+    write(f"        }}\n")
+    write(f"        current = value <= NODE_THRESHOLD[current] ? NODE_LEFT[current] : NODE_RIGHT[current];\n")
+    write(f"    }}\n\n")
 
+    write(f"    // --- Table Lookups: each hinted entry hashes, along node's index bits, up to the committed root ---\n")
+    write(f"    node[0] === 0;\n")
+    write(f"    component node_bits[DEPTH + 1];\n")
+    write(f"    component entry_hash[DEPTH + 1];\n")
+    write(f"    component level_hash[DEPTH + 1][INDEX_BITS];\n")
+    write(f"    signal level[DEPTH + 1][INDEX_BITS + 1];\n")
+    write(f"    signal level_left[DEPTH + 1][INDEX_BITS];\n")
+    write(f"    for (var i = 0; i <= DEPTH; i++) {{\n")
+    write(f"        node_bits[i] = Num2Bits(INDEX_BITS);\n")
+    write(f"        node_bits[i].in <== node[i];\n")
+    write(f"        entry_hash[i] = Poseidon(5);\n")
+    write(f"        for (var e = 0; e < 5; e++) {{\n")
+    write(f"            entry_hash[i].inputs[e] <== entry[i][e];\n")
+    write(f"        }}\n")
+    write(f"        level[i][0] <== entry_hash[i].out;\n")
+    write(f"        for (var k = 0; k < INDEX_BITS; k++) {{\n")
+    write(f"            // Index bit k is 1 when the level-k node is a right child\n")
+    write(f"            level_left[i][k] <== level[i][k] + node_bits[i].out[k] * (sibling[i][k] - level[i][k]);\n")
+    write(f"            level_hash[i][k] = Poseidon(2);\n")
+    write(f"            level_hash[i][k].inputs[0] <== level_left[i][k];\n")
+    write(f"            level_hash[i][k].inputs[1] <== level[i][k] + sibling[i][k] - level_left[i][k];\n")
+    write(f"            level[i][k + 1] <== level_hash[i][k].out;\n")
+    write(f"        }}\n")
+    write(f"        level[i][INDEX_BITS] === {merkle_tree[1]};\n")
+    write(f"    }}\n\n")
 
+    write(f"    // --- Path Steps: compare the entry's feature with its threshold and follow the chosen child ---\n")
+    write(f"    component feature_is[DEPTH][numFeatures];\n")
+    write(f"    signal feature_term[DEPTH][numFeatures];\n")
+    write(f"    signal selected[DEPTH];\n")
+    write(f"    component comp[DEPTH];\n")
+    write(f"    signal step[DEPTH];\n")
+    write(f"    for (var i = 0; i < DEPTH; i++) {{\n")
+    write(f"        var selected_sum = 0;\n")
+    write(f"        for (var j = 0; j < numFeatures; j++) {{\n")
+    write(f"            feature_is[i][j] = IsEqual();\n")
+    write(f"            feature_is[i][j].in[0] <== entry[i][0];\n")
+    write(f"            feature_is[i][j].in[1] <== j;\n")
+    write(f"            feature_term[i][j] <== feature_is[i][j].out * features[j];\n")
+    write(f"            selected_sum += feature_term[i][j];\n")
+    write(f"        }}\n")
+    write(f"        selected[i] <== selected_sum;\n")
+    write(f"        comp[i] = LessEqThan({n_bits});\n")
+    write(f"        comp[i].in[0] <== selected[i];\n")
+    write(f"        comp[i].in[1] <== entry[i][1];\n")
+    write(f"        step[i] <== comp[i].out * (entry[i][2] - entry[i][3]); // left - right if true, 0 if false\n")
+    write(f"        node[i + 1] === entry[i][3] + step[i];\n")
+    write(f"    }}\n\n")
+    write(f"    out_prediction <== entry[DEPTH][4];\n")
+    write(f"}}\n\n")
+    write(f"// To use this, instantiate it in a main component\n")
+    write(f"// component main {{public [features]}} = DecisionTree({len(feature_names)});")
+
+def generate_batch_circom_code(model, feature_names, batch_size, out=None, raw_units=None):
+    """
+    Wraps the single-sample DecisionTree template in a DecisionTreeBatch(K, numFeatures)
+    main component, so K feature vectors are proven with one witness and one proof.
+    The thresholds are compile-time constants, so all K instances share the same wiring.
+    """
+    if out is None:
+        buffer = io.StringIO()
+        generate_batch_circom_code(model, feature_names, batch_size, out=buffer, raw_units=raw_units)
+        return buffer.getvalue()
+    num_features = len(feature_names)
+    generate_circom_code(model, feature_names, out=out, raw_units=raw_units)
+    circom_lines = ["", ""]
+
+    circom_lines.append(f"template DecisionTreeBatch(K, numFeatures) {{")
+    circom_lines.append(f"    // --- Inputs ---")
+    circom_lines.append(f"    // K feature vectors, each in the same order and units as DecisionTree")
+    circom_lines.append(f"    // Unused slots are padded by repeating the last real sample")
+    circom_lines.append(f"    signal input features[K][numFeatures];\n")
+    circom_lines.append(f"    // --- Outputs ---")
+    circom_lines.append(f"    // One prediction per slot, in the same order as features")
+    circom_lines.append(f"    signal output out_predictions[K];\n")
+    circom_lines.append(f"    component trees[K];")
+    circom_lines.append(f"    for (var k = 0; k < K; k++) {{")
+    circom_lines.append(f"        trees[k] = DecisionTree(numFeatures);")
+    circom_lines.append(f"        for (var i = 0; i < numFeatures; i++) {{")
+    circom_lines.append(f"            trees[k].features[i] <== features[k][i];")
+    circom_lines.append(f"        }}")
+    circom_lines.append(f"        out_predictions[k] <== trees[k].out_prediction;")
+    circom_lines.append(f"    }}")
     circom_lines.append(f"}}\n")
-    circom_lines.append(f"// To use this, instantiate it in a main component")
-    circom_lines.append(f"// component main {{public [features]}} = DecisionTree({num_features});")
-    return "\n".join(circom_lines)
+    # public.json layout: out_predictions[0..K-1], then features flattened row by row
+    circom_lines.append(f"component main {{public [features]}} = DecisionTreeBatch({batch_size}, {num_features});")
+    out.write("\n".join(circom_lines))
+
+def generate_committed_circom_code(model, feature_names, out=None, raw_units=None):
+    """
+    Wraps DecisionTree in DecisionTreeCommitted(numFeatures): the features (and a salt) are private and the
+    only public signals are out_prediction and feature_commitment = Poseidon(features..., salt).
+    The pipeline computes the same commitment natively with poseidon_hash.commit_features.
+    """
+    if out is None:
+        buffer = io.StringIO()
+        generate_committed_circom_code(model, feature_names, out=buffer, raw_units=raw_units)
+        return buffer.getvalue()
+    num_features = len(feature_names)
+    generate_circom_code(model, feature_names,
+        extra_includes=["../../node_modules/circomlib/circuits/poseidon.circom"], out=out, raw_units=raw_units)
+    circom_lines = ["", ""]
+
+    circom_lines.append(f"template DecisionTreeCommitted(numFeatures) {{")
+    circom_lines.append(f"    // --- Private Inputs ---")
+    circom_lines.append(f"    // Same order and units as DecisionTree; salt is 0 for unsalted commitments")
+    circom_lines.append(f"    signal input features[numFeatures];")
+    circom_lines.append(f"    signal input salt;\n")
+    circom_lines.append(f"    // --- Public Input ---")
+    circom_lines.append(f"    // Poseidon(features[0], ..., features[numFeatures-1], salt)")
+    circom_lines.append(f"    signal input feature_commitment;\n")
+    circom_lines.append(f"    // --- Output ---")
+    circom_lines.append(f"    // 0 for No Failure, 1 for Failure")
+    circom_lines.append(f"    signal output out_prediction;\n")
+    circom_lines.append(f"    component hasher = Poseidon(numFeatures + 1);")
+    circom_lines.append(f"    component tree = DecisionTree(numFeatures);")
+    circom_lines.append(f"    for (var i = 0; i < numFeatures; i++) {{")
+    circom_lines.append(f"        hasher.inputs[i] <== features[i];")
+    circom_lines.append(f"        tree.features[i] <== features[i];")
+    circom_lines.append(f"    }}")
+    circom_lines.append(f"    hasher.inputs[numFeatures] <== salt;")
+    circom_lines.append(f"    feature_commitment === hasher.out;\n")
+    circom_lines.append(f"    out_prediction <== tree.out_prediction;")
+    circom_lines.append(f"}}\n")
+    # public.json layout: [out_prediction, feature_commitment]
+    circom_lines.append(f"component main {{public [feature_commitment]}} = DecisionTreeCommitted({num_features});")
+    out.write("\n".join(circom_lines))
 
 # --- Main execution ---
 if __name__ == "__main__":
@@ -211,23 +574,44 @@ if __name__ == "__main__":
             raise ValueError("Loaded model is not a scikit-learn Decision Tree or has no 'tree_' attribute.")
         
         feature_names_loaded = joblib.load(FEATURE_NAMES_PATH)
+        raw_units = load_raw_units()
         
         print(f"Loaded model from {MODEL_PATH}")
         print(f"Feature names: {feature_names_loaded}")
-        print(f"Fixed-point multiplier: {FIXED_POINT_MULTIPLIER}")
-        print(f"Comparator n_bits: {COMPARATOR_N_BITS}\n")
+        if raw_units:
+            print(f"Input units: raw (scaler from {SCALER_PATH} folded into the thresholds)")
+        else:
+            print(f"Fixed-point multiplier: {FIXED_POINT_MULTIPLIER}")
+        print(f"Comparator n_bits: {comparator_n_bits(raw_units)}")
+        cost = estimate_circuit_constraints(model, raw_units=raw_units, feature_names=feature_names_loaded)
+        print(f"Tree evaluation: {TREE_EVALUATION} (estimated constraints: full {cost['estimated_constraints_full']}, "
+              f"path {cost['estimated_constraints_path']})\n")
         
         print("Generating Circom code...")
-        circom_code_str = generate_circom_code(model, feature_names_loaded)
-        
-        with open(CIRCOM_OUTPUT_FILE, "w") as f:
-            f.write(circom_code_str)
+        with open(CIRCOM_OUTPUT_FILE, "w", buffering=WRITE_BUFFER_SIZE) as f:
+            generate_circom_code(model, feature_names_loaded, out=f, raw_units=raw_units)
         
         print(f"\nCircom code successfully written to {CIRCOM_OUTPUT_FILE}")
+
+        if BATCH_SIZE > 1:
+            print(f"\nGenerating batch Circom code (K={BATCH_SIZE})...")
+            with open(BATCH_CIRCOM_OUTPUT_FILE, "w", buffering=WRITE_BUFFER_SIZE) as f:
+                generate_batch_circom_code(model, feature_names_loaded, BATCH_SIZE, out=f, raw_units=raw_units)
+            print(f"Batch Circom code successfully written to {BATCH_CIRCOM_OUTPUT_FILE}")
+
+        if PUBLIC_INPUT_MODE == "commitment":
+            print("\nGenerating Poseidon-committed Circom code...")
+            with open(COMMITTED_CIRCOM_OUTPUT_FILE, "w", buffering=WRITE_BUFFER_SIZE) as f:
+                generate_committed_circom_code(model, feature_names_loaded, out=f, raw_units=raw_units)
+            print(f"Committed Circom code successfully written to {COMMITTED_CIRCOM_OUTPUT_FILE}")
         print("\n--- Next Steps ---")
         print(f"1. Review '{CIRCOM_OUTPUT_FILE}'.")
         print(f"2. Create a main component if needed (example provided at the end of the file).")
         print(f"3. Compile the Circom circuit: circom {CIRCOM_OUTPUT_FILE} --r1cs --wasm --sym -o ./circuit_build")
+        if BATCH_SIZE > 1:
+            print(f"4. Compile the batch circuit: circom {BATCH_CIRCOM_OUTPUT_FILE} --r1cs --wasm --sym -o ./batch_circuit_build")
+        if PUBLIC_INPUT_MODE == "commitment":
+            print(f"5. Compile the committed circuit: circom {COMMITTED_CIRCOM_OUTPUT_FILE} --r1cs --wasm --sym -o ./committed_circuit_build")
         # ... (rest of print statements)
 
     except Exception as e: # Changed to catch all exceptions for better debugging here
@@ -0,0 +1,269 @@
+# zkp_scripts/09_build_zkp_artifacts.py
+"""
+Incremental build driver for the circuit artifacts: generate circom -> compile -> groth16 setup ->
+contribute -> export verification key, for every circuit variant the current configuration uses.
+With --proof-systems plonk/fflonk (default: PROOF_SYSTEM) the keys come from snarkjs's universal setup
+instead, which needs no circuit-specific contribution.
+
+Every stage is keyed by a hash of its inputs (model, feature names, generator settings, circom source,
+ptau) and stored in the content-addressed cache (artifact_cache.py), so only stale stages run. When the
+retrained tree is identical the whole build is a few file hashes. config_loader picks the built
+artifacts up through artifacts/build_cache/manifest.json.
+"""
+import argparse
+import json
+import os
+import secrets
+import shutil
+import subprocess
+import sys
+import time
+
+import joblib
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+import config_loader as cfg
+import artifact_cache
+import script_loader
+
+# --- Configuration ---
+# Generated sources include "../../node_modules/circomlib/...", which resolves against this library path
+CIRCOM_LIBRARY_DIR = os.path.join(PROJECT_ROOT, "artifacts", "circuit")
+CIRCOMLIB_PACKAGE_JSON = os.path.join(PROJECT_ROOT, "node_modules", "circomlib", "package.json")
+
+
+def circuit_variants():
+    """(circuit_name, settings) for every circuit the current configuration needs."""
+    variants = [("decision_tree", {})]
+    if cfg.PROOF_BATCH_SIZE > 1:
+        variants.append(("decision_tree_batch", {"batch_size": cfg.PROOF_BATCH_SIZE}))
+    if cfg.PUBLIC_INPUT_MODE == "commitment":
+        variants.append(("decision_tree_committed", {}))
+    return variants
+
+
+def generate_source(generator, circuit_name, settings, model, feature_names, raw_units=None):
+    if circuit_name == "decision_tree_batch":
+        return generator.generate_batch_circom_code(model, feature_names, settings["batch_size"], raw_units=raw_units)
+    if circuit_name == "decision_tree_committed":
+        return generator.generate_committed_circom_code(model, feature_names, raw_units=raw_units)
+    # The single-sample file only carries a commented-out main component for manual builds
+    source = generator.generate_circom_code(model, feature_names, raw_units=raw_units)
+    return source + f"\ncomponent main {{public [features]}} = DecisionTree({len(feature_names)});\n"
+
+
+def run_tool(command, label):
+    print(f"  $ {' '.join(str(part) for part in command)}")
+    start_time = time.time()
+    result = subprocess.run(command, capture_output=True, text=True, shell=(os.name == 'nt'))
+    if result.returncode != 0:
+        print(result.stdout)
+        print(result.stderr)
+        raise RuntimeError(f"{label} failed with exit code {result.returncode}")
+    print(f"  {label} finished in {time.time() - start_time:.1f}s")
+
+
+def setup_zkey_name(proof_system, circuit_name):
+    return f"{circuit_name}_0001.zkey" if proof_system == "groth16" else f"{circuit_name}_{proof_system}.zkey"
+
+
+def groth16_setup(circuit_name, r1cs_path, ptau_candidates, out_dir):
+    """Groth16 setup + one contribution + verification key export into out_dir; returns (ptau_path, power)."""
+    ptau_path, ptau_power = ptau_candidates[0]
+    initial_zkey = os.path.join(out_dir, f"{circuit_name}_0000.zkey")
+    final_zkey = os.path.join(out_dir, setup_zkey_name("groth16", circuit_name))
+    run_tool([cfg.SNARKJS_CMD_PATH, "groth16", "setup", r1cs_path, ptau_path, initial_zkey], "groth16 setup")
+    entropy = os.getenv("ZKEY_CONTRIBUTION_ENTROPY") or secrets.token_hex(32)
+    run_tool([cfg.SNARKJS_CMD_PATH, "zkey", "contribute", initial_zkey, final_zkey,
+              "--name=Build driver contribution", f"-e={entropy}"], "zkey contribute")
+    run_tool([cfg.SNARKJS_CMD_PATH, "zkey", "export", "verificationkey", final_zkey,
+              os.path.join(out_dir, "verification_key.json")], "export verification key")
+    os.remove(initial_zkey)
+    return ptau_path, ptau_power
+
+
+def universal_setup(proof_system, circuit_name, r1cs_path, ptau_candidates, out_dir):
+    """
+    `snarkjs plonk|fflonk setup` + verification key export into out_dir; returns (ptau_path, power).
+    The keys are derived from the ptau alone (no contribution). PLONK and FFLONK need a larger domain than
+    the R1CS constraint count suggests, so the ptau files are tried smallest first until one fits.
+    """
+    zkey_path = os.path.join(out_dir, setup_zkey_name(proof_system, circuit_name))
+    for ptau_path, ptau_power in ptau_candidates:
+        command = [cfg.SNARKJS_CMD_PATH, proof_system, "setup", r1cs_path, ptau_path, zkey_path]
+        print(f"  $ {' '.join(str(part) for part in command)}")
+        start_time = time.time()
+        result = subprocess.run(command, capture_output=True, text=True, shell=(os.name == 'nt'))
+        if result.returncode == 0 and os.path.exists(zkey_path):
+            print(f"  {proof_system} setup finished in {time.time() - start_time:.1f}s")
+            break
+        if "too big" not in (result.stdout + result.stderr).lower():
+            print(result.stdout)
+            print(result.stderr)
+            raise RuntimeError(f"{proof_system} setup failed with exit code {result.returncode}")
+        print(f"  Power {ptau_power} is too small for {proof_system}; trying the next ptau file")
+    else:
+        raise FileNotFoundError(f"No .ptau file in {cfg.PTAU_SEARCH_DIRS} is large enough for the {proof_system} setup")
+    run_tool([cfg.SNARKJS_CMD_PATH, "zkey", "export", "verificationkey", zkey_path,
+              os.path.join(out_dir, "verification_key.json")], "export verification key")
+    return ptau_path, ptau_power
+
+
+def setup_stage_key(manifest, proof_system, r1cs_digest, ptau_path):
+    """Cache key of a setup: the r1cs and the ptau it was run with (plus the proof system unless Groth16)."""
+    setup_inputs = {"r1cs": r1cs_digest, "ptau": artifact_cache.cached_file_digest(manifest, ptau_path)}
+    if proof_system != "groth16": # Groth16 setups are keyed by the r1cs and ptau alone
+        setup_inputs["proof_system"] = proof_system
+    return artifact_cache.stage_key("setup", **setup_inputs)
+
+
+def run_setup(proof_system, circuit_name, r1cs_path, ptau_candidates, out_dir):
+    """Writes the proving key (setup_zkey_name) and verification_key.json for proof_system into out_dir."""
+    if proof_system == "groth16":
+        return groth16_setup(circuit_name, r1cs_path, ptau_candidates, out_dir)
+    return universal_setup(proof_system, circuit_name, r1cs_path, ptau_candidates, out_dir)
+
+
+def build_circuit(circuit_name, settings, generator, model, feature_names, input_digests, manifest, args,
+                  raw_units=None):
+    """Brings one circuit up to date and returns its manifest entry."""
+    print(f"\n=== {circuit_name} ===")
+
+    # 1. Circom source
+    source_key = artifact_cache.stage_key("source", circuit=circuit_name, settings=settings, **input_digests)
+    source_file_name = f"{circuit_name}.circom"
+    if artifact_cache.is_built("source", source_key):
+        print(f"[source] up to date ({source_key[:12]})")
+    else:
+        print(f"[source] generating ({source_key[:12]})")
+        scratch_dir = artifact_cache.begin_stage("source", source_key)
+        with open(os.path.join(scratch_dir, source_file_name), "w") as f:
+            f.write(generate_source(generator, circuit_name, settings, model, feature_names, raw_units))
+        artifact_cache.publish_stage("source", source_key, scratch_dir)
+    source_path = os.path.join(artifact_cache.stage_dir("source", source_key), source_file_name)
+
+    # 2. Compile (keyed by the circom source itself, so generator changes that emit identical code are free)
+    compile_key = artifact_cache.stage_key("compile", source=artifact_cache.sha256_file(source_path),
+                                           circomlib=input_digests["circomlib"])
+    if artifact_cache.is_built("compile", compile_key):
+        print(f"[compile] up to date ({compile_key[:12]})")
+    else:
+        print(f"[compile] compiling ({compile_key[:12]})")
+        scratch_dir = artifact_cache.begin_stage("compile", compile_key)
+        run_tool([cfg.CIRCOM_CMD_PATH, source_path, "--r1cs", "--wasm", "--sym", "-o", scratch_dir,
+                  "-l", CIRCOM_LIBRARY_DIR], "circom")
+        artifact_cache.publish_stage("compile", compile_key, scratch_dir)
+    compile_dir = artifact_cache.stage_dir("compile", compile_key)
+    r1cs_path = os.path.join(compile_dir, f"{circuit_name}.r1cs")
+    r1cs_header = artifact_cache.read_r1cs_header(r1cs_path)
+    required_power = artifact_cache.required_ptau_power(r1cs_header)
+    print(f"  {r1cs_header['n_constraints']} constraints -> needs ptau power >= {required_power}")
+
+    # 3. Proving + verification keys for every requested proof system
+    candidates = artifact_cache.ptau_candidates(required_power, cfg.PTAU_SEARCH_DIRS)
+    if not candidates:
+        raise FileNotFoundError(f"No .ptau file with power >= {required_power} in {cfg.PTAU_SEARCH_DIRS}")
+    previous = manifest["circuits"].get(circuit_name, {})
+    same_circuit = previous.get("compile_key") == compile_key # Keys of other proof systems stay valid
+    setups = dict(previous.get("setups", {})) if same_circuit else {}
+    key_artifacts = {name: path for name, path in previous.get("artifacts", {}).items()
+                     if same_circuit and name.endswith(("zkey", "vkey"))}
+    r1cs_digest = artifact_cache.sha256_file(r1cs_path)
+    ptau_powers = dict(candidates)
+    for proof_system in args.proof_systems:
+        # Groth16 always uses the smallest ptau; PLONK/FFLONK use the smallest one their domain fits, which is
+        # only known after a setup has run, so the ptau recorded for this circuit last time is looked up first
+        if proof_system == "groth16":
+            ptau_path = candidates[0][0]
+        else:
+            ptau_path = next((path for path, _ in candidates
+                              if os.path.basename(path) == setups.get(proof_system, {}).get("ptau")), None)
+        setup_key = setup_stage_key(manifest, proof_system, r1cs_digest, ptau_path) if ptau_path else None
+        if setup_key and artifact_cache.is_built("setup", setup_key) and not args.force_setup:
+            print(f"[setup] {proof_system} up to date ({setup_key[:12]})")
+        else:
+            print(f"[setup] running {proof_system} setup")
+            scratch_dir = artifact_cache.begin_stage(
+                "setup", artifact_cache.stage_key("setup_scratch", r1cs=r1cs_digest, proof_system=proof_system))
+            start_time = time.time()
+            ptau_path, ptau_power = run_setup(proof_system, circuit_name, r1cs_path, candidates, scratch_dir)
+            setup_key = setup_stage_key(manifest, proof_system, r1cs_digest, ptau_path)
+            print(f"  setup key {setup_key[:12]}")
+            with open(os.path.join(scratch_dir, "setup.json"), "w") as f:
+                json.dump({"proof_system": proof_system, "ptau": os.path.basename(ptau_path), "ptau_power": ptau_power,
+                           "seconds": round(time.time() - start_time, 2)}, f, indent=2)
+            if os.path.isdir(artifact_cache.stage_dir("setup", setup_key)): # --force-setup replaces the old keys
+                shutil.rmtree(artifact_cache.stage_dir("setup", setup_key))
+            artifact_cache.publish_stage("setup", setup_key, scratch_dir)
+        setup_dir = artifact_cache.stage_dir("setup", setup_key)
+        setup_info = {"ptau": os.path.basename(ptau_path), "ptau_power": ptau_powers[ptau_path]}
+        if os.path.exists(os.path.join(setup_dir, "setup.json")):
+            with open(os.path.join(setup_dir, "setup.json"), "r") as f:
+                setup_info = json.load(f)
+        print(f"  {proof_system}: {setup_info['ptau']} (power {setup_info['ptau_power']})")
+        setups[proof_system] = dict(setup_info, setup_key=setup_key)
+        prefix = "" if proof_system == "groth16" else f"{proof_system}_"
+        key_artifacts[f"{prefix}zkey"] = os.path.join("setup", setup_key, setup_zkey_name(proof_system, circuit_name))
+        key_artifacts[f"{prefix}vkey"] = os.path.join("setup", setup_key, "verification_key.json")
+
+    js_dir = os.path.join("compile", compile_key, f"{circuit_name}_js")
+    return {
+        "source_key": source_key, "compile_key": compile_key,
+        "constraints": r1cs_header["n_constraints"], "setups": setups,
+        "artifacts": dict({ # Relative to the cache root
+            "circom": os.path.join("source", source_key, source_file_name),
+            "r1cs": os.path.join("compile", compile_key, f"{circuit_name}.r1cs"),
+            "wasm": os.path.join(js_dir, f"{circuit_name}.wasm"),
+            "witness_gen": os.path.join(js_dir, "generate_witness.js"),
+        }, **key_artifacts),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild only the stale circuit/zkey artifacts.")
+    parser.add_argument("--force-setup", action="store_true",
+                        help="Redo the key setup (and Groth16 contribution) even if cached keys exist.")
+    parser.add_argument("--proof-systems", default=cfg.PROOF_SYSTEM,
+                        help=f"Comma-separated proof systems to build keys for, from {cfg.PROOF_SYSTEMS}.")
+    args = parser.parse_args()
+    args.proof_systems = [name.strip().lower() for name in args.proof_systems.split(",") if name.strip()]
+    unknown = set(args.proof_systems) - set(cfg.PROOF_SYSTEMS)
+    if unknown:
+        parser.error(f"Unknown proof systems {sorted(unknown)}; expected some of {cfg.PROOF_SYSTEMS}")
+
+    start_time = time.time()
+    manifest = artifact_cache.load_manifest()
+    generator = script_loader.load_generator()
+    model = joblib.load(cfg.MODEL_PATH)
+    feature_names = joblib.load(cfg.FEATURE_NAMES_PATH)
+    raw_units = generator.load_raw_units() # None unless CIRCUIT_INPUT_UNITS=raw
+
+    input_digests = {
+        "model": artifact_cache.sha256_file(cfg.MODEL_PATH),
+        "feature_names": artifact_cache.sha256_file(cfg.FEATURE_NAMES_PATH),
+        "generator": artifact_cache.sha256_file(script_loader.GENERATOR_SCRIPT_PATH),
+        "generator_settings": {"fixed_point_multiplier": generator.FIXED_POINT_MULTIPLIER,
+                               "comparator_n_bits": generator.comparator_n_bits(raw_units),
+                               "input_units": generator.INPUT_UNITS,
+                               "tree_evaluation": generator.TREE_EVALUATION,
+                               "raw_unit_multipliers": generator.RAW_UNIT_MULTIPLIERS if raw_units else None},
+        # Raw-unit thresholds are folded from the scaler, so a refit scaler must regenerate the circuit
+        "scaler": artifact_cache.sha256_file(cfg.SCALER_PATH) if raw_units else None,
+        "circomlib": artifact_cache.sha256_file(CIRCOMLIB_PACKAGE_JSON) if os.path.exists(CIRCOMLIB_PACKAGE_JSON) else None,
+    }
+
+    for circuit_name, settings in circuit_variants():
+        manifest["circuits"][circuit_name] = build_circuit(
+            circuit_name, settings, generator, model, feature_names, input_digests, manifest, args, raw_units)
+        artifact_cache.save_manifest(manifest) # Keep finished circuits even if a later one fails
+
+    print(f"\nBuild complete in {time.time() - start_time:.1f}s. Manifest: {artifact_cache.MANIFEST_PATH}")
+    for circuit_name, entry in manifest["circuits"].items():
+        setups = entry.get("setups") or {"groth16": {"ptau": entry.get("ptau"), "setup_key": entry.get("setup_key", "")}}
+        keys = ", ".join(f"{system} {info['ptau']} zkey {info['setup_key'][:12]}" for system, info in setups.items())
+        print(f"  {circuit_name}: {entry['constraints']} constraints; {keys}")
+
+
+if __name__ == "__main__":
+    main()
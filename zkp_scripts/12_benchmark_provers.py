@@ -0,0 +1,115 @@
+# zkp_scripts/12_benchmark_provers.py
+"""
+Micro-benchmark of the Groth16 prover backends (prover_backends.py) on our circuit.
+
+Builds one witness for a dataset sample, then proves it --runs times with every available backend
+(after one warm-up run), verifies each backend's proof and checks that all backends produce the same
+public signals. Prints mean/median/min prove time and the speed-up over snarkjs.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+from datetime import datetime, timezone
+
+import joblib
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+import config_loader as cfg
+import dataset_cache
+import poseidon_hash
+import prover_backends
+import script_loader
+
+# --- Configuration ---
+BENCHMARK_OUTPUT_DIR = os.path.join(PROJECT_ROOT, "runtime_outputs", "benchmark")
+WORK_DIR = os.path.join(BENCHMARK_OUTPUT_DIR, "provers_work")
+
+
+def build_witness(pipeline, sample_idx, committed):
+    """Writes input.json and witness.wtns for one sample into WORK_DIR; returns the witness path."""
+    df_original = dataset_cache.load_dataset(cfg.DATASET_PATH)
+    scaler = joblib.load(cfg.SCALER_PATH)
+    paths = pipeline.sample_work_paths(WORK_DIR, committed)
+    _, _, features = pipeline.prepare_input_for_circuit(
+        df_original, sample_idx, scaler, cfg.FEATURE_NAMES_ORDER,
+        cfg.NUMERICAL_FEATURES_FOR_SCALING, cfg.FIXED_POINT_MULTIPLIER, paths["input_json"])
+    if committed:
+        salt = poseidon_hash.random_salt()
+        with open(paths["input_json"], 'w') as f:
+            json.dump({"features": features, "salt": str(salt),
+                       "feature_commitment": str(poseidon_hash.commit_features(features, salt))}, f)
+    wasm_path = cfg.COMMITTED_WASM_FILE_PATH if committed else cfg.WASM_FILE_PATH
+    witness_gen_script_path = cfg.COMMITTED_WITNESS_GEN_SCRIPT_PATH if committed else cfg.WITNESS_GEN_SCRIPT_PATH
+    command = pipeline.build_witness_command(witness_gen_script_path, wasm_path, paths["input_json"], paths["witness"])
+    if not pipeline.run_command(command, working_dir=os.path.dirname(wasm_path)):
+        raise RuntimeError("Witness generation failed.")
+    return paths["witness"]
+
+
+def benchmark_backend(backend, zkey_path, vkey_path, witness_path, runs):
+    """Warm-up + `runs` timed proofs; returns timings, verification result and public signals."""
+    proof_path = os.path.join(WORK_DIR, f"proof_{backend.name}.json")
+    public_path = os.path.join(WORK_DIR, f"public_{backend.name}.json")
+    backend.prove(zkey_path, witness_path, proof_path, public_path, cwd=cfg.BASE_DIR) # Warm-up (file cache, JIT)
+    timings = [backend.prove(zkey_path, witness_path, proof_path, public_path, cwd=cfg.BASE_DIR) for _ in range(runs)]
+    with open(public_path, 'r') as f:
+        public_signals = json.load(f)
+    return {
+        "mean_s": round(statistics.mean(timings), 4),
+        "median_s": round(statistics.median(timings), 4),
+        "min_s": round(min(timings), 4),
+        "verified": backend.verify(vkey_path, public_path, proof_path, cwd=cfg.BASE_DIR),
+        "public_signals": public_signals,
+    }
+
+
+# --- Main execution ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare Groth16 prover backends on the decision tree circuit.")
+    parser.add_argument("--backends", default=",".join(prover_backends.PROVER_BACKENDS),
+                        help="Comma-separated backends to compare.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--sample-index", type=int, default=cfg.SAMPLE_INDEX)
+    parser.add_argument("--committed", action="store_true", help="Benchmark the DecisionTreeCommitted circuit.")
+    args = parser.parse_args()
+
+    zkey_path = cfg.COMMITTED_PROVING_KEY_PATH if args.committed else cfg.PROVING_KEY_PATH
+    vkey_path = cfg.COMMITTED_VERIFICATION_KEY_PATH if args.committed else cfg.VERIFICATION_KEY_PATH
+    if not os.path.exists(zkey_path):
+        print(f"Error: {zkey_path} not found. Run zkp_scripts/09_build_zkp_artifacts.py first.")
+        sys.exit(1)
+
+    os.makedirs(WORK_DIR, exist_ok=True)
+    witness_path = build_witness(script_loader.load_pipeline(), args.sample_index, args.committed)
+    print(f"Witness for sample {args.sample_index}: {witness_path}")
+
+    results = {}
+    for name in args.backends.split(","):
+        backend = prover_backends.get_prover(name.strip(), cfg.SNARKJS_CMD_PATH, cfg.NATIVE_PROVER_PATH)
+        missing = backend.missing_executables()
+        if missing:
+            print(f"Skipping {backend.name}: executables not found {missing}")
+            continue
+        print(f"Benchmarking {backend.name} ({args.runs} runs)...")
+        results[backend.name] = benchmark_backend(backend, zkey_path, vkey_path, witness_path, args.runs)
+
+    if not results:
+        print("No prover backend available.")
+        sys.exit(1)
+    reference_signals = next(iter(results.values()))["public_signals"]
+    baseline = results.get("snarkjs", {}).get("median_s")
+    print(f"\n{'backend':<10}{'mean (s)':>10}{'median (s)':>12}{'min (s)':>10}{'speed-up':>10}  verified  same public signals")
+    for name, result in results.items():
+        speedup = f"{baseline / result['median_s']:.1f}x" if baseline else "-"
+        print(f"{name:<10}{result['mean_s']:>10}{result['median_s']:>12}{result['min_s']:>10}{speedup:>10}  "
+              f"{str(result['verified']):<8}  {result['public_signals'] == reference_signals}")
+
+    report_path = os.path.join(BENCHMARK_OUTPUT_DIR, f"provers_{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.json")
+    with open(report_path, 'w') as f:
+        json.dump({"zkey": zkey_path, "runs": args.runs, "sample_index": args.sample_index,
+                   "results": {name: {k: v for k, v in result.items() if k != "public_signals"}
+                               for name, result in results.items()}}, f, indent=2)
+    print(f"\nReport written to {report_path}")
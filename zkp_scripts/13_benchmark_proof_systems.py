@@ -0,0 +1,156 @@
+# zkp_scripts/13_benchmark_proof_systems.py
+"""
+Compares Groth16 with the universal-setup systems PLONK and FFLONK on our circuit.
+
+For each proof system: times the key setup a retrained tree needs (Groth16 setup + contribution, or the
+plonk/fflonk setup from the shared ptau), proves one witness --runs times with snarkjs, verifies the
+proof, measures proof.json and calldata size, and estimates the gas of the snarkjs-exported Solidity
+verifier on an in-process eth-tester chain (needs py-solc-x and solc, like 11_benchmark_pipeline.py).
+Keys are built in a scratch directory, so the build cache and the configured keys are not touched.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+import config_loader as cfg
+import artifact_cache
+import prover_backends
+import script_loader
+
+# --- Configuration ---
+BUILD_SCRIPT_PATH = os.path.join(PROJECT_ROOT, "zkp_scripts", "09_build_zkp_artifacts.py")
+PROVERS_BENCHMARK_SCRIPT_PATH = os.path.join(PROJECT_ROOT, "zkp_scripts", "12_benchmark_provers.py")
+PIPELINE_BENCHMARK_SCRIPT_PATH = os.path.join(PROJECT_ROOT, "pipeline_scripts", "11_benchmark_pipeline.py")
+BENCHMARK_OUTPUT_DIR = os.path.join(PROJECT_ROOT, "runtime_outputs", "benchmark")
+WORK_DIR = os.path.join(BENCHMARK_OUTPUT_DIR, "proof_systems_work")
+CALLDATA_WORDS = {"groth16": 8, "plonk": 24, "fflonk": 24} # uint256 proof words passed to the contract
+
+
+def coerce_calldata(value, abi_type):
+    """Converts snarkjs's hex-string calldata to what web3 expects for abi_type (ints for uint*)."""
+    if isinstance(value, list):
+        return [coerce_calldata(item, abi_type[:abi_type.rindex('[')]) for item in value]
+    return int(value, 16) if abi_type.startswith("uint") else value
+
+
+def measure_verifier_gas(w3, account, deploy, proof_system, zkey_path, public_path, proof_path, out_dir):
+    """Exports, deploys and calls the snarkjs Solidity verifier; returns (verify gas, on-chain result)."""
+    import solcx
+    verifier_path = os.path.join(out_dir, f"{proof_system}_verifier.sol")
+    subprocess.run([cfg.SNARKJS_CMD_PATH, "zkey", "export", "solidityverifier", zkey_path, verifier_path],
+                   capture_output=True, text=True, check=True)
+    compiled = solcx.compile_files([verifier_path], output_values=["abi", "bin"], solc_version=deploy.SOLC_VERSION)
+    verifier = next(value for key, value in compiled.items() if key.endswith("Verifier") and value["bin"])
+    contract = deploy.deploy_contract(w3, account, verifier["abi"], verifier["bin"], f"{proof_system} verifier")
+    calldata = subprocess.run([cfg.SNARKJS_CMD_PATH, "zkey", "export", "soliditycalldata", public_path, proof_path],
+                              capture_output=True, text=True, check=True).stdout
+    verify_abi = next(item for item in verifier["abi"] if item.get("name") == "verifyProof")
+    arguments = [coerce_calldata(value, item["type"])
+                 for value, item in zip(json.loads(f"[{calldata.strip()}]"), verify_abi["inputs"])]
+    call = contract.functions.verifyProof(*arguments)
+    return call.estimate_gas({'from': account.address}), bool(call.call())
+
+
+def benchmark_proof_system(proof_system, builder, circuit_name, r1cs_path, ptau_candidates, witness_path, runs, chain):
+    """Setup, `runs` timed proofs, local verification, sizes and (if chain is set) verifier gas for one system."""
+    out_dir = os.path.join(WORK_DIR, proof_system)
+    os.makedirs(out_dir, exist_ok=True)
+    start_time = time.perf_counter()
+    _, ptau_power = builder.run_setup(proof_system, circuit_name, r1cs_path, ptau_candidates, out_dir)
+    setup_seconds = time.perf_counter() - start_time
+
+    zkey_path = os.path.join(out_dir, builder.setup_zkey_name(proof_system, circuit_name))
+    vkey_path = os.path.join(out_dir, "verification_key.json")
+    proof_path = os.path.join(out_dir, "proof.json")
+    public_path = os.path.join(out_dir, "public.json")
+    prover = prover_backends.SnarkjsProver(cfg.SNARKJS_CMD_PATH, proof_system)
+    prover.prove(zkey_path, witness_path, proof_path, public_path, cwd=cfg.BASE_DIR) # Warm-up
+    timings = [prover.prove(zkey_path, witness_path, proof_path, public_path, cwd=cfg.BASE_DIR) for _ in range(runs)]
+    result = {
+        "setup_s": round(setup_seconds, 2),
+        "ptau_power": ptau_power,
+        "zkey_mb": round(os.path.getsize(zkey_path) / 2**20, 2),
+        "prove_median_s": round(statistics.median(timings), 4),
+        "prove_min_s": round(min(timings), 4),
+        "proof_json_bytes": os.path.getsize(proof_path),
+        "calldata_bytes": CALLDATA_WORDS[proof_system] * 32,
+        "verified": prover.verify(vkey_path, public_path, proof_path, cwd=cfg.BASE_DIR),
+        "verify_gas": None,
+    }
+    if chain is not None:
+        w3, account, deploy = chain
+        try:
+            result["verify_gas"], result["verified_on_chain"] = measure_verifier_gas(
+                w3, account, deploy, proof_system, zkey_path, public_path, proof_path, out_dir)
+        except Exception as e:
+            print(f"  Verifier gas not measured for {proof_system}: {e}")
+    return result
+
+
+def print_report(results):
+    print(f"\n{'system':<9}{'setup (s)':>10}{'ptau':>6}{'zkey (MB)':>11}{'prove (s)':>11}"
+          f"{'proof (B)':>11}{'calldata (B)':>14}{'verify gas':>12}  verified")
+    for proof_system, result in results.items():
+        print(f"{proof_system:<9}{result['setup_s']:>10}{result['ptau_power']:>6}{result['zkey_mb']:>11}"
+              f"{result['prove_median_s']:>11}{result['proof_json_bytes']:>11}{result['calldata_bytes']:>14}"
+              f"{str(result['verify_gas'] or '-'):>12}  {result['verified']}")
+
+
+# --- Main execution ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare Groth16, PLONK and FFLONK setup/prove/size/gas on our circuit.")
+    parser.add_argument("--proof-systems", default=",".join(cfg.PROOF_SYSTEMS))
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--sample-index", type=int, default=cfg.SAMPLE_INDEX)
+    parser.add_argument("--committed", action="store_true", help="Benchmark the DecisionTreeCommitted circuit.")
+    parser.add_argument("--rpc-url", default=None, help="Local dev node instead of the in-process chain.")
+    parser.add_argument("--no-gas", action="store_true", help="Skip the Solidity verifier gas measurement.")
+    args = parser.parse_args()
+
+    circuit_name = "decision_tree_committed" if args.committed else "decision_tree"
+    build_dir = cfg.COMMITTED_CIRCUIT_BUILD_DIR if args.committed else cfg.CIRCUIT_BUILD_DIR
+    r1cs_path = artifact_cache.resolve(circuit_name, "r1cs", os.path.join(build_dir, f"{circuit_name}.r1cs"))
+    if not os.path.exists(r1cs_path):
+        print(f"Error: {r1cs_path} not found. Run zkp_scripts/09_build_zkp_artifacts.py first.")
+        sys.exit(1)
+    required_power = artifact_cache.required_ptau_power(artifact_cache.read_r1cs_header(r1cs_path))
+    ptau_candidates = artifact_cache.ptau_candidates(required_power, cfg.PTAU_SEARCH_DIRS)
+    if not ptau_candidates:
+        print(f"Error: no .ptau file with power >= {required_power} in {cfg.PTAU_SEARCH_DIRS}")
+        sys.exit(1)
+
+    builder = script_loader.load_script(BUILD_SCRIPT_PATH, "build_zkp_artifacts")
+    provers_benchmark = script_loader.load_script(PROVERS_BENCHMARK_SCRIPT_PATH, "benchmark_provers")
+    os.makedirs(WORK_DIR, exist_ok=True)
+    provers_benchmark.WORK_DIR = WORK_DIR
+    witness_path = provers_benchmark.build_witness(script_loader.load_pipeline(), args.sample_index, args.committed)
+    print(f"Witness for sample {args.sample_index}: {witness_path}")
+
+    chain = None
+    if not args.no_gas:
+        deploy = script_loader.load_script(PIPELINE_BENCHMARK_SCRIPT_PATH, "benchmark_pipeline")
+        try:
+            w3 = deploy.connect_local_chain(args.rpc_url)
+            chain = (w3, deploy.create_funded_account(w3), deploy)
+        except Exception as e:
+            print(f"Verifier gas will not be measured: {e}")
+
+    results = {}
+    for proof_system in [name.strip().lower() for name in args.proof_systems.split(",") if name.strip()]:
+        print(f"\n=== {proof_system} ===")
+        results[proof_system] = benchmark_proof_system(proof_system, builder, circuit_name, r1cs_path,
+                                                       ptau_candidates, witness_path, args.runs, chain)
+    print_report(results)
+
+    report_path = os.path.join(BENCHMARK_OUTPUT_DIR, f"proof_systems_{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.json")
+    with open(report_path, 'w') as f:
+        json.dump({"circuit": circuit_name, "r1cs": r1cs_path, "runs": args.runs, "sample_index": args.sample_index,
+                   "results": results}, f, indent=2)
+    print(f"\nReport written to {report_path}")